@@ -6,29 +6,38 @@ def _account_root():
     return "accounting/accounts"
 
 
-def _get_last_day(datetime):
-    """Return the start of the day before 'datetime', e.g.
-       _get_last_day(April 1st) will return March 31st
+def _get_hourly_datetime(datetime):
+    """Return the datetime for the top of the hour of 'datetime',
+       e.g. 5.42pm would return 5.00pm
     """
+    from Acquire.ObjectStore import datetime_to_datetime \
+        as _datetime_to_datetime
     import datetime as _datetime
-    datetime = datetime - _datetime.timedelta(days=1)
-    return _datetime.datetime(year=datetime.year, month=datetime.month,
-                              day=datetime.day, tzinfo=datetime.tzinfo)
+    datetime = _datetime_to_datetime(datetime)
+    return _datetime.datetime(year=datetime.year,
+                              month=datetime.month,
+                              day=datetime.day,
+                              hour=datetime.hour,
+                              tzinfo=datetime.tzinfo)
 
 
-def _get_last_month(datetime):
-    """Return the date at the start of the month before 'datetime', e.g.
-       _get_last_month(March 21st) will return February 1st
+def _get_daily_datetime(datetime):
+    """Return the datetime for the start of the day of 'datetime',
+       e.g. 5.42pm on March 21st would return midnight on March 21st
     """
+    from Acquire.ObjectStore import datetime_to_datetime \
+        as _datetime_to_datetime
     import datetime as _datetime
-    datetime = datetime.replace(day=1) - _datetime.timedelta(days=1)
-    return _datetime.datetime(year=datetime.year, month=datetime.month,
-                              day=1, tzinfo=datetime.tzinfo)
+    datetime = _datetime_to_datetime(datetime)
+    return _datetime.datetime(year=datetime.year,
+                              month=datetime.month,
+                              day=datetime.day,
+                              tzinfo=datetime.tzinfo)
 
 
-def _get_hourly_datetime(datetime):
-    """Return the datetime for the top of the hour of 'datetime',
-       e.g. 5.42pm would return 5.00pm
+def _get_monthly_datetime(datetime):
+    """Return the datetime for the start of the month of 'datetime',
+       e.g. 5.42pm on March 21st would return midnight on March 1st
     """
     from Acquire.ObjectStore import datetime_to_datetime \
         as _datetime_to_datetime
@@ -36,11 +45,19 @@ def _get_hourly_datetime(datetime):
     datetime = _datetime_to_datetime(datetime)
     return _datetime.datetime(year=datetime.year,
                               month=datetime.month,
-                              day=datetime.day,
-                              hour=datetime.hour,
+                              day=1,
                               tzinfo=datetime.tzinfo)
 
 
+def _get_next_month(datetime):
+    """Return the datetime for the start of the month after 'datetime',
+       e.g. _get_next_month(March 21st) will return April 1st
+    """
+    import datetime as _datetime
+    datetime = _get_monthly_datetime(datetime) + _datetime.timedelta(days=32)
+    return _get_monthly_datetime(datetime)
+
+
 def _get_key_from_hour(start, datetime):
     """Return a key encoding the passed date, starting the key with 'start',
        but only up unto the specified hour
@@ -51,6 +68,18 @@ def _get_key_from_hour(start, datetime):
     return "%s/%sT%02d" % (start, datetime.date().isoformat(), datetime.hour)
 
 
+def _get_key_from_second(start, datetime):
+    """Return a key encoding the passed datetime, starting the key with
+       'start', but only up until the specified second
+    """
+    from Acquire.ObjectStore import datetime_to_datetime \
+        as _datetime_to_datetime
+    datetime = _datetime_to_datetime(datetime)
+    return "%s/%sT%02d:%02d:%02d" % (start, datetime.date().isoformat(),
+                                     datetime.hour, datetime.minute,
+                                     datetime.second)
+
+
 def _get_key_from_day(start, datetime):
     """Return a key encoding the passed date, starting the key with 'start',
        but only up until the specified day
@@ -58,18 +87,27 @@ def _get_key_from_day(start, datetime):
     from Acquire.ObjectStore import datetime_to_datetime \
         as _datetime_to_datetime
     datetime = _datetime_to_datetime(datetime)
-    return "%s/%4d-%02d-%02d" % (start, datetime.year, datetime.month,
-                                 datetime.day)
+    return "%s/%s" % (start, datetime.date().isoformat())
 
 
 def _get_key_from_month(start, datetime):
     """Return a key encoding the passed date, starting the key with 'start',
-       but only up to the specified month
+       but only up until the specified month
     """
     from Acquire.ObjectStore import datetime_to_datetime \
         as _datetime_to_datetime
     datetime = _datetime_to_datetime(datetime)
-    return "%s/%4d-%02d" % (start, datetime.year, datetime.month)
+    return "%s/%04d-%02d" % (start, datetime.year, datetime.month)
+
+
+def _get_beginning_of_time():
+    """Return the datetime before any transaction could have been
+       made, at which point all accounts have a zero balance
+    """
+    from Acquire.ObjectStore import datetime_to_datetime \
+        as _datetime_to_datetime
+    import datetime as _datetime
+    return _datetime_to_datetime(_datetime.datetime.fromordinal(1))
 
 
 def _get_hour_from_key(key):
@@ -92,6 +130,25 @@ def _get_hour_from_key(key):
         raise AccountError("Could not find a date in the key '%s'" % key)
 
 
+def _get_day_from_key(key):
+    """Return the date (at midnight) that is encoded in the passed key"""
+    import re as _re
+    m = _re.search(r"(\d\d\d\d)-(\d\d)-(\d\d)$", key)
+
+    if m:
+        from Acquire.ObjectStore import date_and_time_to_datetime \
+            as _date_and_time_to_datetime
+        import datetime as _datetime
+
+        return _date_and_time_to_datetime(
+                    _datetime.date(year=int(m.groups()[0]),
+                                   month=int(m.groups()[1]),
+                                   day=int(m.groups()[2])))
+    else:
+        from Acquire.Accounting import AccountError
+        raise AccountError("Could not find a date in the key '%s'" % key)
+
+
 def _get_datetime_from_key(key):
     """Return the datetime that is encoded in the passed key
 
@@ -312,70 +369,40 @@ class Account:
         start_datetime = _datetime_to_datetime(start_datetime)
         end_datetime = _datetime_to_datetime(end_datetime)
 
-        # get the day for each time
-        start_day = start_datetime.toordinal()
-        end_day = end_datetime.toordinal()
+        if end_datetime <= start_datetime:
+            return []
 
-        if end_datetime.time() == _datetime.time():
-            # this ends on midnight of the first day - do not
-            # include this last day as nothing will match
-            end_day -= 1
-
-        from Acquire.ObjectStore import string_to_datetime \
-            as _string_to_datetime
-        from Acquire.ObjectStore import date_to_string as _date_to_string
         from Acquire.ObjectStore import ObjectStore as _ObjectStore
         from Acquire.Accounting import TransactionInfo as _TransactionInfo
 
         bucket = self._get_account_bucket()
 
-        num_days = end_day - start_day
-
-        if num_days < 7:
-            # sufficiently few days that a day-by-day search is enough
-            transactions = []
-            for day in range(start_day, end_day+1):
-                day_date = _datetime.datetime.fromordinal(day)
-                day_string = _date_to_string(day_date)
-
-                prefix = "%s/%s" % (self._transactions_key(), day_string)
-
-                try:
-                    keys = _ObjectStore.get_all_object_names(bucket=bucket,
-                                                             prefix=prefix)
-                except:
-                    keys = []
-
-                for key in keys:
-                    transaction = _TransactionInfo.from_key(key)
-                    datetime = transaction.datetime()
-                    if datetime > start_datetime and datetime <= end_datetime:
-                        transactions.append(transaction)
-
-            return transactions
+        # transaction keys are ordered by time, so this is a single
+        # listing of the keys from the start second up to (but not
+        # including) the second after the end
+        prefix = self._transactions_key()
+        start_key = _get_key_from_second(start=prefix,
+                                         datetime=start_datetime)
+        end_key = _get_key_from_second(start=prefix,
+                                       datetime=end_datetime +
+                                       _datetime.timedelta(seconds=1))
 
-        # elif num_days < 300:  Try a better algorithm for weeks and months
-
-        else:
-            # likely more than years - easier to just scan all transactions
-            # on the account
-            prefix = self._transactions_key()
-
-            try:
-                keys = _ObjectStore.get_all_object_names(bucket=bucket,
-                                                         prefix=prefix)
-            except:
-                keys = []
+        try:
+            keys = _ObjectStore.list_keys_between(bucket=bucket,
+                                                  start_key=start_key,
+                                                  end_key=end_key)
+        except:
+            keys = []
 
-            transactions = []
+        transactions = []
 
-            for key in keys:
-                transaction = _TransactionInfo.from_key(key)
-                datetime = transaction.datetime()
-                if datetime > start_datetime and datetime <= end_datetime:
-                    transactions.append(transaction)
+        for key in keys:
+            transaction = _TransactionInfo.from_key(key)
+            datetime = transaction.datetime()
+            if datetime > start_datetime and datetime <= end_datetime:
+                transactions.append(transaction)
 
-            return transactions
+        return transactions
 
     def _get_balance_key(self, now=None):
         """Return the balance key for the passed time. This is the key
@@ -390,102 +417,224 @@ class Account:
             return _get_key_from_hour(start=self._balance_key(),
                                       datetime=self._get_now(now))
 
-    def _find_last_balance_key(self, now=None, bucket=None):
-        """Return the key containing the last hourly balance update before
-           'now' (defaults to actual now if not set)
+    def _get_balance_snapshot(self, key, bucket):
+        """Return the Balance snapshot stored at 'key', or None if
+           there is no snapshot at this key
         """
         from Acquire.ObjectStore import ObjectStore as _ObjectStore
-        now = self._get_now(now)
-        bucket = self._get_account_bucket(bucket)
-        start = self._balance_key()
+        from Acquire.Accounting import Balance as _Balance
 
-        # look for any balance keys from today
-        prefix = _get_key_from_day(start=start, datetime=now)
         try:
-            keys = _ObjectStore.get_all_object_names(bucket=bucket,
-                                                     prefix=prefix)
+            data = _ObjectStore.get_object_from_json(bucket=bucket, key=key)
         except:
-            keys = []
+            data = None
+
+        if data is None:
+            return None
+        else:
+            return _Balance.from_data(data)
+
+    def _set_balance_snapshot(self, key, balance, snapshot_time, bucket):
+        """Save the passed Balance as the snapshot at 'key', which
+           is the balance at 'snapshot_time'. Snapshots are only saved
+           for times that have already passed, as transactions could
+           still be made before a snapshot time that is in the future
+        """
+        from Acquire.ObjectStore import get_datetime_now as _get_datetime_now
+
+        if snapshot_time > _get_datetime_now():
+            return
+
+        from Acquire.ObjectStore import ObjectStore as _ObjectStore
+        _ObjectStore.set_object_from_json(bucket=bucket, key=key,
+                                          data=balance.to_data())
+
+    def _find_last_snapshot_key(self, start_key, end_key, bucket):
+        """Return the last snapshot key from 'start_key' (inclusive) up to
+           'end_key' (exclusive), or None if there are no snapshots in this
+           range. The snapshot keys are ordered by time, so this is a
+           single, bounded, reverse listing
+        """
+        from Acquire.ObjectStore import ObjectStore as _ObjectStore
 
-        if len(keys) > 0:
-            keys.sort()
-            return keys[-1]
-
-        # look for any balance keys from yesterday
-        # (we do this to stop big lookups for active accounts when
-        #  we jump between months)
-        now = _get_last_day(now)
-        prefix = _get_key_from_day(start=start, datetime=now)
         try:
-            keys = _ObjectStore.get_all_object_names(bucket=bucket,
-                                                     prefix=prefix)
+            keys = _ObjectStore.list_keys_between(bucket=bucket,
+                                                  start_key=start_key,
+                                                  end_key=end_key,
+                                                  reverse=True, limit=1)
         except:
             keys = []
 
         if len(keys) > 0:
-            keys.sort()
-            return keys[-1]
+            return keys[0]
+        else:
+            return None
+
+    def _search_last_snapshot_key(self, start, get_key, end_time, window,
+                                  bucket):
+        """Return the last snapshot key (as made by 'get_key(start,
+           datetime)') before the key for 'end_time', or None if there
+           are no earlier snapshots. Reverse listings list their whole
+           range on the cloud backends, so rather than searching all
+           of the history, this searches the snapshots in 'window'
+           before 'end_time', widening the window eight-fold each time
+           until it reaches the first snapshot (which is found using
+           a single forward listing)
+        """
+        from Acquire.ObjectStore import ObjectStore as _ObjectStore
+
+        end_key = get_key(start=start, datetime=end_time)
 
-        # look for any balance keys from this month
-        prefix = _get_key_from_month(start=start, datetime=now)
         try:
-            keys = _ObjectStore.get_all_object_names(bucket=bucket,
-                                                     prefix=prefix)
+            first_keys = _ObjectStore.list_keys_between(
+                                bucket=bucket, start_key="%s/" % start,
+                                end_key=end_key, limit=1)
         except:
-            keys = []
+            first_keys = []
 
-        if len(keys) > 0:
-            keys.sort()
-            return keys[-1]
+        if len(first_keys) == 0:
+            return None
+
+        first_key = first_keys[0]
 
-        for _ in range(0, 6):
-            now = _get_last_month(now)
-            prefix = _get_key_from_month(start=start, datetime=now)
+        while True:
             try:
-                keys = _ObjectStore.get_all_object_names(bucket=bucket,
-                                                         prefix=prefix)
-            except:
-                keys = []
+                start_key = get_key(start=start, datetime=end_time - window)
+            except OverflowError:
+                start_key = first_key
 
-            if len(keys) > 0:
-                keys.sort()
-                return keys[-1]
+            start_key = max(start_key, first_key)
 
-        # wow - no balance keys at all over the last 6 months. Look for
-        # *any* balance keys
-        try:
-            keys = _ObjectStore.get_all_object_names(bucket=bucket,
-                                                     prefix=prefix)
-        except:
-            keys = []
+            last_key = self._find_last_snapshot_key(start_key=start_key,
+                                                    end_key=end_key,
+                                                    bucket=bucket)
 
-        if len(keys) > 0:
-            keys.sort()
-            # can only return the latest key before 'now'
-            for i in range(len(keys)-1, 0, -1):
-                key = keys[i]
-                hourly_time = _get_hour_from_key(key)
+            if last_key is not None or start_key == first_key:
+                return last_key
 
-                if hourly_time < now:
-                    return key
+            window *= 8
 
-        # no balance keys at all! Set a balance key for the beginning of time
-        from Acquire.ObjectStore import datetime_to_datetime \
-            as _datetime_to_datetime
-        from Acquire.Accounting import Balance as _Balance
+    def _get_monthly_balance(self, now=None, bucket=None):
+        """Calculate and return the balance at the start of the month
+           for 'now' (defaults to actually now if not specified).
+           This is calculated from the last monthly snapshot before
+           this month (or, for accounts without monthly snapshots,
+           from the last hourly balance), and is then saved as
+           the snapshot for this month
+        """
         import datetime as _datetime
-        hourly_time = _datetime_to_datetime(_datetime.datetime.fromordinal(1))
 
-        hourly_key = self._get_balance_key(now=hourly_time)
-        hourly_balance = _Balance()
-        _ObjectStore.set_object_from_json(bucket=bucket, key=hourly_key,
-                                          data=hourly_balance.to_data())
+        bucket = self._get_account_bucket(bucket)
+        monthly_time = _get_monthly_datetime(self._get_now(now))
+        start = self._monthly_balance_key()
+        monthly_key = _get_key_from_month(start=start, datetime=monthly_time)
+
+        monthly_balance = self._get_balance_snapshot(monthly_key, bucket)
+
+        if monthly_balance is not None:
+            return monthly_balance
+
+        last_key = self._search_last_snapshot_key(
+                            start=start, get_key=_get_key_from_month,
+                            end_time=monthly_time,
+                            window=_datetime.timedelta(days=366),
+                            bucket=bucket)
+
+        if last_key is None:
+            # this account has no monthly snapshots - this is either
+            # a new account, or one from before snapshots were added,
+            # in which case we start from its last hourly balance
+            last_key = self._search_last_snapshot_key(
+                            start=self._balance_key(),
+                            get_key=_get_key_from_hour,
+                            end_time=monthly_time,
+                            window=_datetime.timedelta(days=31),
+                            bucket=bucket)
+
+            if last_key is None:
+                last_time = _get_beginning_of_time()
+            else:
+                last_time = _get_hour_from_key(last_key)
+        else:
+            last_time = _get_day_from_key("%s-01" % last_key)
+
+        if last_key is None:
+            from Acquire.Accounting import Balance as _Balance
+            last_balance = _Balance()
+        else:
+            last_balance = self._get_balance_snapshot(last_key, bucket)
+
+        transactions = self._get_transactions_between(
+                                    start_datetime=last_time,
+                                    end_datetime=monthly_time,
+                                    bucket=bucket)
+
+        monthly_balance = last_balance + _sum_transactions(transactions)
+
+        self._set_balance_snapshot(monthly_key, monthly_balance,
+                                   monthly_time, bucket)
+
+        return monthly_balance
+
+    def _get_daily_balance(self, now=None, bucket=None):
+        """Calculate and return the balance at the start of the day
+           for 'now' (defaults to actually now if not specified). This
+           is calculated from the last daily snapshot earlier in the
+           same month (or the monthly snapshot if there isn't one),
+           and is then saved as the snapshot for this day
+        """
+        bucket = self._get_account_bucket(bucket)
+        daily_time = _get_daily_datetime(self._get_now(now))
+        monthly_time = _get_monthly_datetime(daily_time)
+
+        if daily_time == monthly_time:
+            return self._get_monthly_balance(now=monthly_time, bucket=bucket)
+
+        start = self._daily_balance_key()
+        daily_key = _get_key_from_day(start=start, datetime=daily_time)
+
+        daily_balance = self._get_balance_snapshot(daily_key, bucket)
+
+        if daily_balance is not None:
+            return daily_balance
+
+        last_key = self._find_last_snapshot_key(
+                            start_key=_get_key_from_day(
+                                        start=start, datetime=monthly_time),
+                            end_key=daily_key, bucket=bucket)
+
+        last_balance = None
+
+        if last_key is not None:
+            last_balance = self._get_balance_snapshot(last_key, bucket)
+            last_time = _get_day_from_key(last_key)
+
+        if last_balance is None:
+            last_balance = self._get_monthly_balance(now=monthly_time,
+                                                     bucket=bucket)
+            last_time = monthly_time
+
+        transactions = self._get_transactions_between(
+                                    start_datetime=last_time,
+                                    end_datetime=daily_time,
+                                    bucket=bucket)
+
+        daily_balance = last_balance + _sum_transactions(transactions)
+
+        self._set_balance_snapshot(daily_key, daily_balance,
+                                   daily_time, bucket)
 
-        return hourly_key
+        return daily_balance
 
     def _get_hourly_balance(self, now=None, bucket=None):
         """Calculate and return the balance at the top of the hour
-           for 'now' (defaults to actually now if not specified)
+           for 'now' (defaults to actually now if not specified). This
+           is calculated from the last hourly snapshot earlier in the
+           same day (or the daily snapshot if there isn't one),
+           and is then saved as the snapshot for this hour. Together
+           with the daily and monthly snapshots, this means that any
+           balance is calculated from a small number of snapshots
+           plus at most one day's worth of transactions
         """
         now = self._get_now(now)
         hourly_key = self._get_balance_key(now)
@@ -493,47 +642,41 @@ class Account:
         if hourly_key in self._last_update:
             return self._last_update[hourly_key]["hourly_balance"]
 
-        from Acquire.Accounting import Balance as _Balance
-        from Acquire.ObjectStore import ObjectStore as _ObjectStore
         bucket = self._get_account_bucket(bucket)
 
-        try:
-            data = _ObjectStore.get_object_from_json(bucket=bucket,
-                                                     key=hourly_key)
-            hourly_balance = _Balance.from_data(data)
-        except:
-            hourly_balance = None
-
+        hourly_balance = self._get_balance_snapshot(hourly_key, bucket)
         hourly_now_time = _get_hourly_datetime(now)
 
         if hourly_balance is None:
-            # look for the last balance key...
-            last_balance_key = self._find_last_balance_key(now=now,
-                                                           bucket=bucket)
+            daily_time = _get_daily_datetime(now)
 
-            if last_balance_key is None:
-                from Acquire.Accounting import AccountError
-                raise AccountError(
-                    "The first balance of the account %s has not been set?"
-                    % str(self))
+            last_balance = None
 
-            data = _ObjectStore.get_object_from_json(bucket=bucket,
-                                                     key=last_balance_key)
+            if hourly_now_time != daily_time:
+                last_key = self._find_last_snapshot_key(
+                                    start_key=self._get_balance_key(
+                                                            daily_time),
+                                    end_key=hourly_key, bucket=bucket)
 
-            last_balance = _Balance.from_data(data)
-            last_balance_time = _get_hour_from_key(last_balance_key)
+                if last_key is not None:
+                    last_balance = self._get_balance_snapshot(last_key,
+                                                              bucket)
+                    last_time = _get_hour_from_key(last_key)
 
-            transactions = self._get_transactions_between(
-                                        start_datetime=last_balance_time,
-                                        end_datetime=hourly_now_time)
+            if last_balance is None:
+                last_balance = self._get_daily_balance(now=daily_time,
+                                                       bucket=bucket)
+                last_time = daily_time
 
-            total = _sum_transactions(transactions)
+            transactions = self._get_transactions_between(
+                                        start_datetime=last_time,
+                                        end_datetime=hourly_now_time,
+                                        bucket=bucket)
 
-            hourly_balance = last_balance + total
+            hourly_balance = last_balance + _sum_transactions(transactions)
 
-        _ObjectStore.set_object_from_json(bucket=bucket,
-                                          key=hourly_key,
-                                          data=hourly_balance.to_data())
+            self._set_balance_snapshot(hourly_key, hourly_balance,
+                                       hourly_now_time, bucket)
 
         self._last_update[hourly_key] = \
             {"hourly_balance": hourly_balance,
@@ -542,6 +685,75 @@ class Account:
 
         return hourly_balance
 
+    def backfill_balance_snapshots(self, now=None, bucket=None):
+        """Write the monthly balance snapshots for this account from
+           the month of its first transaction up to 'now' (defaults
+           to actually now). This is only needed for accounts that
+           were created before balance snapshots were introduced,
+           so that their balances do not need to be calculated
+           from their full transaction history. This streams through
+           the transactions once, and returns the number of
+           snapshots that were written
+
+           Args:
+                now (datetime, default=None): Time up to which to backfill
+                bucket (dict, default=None): Bucket to load data from
+
+           Returns:
+                int: The number of snapshots written
+        """
+        if self.is_null():
+            return 0
+
+        from Acquire.ObjectStore import ObjectStore as _ObjectStore
+        from Acquire.Accounting import Balance as _Balance
+        from Acquire.Accounting import TransactionInfo as _TransactionInfo
+
+        now = self._get_now(now)
+        bucket = self._get_account_bucket(bucket)
+        start = self._monthly_balance_key()
+
+        balance = _Balance()
+        next_month = None
+        nsnapshots = 0
+
+        for key in _ObjectStore.iter_object_names(
+                                        bucket=bucket,
+                                        prefix=self._transactions_key()):
+            transaction = _TransactionInfo.from_key(key)
+            datetime = transaction.datetime()
+
+            if datetime > now:
+                break
+
+            if next_month is None:
+                next_month = _get_monthly_datetime(datetime)
+
+            # the snapshot at the start of each month holds the balance
+            # of all transactions up to and including that time
+            while next_month < datetime:
+                self._set_balance_snapshot(
+                        _get_key_from_month(start=start,
+                                            datetime=next_month),
+                        balance, next_month, bucket)
+                nsnapshots += 1
+                next_month = _get_next_month(next_month)
+
+            balance = balance + transaction
+
+        if next_month is not None:
+            while next_month <= now:
+                self._set_balance_snapshot(
+                        _get_key_from_month(start=start,
+                                            datetime=next_month),
+                        balance, next_month, bucket)
+                nsnapshots += 1
+                next_month = _get_next_month(next_month)
+
+        self._last_update = {}
+
+        return nsnapshots
+
     def balance(self, now=None, bucket=None):
         """Get the balance of the account at 'now' (defaults to actually now).
            This returns a Balance object for the balance, that includes
@@ -1007,38 +1219,82 @@ class Account:
         if debit_note.value() <= 0:
             return
 
+        return self._credit_many([debit_note], bucket=bucket)[0]
+
+    def _credit_many(self, debit_notes, bucket=None):
+        """Credit the value in each of the passed 'debit_notes' to this
+           account. This works in the same way as _credit, except that
+           all of the line items are written to the object store together.
+           Either all of the credits are recorded, or none of them are
+
+            Args:
+                debit_notes (list): DebitNotes holding the values to be
+                credited to this account
+                bucket (dict, default=None): Bucket to load data from
+
+            Returns:
+                list: List of tuples of (uid, datetime), one per debit note
+        """
+        from Acquire.Accounting import DebitNote as _DebitNote
         from Acquire.Accounting import TransactionInfo as _TransactionInfo
         from Acquire.Accounting import TransactionCode as _TransactionCode
 
-        if debit_note.is_provisional():
-            encoded_value = _TransactionInfo.encode(
-                                _TransactionCode.ACCOUNT_RECEIVABLE,
-                                debit_note.value())
-        else:
-            encoded_value = _TransactionInfo.encode(
-                                _TransactionCode.CREDIT,
-                                debit_note.value())
+        debit_notes = list(debit_notes)
+
+        encoded_values = []
+
+        for debit_note in debit_notes:
+            if not isinstance(debit_note, _DebitNote):
+                raise TypeError("The passed debit note must be a DebitNote")
+
+            if debit_note.value() <= 0:
+                raise ValueError("You cannot credit a zero or negative "
+                                 "value: %s" % debit_note)
+
+            if debit_note.is_provisional():
+                encoded_values.append(_TransactionInfo.encode(
+                                    _TransactionCode.ACCOUNT_RECEIVABLE,
+                                    debit_note.value()))
+            else:
+                encoded_values.append(_TransactionInfo.encode(
+                                    _TransactionCode.CREDIT,
+                                    debit_note.value()))
+
+        if len(debit_notes) == 0:
+            return []
 
         bucket = self._get_account_bucket()
 
-        # create a UID and datetime for this credit and record
-        # it in the account
+        from Acquire.ObjectStore import datetime_to_string \
+            as _datetime_to_string
+        from Acquire.ObjectStore import create_uuid as _create_uuid
+        from Acquire.Accounting import LineItem as _LineItem
+
+        # create a UID and datetime for these credits and record
+        # them in the account
         while True:
             now = self._get_safe_now()
 
-            # and to create a key to find this credit later. The key is made
+            # and to create a key to find each credit later. The key is made
             # up from the isoformat datetime of the credit and a random string
-            from Acquire.ObjectStore import datetime_to_string \
-                as _datetime_to_string
-            from Acquire.ObjectStore import ObjectStore as _ObjectStore
-            from Acquire.Accounting import LineItem as _LineItem
-            from Acquire.ObjectStore import create_uuid as _create_uuid
-
             datetime_key = _datetime_to_string(now)
-            uid = "%s/%s" % (datetime_key, _create_uuid()[0:8])
 
-            item_key = "%s/%s/%s" % (self._transactions_key(),
-                                     uid, encoded_value)
+            uids = []
+            items = {}
+
+            for (debit_note, encoded_value) in zip(debit_notes,
+                                                   encoded_values):
+                uid = "%s/%s" % (datetime_key, _create_uuid()[0:8])
+                item_key = "%s/%s/%s" % (self._transactions_key(),
+                                         uid, encoded_value)
+
+                # the line item records the UID of the debit note, so we can
+                # find this debit note in the system and, from this, get the
+                # original transaction in the transaction record
+                l = _LineItem(debit_note.uid(), debit_note.authorisation())
+
+                uids.append(uid)
+                items[item_key] = l.to_data()
 
             now2 = self._get_safe_now()
 
@@ -1046,14 +1302,31 @@ class Account:
                 # we are safely in the same hour
                 break
 
-        # the line item records the UID of the debit note, so we can
-        # find this debit note in the system and, from this, get the
-        # original transaction in the transaction record
-        l = _LineItem(debit_note.uid(), debit_note.authorisation())
+        self._write_line_items(items, bucket=bucket)
 
-        _ObjectStore.set_object_from_json(bucket, item_key, l.to_data())
+        return [(uid, now) for uid in uids]
 
-        return (uid, now)
+    def _write_line_items(self, items, bucket):
+        """Internal function used to write all of the passed line items
+           (a dictionary of line item data indexed by key) to the object
+           store together. If any of the writes fail then the items
+           that were written are removed, so that either all or none
+           of the items are recorded in the account
+        """
+        from Acquire.ObjectStore import ObjectStore as _ObjectStore
+        from Acquire.ObjectStore import ObjectStoreBatchError \
+            as _ObjectStoreBatchError
+
+        try:
+            _ObjectStore.set_objects_from_json(bucket=bucket, objects=items)
+        except _ObjectStoreBatchError as e:
+            for key in e.results().keys():
+                try:
+                    _ObjectStore.delete_object(bucket=bucket, key=key)
+                except:
+                    pass
+
+            raise
 
     def _debit(self, transaction, authorisation,
                is_provisional, receipt_by,
@@ -1098,32 +1371,105 @@ class Account:
         if self.is_null() or transaction.value() <= 0:
             return None
 
+        return self._debit_many(
+                    transactions=[transaction],
+                    authorisation=authorisation,
+                    is_provisional=is_provisional,
+                    receipt_by=receipt_by,
+                    authorisation_resource=authorisation_resource,
+                    bucket=bucket)[0]
+
+    def _debit_many(self, transactions, authorisation,
+                    is_provisional, receipt_by,
+                    authorisation_resource=None, bucket=None):
+        """Debit the values of all of the passed transactions from this
+           account, based on the authorisation contained in 'authorisation'.
+           This works in the same way as _debit, except that the whole
+           batch is validated against a single read of the balance, all of
+           the line items are written together, and the balance is
+           re-checked once after they are written. Either all of the
+           debits succeed, or none of them do (e.g. an
+           InsufficientFundsError is raised if the account cannot
+           afford the total of the batch)
+
+           Note that this function is private as it should only be called
+           by the DebitNote class
+
+            Args:
+                transactions (list): Transactions holding the values to be
+                debited from this account
+                authorisation (Authorisation): Authorisation for the
+                transactions
+                is_provisional (bool): If True the transactions will be
+                recorded as liabilities
+                receipt_by (datetime): Datetime by which the transactions
+                should be receipted
+                authorisation_resource (str, default=None): Resource that
+                was authorised (defaults to each transaction's fingerprint)
+                bucket (dict, default=None): Bucket to load data from
+
+            Returns:
+                list: List of tuples of (uid, now, receipt_by), one per
+                transaction
+        """
+        if self.is_null():
+            return None
+
         from Acquire.Accounting import Transaction as _Transaction
+        from Acquire.Accounting import create_decimal as _create_decimal
+
+        transactions = list(transactions)
+        total = _create_decimal(0)
 
-        if not isinstance(transaction, _Transaction):
-            raise TypeError("The passed transaction must be a Transaction!")
+        for transaction in transactions:
+            if not isinstance(transaction, _Transaction):
+                raise TypeError("The passed transaction must be a "
+                                "Transaction!")
+
+            if transaction.value() <= 0:
+                raise ValueError("You cannot debit a zero or negative "
+                                 "value: %s" % transaction)
+
+            total += transaction.value()
+
+        if len(transactions) == 0:
+            return []
 
         if authorisation_resource is None:
-            authorisation_resource = transaction.fingerprint()
+            resources = []
+
+            for transaction in transactions:
+                resource = transaction.fingerprint()
+                if resource not in resources:
+                    resources.append(resource)
+
             accept_partial_match = True
         else:
+            resources = [authorisation_resource]
             accept_partial_match = False
 
-        self.assert_valid_authorisation(
+        for resource in resources:
+            self.assert_valid_authorisation(
                                     authorisation=authorisation,
-                                    resource=authorisation_resource,
+                                    resource=resource,
                                     accept_partial_match=accept_partial_match)
 
         bucket = self._get_account_bucket()
 
         balance = self.balance(bucket=bucket)
 
-        if balance.available(self.get_overdraft_limit()) < transaction.value():
+        if balance.available(self.get_overdraft_limit()) < total:
             from Acquire.Accounting import InsufficientFundsError
-            raise InsufficientFundsError(
-                "You cannot debit '%s' from account %s as there "
-                "are insufficient funds in this account." %
-                (transaction, str(self)))
+            if len(transactions) == 1:
+                raise InsufficientFundsError(
+                    "You cannot debit '%s' from account %s as there "
+                    "are insufficient funds in this account." %
+                    (transactions[0], str(self)))
+            else:
+                raise InsufficientFundsError(
+                    "You cannot debit %d transactions totalling %s from "
+                    "account %s as there are insufficient funds in this "
+                    "account." % (len(transactions), total, str(self)))
 
         from Acquire.ObjectStore import datetime_to_string \
             as _datetime_to_string
@@ -1131,15 +1477,15 @@ class Account:
             as _datetime_to_datetime
         from Acquire.ObjectStore import get_datetime_future \
             as _get_datetime_future
-        from Acquire.ObjectStore import ObjectStore as _ObjectStore
+        from Acquire.ObjectStore import create_uuid as _create_uuid
         from Acquire.Accounting import LineItem as _LineItem
 
         from Acquire.Accounting import TransactionInfo as _TransactionInfo
         from Acquire.Accounting import TransactionCode as _TransactionCode
 
         while True:
-            # create a UID and datetime for this debit and record
-            # it in the account
+            # create a UID and datetime for these debits and record
+            # them in the account
             now = self._get_safe_now()
 
             if is_provisional:
@@ -1160,68 +1506,79 @@ class Account:
             else:
                 receipt_by = None
 
-            # and to create a key to find this debit later. The key is made
+            # and to create a key to find each debit later. The key is made
             # up from the isoformat datetime of the debit and a random string
-            from Acquire.ObjectStore import create_uuid as _create_uuid
             datetime_key = _datetime_to_string(now)
-            uid = "%s/%s" % (datetime_key, _create_uuid()[0:8])
 
-            # the key in the object store is a combination of the key for this
-            # account plus the uid for the debit plus the actual debit value.
-            # We record the debit value in the key so that we can accumulate
-            # the balance from just the key names
-            if is_provisional:
-                encoded_value = _TransactionInfo.encode(
-                                    _TransactionCode.CURRENT_LIABILITY,
-                                    transaction.value())
-            else:
-                encoded_value = _TransactionInfo.encode(
-                                    _TransactionCode.DEBIT,
-                                    transaction.value())
+            uids = []
+            items = {}
 
-            item_key = "%s/%s/%s" % (self._transactions_key(),
-                                     uid, encoded_value)
+            for transaction in transactions:
+                uid = "%s/%s" % (datetime_key, _create_uuid()[0:8])
+
+                # the key in the object store is a combination of the key for
+                # this account plus the uid for the debit plus the actual
+                # debit value. We record the debit value in the key so that
+                # we can accumulate the balance from just the key names
+                if is_provisional:
+                    encoded_value = _TransactionInfo.encode(
+                                        _TransactionCode.CURRENT_LIABILITY,
+                                        transaction.value())
+                else:
+                    encoded_value = _TransactionInfo.encode(
+                                        _TransactionCode.DEBIT,
+                                        transaction.value())
+
+                item_key = "%s/%s/%s" % (self._transactions_key(),
+                                         uid, encoded_value)
 
-            # create a line_item for this debit and save it to the object store
-            line_item = _LineItem(uid, authorisation)
+                # create a line_item for this debit
+                line_item = _LineItem(uid, authorisation)
+
+                uids.append(uid)
+                items[item_key] = line_item.to_data()
 
             # validate that we have not stepped into another hour...
             now2 = self._get_safe_now()
 
             if now.hour == now2.hour:
                 # we are still in the same hour, so it is safe to
-                # record the transaction
+                # record the transactions
                 break
 
-        _ObjectStore.set_object_from_json(bucket=bucket, key=item_key,
-                                          data=line_item.to_data())
+        self._write_line_items(items, bucket=bucket)
 
         balance = self.balance(bucket=bucket)
 
         if balance.available(overdraft_limit=self._overdraft_limit) < 0:
-            # This transaction has helped push the account beyond the
+            # These transactions have helped push the account beyond the
             # overdraft limit. This can only happen if two debits
             # take place at the same time - both should be refunded
-            from Acquire.Accounting import TransactionInfo \
-                as _TransactionInfo
+            rescinds = {}
+
+            for item_key in items.keys():
+                info = _TransactionInfo.from_key(item_key)
+                info = _TransactionInfo.rescind(info)
 
-            info = _TransactionInfo.from_key(item_key)
-            info = _TransactionInfo.rescind(info)
+                line_item = _LineItem(uid=info.dated_uid(),
+                                      authorisation=None)
 
-            line_item = _LineItem(uid=info.dated_uid(), authorisation=None)
+                rescind_key = "%s/%s" % (self._transactions_key(),
+                                         info.to_key())
 
-            item_key = "%s/%s" % (self._transactions_key(),
-                                  info.to_key())
+                rescinds[rescind_key] = line_item.to_data()
 
-            _ObjectStore.set_object_from_json(bucket=bucket, key=item_key,
-                                              data=line_item.to_data())
+            from Acquire.ObjectStore import ObjectStore as _ObjectStore
+            _ObjectStore.set_objects_from_json(bucket=bucket,
+                                               objects=rescinds)
 
+            from Acquire.Accounting import InsufficientFundsError
             raise InsufficientFundsError(
-                "You cannot debit '%s' from account %s as there "
+                "You cannot debit %s from account %s as there "
                 "are insufficient funds in this account." %
-                (transaction, str(self)))
+                (total, str(self)))
 
-        return (uid, now, receipt_by)
+        return [(uid, now, receipt_by) for uid in uids]
 
     def get_overdraft_limit(self):
         """Return the overdraft limit of this account
@@ -1312,6 +1669,24 @@ class Account:
         else:
             return "%s/balance" % self._key()
 
+    def _daily_balance_key(self):
+        """Return the root key for the daily balance snapshots for this
+           account in this object store
+        """
+        if self.is_null():
+            return None
+        else:
+            return "%s/daily_balance" % self._key()
+
+    def _monthly_balance_key(self):
+        """Return the root key for the monthly balance snapshots for this
+           account in this object store
+        """
+        if self.is_null():
+            return None
+        else:
+            return "%s/monthly_balance" % self._key()
+
     def _load_account(self, bucket=None):
         """Load the current state of the account from the object store"""
         if self.is_null():
@@ -333,6 +333,13 @@ class CreditNote:
 
         (uid, datetime) = account._credit(debit_note, bucket=bucket)
 
+        self._set_credit(debit_note=debit_note, account=account,
+                         uid=uid, datetime=datetime)
+
+    def _set_credit(self, debit_note, account, uid, datetime):
+        """Internal function used to set the data of this note from
+           the result of crediting 'debit_note' to 'account'
+        """
         self._account_uid = account.uid()
         self._debit_account_uid = debit_note.account_uid()
         self._datetime = datetime
@@ -344,6 +351,46 @@ class CreditNote:
         if self._is_provisional:
             self._receipt_by = debit_note.receipt_by()
 
+    @staticmethod
+    def create_many(debit_notes, account, bucket=None):
+        """Create and return the credit notes that match all of the
+           passed debit notes, which are credited together to the
+           passed account. Either all of the credits are recorded,
+           or none of them are
+
+           Args:
+                debit_notes (list): DebitNotes to take value from
+                account (Account): Account to credit
+                bucket (dict, default=None): Bucket to load data from
+           Returns:
+                list: List of CreditNotes, one per debit note
+        """
+        from Acquire.Accounting import DebitNote as _DebitNote
+        from Acquire.Accounting import Account as _Account
+
+        debit_notes = list(debit_notes)
+
+        for debit_note in debit_notes:
+            if not isinstance(debit_note, _DebitNote):
+                raise TypeError("You can only create a CreditNote "
+                                "with a DebitNote")
+
+        if not isinstance(account, _Account):
+            raise TypeError("You can only create a CreditNote with an "
+                            "Account")
+
+        credits = account._credit_many(debit_notes, bucket=bucket)
+
+        notes = []
+
+        for (debit_note, (uid, datetime)) in zip(debit_notes, credits):
+            note = CreditNote()
+            note._set_credit(debit_note=debit_note, account=account,
+                             uid=uid, datetime=datetime)
+            notes.append(note)
+
+        return notes
+
     @staticmethod
     def from_data(data):
         """Construct and return a new CreditNote from the passed json-decoded
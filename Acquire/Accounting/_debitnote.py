@@ -359,11 +359,6 @@ class DebitNote:
             if not isinstance(authorisation, _Authorisation):
                 raise TypeError("Authorisation must be of type Authorisation")
 
-        self._transaction = transaction
-        self._account_uid = account.uid()
-        self._authorisation = authorisation
-        self._is_provisional = is_provisional
-
         (uid, datetime, receipt_by) = account._debit(
                         transaction=transaction,
                         authorisation=authorisation,
@@ -371,6 +366,21 @@ class DebitNote:
                         is_provisional=is_provisional,
                         receipt_by=receipt_by, bucket=bucket)
 
+        self._set_debit(transaction=transaction, account=account,
+                        authorisation=authorisation,
+                        is_provisional=is_provisional,
+                        uid=uid, datetime=datetime, receipt_by=receipt_by)
+
+    def _set_debit(self, transaction, account, authorisation,
+                   is_provisional, uid, datetime, receipt_by):
+        """Internal function used to set the data of this note from
+           the result of a debit of 'transaction' from 'account'
+        """
+        self._transaction = transaction
+        self._account_uid = account.uid()
+        self._authorisation = authorisation
+        self._is_provisional = is_provisional
+
         from Acquire.ObjectStore import datetime_to_datetime \
             as _datetime_to_datetime
         self._datetime = _datetime_to_datetime(datetime)
@@ -382,6 +392,73 @@ class DebitNote:
         else:
             assert(receipt_by is None)
 
+    @staticmethod
+    def create_many(transactions, account, authorisation,
+                    is_provisional=False, receipt_by=None,
+                    authorisation_resource=None, bucket=None):
+        """Create and return the debit notes for all of the passed
+           transactions, which are debited together from the passed
+           account. The whole batch is checked against a single read
+           of the account balance, and either all of the debits
+           succeed, or none of them do. All of the notes share the
+           same datetime and (if provisional) 'receipt_by' time
+
+           Args:
+                transactions (list): Transactions to debit
+                account (Account): Account to take value from
+                authorisation (Authorisation): Authorises the removal
+                of value from account
+                is_provisional (bool, default=False): Whether the debits
+                are provisional or not
+                receipt_by (datetime, default=None): Datetime by which the
+                debits must be receipted
+                authorisation_resource (str, default=None): Resource that
+                was authorised
+                bucket (dict, default=None): Bucket to read data from
+           Returns:
+                list: List of DebitNotes, one per transaction
+        """
+        from Acquire.Accounting import Transaction as _Transaction
+        from Acquire.Accounting import Account as _Account
+
+        transactions = list(transactions)
+
+        for transaction in transactions:
+            if not isinstance(transaction, _Transaction):
+                raise TypeError("You can only create a DebitNote with a "
+                                "Transaction")
+
+        if not isinstance(account, _Account):
+            raise TypeError("You can only create a DebitNote with a valid "
+                            "Account")
+
+        if authorisation is not None:
+            from Acquire.Identity import Authorisation as _Authorisation
+
+            if not isinstance(authorisation, _Authorisation):
+                raise TypeError("Authorisation must be of type Authorisation")
+
+        debits = account._debit_many(
+                        transactions=transactions,
+                        authorisation=authorisation,
+                        authorisation_resource=authorisation_resource,
+                        is_provisional=is_provisional,
+                        receipt_by=receipt_by, bucket=bucket)
+
+        notes = []
+
+        for (transaction, debit) in zip(transactions, debits):
+            (uid, datetime, receipt_by) = debit
+            note = DebitNote()
+            note._set_debit(transaction=transaction, account=account,
+                            authorisation=authorisation,
+                            is_provisional=is_provisional,
+                            uid=uid, datetime=datetime,
+                            receipt_by=receipt_by)
+            notes.append(note)
+
+        return notes
+
     def to_data(self):
         """Return this DebitNote as a dictionary that can be encoded as json
 
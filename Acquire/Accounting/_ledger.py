@@ -79,6 +79,42 @@ class Ledger:
                                               Ledger.get_key(record.uid()),
                                               record.to_data())
 
+    @staticmethod
+    def save_transactions(records, bucket=None):
+        """Save all of the passed transaction records to the object
+           store. The records are written together, so this is much
+           faster than calling save_transaction for each record
+
+           Args:
+                records (list): TransactionRecords to save
+                bucket (dict, default=None): Bucket to save data to
+           Returns:
+                None
+        """
+        from Acquire.Accounting import TransactionRecord as _TransactionRecord
+
+        objects = {}
+
+        for record in records:
+            if not isinstance(record, _TransactionRecord):
+                raise TypeError("You can only write TransactionRecord objects "
+                                "to the ledger!")
+
+            if not record.is_null():
+                objects[Ledger.get_key(record.uid())] = record.to_data()
+
+        if len(objects) == 0:
+            return
+
+        if bucket is None:
+            from Acquire.Service import get_service_account_bucket \
+                as _get_service_account_bucket
+            bucket = _get_service_account_bucket()
+
+        from Acquire.ObjectStore import ObjectStore as _ObjectStore
+
+        _ObjectStore.set_objects_from_json(bucket, objects)
+
     @staticmethod
     def refund(refund, bucket=None):
         """Create and record a new transaction from the passed refund. This
@@ -355,75 +391,33 @@ class Ledger:
                 as _get_service_account_bucket
             bucket = _get_service_account_bucket()
 
-        # first, try to debit all of the transactions. If any fail (e.g.
-        # because there is insufficient balance) then they are all
-        # immediately refunded
-        debit_notes = []
-        try:
-            for transaction in transactions:
-                debit_notes.append(_DebitNote(
-                    transaction=transaction,
-                    account=debit_account,
-                    authorisation=authorisation,
-                    authorisation_resource=authorisation_resource,
-                    is_provisional=is_provisional,
-                    receipt_by=receipt_by, bucket=bucket))
-
-                # ensure the receipt_by date for all notes is the same
-                if is_provisional and (receipt_by is None):
-                    receipt_by = debit_notes[0].receipt_by()
-
-        except Exception as e:
-            # refund all of the completed debits
-            credit_notes = []
-            debit_error = str(e)
-            try:
-                for debit_note in debit_notes:
-                    debit_account._rescind_note(debit_note, bucket=bucket)
-            except Exception as e:
-                from Acquire.Accounting import UnbalancedLedgerError
-                raise UnbalancedLedgerError(
-                    "We have an unbalanced ledger as it was not "
-                    "possible to refund a multi-part refused credit (%s): "
-                    "Credit refusal error = %s. Refund error = %s" %
-                    (str(debit_note), str(debit_error), str(e)))
-
-            # raise the original error to show that, e.g. there was
-            # insufficient balance
-            raise e
+        # first, debit all of the transactions together. These are
+        # checked against a single read of the balance of the debit
+        # account, and either all succeed or none of them are recorded
+        # (e.g. because there is insufficient balance)
+        debit_notes = _DebitNote.create_many(
+                            transactions=transactions,
+                            account=debit_account,
+                            authorisation=authorisation,
+                            authorisation_resource=authorisation_resource,
+                            is_provisional=is_provisional,
+                            receipt_by=receipt_by, bucket=bucket)
 
         # now create the credit note(s) for this transaction. This will credit
         # the account, thereby transferring value from the debit_note(s) to
         # that account. If this fails then the debit_note(s) needs to
         # be refunded
-        credit_notes = {}
-        has_error = False
-        credit_error = Exception()
-        for debit_note in debit_notes:
-            try:
-                credit_note = _CreditNote(debit_note, credit_account,
-                                          bucket=bucket)
-                credit_notes[debit_note.uid()] = credit_note
-            except Exception as e:
-                has_error = True
-                credit_error = e
-                break
-
-        if has_error:
+        try:
+            credit_notes = {}
+            for credit_note in _CreditNote.create_many(debit_notes,
+                                                       credit_account,
+                                                       bucket=bucket):
+                credit_notes[credit_note.debit_note_uid()] = credit_note
+        except Exception as e:
             # something went wrong crediting the account... We need to refund
-            # the transaction - first retract the credit notes...
-            try:
-                for credit_note in credit_notes.values():
-                    credit_account._delete_note(credit_note, bucket=bucket)
-            except Exception as e:
-                from Acquire.Accounting import UnbalancedLedgerError
-                raise UnbalancedLedgerError(
-                    "We have an unbalanced ledger as it was not "
-                    "possible to credit a multi-part debit (%s): Credit "
-                    "refusal error = %s. Refund error = %s" %
-                    (debit_notes, str(credit_error), str(e)))
-
-            # now refund all of the debit notes
+            # the transaction. No credits were recorded, so just refund all
+            # of the debit notes
+            credit_error = e
             try:
                 for debit_note in debit_notes:
                     debit_account._delete_note(debit_note, bucket=bucket)
@@ -517,10 +511,10 @@ class Ledger:
                 if refund is not None:
                     record._refund = refund
 
-                Ledger.save_transaction(record, bucket)
-
                 records.append(record)
 
+            Ledger.save_transactions(records, bucket)
+
             return records
 
         except:
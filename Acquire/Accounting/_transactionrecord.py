@@ -411,16 +411,22 @@ class TransactionRecord:
             bucket = _get_service_account_bucket()
 
         from Acquire.Accounting import Ledger as _Ledger
-        from Acquire.ObjectStore import Mutex as _Mutex
+        from Acquire.ObjectStore import ObjectStore as _ObjectStore
+        from Acquire.ObjectStore import ObjectStorePreconditionError \
+            as _ObjectStorePreconditionError
 
-        try:
-            mutex = _Mutex(uid, timeout=600, lease_time=600)
-        except Exception as e:
-            raise LedgerError("Cannot secure a Ledger mutex for transaction "
-                              "'%s'. Error = %s" % (uid, str(e)))
+        key = _Ledger.get_key(uid)
 
-        try:
-            transaction = _Ledger.load_transaction(uid, bucket)
+        while True:
+            try:
+                (data, etag) = _ObjectStore.get_object_from_json_with_etag(
+                                                                bucket, key)
+            except Exception as e:
+                raise LedgerError("There is no transaction recorded in the "
+                                  "ledger with UID=%s (at key %s): %s" %
+                                  (uid, key, str(e)))
+
+            transaction = TransactionRecord.from_data(data)
 
             if transaction.transaction_state() != expected_state:
                 raise TransactionError(
@@ -428,33 +434,22 @@ class TransactionRecord:
                     "%s to %s as it is not in the expected state" %
                     (str(transaction), expected_state.value, new_state.value))
 
-            transaction._transaction_state = new_state
-        except:
-            mutex.unlock()
-            raise
+            # no need to write anything back if the state isn't changed
+            if expected_state == new_state:
+                return transaction
 
-        # now need to write anything back if the state isn't changed
-        if expected_state == new_state:
-            return transaction
+            transaction._transaction_state = new_state
 
-        # make sure we have enough time remaining on the lease to be
-        # able to write this result back to the object store...
-        if mutex.seconds_remaining_on_lease() < 100:
+            # this write only succeeds if no-one else has changed the
+            # transaction since we read it. If they have, then reload
+            # it and check the state again
             try:
-                mutex.fully_unlock()
-            except:
-                pass
-
-            return TransactionRecord.load_test_and_set(uid, expected_state,
-                                                       new_state, bucket)
+                _ObjectStore.set_object_from_json_if(
+                        bucket, key, transaction.to_data(), if_match=etag)
+            except _ObjectStorePreconditionError:
+                continue
 
-        try:
-            _Ledger.save_transaction(transaction, bucket)
-        except:
-            mutex.unlock()
-            raise
-
-        return transaction
+            return transaction
 
     @staticmethod
     def from_data(data):
@@ -1,16 +1,26 @@
 
 __all__ = ["ChunkDownloader"]
 
+# the default number of chunks that are requested and decompressed
+# at the same time by 'download'
+_default_max_in_flight = 4
+
 
 class ChunkDownloader:
     """This class is used to control the chunked downloading
        of a file. This allows a file to be downloaded
        chunk by chunk (bit by bit). This is useful, e.g.
-       to download a file as it is being written
+       to download a file as it is being written.
+
+       'download' prefetches chunks - up to 'max_in_flight' chunks
+       are requested, verified and decompressed at the same time
+       by a pool of worker threads, with the chunks written to
+       the local file in order
     """
-    def __init__(self, drive_uid=None, file_uid=None):
+    def __init__(self, drive_uid=None, file_uid=None, max_in_flight=None):
         """Create a new ChunkDowloader that downloads the specified
-           file from the specified drive
+           file from the specified drive, with up to 'max_in_flight'
+           chunks being downloaded at the same time
         """
         self._uid = None
         self._drive_uid = None
@@ -21,6 +31,7 @@ class ChunkDownloader:
         self._last_filename = None
         self._downloaded_filename = None
         self._FILE = None
+        self.set_max_in_flight(max_in_flight)
 
         if drive_uid is not None:
             self._drive_uid = str(drive_uid)
@@ -57,6 +68,28 @@ class ChunkDownloader:
         """Return the service that created this downloader"""
         return self._service
 
+    def set_max_in_flight(self, max_in_flight=None):
+        """Set the maximum number of chunks that will be downloaded
+           and decompressed at the same time. Set this to 1 to
+           download the chunks one at a time
+        """
+        if max_in_flight is None:
+            max_in_flight = _default_max_in_flight
+        else:
+            max_in_flight = int(max_in_flight)
+
+        if max_in_flight < 1:
+            raise ValueError("The number of chunks in flight must be at "
+                             "least 1: %s" % max_in_flight)
+
+        self._max_in_flight = max_in_flight
+
+    def max_in_flight(self):
+        """Return the maximum number of chunks that will be downloaded
+           and decompressed at the same time
+        """
+        return self._max_in_flight
+
     def local_filename(self):
         """Return the name of the local file to which we are downloading
            data
@@ -91,13 +124,14 @@ class ChunkDownloader:
 
         return self._downloaded_filename
 
-    def download_next_chunk(self):
-        """Download the next chunk. Returns 'True' if something was
-           downloaded, else it returns 'False'
+    def _download_chunk(self, chunk_index):
+        """Internal function that downloads, verifies and decompresses
+           the chunk at index 'chunk_index'. This returns a tuple of
+           the decompressed chunk (or None if this chunk is not
+           available) and the number of chunks in the file (or None
+           if this is not yet known). This is called by the worker
+           threads
         """
-        if not self.is_open():
-            return False
-
         service = self.service()
 
         if service is None:
@@ -109,27 +143,33 @@ class ChunkDownloader:
         secret = _Hash.multi_md5(self._secret,
                                  "%s%s%d" % (self._drive_uid,
                                              self._file_uid,
-                                             self._next_index))
+                                             chunk_index))
 
         args = {}
         args["uid"] = self._uid
         args["drive_uid"] = self._drive_uid
         args["file_uid"] = self._file_uid
-        args["chunk_index"] = self._next_index
+        args["chunk_index"] = chunk_index
         args["secret"] = secret
 
         response = service.call_function(function="download_chunk",
                                          args=args)
 
+        chunk = None
+        num_chunks = None
+
         if "meta" in response:
             import json as _json
             meta = _json.loads(response["meta"])
             checksum = meta["checksum"]
 
-            from Acquire.ObjectStore import string_to_bytes \
-                as _string_to_bytes
+            chunk = response["chunk"]
 
-            chunk = _string_to_bytes(response["chunk"])
+            if not isinstance(chunk, bytes):
+                # the chunk was sent as a base64-encoded string
+                from Acquire.ObjectStore import string_to_bytes \
+                    as _string_to_bytes
+                chunk = _string_to_bytes(chunk)
 
             md5 = _Hash.md5(chunk)
 
@@ -141,21 +181,95 @@ class ChunkDownloader:
 
             import bz2 as _bz2
             chunk = _bz2.decompress(chunk)
+
+        if "num_chunks" in response:
+            num_chunks = int(response["num_chunks"])
+
+        return (chunk, num_chunks)
+
+    def _write_chunk(self, chunk, num_chunks):
+        """Internal function that writes the next (decompressed) chunk
+           to the local file. This returns whether or not the whole
+           file has now been downloaded
+        """
+        if chunk is not None:
             self._FILE.write(chunk)
             self._FILE.flush()
-            chunk = None
-
             self._next_index = self._next_index + 1
 
-        if "num_chunks" in response:
-            num_chunks = int(response["num_chunks"])
+        return num_chunks is not None and self._next_index >= num_chunks
 
-            if self._next_index >= num_chunks:
-                # nothing more to download
-                self.close()
+    def download_next_chunk(self):
+        """Download the next chunk. Returns 'True' if something was
+           downloaded, else it returns 'False'
+        """
+        if not self.is_open():
+            return False
+
+        (chunk, num_chunks) = self._download_chunk(self._next_index)
+
+        if self._write_chunk(chunk, num_chunks):
+            # nothing more to download
+            self.close()
 
         return True
 
+    def _download_prefetched(self):
+        """Internal function that downloads as much of the file as
+           possible, keeping up to 'max_in_flight' chunks in flight.
+           The chunks are written in order - this stops at the first
+           chunk that is not yet available. No chunks past the end of
+           the file are requested once the number of chunks is known.
+           Prefetches after the stopping point are cancelled, or waited
+           for if they have already started (raising any error), and
+           their chunks will be downloaded again by the next call
+        """
+        from collections import deque as _deque
+        from concurrent.futures import ThreadPoolExecutor \
+            as _ThreadPoolExecutor
+
+        finished = False
+        total_chunks = None
+
+        with _ThreadPoolExecutor(max_workers=self._max_in_flight) as pool:
+            pending = _deque()
+            next_request = self._next_index
+
+            try:
+                while not finished:
+                    while len(pending) < self._max_in_flight and \
+                            (total_chunks is None or
+                             next_request < total_chunks):
+                        pending.append(pool.submit(self._download_chunk,
+                                                   next_request))
+                        next_request += 1
+
+                    if len(pending) == 0:
+                        break
+
+                    (chunk, num_chunks) = pending.popleft().result()
+
+                    if num_chunks is not None:
+                        total_chunks = num_chunks
+
+                    finished = self._write_chunk(chunk, num_chunks)
+
+                    if chunk is None:
+                        # this chunk has not been uploaded yet
+                        break
+            finally:
+                # don't start any requests that haven't already started
+                for future in pending:
+                    future.cancel()
+
+            for future in pending:
+                if not future.cancelled():
+                    future.result()
+
+        if finished:
+            # only close once no requests are in flight
+            self.close()
+
     def download(self, filename=None, dir=None):
         """Download as much of the file as possible to 'filename'. You
            can call this repeatedly with the same filename (or with
@@ -164,6 +278,11 @@ class ChunkDownloader:
         self._start_download(filename=filename, dir=dir)
         downloaded_filename = self._downloaded_filename
 
+        if self._max_in_flight > 1:
+            if self.is_open():
+                self._download_prefetched()
+            return downloaded_filename
+
         got_chunk = self.download_next_chunk()
 
         while got_chunk:
@@ -232,15 +351,15 @@ class ChunkDownloader:
         return data
 
     @staticmethod
-    def from_data(data, privkey=None, service=None):
+    def from_data(data, privkey=None, service=None, max_in_flight=None):
         """Return a ChunkDownloader from a json-deserialised dictionary.
            If this was encrypted then you need to supply a private
            key to decrypt the sensitive data
         """
         if data is None or len(data) == 0:
-            return ChunkDownloader()
+            return ChunkDownloader(max_in_flight=max_in_flight)
 
-        c = ChunkDownloader()
+        c = ChunkDownloader(max_in_flight=max_in_flight)
 
         try:
             is_encrypted = data["is_encrypted"]
@@ -1,21 +1,39 @@
 
 __all__ = ["ChunkUploader"]
 
+# the default number of chunks that are compressed and uploaded
+# at the same time
+_default_max_in_flight = 4
+
+# the default size of the chunks used when uploading a file
+_default_chunk_size = 8 * 1024 * 1024
+
 
 class ChunkUploader:
     """This class is used to control the chunked uploading
        of a file. This allows a file to be uploaded
        chunk by chunk (bit by bit). This is useful, e.g.
-       to upload a file as it is being written
+       to upload a file as it is being written.
+
+       Uploads are pipelined - each chunk is compressed, checksummed
+       and uploaded by a pool of worker threads, with up to
+       'max_in_flight' chunks being processed at the same time.
+       Chunks may therefore arrive at the service in any order,
+       and the service verifies that all chunks have arrived
+       when the uploader is closed
     """
-    def __init__(self, drive_uid=None, file_uid=None):
+    def __init__(self, drive_uid=None, file_uid=None, max_in_flight=None):
         """Create a new ChunkUploader that uploads the specified
-           file to the specified drive
+           file to the specified drive, with up to 'max_in_flight'
+           chunks being uploaded at the same time
         """
         self._drive_uid = None
         self._file_uid = None
         self._chunk_idx = None
         self._service = None
+        self._pool = None
+        self._pending = None
+        self.set_max_in_flight(max_in_flight)
 
         if drive_uid is not None:
             self._drive_uid = str(drive_uid)
@@ -45,58 +63,162 @@ class ChunkUploader:
         """Return the service that created this uploader"""
         return self._service
 
-    def upload(self, chunk):
-        """Upload the next chunk of the file"""
-        if self.is_null():
-            raise PermissionError("Cannot upload a chunk to a null uploader!")
+    def set_max_in_flight(self, max_in_flight=None):
+        """Set the maximum number of chunks that will be compressed
+           and uploaded at the same time. Set this to 1 to upload
+           the chunks one at a time, in order
+        """
+        if max_in_flight is None:
+            max_in_flight = _default_max_in_flight
+        else:
+            max_in_flight = int(max_in_flight)
 
-        service = self.service()
+        if max_in_flight < 1:
+            raise ValueError("The number of chunks in flight must be at "
+                             "least 1: %s" % max_in_flight)
 
-        if service is None:
-            raise PermissionError("Cannot upload a chunk to a null service!")
+        self._max_in_flight = max_in_flight
 
-        # first, compress the chunk
-        from Acquire.ObjectStore import bytes_to_string as _bytes_to_string
+    def max_in_flight(self):
+        """Return the maximum number of chunks that will be compressed
+           and uploaded at the same time
+        """
+        return self._max_in_flight
+
+    def _upload_chunk(self, chunk_idx, chunk):
+        """Internal function that compresses, checksums and then uploads
+           'chunk' as the chunk at index 'chunk_idx'. This is called
+           by the worker threads
+        """
         from Acquire.Crypto import Hash as _Hash
         import bz2 as _bz2
 
-        if isinstance(chunk, str):
-            chunk = chunk.encode("utf-8")
-
         chunk = _bz2.compress(chunk)
         md5 = _Hash.md5(chunk)
-        chunk = _bytes_to_string(chunk)
-
-        if self._chunk_idx is None:
-            self._chunk_idx = 0
-        else:
-            self._chunk_idx = self._chunk_idx + 1
 
         secret = _Hash.multi_md5(self._secret,
                                  "%s%s%d" % (self._drive_uid,
                                              self._file_uid,
-                                             self._chunk_idx))
+                                             chunk_idx))
 
         args = {}
         args["drive_uid"] = self._drive_uid
         args["file_uid"] = self._file_uid
-        args["chunk_index"] = self._chunk_idx
+        args["chunk_index"] = chunk_idx
         args["secret"] = secret
+        # this is sent raw if the service supports binary framing,
+        # else it is sent as a base64-encoded string
         args["data"] = chunk
         args["checksum"] = md5
 
-        service.call_function(function="upload_chunk", args=args)
+        self._service.call_function(function="upload_chunk", args=args)
+
+    def upload(self, chunk):
+        """Upload the next chunk of the file. The chunk is compressed and
+           uploaded in the background - this only blocks if there are
+           already 'max_in_flight' chunks being uploaded. Any error
+           uploading a chunk is raised by a later call to 'upload',
+           or by 'flush' or 'close'
+        """
+        if self.is_null():
+            raise PermissionError("Cannot upload a chunk to a null uploader!")
+
+        service = self.service()
+
+        if service is None:
+            raise PermissionError("Cannot upload a chunk to a null service!")
+
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+
+        if self._chunk_idx is None:
+            self._chunk_idx = 0
+        else:
+            self._chunk_idx = self._chunk_idx + 1
+
+        if self._max_in_flight == 1:
+            self._upload_chunk(self._chunk_idx, chunk)
+            return
+
+        if self._pool is None:
+            from collections import deque as _deque
+            from concurrent.futures import ThreadPoolExecutor \
+                as _ThreadPoolExecutor
+            self._pool = _ThreadPoolExecutor(max_workers=self._max_in_flight)
+            self._pending = _deque()
+
+        # wait for the oldest chunk if there are too many in flight
+        while len(self._pending) >= self._max_in_flight:
+            self._pending.popleft().result()
+
+        self._pending.append(self._pool.submit(self._upload_chunk,
+                                               self._chunk_idx, chunk))
+
+    def upload_file(self, filename, chunk_size=None):
+        """Upload the whole of the file 'filename', reading it in chunks
+           of 'chunk_size' bytes, which are uploaded via the pipeline
+           of worker threads. This does not close the uploader, so
+           more chunks can still be uploaded afterwards
+        """
+        if chunk_size is None:
+            chunk_size = _default_chunk_size
+        else:
+            chunk_size = int(chunk_size)
+
+        if chunk_size < 1:
+            raise ValueError("The chunk size must be at least 1 byte")
+
+        with open(filename, "rb") as FILE:
+            while True:
+                chunk = FILE.read(chunk_size)
+
+                if not chunk:
+                    break
+
+                self.upload(chunk)
+
+    def flush(self):
+        """Block until all of the chunks that are in flight have been
+           uploaded. This raises the first error that occurred
+           uploading any of the chunks
+        """
+        if self._pending is None:
+            return
+
+        error = None
+
+        while len(self._pending) > 0:
+            try:
+                self._pending.popleft().result()
+            except Exception as e:
+                if error is None:
+                    error = e
+
+        if error is not None:
+            raise error
 
     def is_open(self):
         """Return whether or not the file is open (has been written to)"""
         return self._chunk_idx is not None
 
     def close(self):
-        """Close the uploader - this will finalise the file"""
+        """Close the uploader - this will wait for all chunks to be
+           uploaded, and then finalise the file. The service verifies
+           that all of the chunks have been received
+        """
+        try:
+            self.flush()
+        finally:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+                self._pending = None
+
         if self.is_open():
             args = {"drive_uid": self._drive_uid,
                     "file_uid": self._file_uid,
-                    "secret": self._secret}
+                    "secret": self._secret,
+                    "num_chunks": self._chunk_idx + 1}
 
             self.service().call_function(function="close_uploader",
                                          args=args)
@@ -138,15 +260,15 @@ class ChunkUploader:
         return data
 
     @staticmethod
-    def from_data(data, privkey=None, service=None):
+    def from_data(data, privkey=None, service=None, max_in_flight=None):
         """Return a ChunkUploader from a json-deserialised dictionary.
            If this was encrypted then you need to supply a private
            key to decrypt the sensitive data
         """
         if data is None or len(data) == 0:
-            return ChunkUploader()
+            return ChunkUploader(max_in_flight=max_in_flight)
 
-        c = ChunkUploader()
+        c = ChunkUploader(max_in_flight=max_in_flight)
 
         try:
             is_encrypted = data["is_encrypted"]
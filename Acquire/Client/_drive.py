@@ -250,12 +250,23 @@ class Drive:
                                           force_par=force_par,
                                           aclrules=aclrules)
 
+    async def upload_async(self, filename, dir=None, uploaded_name=None,
+                           aclrules=None, force_par=False):
+        """Awaitable version of upload, which lets many files be
+           uploaded concurrently from a single event loop
+        """
+        from Acquire.Service import run_async as _run_async
+        return await _run_async(self.upload, filename=filename, dir=dir,
+                                uploaded_name=uploaded_name,
+                                aclrules=aclrules, force_par=force_par)
+
     def chunk_download(self, filename, dir=None, download_name=None,
-                       version=None):
+                       version=None, max_in_flight=None):
         """Download the file 'filename' from the Drive to directory 'dir' on
            this computer (or current directory if not specified), calling
            the downloaded file 'download_filename' (or 'filename' if not
-           specified). Force transfer using an OSPar is force_par is True
+           specified). Up to 'max_in_flight' chunks are downloaded at
+           the same time
         """
         if self.is_null():
             raise PermissionError("Cannot upload a file to a null drive!")
@@ -265,7 +276,8 @@ class Drive:
         filemeta._set_drive_metadata(self._metadata, self._creds)
 
         return filemeta.open().chunk_download(filename=download_name,
-                                              version=version, dir=dir)
+                                              version=version, dir=dir,
+                                              max_in_flight=max_in_flight)
 
     def download(self, filename, dir=None, download_name=None,
                  version=None, force_par=False):
@@ -285,6 +297,16 @@ class Drive:
                                         version=version, dir=dir,
                                         force_par=force_par)
 
+    async def download_async(self, filename, dir=None, download_name=None,
+                             version=None, force_par=False):
+        """Awaitable version of download, which lets many files be
+           downloaded concurrently from a single event loop
+        """
+        from Acquire.Service import run_async as _run_async
+        return await _run_async(self.download, filename=filename, dir=dir,
+                                download_name=download_name,
+                                version=version, force_par=force_par)
+
     @staticmethod
     def _list_drives(creds, drive_uid=None):
         """Return a list of all of the DriveMetas of the drives accessible
@@ -397,6 +419,13 @@ class Drive:
 
         return files
 
+    async def list_files_async(self, dir=None, filename=None,
+                               include_metadata=False):
+        """Awaitable version of list_files"""
+        from Acquire.Service import run_async as _run_async
+        return await _run_async(self.list_files, dir=dir, filename=filename,
+                                include_metadata=include_metadata)
+
     def location(self, name=None, version=None):
         """Return the unique location identifying the passed file
            (or directory). If no name is specified, this this will
@@ -226,9 +226,10 @@ class File:
             raise
 
     def chunk_download(self, filename=None, version=None,
-                       dir=None):
+                       dir=None, max_in_flight=None):
         """Return a ChunkDownloader to download this file
-           chunk-by-chunk
+           chunk-by-chunk, with up to 'max_in_flight' chunks
+           being downloaded at the same time
         """
         if self.is_null():
             raise PermissionError("Cannot download a null File!")
@@ -273,7 +274,8 @@ class File:
         from Acquire.Client import ChunkDownloader as _ChunkDownloader
         downloader = _ChunkDownloader.from_data(response["downloader"],
                                                 privkey=privkey,
-                                                service=storage_service)
+                                                service=storage_service,
+                                                max_in_flight=max_in_flight)
 
         downloader._start_download(filename=filename, dir=dir)
 
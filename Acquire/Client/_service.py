@@ -387,6 +387,14 @@ class Service:
         self._fail()
         return None
 
+    def get_sessions_info(self, session_uids,
+                          scope=None, permissions=None):
+        """Return information about all of the passed sessions,
+           optionally limited to the provided scope and permissions
+        """
+        self._fail()
+        return None
+
     def to_data(self, password=None):
         """Serialise this key to a dictionary, using the supplied
            password to encrypt the private key and certificate"""
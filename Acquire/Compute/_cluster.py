@@ -3,6 +3,10 @@ from enum import Enum as _Enum
 
 __all__ = ["Cluster"]
 
+# The maximum time (in seconds) that a call to wait_for_jobs can wait
+# on the compute service before returning
+_max_wait_time = 60
+
 
 class JobState(_Enum):
     PENDING = "pending"
@@ -310,6 +314,68 @@ class Cluster:
         data = key.decrypt(data)
         return _json.loads(data)
 
+    @staticmethod
+    def _move_job(bucket, uid, start_state, end_state=None):
+        """Internal function used on the service to return the job with
+           specified 'uid' in state 'start_state', moving it to
+           'end_state' if this is specified
+        """
+        start_state = JobState(start_state)
+
+        if end_state is not None:
+            end_state = JobState(end_state)
+
+        from Acquire.ObjectStore import ObjectStore as _ObjectStore
+
+        key = "compute/%s/%s" % (start_state.value, uid)
+
+        if (end_state is None) or (end_state == start_state):
+            try:
+                data = _ObjectStore.get_object_from_json(bucket=bucket,
+                                                         key=key)
+            except:
+                data = None
+        else:
+            from Acquire.ObjectStore import get_datetime_now_to_string \
+                as _get_datetime_now_to_string
+
+            # move the job by atomically creating it in the end state,
+            # so that only one caller can move the job
+            try:
+                data = _ObjectStore.get_object_from_json(bucket=bucket,
+                                                         key=key)
+                data[end_state.value] = _get_datetime_now_to_string()
+                end_key = "compute/%s/%s" % (end_state.value, uid)
+                _ObjectStore.set_object_from_json_if(bucket=bucket,
+                                                     key=end_key,
+                                                     data=data,
+                                                     if_match=None)
+            except:
+                data = None
+
+            if data is not None:
+                _ObjectStore.delete_object(bucket=bucket, key=key)
+
+                if start_state == JobState.PENDING:
+                    from ._jobqueue import JobQueue as _JobQueue
+                    _JobQueue.remove(bucket=bucket, uid=uid,
+                                     key=data.get("queue_key", None))
+
+        if data is None:
+            raise KeyError(
+                "There is no job with UID %s in state %s" %
+                (uid, start_state.value))
+
+        # the data is a dictionary of the submission time and the
+        # job UID
+        if uid != data["uid"]:
+            raise ValueError("The job info for UID %s is corrupt? %s" %
+                             (uid, data))
+
+        # now load the actual job info
+        from Acquire.Compute import ComputeJob as _ComputeJob
+        return _ComputeJob.load(uid=uid)
+
     def get_job(self, uid, start_state="pending", end_state=None,
                 passphrase=None):
         """Return the job with specified 'uid' in the specified
@@ -325,66 +391,104 @@ class Cluster:
         if Cluster._is_running_service():
             self.verify_passphrase(resource=resource, passphrase=passphrase)
 
-            start_state = JobState(start_state)
+            from Acquire.Service import get_service_account_bucket \
+                as _get_service_account_bucket
+
+            return Cluster._move_job(bucket=_get_service_account_bucket(),
+                                     uid=uid, start_state=start_state,
+                                     end_state=end_state)
+        else:
+            passphrase = self.passphrase(resource)
+            args = {"uid": str(uid),
+                    "passphrase": passphrase,
+                    "start_state": str(start_state)}
 
             if end_state is not None:
-                end_state = JobState(end_state)
+                args["end_state"] = str(end_state)
 
-            from Acquire.ObjectStore import ObjectStore as _ObjectStore
-            from Acquire.Service import get_service_account_bucket \
-                as _get_service_account_bucket
+            # the job can only safely be fetched again if it isn't moved
+            result = self.compute_service().call_function(
+                                        function="get_job", args=args,
+                                        idempotent=(end_state is None))
 
-            bucket = _get_service_account_bucket()
-            key = "compute/%s/%s" % (start_state.value, uid)
+            from Acquire.Compute import ComputeJob as _ComputeJob
+            return _ComputeJob.from_data(self.decrypt_data(result["job"]))
 
-            if (end_state is None) or (end_state == start_state):
-                try:
-                    data = _ObjectStore.get_object_from_json(bucket=bucket,
-                                                             key=key)
-                except:
-                    data = None
-            else:
-                from Acquire.ObjectStore import get_datetime_now_to_string \
-                    as _get_datetime_now_to_string
+    async def get_job_async(self, uid, start_state="pending",
+                            end_state=None, passphrase=None):
+        """Awaitable version of get_job, which lets many jobs be
+           fetched (or polled) concurrently from a single event loop
+        """
+        from Acquire.Service import run_async as _run_async
+        return await _run_async(self.get_job, uid=uid,
+                                start_state=start_state,
+                                end_state=end_state, passphrase=passphrase)
+
+    def get_jobs(self, uids, start_state="pending", end_state=None,
+                 passphrase=None):
+        """Return all of the jobs with the specified 'uids' in the
+           specified state (start_state), moving them to 'end_state' if
+           this is specified. This is the same as calling 'get_job' for
+           each job, except that all of the jobs are fetched with a
+           single call to the service, which moves and loads the jobs
+           concurrently. This returns a tuple of two dictionaries, the
+           first holds the jobs that were fetched, indexed by UID, and
+           the second holds the error message for each job that could
+           not be fetched, again indexed by UID. If you are on the
+           service you need to supply a valid passphrase
+        """
+        uids = [str(uid) for uid in uids]
 
-                try:
-                    data = _ObjectStore.take_object_from_json(bucket=bucket,
-                                                              key=key)
-                    data[end_state.value] = _get_datetime_now_to_string()
-                    key = "compute/%s/%s" % (end_state.value, uid)
-                    _ObjectStore.set_object_from_json(bucket=bucket, key=key,
-                                                      data=data)
-                except:
-                    data = None
+        if end_state is None:
+            resource = "get_jobs %s %s" % (",".join(uids), start_state)
+        else:
+            resource = "get_jobs %s %s->%s" % (",".join(uids), start_state,
+                                               end_state)
 
-            if data is None:
-                raise KeyError(
-                    "There is no job with UID %s in state %s" %
-                    (uid, start_state.value))
+        if len(uids) == 0:
+            return ({}, {})
 
-            # the data is a dictionary of the submission time and the
-            # job UID
-            if uid != data["uid"]:
-                raise ValueError("The job info for UID %s is corrupt? %s" %
-                                 (uid, data))
+        if Cluster._is_running_service():
+            self.verify_passphrase(resource=resource, passphrase=passphrase)
 
-            # now load the actual job info
-            from Acquire.Compute import ComputeJob as _ComputeJob
-            return _ComputeJob.load(uid=uid)
+            from Acquire.ObjectStore._parallel import run_in_parallel \
+                as _run_in_parallel
+            from Acquire.Service import get_service_account_bucket \
+                as _get_service_account_bucket
+
+            bucket = _get_service_account_bucket()
+
+            (jobs, errors) = _run_in_parallel(
+                lambda uid: Cluster._move_job(bucket=bucket, uid=uid,
+                                              start_state=start_state,
+                                              end_state=end_state),
+                uids)
+
+            return (jobs, {uid: str(e) for (uid, e) in errors.items()})
         else:
             passphrase = self.passphrase(resource)
-            args = {"uid": str(uid),
+            args = {"uids": uids,
                     "passphrase": passphrase,
                     "start_state": str(start_state)}
 
             if end_state is not None:
                 args["end_state"] = str(end_state)
 
-            result = self.compute_service().call_function(function="get_job",
+            result = self.compute_service().call_function(function="get_jobs",
                                                           args=args)
 
             from Acquire.Compute import ComputeJob as _ComputeJob
-            return _ComputeJob.from_data(self.decrypt_data(result["job"]))
+
+            jobs = {}
+            for (uid, data) in self.decrypt_data(result["jobs"]).items():
+                jobs[uid] = _ComputeJob.from_data(data)
+
+            try:
+                errors = dict(result["errors"])
+            except:
+                errors = {}
+
+            return (jobs, errors)
 
     def submit_job(self, uid):
         """Submit the job with specified UID to this cluster.
@@ -400,15 +504,23 @@ class Cluster:
             from Acquire.ObjectStore import ObjectStore as _ObjectStore
             from Acquire.Service import get_service_account_bucket \
                 as _get_service_account_bucket
-            from Acquire.ObjectStore import get_datetime_now_to_string \
-                as _get_datetime_now_to_string
+            from Acquire.ObjectStore import get_datetime_now \
+                as _get_datetime_now
+            from Acquire.ObjectStore import datetime_to_string \
+                as _datetime_to_string
+            from ._jobqueue import JobQueue as _JobQueue
 
             bucket = _get_service_account_bucket()
             key = "compute/pending/%s" % uid
-            resource = {"pending": _get_datetime_now_to_string(),
-                        "uid": uid}
+            now = _get_datetime_now()
+            resource = {"pending": _datetime_to_string(now),
+                        "uid": uid,
+                        "queue_key": _JobQueue.get_key(uid, now)}
 
             _ObjectStore.set_object_from_json(bucket, key, resource)
+
+            # now add the job to the queue, which the cluster claims from
+            _JobQueue.push(bucket=bucket, uid=uid, datetime=now)
         else:
             # fetch the pending job and change the status to "submitting"
             return self.get_job(uid=uid, start_state="pending",
@@ -443,6 +555,69 @@ class Cluster:
 
             return self.decrypt_data(result["job_uids"])
 
+    def wait_for_jobs(self, max_jobs=1, lease_time=300, timeout=20,
+                      passphrase=None):
+        """Wait for up to 'timeout' seconds for jobs to be submitted,
+           returning the UIDs of up to 'max_jobs' of the oldest pending
+           jobs as soon as there are any (or an empty list if there
+           are none). The returned jobs are leased to the caller for
+           'lease_time' seconds, during which no other call will return
+           them. The caller should move each job out of the pending
+           state (e.g. using 'submit_job') before its lease expires,
+           else the job will be returned again. This lets the cluster
+           long-poll for new jobs rather than repeatedly listing all
+           of the pending jobs
+        """
+        if self.is_null():
+            return []
+
+        max_jobs = int(max_jobs)
+        lease_time = int(lease_time)
+        timeout = max(0.0, min(float(timeout), _max_wait_time))
+
+        if Cluster._is_running_service():
+            from Acquire.ObjectStore import ObjectStore as _ObjectStore
+            from Acquire.Service import get_service_account_bucket \
+                as _get_service_account_bucket
+            from ._jobqueue import JobQueue as _JobQueue
+
+            self.verify_passphrase(resource="wait_for_jobs",
+                                   passphrase=passphrase)
+
+            bucket = _get_service_account_bucket()
+
+            def _is_pending(uid):
+                try:
+                    _ObjectStore.get_object_with_etag(
+                                    bucket, "compute/pending/%s" % uid)
+                    return True
+                except:
+                    return False
+
+            return _JobQueue.wait(bucket=bucket, max_jobs=max_jobs,
+                                  lease_time=lease_time, timeout=timeout,
+                                  is_pending=_is_pending)
+        else:
+            passphrase = self.passphrase(resource="wait_for_jobs")
+            args = {"passphrase": passphrase,
+                    "max_jobs": max_jobs,
+                    "lease_time": lease_time,
+                    "timeout": timeout}
+
+            result = self.compute_service().call_function(
+                            function="wait_for_jobs", args=args,
+                            timeout=timeout + 60)
+
+            return self.decrypt_data(result["job_uids"])
+
+    def claim_jobs(self, max_jobs=1, lease_time=300, passphrase=None):
+        """Return the UIDs of up to 'max_jobs' of the oldest pending
+           jobs, leased for 'lease_time' seconds, without waiting for
+           new jobs (see 'wait_for_jobs')
+        """
+        return self.wait_for_jobs(max_jobs=max_jobs, lease_time=lease_time,
+                                  timeout=0, passphrase=passphrase)
+
     def to_data(self, passphrase=None):
         """Return a json-serialisable dictionary of this cluster"""
         if self.is_null():
@@ -0,0 +1,252 @@
+
+__all__ = ["JobQueue"]
+
+# The prefix of the time-ordered index of pending jobs
+_queue_prefix = "compute/queue/"
+
+# The prefix of the leases held on claimed jobs. Claimed jobs are moved
+# out of the queue into a lease that is indexed by the time it expires,
+# so that expired leases can be found without reading the live ones
+_lease_prefix = "compute/leases/"
+
+# The format of the times in the keys, which sort lexically into order
+_key_time_format = "%Y%m%dT%H%M%S.%f"
+
+# The key of the object that changes whenever a job is added to the queue
+_version_key = "compute/queue_version"
+
+
+class JobQueue:
+    """This class provides the time-ordered queue of pending jobs that
+       is used by the Cluster on the compute service. Jobs are indexed
+       by submission time, so that the oldest jobs can be found without
+       listing the whole queue. A job is claimed by atomically moving
+       it out of the queue into a lease, which is indexed by the time
+       that the lease expires. This stops any other poller from
+       claiming the job until the lease expires, at which point the
+       job is claimable again. Jobs are removed from the queue once
+       they have been moved out of the pending state
+    """
+    @staticmethod
+    def get_key(uid, datetime):
+        """Return the key in the queue of the job with UID 'uid' that
+           was submitted at 'datetime'. These keys sort lexically
+           into submission order
+        """
+        from Acquire.ObjectStore import datetime_to_datetime \
+            as _datetime_to_datetime
+
+        datetime = _datetime_to_datetime(datetime)
+
+        return "%s%s/%s" % (_queue_prefix,
+                            datetime.strftime(_key_time_format), uid)
+
+    @staticmethod
+    def _get_lease_key(uid, expires):
+        """Internal function that returns the key of the lease on the
+           job with UID 'uid' that expires at 'expires'. These keys
+           sort lexically into the order in which the leases expire
+        """
+        return "%s%s/%s" % (_lease_prefix,
+                            expires.strftime(_key_time_format), uid)
+
+    @staticmethod
+    def push(bucket, uid, datetime=None):
+        """Add the job with UID 'uid' that was submitted at 'datetime'
+           (default now) to the queue, returning the key of the job
+           in the queue
+        """
+        from Acquire.ObjectStore import ObjectStore as _ObjectStore
+        from Acquire.ObjectStore import get_datetime_now \
+            as _get_datetime_now
+        from Acquire.ObjectStore import datetime_to_string \
+            as _datetime_to_string
+
+        if datetime is None:
+            datetime = _get_datetime_now()
+
+        key = JobQueue.get_key(uid, datetime)
+
+        _ObjectStore.set_string_object(bucket, key, str(uid))
+
+        # signal to anyone waiting for jobs that the queue has changed
+        _ObjectStore.set_string_object(bucket, _version_key,
+                                       _datetime_to_string(
+                                                _get_datetime_now()))
+
+        return key
+
+    @staticmethod
+    def remove(bucket, uid, key=None):
+        """Remove the job with UID 'uid' (with key 'key' in the queue)
+           from the queue. A job that has been claimed is no longer in
+           the queue, and its lease is removed by 'claim' once it has
+           expired, as the job is then no longer pending
+        """
+        from Acquire.ObjectStore import ObjectStore as _ObjectStore
+
+        if key is not None:
+            try:
+                _ObjectStore.delete_object(bucket, key)
+            except:
+                pass
+
+    @staticmethod
+    def _try_lease(bucket, key, lease_time, now):
+        """Internal function that tries to atomically move the entry at
+           'key' (either in the queue or an expired lease) to a new lease
+           that expires 'lease_time' seconds after 'now'. This returns
+           the UID of the job and the key of the new lease, or (None,
+           None) if someone else moved the entry first
+        """
+        from Acquire.ObjectStore import ObjectStore as _ObjectStore
+        import datetime as _datetime
+        import json as _json
+
+        try:
+            (data, etag) = _ObjectStore.get_object_with_etag(bucket, key)
+            uid = data.decode("utf-8")
+
+            if uid.startswith("{"):
+                # a lease that was written before leases were indexed
+                # by the time that they expire
+                uid = _json.loads(uid)["uid"]
+        except:
+            return (None, None)
+
+        expires = now + _datetime.timedelta(seconds=lease_time)
+        lease_key = JobQueue._get_lease_key(uid, expires)
+
+        try:
+            _ObjectStore.set_object_if(bucket, lease_key,
+                                       uid.encode("utf-8"), if_match=None)
+        except:
+            return (None, None)
+
+        try:
+            _ObjectStore.delete_object_if(bucket, key, etag)
+        except:
+            # someone else moved the entry first
+            JobQueue._remove_lease(bucket, lease_key)
+            return (None, None)
+
+        return (uid, lease_key)
+
+    @staticmethod
+    def _remove_lease(bucket, lease_key):
+        """Internal function that removes the lease at 'lease_key'"""
+        from Acquire.ObjectStore import ObjectStore as _ObjectStore
+
+        try:
+            _ObjectStore.delete_object(bucket, lease_key)
+        except:
+            pass
+
+    @staticmethod
+    def claim(bucket, max_jobs=1, lease_time=300, is_pending=None):
+        """Claim up to 'max_jobs' of the oldest pending jobs, leasing
+           them for 'lease_time' seconds. Jobs whose leases have expired
+           are claimed first, followed by the jobs in the queue, in
+           submission order. Only expired leases are listed, so the
+           cost of a claim does not depend on the number of jobs that
+           are leased. This returns the UIDs of the claimed jobs. The
+           optional function 'is_pending(uid)' is used to check that
+           the job is still pending - jobs that are not are removed
+           from the queue (or have their lease removed)
+        """
+        from Acquire.ObjectStore import ObjectStore as _ObjectStore
+        from Acquire.ObjectStore import get_datetime_now \
+            as _get_datetime_now
+
+        max_jobs = int(max_jobs)
+        lease_time = int(lease_time)
+
+        if max_jobs < 1:
+            return []
+
+        now = _get_datetime_now()
+        uids = []
+        page_size = max(10, 2 * max_jobs)
+
+        # the keys of the leases that have expired sort before this
+        expired = "%s%s" % (_lease_prefix, now.strftime(_key_time_format))
+
+        for (prefix, end_before) in [(_lease_prefix, expired),
+                                     (_queue_prefix, None)]:
+            for name in _ObjectStore.iter_object_names(
+                                        bucket, prefix=prefix,
+                                        end_before=end_before,
+                                        page_size=page_size):
+                (uid, lease_key) = JobQueue._try_lease(bucket, name,
+                                                       lease_time, now)
+
+                if uid is None:
+                    continue
+
+                if is_pending is not None and not is_pending(uid):
+                    JobQueue._remove_lease(bucket, lease_key)
+                    continue
+
+                uids.append(uid)
+
+                if len(uids) >= max_jobs:
+                    return uids
+
+        return uids
+
+    @staticmethod
+    def get_version(bucket):
+        """Return the version of the queue, which changes whenever
+           a job is added to the queue. This is read directly from
+           the object store, bypassing any cache
+        """
+        from Acquire.ObjectStore import ObjectStore as _ObjectStore
+
+        try:
+            return _ObjectStore.get_object_with_etag(bucket, _version_key)[1]
+        except:
+            return None
+
+    @staticmethod
+    def wait(bucket, max_jobs=1, lease_time=300, timeout=20,
+             poll_interval=0.5, is_pending=None):
+        """Wait for up to 'timeout' seconds for pending jobs, claiming
+           up to 'max_jobs' of them as soon as there are any (see
+           'claim'). While waiting, this only polls the single object
+           that changes when jobs are added to the queue, rather than
+           listing the queue. This returns the UIDs of the claimed
+           jobs, which is empty if the wait timed out
+        """
+        import time as _time
+
+        start = _time.monotonic()
+
+        version = JobQueue.get_version(bucket)
+        uids = JobQueue.claim(bucket, max_jobs=max_jobs,
+                              lease_time=lease_time, is_pending=is_pending)
+
+        # re-check the whole queue periodically to pick up jobs
+        # whose leases have expired
+        recheck_interval = max(poll_interval, min(lease_time, 30))
+        last_check = start
+
+        while len(uids) == 0:
+            now = _time.monotonic()
+
+            if now - start >= timeout:
+                break
+
+            _time.sleep(min(poll_interval, timeout - (now - start)))
+
+            new_version = JobQueue.get_version(bucket)
+            now = _time.monotonic()
+
+            if new_version != version or \
+                    now - last_check >= recheck_interval:
+                version = new_version
+                last_check = now
+                uids = JobQueue.claim(bucket, max_jobs=max_jobs,
+                                      lease_time=lease_time,
+                                      is_pending=is_pending)
+
+        return uids
@@ -1,6 +1,7 @@
 
 import os as _os
 import base64 as _base64
+import time as _time
 import uuid as _uuid
 
 from Acquire.Stubs import lazy_import as _lazy_import
@@ -15,10 +16,36 @@ _hashes = _lazy_import.lazy_module("cryptography.hazmat.primitives.hashes")
 _padding = _lazy_import.lazy_module(
             "cryptography.hazmat.primitives.asymmetric.padding")
 _fernet = _lazy_import.lazy_module("cryptography.fernet")
+_aead = _lazy_import.lazy_module("cryptography.hazmat.primitives.ciphers.aead")
+_tracing = _lazy_import.lazy_module("Acquire.Service._tracing")
 
 __all__ = ["PrivateKey", "PublicKey", "SymmetricKey", "get_private_key"]
 
 
+def _traced(name, message_index=1):
+    """Internal decorator that records every call to the decorated key
+       operation as a span called 'name' in the service tracing. The
+       size of the argument at 'message_index' is recorded as the
+       number of bytes processed
+    """
+    import functools as _functools
+
+    def decorator(func):
+        @_functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _tracing.trace(name) as span:
+                try:
+                    span.nbytes = len(args[message_index])
+                except Exception:
+                    pass
+
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
 def _bytes_to_string(b):
     """Return the passed binary bytes safely encoded to
        a base64 utf-8 string"""
@@ -88,6 +115,31 @@ def _generate_symmetric_key():
     return _fernet.Fernet.generate_key()
 
 
+# Messages encrypted using a session key start with this magic. The
+# magic is followed by the session key wrapped (encrypted) using
+# RSA-OAEP, then the 12-byte nonce, and then the AES-GCM ciphertext
+# (with the magic and wrapped key as associated data)
+_session_magic = b"\x00AQS1"
+
+# The maximum number of messages, and the maximum time (in seconds),
+# for which a session key is used before a new one is generated
+_max_session_messages = 1024
+_max_session_age = 3600
+
+# Cache of the unwrapped session keys, indexed by the fingerprint of
+# the private key and the header of the message. This is shared by all
+# private keys, as services reload their keys for every function call
+_session_keys = {}
+_max_cached_session_keys = 256
+
+
+def _oaep_padding():
+    """Internal function returning the padding used for RSA encryption"""
+    return _padding.OAEP(mgf=_padding.MGF1(algorithm=_hashes.SHA256()),
+                         algorithm=_hashes.SHA256(),
+                         label=None)
+
+
 _key_database = {}
 
 
@@ -113,6 +165,7 @@ class PublicKey:
     def __init__(self, public_key=None):
         """Construct from the passed public key"""
         self._pubkey = public_key
+        self._session = None
 
     def bytes(self):
         """Return the raw bytes for this key"""
@@ -176,26 +229,33 @@ class PublicKey:
         # return this signature as "AA:BB:CC:DD:EE:etc."
         return ":".join([h[i:i+2] for i in range(0, len(h), 2)])
 
-    def encrypt(self, message):
+    @_traced("crypto.encrypt")
+    def encrypt(self, message, use_session_key=False):
         """Encrypt and return the passed message. For short messages this
            will use the private key directly. For longer messages,
            this will generate a random
            symmetric key, will encrypt the message using that, and will then
-           encrypt the symmetric key. This returns some bytes
+           encrypt the symmetric key. This returns some bytes.
+
+           If 'use_session_key' is True then the message is encrypted
+           with AES-GCM using a session key that is shared between
+           messages. The session key is encrypted using this public key
+           and sent with every message, but is only regenerated (and
+           re-encrypted) after a bounded number of messages or time.
+           The matching private key caches the decrypted session key,
+           so neither side pays for an RSA operation per message.
+           Only use this if the recipient supports session keys
         """
         if isinstance(message, str):
             message = message.encode("utf-8")
 
-        try:
-            return self._pubkey.encrypt(
-                        message,
-                        _padding.OAEP(
-                            mgf=_padding.MGF1(algorithm=_hashes.SHA256()),
-                            algorithm=_hashes.SHA256(),
-                            label=None)
-                        )
-        except:
-            pass
+        if use_session_key:
+            return self._encrypt_with_session_key(message)
+
+        # the maximum length of message that can be encrypted using
+        # RSA-OAEP with SHA256
+        if len(message) <= int(self._pubkey.key_size / 8) - 66:
+            return self._pubkey.encrypt(message, _oaep_padding())
 
         # this is a longer message that cannot be encoded using
         # an asymmetric key - need to use a symmetric key
@@ -203,18 +263,37 @@ class PublicKey:
         f = _fernet.Fernet(key)
         token = f.encrypt(message)
 
-        encrypted_key = self._pubkey.encrypt(
-                            key,
-                            _padding.OAEP(
-                                mgf=_padding.MGF1(algorithm=_hashes.SHA256()),
-                                algorithm=_hashes.SHA256(),
-                                label=None)
-                            )
+        encrypted_key = self._pubkey.encrypt(key, _oaep_padding())
 
         # the first 256 bytes are the encrypted key - the rest
         # is the token, because we are using 2048 bit (256 byte) keys
         return encrypted_key + token
 
+    def _encrypt_with_session_key(self, message):
+        """Internal function used to encrypt 'message' using the
+           current session key, generating a new session key
+           if needed
+        """
+        session = self._session
+
+        if session is None or session[2] >= _max_session_messages or \
+                session[3] < _time.monotonic():
+            key = _aead.AESGCM.generate_key(bit_length=256)
+            header = _session_magic + self._pubkey.encrypt(key,
+                                                           _oaep_padding())
+            session = [_aead.AESGCM(key), header, 0,
+                       _time.monotonic() + _max_session_age]
+            self._session = session
+
+        session[2] += 1
+
+        nonce = _os.urandom(12)
+        (aesgcm, header) = (session[0], session[1])
+
+        return b"".join([header, nonce,
+                         aesgcm.encrypt(nonce, message, header)])
+
+    @_traced("crypto.verify", message_index=2)
     def verify(self, signature, message):
         """Verify that the message has been correctly signed"""
         if self._pubkey is None:
@@ -276,6 +355,7 @@ class PrivateKey:
            a new key"""
         self._privkey = private_key
         self._name = name
+        self._public_key = None
 
         if self._privkey is None:
             if auto_generate:
@@ -406,7 +486,12 @@ class PrivateKey:
         if self._privkey is None:
             return None
 
-        return PublicKey(self._privkey.public_key())
+        if self._public_key is None:
+            # keep the same public key so that its session key
+            # can be reused by 'encrypt'
+            self._public_key = PublicKey(self._privkey.public_key())
+
+        return self._public_key
 
     def key_size_in_bytes(self):
         """Return the number of bytes in this key"""
@@ -421,16 +506,58 @@ class PrivateKey:
         """
         return self.public_key().fingerprint()
 
-    def encrypt(self, message):
-        """Encrypt and return the passed message"""
-        return self.public_key().encrypt(message)
+    def encrypt(self, message, use_session_key=False):
+        """Encrypt and return the passed message. See PublicKey.encrypt
+           for the meaning of 'use_session_key'
+        """
+        return self.public_key().encrypt(message,
+                                         use_session_key=use_session_key)
 
     def verify(self, signature, message):
         """Verify the passed signature is correct for the passed message"""
         return self.public_key().verify(signature, message)
 
+    def _decrypt_with_session_key(self, message):
+        """Internal function used to decrypt a message that was encrypted
+           using a session key. This returns None if the message
+           could not be decrypted
+        """
+        key_size = self.key_size_in_bytes()
+        header_size = len(_session_magic) + key_size
+        header = message[0:header_size]
+        index = (self.fingerprint(), header)
+
+        try:
+            aesgcm = _session_keys[index]
+        except KeyError:
+            aesgcm = None
+
+        if aesgcm is None:
+            try:
+                key = self._privkey.decrypt(message[len(_session_magic):
+                                                    header_size],
+                                            _oaep_padding())
+                aesgcm = _aead.AESGCM(key)
+            except Exception:
+                return None
+
+            if len(_session_keys) >= _max_cached_session_keys:
+                _session_keys.clear()
+
+            _session_keys[index] = aesgcm
+
+        nonce = message[header_size:header_size+12]
+
+        try:
+            return aesgcm.decrypt(nonce, message[header_size+12:], header)
+        except Exception:
+            return None
+
+    @_traced("crypto.decrypt")
     def decrypt(self, message):
-        """Decrypt and return the passed message"""
+        """Decrypt and return the passed message. This decrypts messages
+           encrypted with or without a session key
+        """
         key_size = self.key_size_in_bytes()
 
         if key_size == 0:
@@ -438,31 +565,44 @@ class PrivateKey:
             raise DecryptionError("You cannot decrypt a message "
                                   "with a null key!")
 
-        # try standard decryption
-        try:
-            message = self._privkey.decrypt(
-                message,
-                _padding.OAEP(
-                    mgf=_padding.MGF1(algorithm=_hashes.SHA256()),
-                    algorithm=_hashes.SHA256(),
-                    label=None))
+        if isinstance(message, str):
+            message = message.encode("utf-8")
 
+        decrypted = None
+
+        if message.startswith(_session_magic):
+            # (messages encrypted without a session key could, very
+            #  rarely, also start with the magic)
+            decrypted = self._decrypt_with_session_key(message)
+
+        if decrypted is None and len(message) == key_size:
+            # this is a short message encrypted using this key
             try:
-                return message.decode("utf-8")
-            except:
-                return message
+                decrypted = self._privkey.decrypt(message, _oaep_padding())
+            except Exception as e:
+                from Acquire.Crypto import DecryptionError
+                raise DecryptionError(
+                    "Cannot decrypt the message: %s" % str(e))
+
+        if decrypted is None:
+            decrypted = self._decrypt_long_message(message)
+
+        try:
+            return decrypted.decode("utf-8")
         except:
-            pass
+            return decrypted
+
+    def _decrypt_long_message(self, message):
+        """Internal function used to decrypt a message that was encrypted
+           using a random symmetric key
+        """
+        key_size = self.key_size_in_bytes()
 
         # it is a larger message, so need to decrypt the secret symmetric
         # key, and then use that to decrypt the rest of the token
         try:
-            symkey = self._privkey.decrypt(
-                        message[0:key_size],
-                        _padding.OAEP(
-                            mgf=_padding.MGF1(algorithm=_hashes.SHA256()),
-                            algorithm=_hashes.SHA256(),
-                            label=None))
+            symkey = self._privkey.decrypt(message[0:key_size],
+                                           _oaep_padding())
         except Exception as e:
             from Acquire.Crypto import DecryptionError
             raise DecryptionError(
@@ -476,21 +616,14 @@ class PrivateKey:
             f = _fernet.Fernet(symkey.decode("utf-8"))
 
         try:
-            try:
-                message = f.decrypt(message[key_size:])
-            except:
-                message = f.decrypt(message[key_size:].encode("utf-8"))
+            return f.decrypt(message[key_size:])
         except Exception as e:
             from Acquire.Crypto import DecryptionError
             raise DecryptionError(
                     "Cannot decrypt the long message using the "
                     "symmetric key: %s" % str(e))
 
-        try:
-            return message.decode("utf-8")
-        except:
-            return message
-
+    @_traced("crypto.sign")
     def sign(self, message):
         """Return the signature for the passed message"""
         if self._privkey is None:
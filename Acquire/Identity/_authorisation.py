@@ -1,5 +1,102 @@
 
-__all__ = ["Authorisation"]
+import threading as _threading
+
+from cachetools import TTLCache as _TTLCache
+
+__all__ = ["Authorisation", "invalidate_session_certificate",
+           "clear_session_certificate_cache"]
+
+# Cache of the information about user login sessions that is needed to
+# verify authorisations (the user UID, logout time and public certificate
+# of the session), indexed by (identity_uid, session_uid, scope,
+# permissions). This saves a call to the identity service for every
+# request from the same session. Entries expire after five minutes, and
+# are invalidated when the identity service notifies that the user
+# has logged out
+_cache_session_certs = _TTLCache(maxsize=1024, ttl=300)
+_cache_session_certs_lock = _threading.Lock()
+
+# The length of time (in seconds) covered by each partition of the
+# records written by assert_once. Partitions that only hold stale
+# authorisations are removed in bulk by purge_assert_once_records
+_auth_once_partition_seconds = 3600
+
+
+def _get_auth_once_partition(d):
+    """Internal function that returns the partition of the assert_once
+       records that holds authorisations signed at datetime 'd'
+    """
+    return int(d.timestamp()) // _auth_once_partition_seconds
+
+
+# The key of the object that records when assert_once started to
+# partition its records. Until 'stale_time' has passed since then,
+# assert_once also creates the record in the old unpartitioned layout
+# (auth_once/<uid>), so that authorisations recorded before the
+# records were partitioned cannot be replayed
+_auth_once_partitioned_key = "auth_once_partitioned"
+
+# Cache of when the records in each bucket were partitioned, indexed
+# by bucket name
+_auth_once_partitioned = {}
+
+
+def _get_auth_once_partitioned(bucket):
+    """Internal function that returns the datetime when assert_once
+       started to partition its records in 'bucket', recording
+       that this is now if this has not been recorded before
+    """
+    from Acquire.ObjectStore import ObjectStore as _ObjectStore
+
+    name = _ObjectStore.get_bucket_name(bucket)
+
+    try:
+        return _auth_once_partitioned[name]
+    except KeyError:
+        pass
+
+    from Acquire.ObjectStore import ObjectStorePreconditionError \
+        as _ObjectStorePreconditionError
+    from Acquire.ObjectStore import get_datetime_now as _get_datetime_now
+    from Acquire.ObjectStore import datetime_to_string \
+        as _datetime_to_string
+    from Acquire.ObjectStore import string_to_datetime \
+        as _string_to_datetime
+
+    now = _get_datetime_now()
+
+    try:
+        _ObjectStore.set_object_if(
+            bucket=bucket, key=_auth_once_partitioned_key,
+            data=_datetime_to_string(now).encode("utf-8"), if_match=None)
+        partitioned = now
+    except _ObjectStorePreconditionError:
+        partitioned = _string_to_datetime(_ObjectStore.get_string_object(
+                                    bucket, _auth_once_partitioned_key))
+
+    _auth_once_partitioned[name] = partitioned
+
+    return partitioned
+
+
+def invalidate_session_certificate(identity_uid, session_uid):
+    """Remove all cached information about the login session with UID
+       'session_uid' from the identity service with UID 'identity_uid',
+       e.g. because the user has logged out of this session
+    """
+    with _cache_session_certs_lock:
+        for key in list(_cache_session_certs.keys()):
+            if key[0] == identity_uid and key[1] == session_uid:
+                try:
+                    del _cache_session_certs[key]
+                except KeyError:
+                    pass
+
+
+def clear_session_certificate_cache():
+    """Clear the cache of information about user login sessions"""
+    with _cache_session_certs_lock:
+        _cache_session_certs.clear()
 
 
 class Authorisation:
@@ -272,20 +369,21 @@ class Authorisation:
         now = _get_datetime_now()
 
         if now >= self._auth_datetime:
-            return ((now - self._auth_datetime).seconds > stale_time)
+            return ((now - self._auth_datetime).total_seconds() >
+                    stale_time)
         else:
             # datetime returns large positive numbers if time is
             # in the future - expect a little difference if client
             # clock is fast. Give up to 30 seconds of leeway
             leeway_seconds = 30
-            return (self._auth_datetime - now).seconds > leeway_seconds
-
-    def _get_user_public_cert(self, scope=None, permissions=None):
-        """Internal function that returns the public certificate
-           of the user who signed this authorisation. This will
-           check that the authorisation was not signed after the
-           user logged out, as well as validating the services
-           that provide the user session keys etc.
+            return ((self._auth_datetime - now).total_seconds() >
+                    leeway_seconds)
+
+    def _get_known_public_cert(self, scope=None, permissions=None):
+        """Internal function that returns the public certificate of the
+           user who signed this authorisation if this is already known
+           (or is the testing key) for the passed scope and permissions,
+           or None if this must be fetched from the identity service
         """
         must_fetch = False
 
@@ -315,47 +413,105 @@ class Authorisation:
 
             return testing_key
 
-        # we need to get the public signing key for this session
+        return None
+
+    def _get_user_public_cert(self, scope=None, permissions=None):
+        """Internal function that returns the public certificate
+           of the user who signed this authorisation. This will
+           check that the authorisation was not signed after the
+           user logged out, as well as validating the services
+           that provide the user session keys etc.
+        """
+        pubcert = self._get_known_public_cert(scope=scope,
+                                              permissions=permissions)
+
+        if pubcert is not None:
+            return pubcert
+
+        info = self._get_session_info(scope=scope, permissions=permissions)
+
+        return self._set_session_info(info, scope=scope,
+                                      permissions=permissions)
+
+    def _set_session_info(self, info, scope=None, permissions=None):
+        """Internal function that checks the session information 'info'
+           (the UID of the user, the logout time and the public
+           certificate of the session) against this authorisation,
+           and then records and returns the public certificate
+        """
+        (user_uid, logout_datetime, pubcert) = info
+
+        if self._user_uid != user_uid:
+            raise PermissionError(
+                "Cannot verify the authorisation as there is "
+                "disagreement over the UID of the user who signed "
+                "the authorisation. %s versus %s" %
+                (self._user_uid, user_uid))
+
+        if logout_datetime:
+            # the user has logged out from this session - ensure that
+            # the authorisation was created before the user logged out
+            if logout_datetime < self.signature_time():
+                raise PermissionError(
+                    "This authorisation was signed after the user logged "
+                    "out. This means that the authorisation is not valid. "
+                    "Please log in again and create a new authorisation.")
+
+        self._pubcert = pubcert
+        self._scope = scope
+        self._permissions = permissions
+        return pubcert
+
+    def _get_cache_key(self, scope=None, permissions=None):
+        """Internal function that returns the key used to cache the
+           session information needed to verify this authorisation
+        """
+        return (self._identity_uid, self._session_uid, scope,
+                str(permissions))
+
+    @staticmethod
+    def _get_identity_service(identity_url, identity_uid):
+        """Internal function that returns the trusted identity service
+           at 'identity_url', checking that this has UID 'identity_uid'
+        """
         from Acquire.Service import get_trusted_service \
             as _get_trusted_service
-        from Acquire.ObjectStore import get_datetime_now \
-            as _get_datetime_now
 
         try:
-            identity_service = _get_trusted_service(self._identity_url)
+            identity_service = _get_trusted_service(identity_url)
         except:
             raise PermissionError(
                 "Unable to verify the authorisation as we do not trust "
-                "the identity service at %s" % self._identity_url)
+                "the identity service at %s" % identity_url)
 
         if not identity_service.can_identify_users():
             raise PermissionError(
                 "Cannot verify an Authorisation that does not use a "
                 "valid identity service")
 
-        if identity_service.uid() != self._identity_uid:
+        if identity_service.uid() != identity_uid:
             raise PermissionError(
                 "Cannot auth_once this Authorisation as the actual UID of "
                 "the identity service at '%s' (%s) does not match "
                 "the UID of the service that signed this authorisation "
-                "(%s)" % (self._identity_url, identity_service.uid(),
-                          self._identity_uid))
+                "(%s)" % (identity_url, identity_service.uid(),
+                          identity_uid))
 
-        response = identity_service.get_session_info(
-                                session_uid=self._session_uid,
-                                scope=scope, permissions=permissions)
+        return identity_service
+
+    @staticmethod
+    def _parse_session_info(response):
+        """Internal function that extracts the UID of the user, the
+           logout time (or None) and the public certificate of the
+           session from the response from the identity service
+        """
+        from Acquire.ObjectStore import string_to_datetime \
+            as _string_to_datetime
 
         try:
             user_uid = response["user_uid"]
         except:
-            pass
-
-        if self._user_uid != user_uid:
-            raise PermissionError(
-                "Cannot verify the authorisation as there is "
-                "disagreement over the UID of the user who signed "
-                "the authorisation. %s versus %s" %
-                (self._user_uid, user_uid))
+            user_uid = None
 
         try:
             logout_datetime = _string_to_datetime(
@@ -363,38 +519,69 @@ class Authorisation:
         except:
             logout_datetime = None
 
-        if logout_datetime:
-            # the user has logged out from this session - ensure that
-            # the authorisation was created before the user logged out
-            if logout_datetime < self.signature_time():
-                raise PermissionError(
-                    "This authorisation was signed after the user logged "
-                    "out. This means that the authorisation is not valid. "
-                    "Please log in again and create a new authorisation.")
-
         from Acquire.Crypto import PublicKey as _PublicKey
         pubcert = _PublicKey.from_data(response["public_cert"])
 
-        self._pubcert = pubcert
-        self._scope = scope
-        self._permissions = permissions
-        return pubcert
+        return (user_uid, logout_datetime, pubcert)
+
+    def _get_session_info(self, scope=None, permissions=None):
+        """Internal function that returns the UID of the user, the
+           logout time (or None) and the public certificate of the
+           session that signed this authorisation. This is fetched
+           from the identity service, and is cached on services
+        """
+        from Acquire.Service import is_running_service \
+            as _is_running_service
+
+        use_cache = _is_running_service()
+        key = self._get_cache_key(scope=scope, permissions=permissions)
+
+        if use_cache:
+            with _cache_session_certs_lock:
+                try:
+                    return _cache_session_certs[key]
+                except KeyError:
+                    pass
+
+        # we need to get the public signing key for this session
+        identity_service = Authorisation._get_identity_service(
+                                                self._identity_url,
+                                                self._identity_uid)
+
+        response = identity_service.get_session_info(
+                                session_uid=self._session_uid,
+                                scope=scope, permissions=permissions)
+
+        result = Authorisation._parse_session_info(response)
+
+        if use_cache:
+            with _cache_session_certs_lock:
+                _cache_session_certs[key] = result
+
+        return result
 
     def assert_once(self, stale_time=7200, scope=None,
                     permissions=None):
         """Assert that this is in the one and only time that this
-           service has seen this authorisation. This records the
-           UID of the authorisation to the object store and then
-           verifies that the signature of the UID is correct.
-
-           There is a small race condition if the service asserts
-           the authorisation at the exact same time, but this is
-           a highly unlikely occurance. The aim is to prevent
-           replay attacks.
+           service has seen this authorisation. This atomically
+           records the UID of the authorisation to the object store
+           (failing if it has been recorded before) and then
+           verifies that the signature of the UID is correct. The
+           aim is to prevent replay attacks.
+
+           The records are partitioned by the time the authorisation
+           was signed, so that partitions that only contain stale
+           authorisations can be removed in bulk by
+           purge_assert_once_records
         """
         if self.is_null():
             raise PermissionError("Cannot assert_once a null Authorisation")
 
+        from Acquire.ObjectStore import get_datetime_now \
+            as _get_datetime_now
+
+        now = _get_datetime_now()
+
         if self.is_stale(stale_time):
             if now < self._auth_datetime:
                 raise PermissionError("Cannot assert_once an Authorisation signed "
@@ -403,35 +590,44 @@ class Authorisation:
                 raise PermissionError("Cannot assert_once a stale Authorisation")
 
         from Acquire.ObjectStore import ObjectStore as _ObjectStore
+        from Acquire.ObjectStore import ObjectStorePreconditionError \
+            as _ObjectStorePreconditionError
+        from Acquire.ObjectStore import datetime_to_string \
+            as _datetime_to_string
         from Acquire.Service import get_service_account_bucket \
             as _get_service_account_bucket
-        from Acquire.ObjectStore import get_datetime_now_to_string \
-            as _get_datetime_now_to_string
 
+        # the signing time is encoded into the (signed) UID, so the
+        # same authorisation is always recorded in the same partition
         bucket = _get_service_account_bucket()
-        authkey = "auth_once/%s" % self._uid
-        now = _get_datetime_now_to_string()
+        authkey = "auth_once/%d/%s" % (
+                        _get_auth_once_partition(self._auth_datetime),
+                        self._uid)
 
-        try:
-            data = _ObjectStore.get_string_object(bucket=bucket, key=authkey)
-        except:
-            data = None
+        authkeys = [authkey]
 
-        if data is not None:
-            raise PermissionError(
-                "Cannot auth_once the authorisation as it has been used "
-                "before on this service!")
-
-        # This is the first time this authorisation has been seen.
-        # Record this to the object store to prevent anyone else
-        # from using this authorisation on this service. There is a
-        # small race condition here, but this would be extremely
-        # challenging to exploit, and mitigating it would be a
-        # significant performance problem. Ideally the object store
-        # would have a "test_and_set" to enable us to set only if
-        # the previous value is None
-        _ObjectStore.set_string_object(bucket=bucket, key=authkey,
-                                       string_data=now)
+        # authorisations recorded before the records were partitioned
+        # are in the old layout, and are valid until they are stale
+        partitioned = _get_auth_once_partitioned(bucket)
+
+        if (now - partitioned).total_seconds() <= \
+                self._fix_integer(stale_time, 365*24*7200):
+            authkeys.append("auth_once/%s" % self._uid)
+
+        # Record this to the object store to prevent anyone else from
+        # using this authorisation on this service. This only succeeds
+        # if there is no existing record, which is checked atomically
+        # by the object store
+        for authkey in authkeys:
+            try:
+                _ObjectStore.set_object_if(
+                    bucket=bucket, key=authkey,
+                    data=_datetime_to_string(now).encode("utf-8"),
+                    if_match=None)
+            except _ObjectStorePreconditionError:
+                raise PermissionError(
+                    "Cannot auth_once the authorisation as it has been used "
+                    "before on this service!")
 
         # Now validate that the signature of the UID is correct
         public_cert = self._get_user_public_cert(scope=scope,
@@ -449,6 +645,92 @@ class Authorisation:
                 "Cannot auth_once the authorisation as the signature "
                 "is invalid! % s" % str(e))
 
+    @staticmethod
+    def purge_assert_once_records(stale_time=7200, bucket=None):
+        """Remove the records written by assert_once for all partitions
+           that only contain authorisations that are now stale, and so
+           would be rejected by assert_once anyway. 'stale_time' must
+           be at least as large as the largest 'stale_time' passed
+           to assert_once. This also removes stale records that were
+           written before the records were partitioned. Only the
+           first record of each partition is listed, so this costs
+           one listing per partition (plus one per old record), not
+           one per record. This returns the number of partitions
+           (and old records) that were removed
+        """
+        import datetime as _datetime
+        from Acquire.ObjectStore import ObjectStore as _ObjectStore
+        from Acquire.ObjectStore import get_datetime_now \
+            as _get_datetime_now
+
+        if bucket is None:
+            from Acquire.Service import get_service_account_bucket \
+                as _get_service_account_bucket
+            bucket = _get_service_account_bucket()
+
+        stale_time = int(stale_time)
+        now = _get_datetime_now()
+
+        npurged = 0
+        start_after = None
+
+        # only the first name in each partition is listed, as the rest
+        # of the partition is either removed or skipped
+        while True:
+            key = next(_ObjectStore.iter_object_names(
+                                    bucket, prefix="auth_once/",
+                                    start_after=start_after, page_size=1),
+                       None)
+
+            if key is None:
+                break
+
+            partition = key[len("auth_once/"):].split("/")[0]
+
+            try:
+                # the latest time that could be in this partition
+                end = _datetime.datetime.fromtimestamp(
+                            (int(partition) + 1) *
+                            _auth_once_partition_seconds,
+                            tz=_datetime.timezone.utc)
+                is_partition = True
+            except ValueError:
+                # a record in the old unpartitioned layout, which is
+                # keyed by the UID, which starts with the datetime
+                is_partition = False
+
+                # (this is written by isoformat, which leaves out
+                # the microseconds if they are zero)
+                end = None
+
+                for format in ["%Y-%m-%dT%H:%M:%S.%f", "%Y-%m-%dT%H:%M:%S"]:
+                    try:
+                        end = _datetime.datetime.strptime(partition, format)
+                        end = end.replace(tzinfo=_datetime.timezone.utc)
+                        break
+                    except ValueError:
+                        pass
+
+            is_stale = (end is not None and
+                        (now - end).total_seconds() > stale_time)
+
+            if is_partition:
+                if is_stale:
+                    _ObjectStore.delete_all_objects(
+                            bucket, prefix="auth_once/%s/" % partition)
+                    npurged += 1
+
+                # skip over the rest of this partition
+                start_after = "auth_once/%s/~" % partition
+            else:
+                if is_stale:
+                    _ObjectStore.delete_object(bucket, key)
+                    npurged += 1
+
+                start_after = key
+
+        return npurged
+
     def is_verified(self, refresh_time=3600, stale_time=7200):
         """Return whether or not this authorisation has been verified. Note
            that this will cache any verification for 'refresh_time' (in
@@ -572,6 +854,163 @@ class Authorisation:
         else:
             return
 
+    @staticmethod
+    def verify_many(authorisations, resources=None, refresh_time=3600,
+                    stale_time=7200, force=False,
+                    accept_partial_match=False, scope=None,
+                    permissions=None, return_identifiers=True,
+                    max_workers=None):
+        """Verify all of the passed 'authorisations', where the ith
+           authorisation is verified against the ith resource in
+           'resources' (or against 'resources' itself if this is a
+           single resource). This gives the same result as calling
+           'verify' on each authorisation, except that the public
+           certificates of the sessions are fetched with a single call
+           to each identity service, and the signatures are verified
+           using a pool of up to 'max_workers' threads (by default, one
+           per core). This raises the PermissionError for the first
+           authorisation that could not be verified, or returns the
+           list of identifiers (or Nones) in the same order as
+           'authorisations'
+        """
+        import os as _os
+        from Acquire.Service import is_running_service \
+            as _is_running_service
+        from Acquire.ObjectStore._parallel import run_in_parallel \
+            as _run_in_parallel
+
+        authorisations = list(authorisations)
+        n = len(authorisations)
+
+        if resources is None or isinstance(resources, str):
+            resources = [resources] * n
+        else:
+            resources = list(resources)
+
+            if len(resources) != n:
+                raise ValueError(
+                    "The number of resources (%d) must equal the number "
+                    "of authorisations (%d)" % (len(resources), n))
+
+        use_cache = _is_running_service()
+
+        # errors found while getting the certificates, indexed by the
+        # index of the authorisation
+        errors = {}
+
+        # the indexes of the authorisations whose session certificates
+        # must be fetched, grouped by identity service
+        groups = {}
+
+        for (i, auth) in enumerate(authorisations):
+            if auth.is_null():
+                # this will be reported by verify
+                continue
+
+            try:
+                if auth._get_known_public_cert(
+                        scope=scope, permissions=permissions) is not None:
+                    continue
+            except PermissionError as e:
+                errors[i] = e
+                continue
+
+            if use_cache:
+                key = auth._get_cache_key(scope=scope,
+                                          permissions=permissions)
+                with _cache_session_certs_lock:
+                    info = _cache_session_certs.get(key, None)
+
+                if info is not None:
+                    try:
+                        auth._set_session_info(info, scope=scope,
+                                               permissions=permissions)
+                    except PermissionError as e:
+                        errors[i] = e
+
+                    continue
+
+            group = (auth._identity_url, auth._identity_uid)
+
+            try:
+                groups[group].append(i)
+            except KeyError:
+                groups[group] = [i]
+
+        for ((identity_url, identity_uid), idxs) in groups.items():
+            try:
+                identity_service = Authorisation._get_identity_service(
+                                                        identity_url,
+                                                        identity_uid)
+
+                session_uids = list(dict.fromkeys(
+                        authorisations[i]._session_uid for i in idxs))
+
+                (sessions, session_errors) = \
+                    identity_service.get_sessions_info(
+                                        session_uids=session_uids,
+                                        scope=scope,
+                                        permissions=permissions)
+            except Exception as e:
+                if not isinstance(e, PermissionError):
+                    e = PermissionError(
+                            "Unable to get the session certificates from "
+                            "the identity service at %s: %s" %
+                            (identity_url, str(e)))
+
+                for i in idxs:
+                    errors[i] = e
+
+                continue
+
+            for i in idxs:
+                auth = authorisations[i]
+
+                try:
+                    info = Authorisation._parse_session_info(
+                                            sessions[auth._session_uid])
+                except Exception as e:
+                    errors[i] = PermissionError(
+                        "Unable to get the certificate for session %s: %s"
+                        % (auth._session_uid,
+                           session_errors.get(auth._session_uid, str(e))))
+                    continue
+
+                if use_cache:
+                    key = auth._get_cache_key(scope=scope,
+                                              permissions=permissions)
+                    with _cache_session_certs_lock:
+                        _cache_session_certs[key] = info
+
+                try:
+                    auth._set_session_info(info, scope=scope,
+                                           permissions=permissions)
+                except PermissionError as e:
+                    errors[i] = e
+
+        def _verify(i):
+            if i in errors:
+                raise errors[i]
+
+            return authorisations[i].verify(
+                                resource=resources[i],
+                                refresh_time=refresh_time,
+                                stale_time=stale_time, force=force,
+                                accept_partial_match=accept_partial_match,
+                                scope=scope, permissions=permissions,
+                                return_identifiers=return_identifiers)
+
+        if max_workers is None:
+            max_workers = _os.cpu_count() or 1
+
+        (results, verify_errors) = _run_in_parallel(_verify, range(n),
+                                                    max_workers=max_workers)
+
+        if len(verify_errors) > 0:
+            raise verify_errors[min(verify_errors.keys())]
+
+        return [results[i] for i in range(n)]
+
     @staticmethod
     def from_data(data):
         """Return an authorisation created from the json-decoded dictionary"""
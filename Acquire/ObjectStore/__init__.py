@@ -13,6 +13,8 @@ from ._osparregistry import *
 from ._encoding import *
 from ._function import *
 from ._mutex import *
+from ._parallel import *
+from ._cache import *
 from ._errors import *
 
 try:
@@ -0,0 +1,314 @@
+
+import os as _os
+import threading as _threading
+import time as _time
+from collections import OrderedDict as _OrderedDict
+
+__all__ = ["ObjectStoreCache", "enable_object_store_cache",
+           "disable_object_store_cache", "get_object_store_cache"]
+
+_objstore_cache = None
+
+# the maximum number of invalidated keys that are recorded to check
+# the reads that are in progress
+_max_invalidated = 1024
+
+
+class ObjectStoreCache:
+    """This is a process-local, read-through cache of objects read
+       from the object store. Objects are held as binary data indexed
+       by (bucket name, key). The cache is bounded by the total number
+       of bytes held, with the least recently used objects evicted
+       first. Every object has a time-to-live, which can be set
+       per key prefix (the longest matching prefix wins). A TTL of
+       zero (or less) means that objects under that prefix are never
+       cached. Objects are invalidated whenever they are set, deleted
+       or taken via the ObjectStore in this process, and a read that
+       started before an invalidation cannot add its (possibly old)
+       data to the cache afterwards (see 'generation'). Keys are normalised
+       in the same way as the cloud backends (e.g. 'a//b' is 'a/b').
+       Note that changes made by other processes are only seen once
+       the cached copy has expired, so only use this for objects
+       that change rarely
+    """
+    def __init__(self, max_size=16*1024*1024, max_object_size=1024*1024,
+                 ttl=60, prefix_ttls=None):
+        """Construct the cache, holding at most 'max_size' bytes, and
+           not caching any single object larger than 'max_object_size'
+           bytes. Objects are cached for 'ttl' seconds, unless a
+           different TTL is given for the key's prefix in 'prefix_ttls'.
+           By default mutexes are never cached
+        """
+        if prefix_ttls is None:
+            prefix_ttls = {"mutexes/": 0}
+
+        self._max_size = int(max_size)
+        self._max_object_size = min(int(max_object_size), self._max_size)
+        self._ttl = float(ttl)
+        self._prefix_ttls = {}
+
+        for (prefix, prefix_ttl) in prefix_ttls.items():
+            self._prefix_ttls[str(prefix)] = float(prefix_ttl)
+
+        # sort so that the longest (most specific) prefix is matched first
+        self._prefixes = sorted(self._prefix_ttls.keys(), key=len,
+                                reverse=True)
+
+        self._lock = _threading.Lock()
+        self._objects = _OrderedDict()
+        self._size = 0
+
+        # the generation is incremented on every invalidation. The
+        # generation of the last invalidation of each key is recorded,
+        # so that reads that started before then are not cached. Reads
+        # that started before '_min_generation' are never cached, which
+        # bounds the number of recorded invalidations
+        self._generation = 0
+        self._min_generation = 0
+        self._invalidated = {}
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._invalidations = 0
+
+    def __str__(self):
+        return "ObjectStoreCache(size=%d/%d, objects=%d, hits=%d, " \
+               "misses=%d)" % (self._size, self._max_size,
+                               len(self._objects), self._hits,
+                               self._misses)
+
+    def get_ttl(self, key):
+        """Return the time-to-live (in seconds) of objects cached
+           at 'key'
+
+           Args:
+                key (str): Key of the object
+           Returns:
+                float: Time to live in seconds
+        """
+        for prefix in self._prefixes:
+            if key.startswith(prefix):
+                return self._prefix_ttls[prefix]
+
+        return self._ttl
+
+    def generation(self):
+        """Return the current generation of this cache. Pass this to
+           'set' when adding data that was read from the object store
+           after calling this, so that the data is not cached if the
+           key was invalidated (e.g. written) while it was being read
+
+           Returns:
+                int: The current generation
+        """
+        with self._lock:
+            return self._generation
+
+    def get(self, bucket_name, key):
+        """Return the cached data for 'key' in the bucket called
+           'bucket_name', or None if this is not in the cache
+
+           Args:
+                bucket_name (str): Name of the bucket
+                key (str): Key of the object
+           Returns:
+                bytes: The cached data, or None
+        """
+        index = (bucket_name, _os.path.normpath(key))
+
+        with self._lock:
+            try:
+                (data, expires) = self._objects[index]
+            except KeyError:
+                self._misses += 1
+                return None
+
+            if expires < _time.monotonic():
+                self._remove(index)
+                self._expirations += 1
+                self._misses += 1
+                return None
+
+            self._objects.move_to_end(index)
+            self._hits += 1
+            return data
+
+    def set(self, bucket_name, key, data, generation=None):
+        """Add the passed data for 'key' in the bucket called
+           'bucket_name' to the cache. This does nothing if the
+           data is too large, or objects at 'key' should not
+           be cached. If 'generation' is passed (the value returned
+           by 'generation' before the data was read) then this also
+           does nothing if 'key' has been invalidated since then, as
+           the data may be older than the object
+
+           Args:
+                bucket_name (str): Name of the bucket
+                key (str): Key of the object
+                data (bytes): Data to cache
+                generation (int, default=None): Generation when the
+                data was read
+           Returns:
+                None
+        """
+        if data is None:
+            return
+
+        size = len(data)
+
+        if size > self._max_object_size:
+            return
+
+        ttl = self.get_ttl(key)
+
+        if ttl <= 0:
+            return
+
+        index = (bucket_name, _os.path.normpath(key))
+        expires = _time.monotonic() + ttl
+
+        with self._lock:
+            if generation is not None:
+                if generation < self._min_generation or \
+                        self._invalidated.get(index, -1) > generation:
+                    # the key changed while the data was being read
+                    return
+
+            if index in self._objects:
+                self._remove(index)
+
+            self._objects[index] = (data, expires)
+            self._size += size
+
+            while self._size > self._max_size:
+                (_index, (old_data, _expires)) = self._objects.popitem(
+                                                                last=False)
+                self._size -= len(old_data)
+                self._evictions += 1
+
+    def invalidate(self, bucket_name, key=None, prefix=None):
+        """Remove the object at 'key' in the bucket called 'bucket_name'
+           from the cache. If 'prefix' is passed then all objects whose
+           keys start with 'prefix' are removed. If neither is passed
+           then all objects in the bucket are removed
+
+           Args:
+                bucket_name (str): Name of the bucket
+                key (str, default=None): Key to remove
+                prefix (str, default=None): Prefix of keys to remove
+           Returns:
+                None
+        """
+        with self._lock:
+            self._generation += 1
+
+            if key is not None:
+                indexes = [(bucket_name, _os.path.normpath(key))]
+                self._invalidated[indexes[0]] = self._generation
+
+                if len(self._invalidated) > _max_invalidated:
+                    self._forget_invalidated()
+            else:
+                if prefix is None:
+                    prefix = ""
+
+                indexes = []
+
+                for index in self._objects.keys():
+                    if index[0] == bucket_name and \
+                            index[1].startswith(prefix):
+                        indexes.append(index)
+
+                # no reads in progress can be cached, as any of the
+                # keys with this prefix may have changed
+                self._forget_invalidated()
+
+            for index in indexes:
+                if index in self._objects:
+                    self._remove(index)
+                    self._invalidations += 1
+
+    def clear(self):
+        """Remove all objects from the cache (the counters are
+           not reset)
+        """
+        with self._lock:
+            self._objects.clear()
+            self._size = 0
+
+    def reset_statistics(self):
+        """Reset all of the hit/miss counters to zero"""
+        with self._lock:
+            self._hits = 0
+            self._misses = 0
+            self._evictions = 0
+            self._expirations = 0
+            self._invalidations = 0
+
+    def statistics(self):
+        """Return a dictionary of statistics about this cache, e.g.
+           the number of hits and misses
+
+           Returns:
+                dict: Cache statistics
+        """
+        with self._lock:
+            return {"hits": self._hits,
+                    "misses": self._misses,
+                    "evictions": self._evictions,
+                    "expirations": self._expirations,
+                    "invalidations": self._invalidations,
+                    "size": self._size,
+                    "max_size": self._max_size,
+                    "count": len(self._objects)}
+
+    def _forget_invalidated(self):
+        """Internal function that forgets all recorded invalidations,
+           so that no read that started before now can be cached. This
+           must be called while holding self._lock
+        """
+        self._invalidated = {}
+        self._min_generation = self._generation
+
+    def _remove(self, index):
+        """Internal function to remove the object at 'index'. This
+           must be called while holding self._lock
+        """
+        (data, _expires) = self._objects.pop(index)
+        self._size -= len(data)
+
+
+def enable_object_store_cache(max_size=16*1024*1024,
+                              max_object_size=1024*1024,
+                              ttl=60, prefix_ttls=None):
+    """Enable the process-local read-through cache in front of
+       ObjectStore.get_object (and all functions that use it).
+       This replaces any existing cache. See ObjectStoreCache
+       for a description of the arguments
+
+       Returns:
+            ObjectStoreCache: The new cache
+    """
+    global _objstore_cache
+    _objstore_cache = ObjectStoreCache(max_size=max_size,
+                                       max_object_size=max_object_size,
+                                       ttl=ttl, prefix_ttls=prefix_ttls)
+    return _objstore_cache
+
+
+def disable_object_store_cache():
+    """Disable (and discard) the process-local object store cache"""
+    global _objstore_cache
+    _objstore_cache = None
+
+
+def get_object_store_cache():
+    """Return the process-local object store cache, or None if
+       caching has not been enabled
+
+       Returns:
+            ObjectStoreCache: The cache, or None
+    """
+    return _objstore_cache
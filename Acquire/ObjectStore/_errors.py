@@ -1,13 +1,55 @@
 
 
-__all__ = ["ObjectStoreError", "MutexTimeoutError", "EncodingError",
-           "RequestBucketError"]
+__all__ = ["ObjectStoreError", "ObjectStoreBatchError",
+           "ObjectStorePreconditionError", "MutexTimeoutError",
+           "EncodingError", "RequestBucketError"]
 
 
 class ObjectStoreError(Exception):
     pass
 
 
+class ObjectStoreBatchError(ObjectStoreError):
+    """This exception is raised if one or more of the per-key
+       operations in a batch call (e.g. ObjectStore.get_objects)
+       fail. The results of the successful operations are available
+       via 'results()', while the exceptions raised for each failed
+       key are available via 'errors()'
+    """
+    def __init__(self, message, results=None, errors=None):
+        super().__init__(message)
+
+        if results is None:
+            results = {}
+
+        if errors is None:
+            errors = {}
+
+        self._results = results
+        self._errors = errors
+
+    def results(self):
+        """Return the results of the successful operations,
+           indexed by key
+        """
+        return self._results
+
+    def errors(self):
+        """Return the exceptions raised by the failed operations,
+           indexed by key
+        """
+        return self._errors
+
+
+class ObjectStorePreconditionError(ObjectStoreError):
+    """This exception is raised if a conditional write or delete
+       (e.g. ObjectStore.set_object_if) is not performed because
+       the object has been created, changed or removed since its
+       etag was read
+    """
+    pass
+
+
 class EncodingError(ObjectStoreError):
     pass
 
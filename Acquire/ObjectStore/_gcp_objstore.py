@@ -8,6 +8,15 @@ import copy as _copy
 
 __all__ = ["GCP_ObjectStore"]
 
+# The size of the buffers in which objects are streamed
+_stream_chunk_size = 1024 * 1024
+
+# Streamed objects that are larger than this (or whose size is not
+# known) are uploaded using a resumable upload in parts of
+# _multipart_part_size bytes (which must be a multiple of 256 KB)
+_multipart_threshold = 64 * 1024 * 1024
+_multipart_part_size = 16 * 1024 * 1024
+
 
 def _sanitise_bucket_name(bucket_name, unique_prefix):
     """This function sanitises the passed bucket name. It will always
@@ -34,6 +43,17 @@ def _sanitise_bucket_name(bucket_name, unique_prefix):
     return bucket_name
 
 
+def _is_precondition_failure(e):
+    """Return whether or not the passed exception from the google
+       client shows that a generation precondition was not met
+       (412), or that the object does not exist (404)
+    """
+    try:
+        return e.code in [404, 412]
+    except:
+        return False
+
+
 def _clean_key(key):
     """This function cleans and returns a key so that it is suitable
        for use both as a key and a directory/file path
@@ -104,6 +124,91 @@ def _get_driver_details_from_data(data):
     return details
 
 
+def _list_names(bucket, prefix=None, start=None, end=None, page_size=1000):
+    """Internal generator that lists the names of objects in 'bucket'
+       (optionally with 'prefix') from 'start' (inclusive) to 'end'
+       (exclusive), fetching one page of 'page_size' names at a time.
+       Only the names of the blobs are requested, not their metadata
+
+       Args:
+            bucket (dict): Bucket containing data
+            prefix (str, default=None): Prefix for data
+            start (str, default=None): Name at which to start listing
+            end (str, default=None): Name at which to stop listing
+            page_size (int, default=1000): Number of names per request
+       Returns:
+            generator: Yields the names of the objects
+    """
+    blobs = bucket["bucket"].list_blobs(prefix=prefix,
+                                        start_offset=start,
+                                        end_offset=end,
+                                        page_size=int(page_size),
+                                        fields="items(name),nextPageToken")
+
+    for page in blobs.pages:
+        for obj in page:
+            yield obj.name
+
+
+def _stream_blob(blob):
+    """Internal generator that yields the data of the passed blob
+       in buffers of up to _stream_chunk_size bytes
+    """
+    with blob.open("rb", chunk_size=_stream_chunk_size) as reader:
+        while True:
+            chunk = reader.read(_stream_chunk_size)
+
+            if not chunk:
+                return
+
+            yield chunk
+
+
+def _get_segment_keys(bucket, key):
+    """Internal function that returns the keys of the segments
+       ('key/1', 'key/2', ...) of an object that has been stored in
+       segments, in order. Only the contiguous segments from 1
+       are returned, and this is empty if there are no segments
+    """
+    segments = {}
+
+    for name in _list_names(bucket, prefix="%s/" % key):
+        index = name[len(key)+1:]
+
+        if index.isdigit():
+            segments[int(index)] = name
+
+    keys = []
+    i = 1
+
+    while i in segments:
+        keys.append(segments[i])
+        i += 1
+
+    return keys
+
+
+def _stream_segments(bucket, key):
+    """Internal generator that yields the data of each of the segments
+       of the object at 'key', in order. The segments are fetched
+       concurrently. This raises an ObjectStoreError if there
+       are no segments
+    """
+    segments = _get_segment_keys(bucket, key)
+
+    if len(segments) == 0:
+        from Acquire.ObjectStore import ObjectStoreError
+        raise ObjectStoreError("No data at key '%s'" % key)
+
+    def _get_segment(segment):
+        return bucket["bucket"].blob(segment).download_as_string()
+
+    from ._parallel import iter_in_parallel as _iter_in_parallel
+
+    for data in _iter_in_parallel(_get_segment, segments):
+        yield data
+
+
 class GCP_ObjectStore:
     """This is the backend that abstracts using the Google Cloud Platform
        object store
@@ -198,7 +303,8 @@ class GCP_ObjectStore:
                 bool: True if bucket empty, else False
 
         """
-        it = bucket["bucket"].list_blobs(max_results=1)
+        it = bucket["bucket"].list_blobs(max_results=1,
+                                         fields="items(name)")
 
         num_objs = 0
         for _obj in it:
@@ -248,7 +354,8 @@ class GCP_ObjectStore:
 
     @staticmethod
     def create_par(bucket, encrypt_key, key=None, readable=True,
-                   writeable=False, duration=3600, cleanup_function=None):
+                   writeable=False, duration=3600, cleanup_function=None,
+                   prefix=None):
         """Create a pre-authenticated request for the passed bucket and
            key (if key is None then the request is for the entire bucket).
            This will return a OSPar object that will contain a URL that can
@@ -268,6 +375,8 @@ class GCP_ObjectStore:
                 valid for in seconds
                 cleanup_function (function, default=None): Cleanup
                 function to be passed to PARRegistry
+                prefix (str, default=None): Directory to which read
+                access to the bucket is limited
 
            Returns:
                 OSPar: Pre-authenticated request for the bucket
@@ -282,6 +391,17 @@ class GCP_ObjectStore:
 
         is_bucket = (key is None)
 
+        # a readable bucket OSPar must be limited to a directory, as
+        # otherwise it could be used to list every object in the bucket
+        if is_bucket and readable and not prefix:
+            from Acquire.Client import PARError
+            raise PARError(
+                "You cannot create a Bucket OSPar that has read permissions "
+                "unless you limit it to the objects in a 'prefix'")
+
+        if not (is_bucket and readable):
+            prefix = None
+
         if writeable:
             method = "PUT"
         elif readable:
@@ -297,7 +417,11 @@ class GCP_ObjectStore:
             created_datetime = _get_datetime_now()
             expires_datetime = _get_datetime_now() + _datetime.timedelta(seconds=duration)
             bucket_obj = bucket["bucket"]
-            if is_bucket:
+            if is_bucket and prefix:
+                # the prefix is signed, so the listing cannot be widened
+                url = bucket_obj.generate_signed_url(version='v4', expiration=expires_datetime, method=method,
+                                                     query_parameters={"prefix": prefix})
+            elif is_bucket:
                 url = bucket_obj.generate_signed_url(version='v4', expiration=expires_datetime, method=method)
             else:
                 blob = bucket_obj.blob(key)
@@ -330,7 +454,8 @@ class GCP_ObjectStore:
                      expires_datetime=expires_datetime,
                      is_readable=readable,
                      is_writeable=writeable,
-                     driver_details=driver_details)
+                     driver_details=driver_details,
+                     prefix=prefix)
 
         _OSParRegistry.register(par=par,
                                 url_checksum=url_checksum,
@@ -383,50 +508,121 @@ class GCP_ObjectStore:
                 bytes: Binary data
 
         """
+        key = _clean_key(key)
+
+        try:
+            # small objects are downloaded in a single request
+            return bucket["bucket"].blob(key).download_as_string()
+        except:
+            pass
+
+        return b"".join(_stream_segments(bucket, key))
+
+    @staticmethod
+    def get_object_stream(bucket, key):
+        """Iterate over the binary data contained in the key 'key' in
+           the passed bucket, yielding buffers of up to 1 MB without
+           joining them together. If the object has been stored in
+           segments ('key/1', 'key/2', ...) then the segments are
+           fetched concurrently and yielded in order
 
+           Args:
+                bucket (dict): Bucket containing data
+                key (str): Key for data in bucket
+           Returns:
+                generator: Yields the binary data in buffers
+
+        """
         key = _clean_key(key)
 
-        blob = bucket["bucket"].blob(key)
+        stream = _stream_blob(bucket["bucket"].blob(key))
 
         try:
-            response = blob.download_as_string()
-            is_chunked = False
+            chunk = next(stream)
+        except StopIteration:
+            # this is an empty object
+            return
         except:
+            stream = None
+
+        if stream is not None:
+            yield chunk
+
+            for chunk in stream:
+                yield chunk
+
+            return
+
+        for data in _stream_segments(bucket, key):
+            yield data
+
+    @staticmethod
+    def get_object_with_etag(bucket, key):
+        """Return the binary data contained in the key 'key' in the
+           passed bucket, together with the etag of the object. The
+           etag is the generation number of the object, and the data
+           is downloaded with a precondition on this generation, so
+           that the two always match. Note that this does not support
+           objects that have been chunked
+
+           Args:
+                bucket (dict): Bucket containing data
+                key (str): Key for data in bucket
+           Returns:
+                tuple (bytes, str): Binary data and etag
+        """
+        key = _clean_key(key)
+
+        while True:
             try:
-                blob = bucket["bucket"].blob("%s/1" % key)
-                response = blob.download_as_string()
-                is_chunked = True
+                blob = bucket["bucket"].get_blob(key)
             except:
-                is_chunked = False
-                pass
+                blob = None
 
-            # Raise the original error
-            if not is_chunked:
+            if blob is None:
                 from Acquire.ObjectStore import ObjectStoreError
                 raise ObjectStoreError("No data at key '%s'" % key)
 
-        data = response
+            try:
+                data = blob.download_as_string(
+                                    if_generation_match=blob.generation)
+            except Exception as e:
+                if _is_precondition_failure(e):
+                    # the object changed between reading its metadata
+                    # and its data - try again
+                    continue
+                raise
 
-        if is_chunked:
-            # keep going through to find more chunks
-            next_chunk = 1
+            return (data, str(blob.generation))
 
-            while True:
-                next_chunk += 1
+    @staticmethod
+    def get_objects(bucket, keys):
+        """Return the binary data contained in each of the passed 'keys'
+           in the passed bucket. The objects are fetched concurrently
+           using a bounded pool of threads, so that the time taken
+           scales with the latency of the object store rather than
+           with the number of keys
 
-                try:
-                    blob = bucket["bucket"].blob("%s/%s" % (key, next_chunk))
-                    response = blob.download_as_string()
-                except:
-                    response = None
-                    break
+           Args:
+                bucket (dict): Bucket containing data
+                keys (list): Keys for data in bucket
+           Returns:
+                dict: Binary data indexed by key
 
-                if not data:
-                    data = response
-                else:
-                    data += response
+           Raises:
+                ObjectStoreBatchError: If any of the objects could not
+                be fetched. This holds the per-key errors and the data
+                of all objects that were fetched successfully
+        """
+        from ._parallel import run_in_parallel as _run_in_parallel
+        from ._parallel import assert_no_errors as _assert_no_errors
 
-        return data
+        (results, errors) = _run_in_parallel(
+            lambda key: GCP_ObjectStore.get_object(bucket, key), keys)
+
+        _assert_no_errors(results, errors, "get")
+
+        return results
 
     @staticmethod
     def take_object(bucket, key):
@@ -451,34 +647,88 @@ class GCP_ObjectStore:
         return data
 
     @staticmethod
-    def get_all_object_names(bucket, prefix=None, without_prefix=False):
-        """Returns the names of all objects in the passed bucket
+    def get_all_object_names(bucket, prefix=None, without_prefix=False,
+                             page_size=1000):
+        """Returns the names of all objects in the passed bucket. The
+           names are listed one page of 'page_size' names at a time,
+           requesting only the names (not the metadata) of the blobs
 
            Args:
                 bucket (dict): Bucket containing data
                 prefix (str): Prefix for data
                 without_prefix (str): Whether or not to include the prefix
                                       in the object name
+                page_size (int, default=1000): Number of names
+                to fetch per request
            Returns:
                 list: List of all objects in bucket
 
         """
-        if prefix is not None:
-            prefix = _clean_key(prefix)
+        return list(GCP_ObjectStore.iter_object_names(
+                                        bucket, prefix=prefix,
+                                        page_size=page_size,
+                                        without_prefix=without_prefix))
+
+    @staticmethod
+    def count_objects(bucket, prefix=None, page_size=1000):
+        """Return the number of objects in the passed bucket (that
+           have the passed prefix). This pages through the listing
+           without holding the names in memory
+
+           Args:
+                bucket (dict): Bucket containing data
+                prefix (str, default=None): Prefix for data
+                page_size (int, default=1000): Number of names
+                to fetch per request
+           Returns:
+                int: Number of objects
+        """
+        count = 0
 
-        blobs = bucket["bucket"].list_blobs(prefix=prefix)
+        for _name in GCP_ObjectStore.iter_object_names(
+                                    bucket, prefix=prefix,
+                                    page_size=page_size):
+            count += 1
 
-        names = []
+        return count
 
-        if without_prefix:
+    @staticmethod
+    def iter_object_names(bucket, prefix=None, start_after=None,
+                          end_before=None, page_size=1000,
+                          without_prefix=False):
+        """Iterate over the names of all objects in the passed bucket,
+           in lexical order. Names are fetched lazily from the object
+           store one page at a time, so callers can stop early without
+           listing the whole bucket
+
+           Args:
+                bucket (dict): Bucket containing data
+                prefix (str, default=None): Prefix for data
+                start_after (str, default=None): Only return names
+                that come after this key
+                end_before (str, default=None): Only return names
+                that come before this key
+                page_size (int, default=1000): Number of names
+                to fetch per request
+                without_prefix (bool, default=False): Whether or not
+                to remove the prefix from the returned names
+           Returns:
+                generator: Yields the names of the objects
+
+        """
+        if prefix is not None:
+            prefix = _clean_key(prefix)
+
+        if without_prefix and prefix is not None:
             prefix_len = len(prefix)
+        else:
+            prefix_len = 0
 
-        for obj in blobs:
-            if prefix:
-                if obj.name.startswith(prefix):
-                    name = obj.name
-            else:
-                name = obj.name
+        for name in _list_names(bucket, prefix=prefix, start=start_after,
+                                end=end_before, page_size=page_size):
+            # 'start_offset' is inclusive, but 'start_after' is not
+            if start_after is not None and name <= start_after:
+                continue
 
             while name.endswith("/"):
                 name = name[0:-1]
@@ -493,9 +743,61 @@ class GCP_ObjectStore:
                     name = name[1:]
 
             if len(name) > 0:
-                names.append(name)
+                yield name
+
+    @staticmethod
+    def list_keys_between(bucket, start_key=None, end_key=None,
+                          reverse=False, limit=None):
+        """Return the sorted list of keys in the passed bucket that
+           are between 'start_key' (inclusive) and 'end_key'
+           (exclusive). This uses the native start and end offsets
+           of the GCS listing, so only keys in this range are listed.
+           If 'reverse' is True then the keys are returned in reverse
+           order. At most 'limit' keys are returned
+
+           Args:
+                bucket (dict): Bucket containing data
+                start_key (str, default=None): First key of the range
+                end_key (str, default=None): Key after the range
+                reverse (bool, default=False): Return in reverse order
+                limit (int, default=None): Maximum number of keys
+           Returns:
+                list: Sorted list of keys
+        """
+        if limit is not None:
+            limit = int(limit)
+
+            if limit <= 0:
+                return []
+
+        if reverse:
+            # GCS can only list forwards, so we have to list the whole
+            # range, but only need to hold the last 'limit' keys
+            from collections import deque as _deque
+            keys = _deque(maxlen=limit)
+
+            for name in _list_names(bucket, start=start_key, end=end_key):
+                keys.append(name)
+
+            keys = list(keys)
+            keys.reverse()
+            return keys
+
+        if limit is None or limit > 1000:
+            page_size = 1000
+        else:
+            page_size = limit
+
+        keys = []
+
+        for name in _list_names(bucket, start=start_key, end=end_key,
+                                page_size=page_size):
+            keys.append(name)
+
+            if limit is not None and len(keys) >= limit:
+                break
 
-        return names
+        return keys
 
     @staticmethod
     def set_object(bucket, key, data):
@@ -520,6 +822,107 @@ class GCP_ObjectStore:
         blob = bucket["bucket"].blob(key)
         blob.upload_from_string(data)
 
+    @staticmethod
+    def set_object_stream(bucket, key, fileobj):
+        """Set the value of 'key' in 'bucket' to the binary data read
+           from the file-like object 'fileobj'. Large objects (or
+           streams of unknown size) are uploaded in parts using a
+           resumable upload, so that the whole object is never
+           held in memory
+
+           Args:
+                bucket (dict): Bucket containing data
+                key (str): Key for data in bucket
+                fileobj (file): File-like object opened for binary reading
+
+           Returns:
+                None
+        """
+        from ._objstore import _get_stream_size
+
+        key = _clean_key(key)
+        size = _get_stream_size(fileobj)
+
+        if size is not None and size <= _multipart_threshold:
+            blob = bucket["bucket"].blob(key)
+        else:
+            blob = bucket["bucket"].blob(key,
+                                         chunk_size=_multipart_part_size)
+
+        blob.upload_from_file(fileobj, size=size)
+
+    @staticmethod
+    def set_object_if(bucket, key, data, if_match=None):
+        """Set the value of 'key' in 'bucket' to binary 'data', but
+           only if the generation of the existing object matches
+           'if_match', or, if 'if_match' is None, only if there is no
+           existing object (generation 0). The condition is checked
+           atomically by the object store
+
+           Args:
+                bucket (dict): Bucket containing data
+                key (str): Key for data in bucket
+                data (bytes): Binary data to store in bucket
+                if_match (str, default=None): Etag of the existing object
+
+           Returns:
+                str: Etag of the new object
+
+           Raises:
+                ObjectStorePreconditionError: If the condition is not met
+        """
+        if data is None:
+            data = b'0'
+
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+
+        key = _clean_key(key)
+
+        if if_match is None:
+            generation = 0
+        else:
+            generation = int(if_match)
+
+        blob = bucket["bucket"].blob(key)
+
+        try:
+            blob.upload_from_string(data, if_generation_match=generation)
+        except Exception as e:
+            if _is_precondition_failure(e):
+                from Acquire.ObjectStore import ObjectStorePreconditionError
+                raise ObjectStorePreconditionError(
+                    "Cannot set the object at key '%s' as its generation "
+                    "does not match %s" % (key, generation))
+            raise
+
+        return str(blob.generation)
+
+    @staticmethod
+    def set_objects(bucket, objects):
+        """Set the binary data of many objects in 'bucket'. The objects
+           are written concurrently using a bounded pool of threads
+
+           Args:
+                bucket (dict): Bucket to hold data
+                objects (dict): Binary data indexed by key
+
+           Returns:
+                None
+
+           Raises:
+                ObjectStoreBatchError: If any of the objects could not
+                be written. This holds the per-key errors
+        """
+        from ._parallel import run_in_parallel as _run_in_parallel
+        from ._parallel import assert_no_errors as _assert_no_errors
+
+        (results, errors) = _run_in_parallel(
+            lambda key: GCP_ObjectStore.set_object(bucket, key, objects[key]),
+            objects.keys())
+
+        _assert_no_errors(results, errors, "set")
+
     @staticmethod
     def delete_all_objects(bucket, prefix=None):
         """Deletes all objects...
@@ -552,6 +955,35 @@ class GCP_ObjectStore:
         except:
             pass
 
+    @staticmethod
+    def delete_object_if(bucket, key, if_match):
+        """Removes the object at 'key', but only if its generation
+           matches 'if_match'
+
+           Args:
+                bucket (dict): Bucket containing data
+                key (str): Key for data
+                if_match (str): Etag of the object
+           Returns:
+                None
+
+           Raises:
+                ObjectStorePreconditionError: If the object has been
+                changed or removed
+        """
+        key = _clean_key(key)
+
+        try:
+            bucket["bucket"].blob(key).delete(
+                                    if_generation_match=int(if_match))
+        except Exception as e:
+            if _is_precondition_failure(e):
+                from Acquire.ObjectStore import ObjectStorePreconditionError
+                raise ObjectStorePreconditionError(
+                    "Cannot delete the object at key '%s' as it has "
+                    "been changed or removed" % key)
+            raise
+
     @staticmethod
     def get_size_and_checksum(bucket, key):
         """Return the object size (in bytes) and MD5 checksum of the
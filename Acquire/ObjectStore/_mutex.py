@@ -1,9 +1,90 @@
 
 import uuid
 import datetime as _datetime
+import random as _random
+import threading as _threading
 import time as _time
 
-__all__ = ["Mutex"]
+__all__ = ["Mutex", "get_mutex_statistics", "reset_mutex_statistics"]
+
+# the shortest and longest times (in seconds) to back off between
+# attempts to take a contended mutex
+_min_backoff = 0.01
+_max_backoff = 1.0
+
+# statistics about the wait time and contention for each mutex key
+_statistics = {}
+_statistics_lock = _threading.Lock()
+
+
+def _record_statistics(key, wait_time, attempts, acquired):
+    """Internal function used to record the time spent waiting for
+       the mutex at 'key', and the number of attempts needed
+    """
+    with _statistics_lock:
+        try:
+            stats = _statistics[key]
+        except KeyError:
+            stats = {"acquisitions": 0, "timeouts": 0, "attempts": 0,
+                     "contended": 0, "total_wait": 0.0, "max_wait": 0.0}
+            _statistics[key] = stats
+
+        if acquired:
+            stats["acquisitions"] += 1
+        else:
+            stats["timeouts"] += 1
+
+        stats["attempts"] += attempts
+
+        if attempts > 1:
+            stats["contended"] += 1
+
+        stats["total_wait"] += wait_time
+        stats["max_wait"] = max(stats["max_wait"], wait_time)
+
+
+def get_mutex_statistics(key=None):
+    """Return the statistics of the mutexes locked by this process.
+       These are, for each mutex key, the number of acquisitions and
+       timeouts, the total number of attempts, the number of
+       acquisitions that were contended (needed more than one attempt),
+       and the total and maximum time (in seconds) spent waiting.
+       If 'key' is passed then only the statistics for that
+       mutex are returned
+
+       Args:
+            key (str, default=None): Key of the mutex
+       Returns:
+            dict: Statistics, indexed by mutex key if 'key' is None
+    """
+    import copy as _copy
+
+    with _statistics_lock:
+        if key is None:
+            return _copy.deepcopy(_statistics)
+
+        key = _get_mutex_key(key)
+
+        try:
+            return _copy.copy(_statistics[key])
+        except KeyError:
+            return None
+
+
+def reset_mutex_statistics():
+    """Reset the statistics of all mutexes locked by this process"""
+    with _statistics_lock:
+        _statistics.clear()
+
+
+def _get_mutex_key(key):
+    """Internal function to return the object store key for the
+       mutex called 'key'
+    """
+    if key is None:
+        return "mutexes/none"
+    else:
+        return "mutexes/%s" % str(key).replace(" ", "_")
 
 
 class Mutex:
@@ -12,8 +93,14 @@ class Mutex:
        if it has successfully written its secret to this key. If
        not, then another thread must hold the mutex, and we have
        to wait...
+
+       Waiters retry with a jittered exponential backoff. If the mutex
+       is 'fair' then each waiter first takes a ticket in a queue
+       for the mutex, and the mutex is only taken by the waiter with
+       the oldest ticket, so that waiters are served in order
     """
-    def __init__(self, key=None, timeout=10, lease_time=10, bucket=None):
+    def __init__(self, key=None, timeout=10, lease_time=10, bucket=None,
+                 fair=False, auto_renew=False):
         """Create the mutex. The immediately tries to lock the mutex
            for key 'key' and will block until a lock is successfully
            obtained (or until 'timeout' seconds has been reached, and an
@@ -22,12 +109,15 @@ class Mutex:
            a lease, as the mutex will only be held for a maximum of
            'lease_time' seconds. After this time the mutex will be
            automatically unlocked and made available to lock by
-           others. You can renew the lease by re-locking the mutex.
+           others. You can renew the lease by re-locking the mutex,
+           or by calling 'renew_lease'. If 'auto_renew' is True then
+           the lease is automatically renewed by a background thread
+           until the mutex is unlocked, which is useful for long
+           critical sections. If 'fair' is True then waiters for
+           this mutex are served in the order that they started
+           waiting
         """
-        if key is None:
-            key = "mutexes/none"
-        else:
-            key = "mutexes/%s" % str(key).replace(" ", "_")
+        key = _get_mutex_key(key)
 
         if bucket is None:
             from Acquire.Service import get_service_account_bucket as \
@@ -39,6 +129,11 @@ class Mutex:
         self._key = key
         self._secret = str(uuid.uuid4())
         self._is_locked = 0
+        self._etag = None
+        self._fair = bool(fair)
+        self._auto_renew = bool(auto_renew)
+        self._renewer = None
+        self._renew_lock = _threading.RLock()
         self.lock(timeout, lease_time)
 
     def __del__(self):
@@ -120,20 +215,25 @@ class Mutex:
         if self._is_locked == 0:
             return
 
+        self._stop_renewer()
+
         from Acquire.ObjectStore import ObjectStore as _ObjectStore
+        from Acquire.ObjectStore import ObjectStorePreconditionError \
+            as _ObjectStorePreconditionError
         from Acquire.ObjectStore import get_datetime_now as _get_datetime_now
 
-        try:
-            holder = _ObjectStore.get_string_object(self._bucket, self._key)
-        except:
-            holder = None
-
-        if holder == self._lockstring:
-            # we hold the mutex - delete the key
-            _ObjectStore.delete_object(self._bucket, self._key)
+        with self._renew_lock:
+            try:
+                # only delete the key if we still hold the mutex, i.e.
+                # no-one else has taken it since we wrote our lockstring
+                _ObjectStore.delete_object_if(self._bucket, self._key,
+                                              self._etag)
+            except _ObjectStorePreconditionError:
+                pass
 
-        self._lockstring = None
-        self._is_locked = 0
+            self._lockstring = None
+            self._etag = None
+            self._is_locked = 0
 
         if self._end_lease < _get_datetime_now():
             self._end_lease = None
@@ -161,6 +261,169 @@ class Mutex:
             self.assert_not_expired()
             self._is_locked -= 1
 
+    def renew_lease(self, lease_time=None):
+        """Renew the lease on this mutex, so that it is held for another
+           'lease_time' seconds from now. This raises a MutexTimeoutError
+           if the mutex is no longer held (e.g. because the lease
+           expired and someone else has taken the mutex)
+
+           Args:
+                lease_time (int, default=None): Number of seconds to hold
+                the lock (defaults to the last lease time)
+           Returns:
+                None
+        """
+        if lease_time is None:
+            lease_time = self._lease_time
+        else:
+            lease_time = float(lease_time)
+
+        from Acquire.ObjectStore import get_datetime_now as _get_datetime_now
+        from Acquire.ObjectStore import datetime_to_string \
+            as _datetime_to_string
+        from Acquire.ObjectStore import ObjectStore as _ObjectStore
+        from Acquire.ObjectStore import ObjectStorePreconditionError \
+            as _ObjectStorePreconditionError
+
+        with self._renew_lock:
+            if not self.is_locked():
+                from Acquire.ObjectStore import MutexTimeoutError
+                raise MutexTimeoutError("Cannot renew the lease on the mutex "
+                                        "'%s' as it is not held" % self._key)
+
+            end_lease = _get_datetime_now() + \
+                _datetime.timedelta(seconds=lease_time)
+
+            lockstring = "%s{}%s" % (self._secret,
+                                     _datetime_to_string(end_lease))
+
+            try:
+                self._etag = _ObjectStore.set_object_if(
+                                            self._bucket, self._key,
+                                            lockstring.encode("utf-8"),
+                                            if_match=self._etag)
+            except _ObjectStorePreconditionError:
+                # someone else has taken the mutex, so we no longer hold it
+                self._lockstring = None
+                self._etag = None
+                self._is_locked = 0
+                from Acquire.ObjectStore import MutexTimeoutError
+                raise MutexTimeoutError("The mutex '%s' was taken by another "
+                                        "holder before its lease was renewed"
+                                        % self._key)
+
+            self._end_lease = end_lease
+            self._lockstring = lockstring
+            self._lease_time = lease_time
+
+    def _start_renewer(self):
+        """Internal function that starts the background thread that
+           renews the lease at half of the lease time, until the
+           mutex is unlocked
+        """
+        self._stop_renewer()
+
+        import weakref as _weakref
+
+        stop = _threading.Event()
+
+        # only hold a weak reference, so that a mutex that is discarded
+        # without being unlocked is still released by __del__
+        mutex = _weakref.ref(self)
+
+        def renew():
+            while True:
+                m = mutex()
+
+                if m is None:
+                    return
+
+                wait = m._lease_time / 2.0
+                m = None
+
+                if stop.wait(wait):
+                    return
+
+                m = mutex()
+
+                if m is None:
+                    return
+
+                try:
+                    m.renew_lease()
+                except:
+                    return
+                finally:
+                    m = None
+
+        thread = _threading.Thread(target=renew, daemon=True)
+        self._renewer = (thread, stop)
+        thread.start()
+
+    def _stop_renewer(self):
+        """Internal function that stops the lease renewing thread"""
+        renewer = self._renewer
+        self._renewer = None
+
+        if renewer is not None:
+            (thread, stop) = renewer
+            stop.set()
+
+            if thread is not _threading.current_thread():
+                thread.join()
+
+    def _take_ticket(self, endtime):
+        """Internal function that adds a ticket for this mutex to the
+           queue of waiters. Tickets are ordered by the time they were
+           taken, and record the time at which the waiter will give up
+        """
+        from Acquire.ObjectStore import datetime_to_string \
+            as _datetime_to_string
+        from Acquire.ObjectStore import ObjectStore as _ObjectStore
+
+        ticket = "%s/queue/%017.6f-%s" % (self._key, _time.time(),
+                                          self._secret[0:8])
+
+        _ObjectStore.set_string_object(self._bucket, ticket,
+                                       _datetime_to_string(endtime))
+
+        return ticket
+
+    def _is_first_in_queue(self, ticket, now):
+        """Internal function that returns whether or not 'ticket' is
+           the first ticket in the queue for this mutex. Tickets ahead
+           of this one whose waiters have given up are removed
+        """
+        from Acquire.ObjectStore import string_to_datetime \
+            as _string_to_datetime
+        from Acquire.ObjectStore import ObjectStore as _ObjectStore
+
+        prefix = "%s/queue/" % self._key
+
+        while True:
+            first = None
+
+            for name in _ObjectStore.iter_object_names(self._bucket,
+                                                       prefix=prefix,
+                                                       page_size=1):
+                first = "%s%s" % (prefix, name.split("/")[-1])
+                break
+
+            if first is None or first == ticket:
+                return True
+
+            try:
+                endtime = _string_to_datetime(
+                    _ObjectStore.get_string_object(self._bucket, first))
+            except:
+                endtime = None
+
+            if endtime is None or endtime < now:
+                # this waiter has given up (or crashed) - remove its ticket
+                _ObjectStore.delete_object(self._bucket, first)
+            else:
+                return False
+
     def lock(self, timeout=None, lease_time=None):
         """Lock the mutex, blocking until the mutex is held, or until
            'timeout' seconds have passed. If we time out, then an exception is
@@ -192,90 +455,116 @@ class Mutex:
         from Acquire.ObjectStore import string_to_datetime \
             as _string_to_datetime
         from Acquire.ObjectStore import ObjectStore as _ObjectStore
+        from Acquire.ObjectStore import ObjectStorePreconditionError \
+            as _ObjectStorePreconditionError
 
         if self.is_locked():
-            # renew the lease - if there is less than a second remaining
-            # on the lease then unlock and then lock again from scratch
-            now = _get_datetime_now()
-
-            if (now > self._end_lease) or (now - self._end_lease).seconds < 1:
-                self.fully_unlock()
+            # renew the lease - if someone else has taken the mutex
+            # then lock again from scratch
+            from Acquire.ObjectStore import MutexTimeoutError
+            try:
+                self.renew_lease(lease_time)
+            except MutexTimeoutError:
                 self.lock(timeout, lease_time)
-            else:
-                self._end_lease = now + _datetime.timedelta(seconds=lease_time)
-
-                self._lockstring = "%s{}%s" % (
-                    self._secret, _datetime_to_string(self._end_lease))
-
-                _ObjectStore.set_string_object(self._bucket, self._key,
-                                               self._lockstring)
-
-                self._is_locked += 1
+                return
 
+            self._is_locked += 1
             return
 
+        start_time = _time.monotonic()
         now = _get_datetime_now()
         endtime = now + _datetime.timedelta(seconds=timeout)
 
-        # This is the first time we are trying to get a lock
-        while now < endtime:
-            # does anyone else hold the lock?
-            try:
-                holder = _ObjectStore.get_string_object(self._bucket,
-                                                        self._key)
-            except:
-                holder = None
-
-            is_held = True
-
-            if holder is None:
-                is_held = False
-            else:
-                end_lease = _string_to_datetime(holder.split("{}")[-1])
-                if now > end_lease:
-                    # the lease from the other holder has expired :-)
-                    is_held = False
-
-            if not is_held:
-                # no-one holds this mutex - try to hold it now
-                self._end_lease = now + _datetime.timedelta(seconds=lease_time)
-
-                self._lockstring = "%s{}%s" % (
-                    self._secret, _datetime_to_string(self._end_lease))
-
-                _ObjectStore.set_string_object(self._bucket, self._key,
-                                               self._lockstring)
-
-                holder = _ObjectStore.get_string_object(self._bucket,
-                                                        self._key)
-            else:
-                self._lockstring = None
-
-            if holder == self._lockstring:
-                # it looks like we are the holder - read and write again
-                # just to make sure
-                holder = _ObjectStore.get_string_object(self._bucket,
-                                                        self._key)
-
-                if holder == self._lockstring:
-                    # write again just to make sure
-                    _ObjectStore.set_string_object(self._bucket, self._key,
-                                                   self._lockstring)
-
-                    holder = _ObjectStore.get_string_object(self._bucket,
-                                                            self._key)
-
-            if holder == self._lockstring:
-                # we have read and written our secret to the object store
-                # three times. While a race condition is still possible,
-                # I'd hope it is now highly unlikely - we now hold the mutex
-                self._is_locked = 1
-                return
+        attempts = 0
+        backoff = _min_backoff
 
-            # only try the lock 4 times a second
-            _time.sleep(0.25)
+        if self._fair:
+            ticket = self._take_ticket(endtime)
+        else:
+            ticket = None
 
-            now = _get_datetime_now()
+        try:
+            # This is the first time we are trying to get a lock
+            while now < endtime:
+                attempts += 1
+
+                if ticket is None or self._is_first_in_queue(ticket, now):
+                    # does anyone else hold the lock?
+                    try:
+                        (holder, etag) = _ObjectStore.get_object_with_etag(
+                                                    self._bucket, self._key)
+                        holder = holder.decode("utf-8")
+                    except:
+                        holder = None
+                        etag = None
+
+                    is_held = True
+
+                    if holder is None:
+                        is_held = False
+                    else:
+                        end_lease = _string_to_datetime(
+                                                holder.split("{}")[-1])
+                        if now > end_lease:
+                            # the lease from the other holder has expired
+                            is_held = False
+
+                    if not is_held:
+                        # no-one holds this mutex - try to hold it now.
+                        # This is a single compare-and-swap, which only
+                        # succeeds if no-one else has taken the mutex
+                        # since we read it
+                        end_lease = now + _datetime.timedelta(
+                                                        seconds=lease_time)
+
+                        lockstring = "%s{}%s" % (
+                            self._secret, _datetime_to_string(end_lease))
+
+                        try:
+                            self._etag = _ObjectStore.set_object_if(
+                                            self._bucket, self._key,
+                                            lockstring.encode("utf-8"),
+                                            if_match=etag)
+                            self._end_lease = end_lease
+                            self._lease_time = lease_time
+                            self._lockstring = lockstring
+                            self._is_locked = 1
+                        except _ObjectStorePreconditionError:
+                            # someone else got there first
+                            pass
+
+                    if self._is_locked:
+                        _record_statistics(self._key,
+                                           _time.monotonic() - start_time,
+                                           attempts, True)
+
+                        if self._auto_renew:
+                            self._start_renewer()
+
+                        return
+
+                # back off for a random time that grows exponentially
+                # with the number of attempts (so that many waiters do
+                # not all retry at the same time)
+                remaining = (endtime - _get_datetime_now()).total_seconds()
+                sleep = min(_random.uniform(backoff / 2.0, backoff),
+                            remaining)
+
+                if sleep > 0:
+                    _time.sleep(sleep)
+
+                backoff = min(2.0 * backoff, _max_backoff)
+
+                now = _get_datetime_now()
+        finally:
+            if ticket is not None:
+                try:
+                    _ObjectStore.delete_object(self._bucket, ticket)
+                except:
+                    pass
+
+        _record_statistics(self._key, _time.monotonic() - start_time,
+                           attempts, False)
 
         from Acquire.ObjectStore import MutexTimeoutError
         raise MutexTimeoutError("Cannot acquire a mutex lock on the "
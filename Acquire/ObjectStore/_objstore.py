@@ -5,6 +5,8 @@ import uuid as _uuid
 import json as _json
 import os as _os
 
+from ._cache import get_object_store_cache as _get_object_store_cache
+
 __all__ = ["ObjectStore", "set_object_store_backend",
            "use_testing_object_store_backend",
            "use_oci_object_store_backend",
@@ -13,6 +15,80 @@ __all__ = ["ObjectStore", "set_object_store_backend",
 _objstore_backend = None
 
 
+def _get_cache_bucket_id(bucket):
+    """Internal function that returns the ID used to identify
+       'bucket' in the object store cache. Buckets in the testing
+       backend are directory paths, which are used in full as the
+       bucket names are not unique between different testing stores
+    """
+    if isinstance(bucket, str):
+        return bucket
+    else:
+        return _objstore_backend.get_bucket_name(bucket)
+
+
+def _invalidate_cache(bucket, key=None, prefix=None):
+    """Internal function used to invalidate 'key' (or all keys
+       starting with 'prefix') in 'bucket' in the object store
+       cache, if this has been enabled
+    """
+    cache = _get_object_store_cache()
+
+    if cache is not None:
+        cache.invalidate(_get_cache_bucket_id(bucket), key=key,
+                         prefix=prefix)
+
+
+def _stream_into(chunks, output):
+    """Internal function that writes the buffers yielded by 'chunks'
+       into 'output', which is either a bytearray (which is written in
+       place and then resized to fit) or a file-like object opened for
+       binary writing. This returns the number of bytes written
+    """
+    size = 0
+
+    if isinstance(output, bytearray):
+        view = memoryview(output)
+
+        try:
+            for chunk in chunks:
+                end = size + len(chunk)
+
+                if end <= len(output):
+                    view[size:end] = chunk
+                else:
+                    # the bytearray must grow, so cannot be viewed
+                    view.release()
+                    output[size:] = chunk
+                    view = memoryview(output)
+
+                size = end
+        finally:
+            view.release()
+
+        del output[size:]
+    else:
+        for chunk in chunks:
+            output.write(chunk)
+            size += len(chunk)
+
+    return size
+
+
+def _get_stream_size(fileobj):
+    """Internal function that returns the number of bytes left to read
+       from 'fileobj', or None if this cannot be found (e.g. if this
+       is not seekable)
+    """
+    try:
+        position = fileobj.tell()
+        size = fileobj.seek(0, _io.SEEK_END)
+        fileobj.seek(position)
+        return size - position
+    except Exception:
+        return None
+
+
 def use_testing_object_store_backend(backend):
     from ._testing_objstore import Testing_ObjectStore as _Testing_ObjectStore
     set_object_store_backend(_Testing_ObjectStore)
@@ -74,11 +150,15 @@ class ObjectStore:
            the bucket first, and then delete the bucket. This
            can cause a LOSS OF DATA!
         """
-        return _objstore_backend.delete_bucket(bucket=bucket, force=force)
+        try:
+            return _objstore_backend.delete_bucket(bucket=bucket, force=force)
+        finally:
+            _invalidate_cache(bucket)
 
     @staticmethod
     def create_par(bucket, encrypt_key, key=None, readable=True,
-                   writeable=False, duration=3600, cleanup_function=None):
+                   writeable=False, duration=3600, cleanup_function=None,
+                   prefix=None):
         """Create a pre-authenticated request for the passed bucket and
            key (if key is None then the request is for the entire bucket).
            This will return a OSPar object that will contain a URL that can
@@ -88,14 +168,29 @@ class ObjectStore:
            in 'duration' (by default this is one hour). Note that you must
            pass in a public key that will be used to encrypt this OSPar. This
            is necessary as the OSPar grants access to anyone who can decrypt
-           the URL
+           the URL. Read access to a bucket must be limited to the
+           directory 'prefix' (a "/" is added if needed), so that a bucket
+           OSPar cannot be used to read every object in the bucket
         """
         from Acquire.ObjectStore import OSPar as _OSPar
+        from ._ospar import _to_directory
+
+        if key is None:
+            prefix = _to_directory(prefix)
+
+            if readable and prefix is None:
+                from Acquire.Client import PARError
+                raise PARError(
+                    "You must pass in the 'prefix' of the objects that can "
+                    "be read when creating a readable bucket OSPar")
+        else:
+            prefix = None
 
         par = _objstore_backend.create_par(
                     bucket=bucket, encrypt_key=encrypt_key, key=key,
                     readable=readable, writeable=writeable,
-                    duration=duration, cleanup_function=cleanup_function)
+                    duration=duration, cleanup_function=cleanup_function,
+                    prefix=prefix)
 
         if not isinstance(par, _OSPar):
             raise TypeError("A create_par request should always return an "
@@ -115,17 +210,82 @@ class ObjectStore:
     @staticmethod
     def get_object(bucket, key):
         """Return the binary data contained in the key 'key' in the
-           passed bucket"""
-        return _objstore_backend.get_object(bucket, key)
+           passed bucket. This is read through the object store
+           cache if this has been enabled"""
+        cache = _get_object_store_cache()
+
+        if cache is None:
+            return _objstore_backend.get_object(bucket, key)
+
+        bucket_id = _get_cache_bucket_id(bucket)
+        data = cache.get(bucket_id, key)
+
+        if data is None:
+            # the data is not cached if the object is set while it
+            # is being read, as it may then be the old value
+            generation = cache.generation()
+            data = _objstore_backend.get_object(bucket, key)
+            cache.set(bucket_id, key, data, generation=generation)
+
+        return data
+
+    @staticmethod
+    def get_object_with_etag(bucket, key):
+        """Return a tuple of the binary data contained in the key 'key'
+           in the passed bucket, plus the etag of the object. The etag
+           is an opaque string that changes whenever the object changes,
+           and can be passed to set_object_if to only update the object
+           if it has not been changed since it was read. This always
+           reads from the object store, bypassing any cache
+        """
+        return _objstore_backend.get_object_with_etag(bucket, key)
+
+    @staticmethod
+    def get_object_from_json_with_etag(bucket, key):
+        """Return a tuple of the object constructed from json stored
+           at 'key' in the passed bucket, plus the etag of the object
+        """
+        (data, etag) = ObjectStore.get_object_with_etag(bucket, key)
+        return (_json.loads(data.decode("utf-8")), etag)
+
+    @staticmethod
+    def get_object_stream(bucket, key):
+        """Return a generator that yields the binary data contained in
+           the key 'key' in the passed bucket as a series of buffers,
+           which are streamed from the object store without being
+           joined together. This is read through the object store
+           cache if this has been enabled and the object is cached,
+           but large streamed objects are never added to the cache
+        """
+        cache = _get_object_store_cache()
+
+        if cache is not None:
+            data = cache.get(_get_cache_bucket_id(bucket), key)
+
+            if data is not None:
+                return iter([data])
+
+        return _objstore_backend.get_object_stream(bucket, key)
+
+    @staticmethod
+    def get_object_into(bucket, key, output):
+        """Stream the object contained in the key 'key' in the passed
+           bucket into 'output', which is either a bytearray or a
+           file-like object opened for binary writing. A bytearray is
+           written in place (so should be preallocated to the size of
+           the object, if known) and is then resized to fit the
+           object. This returns the number of bytes written
+        """
+        return _stream_into(ObjectStore.get_object_stream(bucket, key),
+                            output)
 
     @staticmethod
     def get_object_as_file(bucket, key, filename):
         """Get the object contained in the key 'key' in the passed 'bucket'
-           and writing this to the file called 'filename'"""
-        data = ObjectStore.get_object(bucket, key)
-
+           and writing this to the file called 'filename'. The object
+           is streamed to the file, so is never held in memory"""
         with open(filename, "wb") as FILE:
-            FILE.write(data)
+            ObjectStore.get_object_into(bucket, key, FILE)
 
     @staticmethod
     def get_string_object(bucket, key):
@@ -142,12 +302,97 @@ class ObjectStore:
         data = ObjectStore.get_string_object(bucket, key)
         return _json.loads(data)
 
+    @staticmethod
+    def get_objects(bucket, keys):
+        """Return the binary data contained in each of the passed 'keys'
+           in the passed bucket, as a dictionary indexed by key. The
+           objects are fetched concurrently by the backend. If any of
+           the objects cannot be fetched then an ObjectStoreBatchError
+           is raised, which reports the error for each failed key and
+           holds the data of all of the objects that were fetched
+        """
+        keys = list(keys)
+        cache = _get_object_store_cache()
+
+        if cache is None:
+            return _objstore_backend.get_objects(bucket, keys)
+
+        bucket_id = _get_cache_bucket_id(bucket)
+
+        objects = {}
+        missing = []
+
+        for key in keys:
+            data = cache.get(bucket_id, key)
+
+            if data is None:
+                missing.append(key)
+            else:
+                objects[key] = data
+
+        if len(missing) == 0:
+            return objects
+
+        from Acquire.ObjectStore import ObjectStoreBatchError \
+            as _ObjectStoreBatchError
+
+        generation = cache.generation()
+
+        try:
+            fetched = _objstore_backend.get_objects(bucket, missing)
+        except _ObjectStoreBatchError as e:
+            for (key, data) in e.results().items():
+                cache.set(bucket_id, key, data, generation=generation)
+                objects[key] = data
+
+            raise _ObjectStoreBatchError(str(e), results=objects,
+                                         errors=e.errors())
+
+        for (key, data) in fetched.items():
+            cache.set(bucket_id, key, data, generation=generation)
+            objects[key] = data
+
+        return objects
+
+    @staticmethod
+    def get_objects_from_json(bucket, keys):
+        """Return the json-deserialised objects contained in each of
+           the passed 'keys' in the passed bucket, as a dictionary
+           indexed by key. This raises an ObjectStoreBatchError if
+           any of the objects could not be fetched or decoded
+        """
+        from Acquire.ObjectStore import ObjectStoreBatchError \
+            as _ObjectStoreBatchError
+
+        try:
+            objects = ObjectStore.get_objects(bucket, keys)
+            errors = {}
+        except _ObjectStoreBatchError as e:
+            objects = e.results()
+            errors = e.errors()
+
+        results = {}
+
+        for (key, data) in objects.items():
+            try:
+                results[key] = _json.loads(data.decode("utf-8"))
+            except Exception as e:
+                errors[key] = e
+
+        from ._parallel import assert_no_errors as _assert_no_errors
+        _assert_no_errors(results, errors, "decode")
+
+        return results
+
     @staticmethod
     def take_object(bucket, key):
         """Take (delete) the object from the object store, returning
            the object
         """
-        return _objstore_backend.take_object(bucket, key)
+        try:
+            return _objstore_backend.take_object(bucket, key)
+        finally:
+            _invalidate_cache(bucket, key=key)
 
     @staticmethod
     def take_string_object(bucket, key):
@@ -177,21 +422,71 @@ class ObjectStore:
         return _json.loads(data)
 
     @staticmethod
-    def get_all_object_names(bucket, prefix=None, without_prefix=False):
-        """Returns the names of all objects in the passed bucket"""
-        return _objstore_backend.get_all_object_names(bucket, prefix,
-                                                      without_prefix)
+    def get_all_object_names(bucket, prefix=None, without_prefix=False,
+                             page_size=1000):
+        """Returns the names of all objects in the passed bucket. The
+           backend lists these one page of 'page_size' names at a time
+        """
+        return _objstore_backend.get_all_object_names(
+                    bucket, prefix, without_prefix, page_size=page_size)
+
+    @staticmethod
+    def count_objects(bucket, prefix=None, page_size=1000):
+        """Return the number of objects in the passed bucket (that
+           have the passed prefix). This pages through the listing
+           one page of 'page_size' names at a time, without holding
+           all of the names in memory
+        """
+        return _objstore_backend.count_objects(bucket, prefix=prefix,
+                                               page_size=page_size)
+
+    @staticmethod
+    def iter_object_names(bucket, prefix=None, start_after=None,
+                          end_before=None, page_size=1000,
+                          without_prefix=False):
+        """Return a generator that yields the names of the objects in
+           the passed bucket in lexical order. The names are fetched
+           lazily, one page of 'page_size' names at a time, so this
+           can be used to list very large numbers of objects, and
+           the caller can stop iterating as soon as they have found
+           what they need. Only names that are after 'start_after'
+           and before 'end_before' are returned (if these are set)
+        """
+        return _objstore_backend.iter_object_names(
+                    bucket, prefix=prefix, start_after=start_after,
+                    end_before=end_before, page_size=page_size,
+                    without_prefix=without_prefix)
+
+    @staticmethod
+    def list_keys_between(bucket, start_key=None, end_key=None,
+                          reverse=False, limit=None):
+        """Return the sorted list of the keys of the objects in the
+           passed bucket that are between 'start_key' (inclusive) and
+           'end_key' (exclusive). This is a single, bounded listing
+           that is ideal for range queries over keys that are
+           lexically ordered, e.g. that are based on datetimes.
+           If 'reverse' is True then the keys are returned in
+           reverse order, and if 'limit' is set then at most
+           'limit' keys are returned (e.g. reverse=True, limit=1
+           returns the last key before 'end_key'). The cloud backends
+           can only list forwards, so a reverse listing lists the whole
+           range - 'start_key' must be passed to bound the range,
+           e.g. to a window of time before 'end_key'
+        """
+        if reverse and start_key is None:
+            raise ValueError(
+                "You must pass 'start_key' to bound a reverse listing, as "
+                "the whole range up to '%s' is listed" % end_key)
+
+        return _objstore_backend.list_keys_between(
+                    bucket, start_key=start_key, end_key=end_key,
+                    reverse=reverse, limit=limit)
 
     @staticmethod
     def get_all_objects(bucket, prefix=None):
         """Return all of the objects in the passed bucket"""
-        objects = {}
         names = ObjectStore.get_all_object_names(bucket, prefix)
-
-        for name in names:
-            objects[name] = ObjectStore.get_object(bucket, name)
-
-        return objects
+        return ObjectStore.get_objects(bucket, names)
 
     @staticmethod
     def get_all_objects_from_json(bucket, prefix=None):
@@ -230,14 +525,60 @@ class ObjectStore:
     @staticmethod
     def set_object(bucket, key, data):
         """Set the value of 'key' in 'bucket' to binary 'data'"""
-        _objstore_backend.set_object(bucket, key, data)
+        # invalidate after the write. A read that started before the
+        # write may still return the old value, but the cache will not
+        # store this as the key's generation has changed
+        try:
+            _objstore_backend.set_object(bucket, key, data)
+        finally:
+            _invalidate_cache(bucket, key=key)
+
+    @staticmethod
+    def set_object_stream(bucket, key, fileobj):
+        """Set the value of 'key' in 'bucket' to the binary data read
+           from the file-like object 'fileobj'. The data is streamed to
+           the object store (using multipart upload for large objects
+           on the cloud backends), so is never held in memory"""
+        try:
+            _objstore_backend.set_object_stream(bucket, key, fileobj)
+        finally:
+            _invalidate_cache(bucket, key=key)
 
     @staticmethod
     def set_object_from_file(bucket, key, filename):
         """Set the value of 'key' in 'bucket' to equal the contents
-           of the file located by 'filename'"""
-        ObjectStore.set_object(bucket, key,
-                               open(filename, 'rb').read())
+           of the file located by 'filename'. The file is streamed
+           to the object store"""
+        with open(filename, "rb") as FILE:
+            ObjectStore.set_object_stream(bucket, key, FILE)
+
+    @staticmethod
+    def set_object_if(bucket, key, data, if_match=None):
+        """Set the value of 'key' in 'bucket' to binary 'data', but
+           only if the object has not changed since it was read with
+           etag 'if_match' (compare-and-swap). If 'if_match' is None
+           then the object is only set if it does not already exist.
+           The condition is checked atomically by the object store,
+           and an ObjectStorePreconditionError is raised if it is not
+           met. This returns the etag of the new object
+        """
+        try:
+            return _objstore_backend.set_object_if(bucket, key, data,
+                                                   if_match)
+        finally:
+            _invalidate_cache(bucket, key=key)
+
+    @staticmethod
+    def set_object_from_json_if(bucket, key, data, if_match=None):
+        """Set the value of 'key' in 'bucket' to equal the contents of
+           'data', which has been encoded to json, but only if the
+           object has not changed since it was read with etag
+           'if_match' (or does not exist if 'if_match' is None).
+           This returns the etag of the new object
+        """
+        return ObjectStore.set_object_if(
+                    bucket, key, _json.dumps(data).encode("utf-8"),
+                    if_match)
 
     @staticmethod
     def set_ins_object_from_json(bucket, key, data):
@@ -248,25 +589,14 @@ class ObjectStore:
            (either the set object or the value that was previously
            set
         """
-        from Acquire.ObjectStore import Mutex as _Mutex
-        m = _Mutex(bucket=bucket, key=key)
+        from Acquire.ObjectStore import ObjectStorePreconditionError \
+            as _ObjectStorePreconditionError
 
         try:
-            old_data = ObjectStore.get_object_from_json(bucket, key)
-        except:
-            old_data = None
-
-        if old_data is not None:
-            m.unlock()
-            return old_data
-        else:
-            try:
-                ObjectStore.set_object_from_json(bucket, key, data)
-            except:
-                m.unlock()
-                raise
-
+            ObjectStore.set_object_from_json_if(bucket, key, data)
             return data
+        except _ObjectStorePreconditionError:
+            return ObjectStore.get_object_from_json(bucket, key)
 
     @staticmethod
     def set_ins_string_object(bucket, key, string_data):
@@ -276,25 +606,15 @@ class ObjectStore:
            key after the operation (either the set string, or the value
            that was previously set)
         """
-        from Acquire.ObjectStore import Mutex as _Mutex
-        m = _Mutex(bucket=bucket, key=key)
+        from Acquire.ObjectStore import ObjectStorePreconditionError \
+            as _ObjectStorePreconditionError
 
         try:
-            val = ObjectStore.get_string_object(bucket, key)
-        except:
-            val = None
-
-        if val is not None:
-            m.unlock()
-            return val
-        else:
-            try:
-                ObjectStore.set_string_object(bucket, key, string_data)
-            except:
-                m.unlock()
-                raise
-
+            ObjectStore.set_object_if(bucket, key,
+                                      string_data.encode("utf-8"))
             return string_data
+        except _ObjectStorePreconditionError:
+            return ObjectStore.get_string_object(bucket, key)
 
     @staticmethod
     def set_string_object(bucket, key, string_data):
@@ -308,15 +628,62 @@ class ObjectStore:
            of 'data', which has been encoded to json"""
         ObjectStore.set_string_object(bucket, key, _json.dumps(data))
 
+    @staticmethod
+    def set_objects(bucket, objects):
+        """Set the binary data of many objects in 'bucket', where
+           'objects' is a dictionary of binary data indexed by key.
+           The objects are written concurrently by the backend. If
+           any of the objects cannot be written then an
+           ObjectStoreBatchError is raised, which reports the error
+           for each failed key
+        """
+        objects = dict(objects)
+
+        try:
+            _objstore_backend.set_objects(bucket, objects)
+        finally:
+            for key in objects.keys():
+                _invalidate_cache(bucket, key=key)
+
+    @staticmethod
+    def set_objects_from_json(bucket, objects):
+        """Set the value of many objects in 'bucket', where 'objects'
+           is a dictionary of json-serialisable data indexed by key
+        """
+        data = {}
+
+        for (key, value) in objects.items():
+            data[key] = _json.dumps(value).encode("utf-8")
+
+        ObjectStore.set_objects(bucket, data)
+
     @staticmethod
     def delete_all_objects(bucket, prefix=None):
         """Deletes all objects..."""
-        _objstore_backend.delete_all_objects(bucket, prefix)
+        try:
+            _objstore_backend.delete_all_objects(bucket, prefix)
+        finally:
+            _invalidate_cache(bucket, prefix=prefix)
 
     @staticmethod
     def delete_object(bucket, key):
         """Removes the object at 'key'"""
-        _objstore_backend.delete_object(bucket, key)
+        try:
+            _objstore_backend.delete_object(bucket, key)
+        finally:
+            _invalidate_cache(bucket, key=key)
+
+    @staticmethod
+    def delete_object_if(bucket, key, if_match):
+        """Removes the object at 'key', but only if it has not changed
+           since it was read with etag 'if_match'. This raises an
+           ObjectStorePreconditionError if the object has been
+           changed or removed
+        """
+        try:
+            _objstore_backend.delete_object_if(bucket, key, if_match)
+        finally:
+            _invalidate_cache(bucket, key=key)
 
     @staticmethod
     def clear_all_except(bucket, keys):
@@ -344,13 +711,156 @@ class ObjectStore:
         return _objstore_backend.get_size_and_checksum(bucket, key)
 
 
+def _get_traced_size(method, args, kwargs, result):
+    """Internal function that returns the number of bytes transferred
+       by the call 'method(*args, **kwargs)' that returned 'result'
+    """
+    if method in ("set_object", "set_object_if"):
+        data = args[2] if len(args) > 2 else kwargs.get("data")
+        return len(data) if data is not None else 0
+    elif method == "set_objects":
+        objects = args[1] if len(args) > 1 else kwargs.get("objects")
+        return sum(len(data) for data in objects.values()
+                   if data is not None)
+    elif method in ("get_object", "take_object"):
+        return len(result)
+    elif method == "get_object_with_etag":
+        return len(result[0])
+    elif method == "get_objects":
+        return sum(len(data) for data in result.values()
+                   if data is not None)
+    else:
+        return 0
+
+
+class _TracedBackend:
+    """Internal class that wraps the object store backend so that
+       every call that transfers data to or from the object store is
+       recorded (latency, bytes, bucket and key prefix) by the
+       service tracing. Reads that are served by the object store
+       cache do not reach the backend, and so are not recorded
+    """
+    _traced_methods = set(["get_object", "get_object_with_etag",
+                           "get_objects", "take_object",
+                           "get_all_object_names", "count_objects",
+                           "list_keys_between",
+                           "set_object", "set_object_if", "set_objects",
+                           "set_object_stream",
+                           "delete_object", "delete_object_if",
+                           "delete_all_objects", "get_size_and_checksum"])
+
+    def __init__(self, backend):
+        self._backend = backend
+
+    def __getattr__(self, name):
+        attr = getattr(self._backend, name)
+
+        if name in _TracedBackend._traced_methods:
+            return self._trace(name, attr)
+        elif name in ("iter_object_names", "get_object_stream"):
+            return self._trace_iter(name, attr)
+        else:
+            return attr
+
+    def _get_attributes(self, args, kwargs):
+        """Internal function that returns the bucket name and the key
+           prefix (first part of the key) of a call
+        """
+        try:
+            bucket = args[0] if len(args) > 0 else kwargs["bucket"]
+
+            if not isinstance(bucket, str):
+                bucket = self._backend.get_bucket_name(bucket)
+        except Exception:
+            bucket = None
+
+        key = args[1] if len(args) > 1 else \
+            kwargs.get("key", kwargs.get("prefix", None))
+
+        if isinstance(key, (list, tuple)):
+            key = key[0] if len(key) > 0 else None
+        elif isinstance(key, dict):
+            key = next(iter(key), None)
+
+        if key is not None:
+            key = str(key).split("/")[0]
+
+        return (bucket, key)
+
+    def _trace(self, name, function):
+        """Internal function that returns 'function' wrapped so that
+           its calls are traced
+        """
+        from Acquire.Service._tracing import trace as _trace
+
+        def traced(*args, **kwargs):
+            (bucket, prefix) = self._get_attributes(args, kwargs)
+
+            with _trace("objstore.%s" % name, bucket=bucket,
+                        prefix=prefix) as span:
+                result = function(*args, **kwargs)
+
+                try:
+                    span.nbytes = _get_traced_size(name, args, kwargs,
+                                                   result)
+                except Exception:
+                    pass
+
+                return result
+
+        return traced
+
+    def _trace_iter(self, name, function):
+        """Internal function that returns the generator 'function'
+           wrapped so that the total time spent fetching items (and
+           the number of bytes, if these are buffers) is traced as
+           a single span once iteration finishes
+        """
+        import time as _time
+        from Acquire.Service import is_tracing_enabled \
+            as _is_tracing_enabled
+        from Acquire.Service._tracing import _record
+
+        if not _is_tracing_enabled():
+            return function
+
+        def traced(*args, **kwargs):
+            (bucket, prefix) = self._get_attributes(args, kwargs)
+            iterator = iter(function(*args, **kwargs))
+            elapsed = 0.0
+            nbytes = 0
+
+            try:
+                while True:
+                    start = _time.perf_counter()
+
+                    try:
+                        item = next(iterator)
+                    except StopIteration:
+                        return
+                    finally:
+                        elapsed += _time.perf_counter() - start
+
+                    if isinstance(item, (bytes, bytearray, memoryview)):
+                        nbytes += len(item)
+
+                    yield item
+            finally:
+                _record("objstore.%s" % name,
+                        {"bucket": bucket, "prefix": prefix},
+                        1000.0 * elapsed, nbytes)
+
+        return traced
+
+
 def set_object_store_backend(backend):
     """Set the backend that is used to actually connect to
        the object store. This can only be set once in the program!
     """
     global _objstore_backend
 
-    if backend == _objstore_backend:
+    if _objstore_backend is not None and \
+            backend == _objstore_backend._backend:
         return
 
     if _objstore_backend is not None:
@@ -358,4 +868,4 @@ def set_object_store_backend(backend):
         raise ObjectStoreError("You cannot change the object store "
                                "backend once it has been already set!")
 
-    _objstore_backend = backend
+    _objstore_backend = _TracedBackend(backend)
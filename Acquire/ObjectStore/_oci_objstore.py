@@ -9,6 +9,15 @@ import uuid as _uuid
 
 __all__ = ["OCI_ObjectStore"]
 
+# The size of the buffers in which objects are streamed
+_stream_chunk_size = 1024 * 1024
+
+# Streamed objects that are larger than this (or whose size is not
+# known) are uploaded in parts of _multipart_part_size bytes using
+# the native multipart upload
+_multipart_threshold = 64 * 1024 * 1024
+_multipart_part_size = 16 * 1024 * 1024
+
 
 def _sanitise_bucket_name(bucket_name):
     """This function sanitises the passed bucket name. It will always
@@ -28,6 +37,17 @@ def _sanitise_bucket_name(bucket_name):
     return "_".join(bucket_name.split())
 
 
+def _is_precondition_failure(e):
+    """Return whether or not the passed exception from the OCI client
+       shows that a conditional request failed because the object
+       was changed (412) or already exists / was removed (409, 404)
+    """
+    try:
+        return e.status in [404, 409, 412]
+    except:
+        return False
+
+
 def _clean_key(key):
     """This function cleans and returns a key so that it is suitable
        for use both as a key and a directory/file path
@@ -120,6 +140,96 @@ def _get_driver_details_from_data(data):
     return details
 
 
+def _list_names(bucket, prefix=None, start=None, end=None, page_size=1000):
+    """Internal generator that lists the names of objects in 'bucket'
+       (optionally with 'prefix') from 'start' (inclusive) to 'end'
+       (exclusive), fetching one page of 'page_size' names at a time.
+       The names are yielded exactly as they are returned by OCI
+
+       Args:
+            bucket (dict): Bucket containing data
+            prefix (str, default=None): Prefix for data
+            start (str, default=None): Name at which to start listing
+            end (str, default=None): Name at which to stop listing
+            page_size (int, default=1000): Number of names per request
+       Returns:
+            generator: Yields the names of the objects
+    """
+    client = bucket["client"]
+
+    while True:
+        objects = client.list_objects(bucket["namespace"],
+                                      bucket["bucket_name"],
+                                      prefix=prefix, start=start, end=end,
+                                      limit=int(page_size),
+                                      fields="name").data
+
+        for obj in objects.objects:
+            yield obj.name
+
+        start = objects.next_start_with
+
+        if start is None:
+            return
+
+
+def _stream_response(response):
+    """Internal generator that yields the body of the passed get_object
+       'response' in buffers of up to _stream_chunk_size bytes
+    """
+    for chunk in response.data.raw.stream(_stream_chunk_size,
+                                          decode_content=False):
+        yield chunk
+
+
+def _get_segment_keys(bucket, key):
+    """Internal function that returns the keys of the segments
+       ('key/1', 'key/2', ...) of an object that has been stored in
+       segments, in order. Only the contiguous segments from 1
+       are returned, and this is empty if there are no segments
+    """
+    segments = {}
+
+    for name in _list_names(bucket, prefix="%s/" % key):
+        index = name[len(key)+1:]
+
+        if index.isdigit():
+            segments[int(index)] = name
+
+    keys = []
+    i = 1
+
+    while i in segments:
+        keys.append(segments[i])
+        i += 1
+
+    return keys
+
+
+def _stream_segments(bucket, key):
+    """Internal generator that yields the data of each of the segments
+       of the object at 'key', in order. The segments are fetched
+       concurrently. This raises an ObjectStoreError if there
+       are no segments
+    """
+    segments = _get_segment_keys(bucket, key)
+
+    if len(segments) == 0:
+        from Acquire.ObjectStore import ObjectStoreError
+        raise ObjectStoreError("No data at key '%s'" % key)
+
+    def _get_segment(segment):
+        response = bucket["client"].get_object(bucket["namespace"],
+                                               bucket["bucket_name"],
+                                               segment)
+        return b"".join(_stream_response(response))
+
+    from ._parallel import iter_in_parallel as _iter_in_parallel
+
+    for data in _iter_in_parallel(_get_segment, segments):
+        yield data
+
+
 class OCI_ObjectStore:
     """This is the backend that abstracts using the Oracle Cloud
        Infrastructure object store
@@ -254,7 +364,8 @@ class OCI_ObjectStore:
         """
         objects = bucket["client"].list_objects(bucket["namespace"],
                                                 bucket["bucket_name"],
-                                                limit=1).data
+                                                limit=1,
+                                                fields="name").data
 
         for _obj in objects.objects:
             return False
@@ -309,7 +420,8 @@ class OCI_ObjectStore:
 
     @staticmethod
     def create_par(bucket, encrypt_key, key=None, readable=True,
-                   writeable=False, duration=3600, cleanup_function=None):
+                   writeable=False, duration=3600, cleanup_function=None,
+                   prefix=None):
         """Create a pre-authenticated request for the passed bucket and
            key (if key is None then the request is for the entire bucket).
            This will return a OSPar object that will contain a URL that can
@@ -329,6 +441,8 @@ class OCI_ObjectStore:
                 valid for in seconds
                 cleanup_function (function, default=None): Cleanup
                 function to be passed to PARRegistry
+                prefix (str, default=None): Directory to which read
+                access to the bucket is limited
 
            Returns:
                 OSPar: Pre-authenticated request for the bucket
@@ -348,13 +462,13 @@ class OCI_ObjectStore:
 
         is_bucket = (key is None)
 
-        # Limitation of OCI - cannot have a bucket OSPar with
-        # read permissions!
-        if is_bucket and readable:
+        # a readable bucket OSPar must be limited to a directory, as
+        # otherwise it could be used to read every object in the bucket
+        if is_bucket and readable and not prefix:
             from Acquire.Client import PARError
             raise PARError(
                 "You cannot create a Bucket OSPar that has read permissions "
-                "due to a limitation in the underlying platform")
+                "unless you limit it to the objects in a 'prefix'")
 
         try:
             from oci.object_storage.models import \
@@ -371,7 +485,16 @@ class OCI_ObjectStore:
         request = _CreatePreauthenticatedRequestDetails()
 
         if is_bucket:
-            request.access_type = "AnyObjectWrite"
+            if readable and writeable:
+                request.access_type = "AnyObjectReadWrite"
+            elif readable:
+                request.access_type = "AnyObjectRead"
+            else:
+                request.access_type = "AnyObjectWrite"
+
+            if readable:
+                # allow the objects in the bucket to be listed via the OSPar
+                request.bucket_listing_action = "ListObjects"
         elif readable and writeable:
             request.access_type = "ObjectReadWrite"
         elif readable:
@@ -387,6 +510,11 @@ class OCI_ObjectStore:
 
         if not is_bucket:
             request.object_name = _clean_key(key)
+        elif readable:
+            # the object name of an AnyObject* request is the prefix of
+            # the objects that can be accessed (not cleaned, as this
+            # would remove the trailing "/" of the directory)
+            request.object_name = prefix
 
         request.time_expires = expires_datetime
 
@@ -441,12 +569,19 @@ class OCI_ObjectStore:
                           "par_id": oci_par.id,
                           "par_name": oci_par.name}
 
+        if is_bucket:
+            par_key = None
+        else:
+            par_key = oci_par.object_name
+            prefix = None
+
         par = _OSPar(url=url, encrypt_key=encrypt_key,
-                     key=oci_par.object_name,
+                     key=par_key,
                      expires_datetime=expires_datetime,
                      is_readable=readable,
                      is_writeable=writeable,
-                     driver_details=driver_details)
+                     driver_details=driver_details,
+                     prefix=prefix)
 
         _OSParRegistry.register(par=par,
                                 url_checksum=url_checksum,
@@ -531,62 +666,95 @@ class OCI_ObjectStore:
                 bytes: Binary data
 
         """
+        return b"".join(OCI_ObjectStore.get_object_stream(bucket, key))
+
+    @staticmethod
+    def get_object_stream(bucket, key):
+        """Iterate over the binary data contained in the key 'key' in
+           the passed bucket, yielding buffers of up to 1 MB without
+           joining them together. If the object has been stored in
+           segments ('key/1', 'key/2', ...) then the segments are
+           fetched concurrently and yielded in order
+
+           Args:
+                bucket (dict): Bucket containing data
+                key (str): Key for data in bucket
+           Returns:
+                generator: Yields the binary data in buffers
 
+        """
         key = _clean_key(key)
 
         try:
             response = bucket["client"].get_object(bucket["namespace"],
                                                    bucket["bucket_name"],
                                                    key)
-            is_chunked = False
         except:
-            try:
-                response = bucket["client"].get_object(bucket["namespace"],
-                                                       bucket["bucket_name"],
-                                                       "%s/1" % key)
-                is_chunked = True
-            except:
-                is_chunked = False
-                pass
+            response = None
 
-            # Raise the original error
-            if not is_chunked:
-                from Acquire.ObjectStore import ObjectStoreError
-                raise ObjectStoreError("No data at key '%s'" % key)
+        if response is not None:
+            for chunk in _stream_response(response):
+                yield chunk
 
-        data = None
+            return
 
-        for chunk in response.data.raw.stream(1024 * 1024,
-                                              decode_content=False):
-            if not data:
-                data = chunk
-            else:
-                data += chunk
+        for data in _stream_segments(bucket, key):
+            yield data
 
-        if is_chunked:
-            # keep going through to find more chunks
-            next_chunk = 1
+    @staticmethod
+    def get_object_with_etag(bucket, key):
+        """Return the binary data contained in the key 'key' in the
+           passed bucket, together with the etag of the object. Note
+           that this does not support objects that have been chunked
 
-            while True:
-                next_chunk += 1
+           Args:
+                bucket (dict): Bucket containing data
+                key (str): Key for data in bucket
+           Returns:
+                tuple (bytes, str): Binary data and etag
+        """
+        key = _clean_key(key)
 
-                try:
-                    response = bucket["client"].get_object(
-                                        bucket["namespace"],
-                                        bucket["bucket_name"],
-                                        "%s/%d" % (key, next_chunk))
-                except:
-                    response = None
-                    break
-
-                for chunk in response.data.raw.stream(1024 * 1024,
-                                                      decode_content=False):
-                    if not data:
-                        data = chunk
-                    else:
-                        data += chunk
+        try:
+            response = bucket["client"].get_object(bucket["namespace"],
+                                                   bucket["bucket_name"],
+                                                   key)
+        except:
+            from Acquire.ObjectStore import ObjectStoreError
+            raise ObjectStoreError("No data at key '%s'" % key)
 
-        return data
+        data = b"".join(_stream_response(response))
+
+        return (data, response.headers["etag"])
+
+    @staticmethod
+    def get_objects(bucket, keys):
+        """Return the binary data contained in each of the passed 'keys'
+           in the passed bucket. The objects are fetched concurrently
+           using a bounded pool of threads, so that the time taken
+           scales with the latency of the object store rather than
+           with the number of keys
+
+           Args:
+                bucket (dict): Bucket containing data
+                keys (list): Keys for data in bucket
+           Returns:
+                dict: Binary data indexed by key
+
+           Raises:
+                ObjectStoreBatchError: If any of the objects could not
+                be fetched. This holds the per-key errors and the data
+                of all objects that were fetched successfully
+        """
+        from ._parallel import run_in_parallel as _run_in_parallel
+        from ._parallel import assert_no_errors as _assert_no_errors
+
+        (results, errors) = _run_in_parallel(
+            lambda key: OCI_ObjectStore.get_object(bucket, key), keys)
+
+        _assert_no_errors(results, errors, "get")
+
+        return results
 
     @staticmethod
     def take_object(bucket, key):
@@ -611,34 +779,89 @@ class OCI_ObjectStore:
         return data
 
     @staticmethod
-    def get_all_object_names(bucket, prefix=None, without_prefix=False):
-        """Returns the names of all objects in the passed bucket
+    def get_all_object_names(bucket, prefix=None, without_prefix=False,
+                             page_size=1000):
+        """Returns the names of all objects in the passed bucket. The
+           names are listed one page of 'page_size' names at a time,
+           following the 'next_start_with' marker until the listing
+           is complete
 
            Args:
                 bucket (dict): Bucket containing data
                 prefix (str): Prefix for data
+                without_prefix (bool, default=False): Whether or not
+                to remove the prefix from the returned names
+                page_size (int, default=1000): Number of names
+                to fetch per request
            Returns:
                 list: List of all objects in bucket
 
         """
-        if prefix is not None:
-            prefix = _clean_key(prefix)
+        return list(OCI_ObjectStore.iter_object_names(
+                                        bucket, prefix=prefix,
+                                        page_size=page_size,
+                                        without_prefix=without_prefix))
 
-        objects = bucket["client"].list_objects(bucket["namespace"],
-                                                bucket["bucket_name"],
-                                                prefix=prefix).data
+    @staticmethod
+    def count_objects(bucket, prefix=None, page_size=1000):
+        """Return the number of objects in the passed bucket (that
+           have the passed prefix). This pages through the listing
+           without holding the names in memory
 
-        names = []
+           Args:
+                bucket (dict): Bucket containing data
+                prefix (str, default=None): Prefix for data
+                page_size (int, default=1000): Number of names
+                to fetch per request
+           Returns:
+                int: Number of objects
+        """
+        count = 0
+
+        for _name in OCI_ObjectStore.iter_object_names(
+                                    bucket, prefix=prefix,
+                                    page_size=page_size):
+            count += 1
+
+        return count
+
+    @staticmethod
+    def iter_object_names(bucket, prefix=None, start_after=None,
+                          end_before=None, page_size=1000,
+                          without_prefix=False):
+        """Iterate over the names of all objects in the passed bucket,
+           in lexical order. Names are fetched lazily from the object
+           store one page at a time, so callers can stop early without
+           listing the whole bucket
+
+           Args:
+                bucket (dict): Bucket containing data
+                prefix (str, default=None): Prefix for data
+                start_after (str, default=None): Only return names
+                that come after this key
+                end_before (str, default=None): Only return names
+                that come before this key
+                page_size (int, default=1000): Number of names
+                to fetch per request
+                without_prefix (bool, default=False): Whether or not
+                to remove the prefix from the returned names
+           Returns:
+                generator: Yields the names of the objects
 
-        if without_prefix:
+        """
+        if prefix is not None:
+            prefix = _clean_key(prefix)
+
+        if without_prefix and prefix is not None:
             prefix_len = len(prefix)
+        else:
+            prefix_len = 0
 
-        for obj in objects.objects:
-            if prefix:
-                if obj.name.startswith(prefix):
-                    name = obj.name
-            else:
-                name = obj.name
+        for name in _list_names(bucket, prefix=prefix, start=start_after,
+                                end=end_before, page_size=page_size):
+            # 'start' is inclusive, but 'start_after' is not
+            if start_after is not None and name <= start_after:
+                continue
 
             while name.endswith("/"):
                 name = name[0:-1]
@@ -653,9 +876,61 @@ class OCI_ObjectStore:
                     name = name[1:]
 
             if len(name) > 0:
-                names.append(name)
+                yield name
 
-        return names
+    @staticmethod
+    def list_keys_between(bucket, start_key=None, end_key=None,
+                          reverse=False, limit=None):
+        """Return the sorted list of keys in the passed bucket that
+           are between 'start_key' (inclusive) and 'end_key'
+           (exclusive). This uses the native start and end markers
+           of the OCI listing, so only keys in this range are listed.
+           If 'reverse' is True then the keys are returned in reverse
+           order. At most 'limit' keys are returned
+
+           Args:
+                bucket (dict): Bucket containing data
+                start_key (str, default=None): First key of the range
+                end_key (str, default=None): Key after the range
+                reverse (bool, default=False): Return in reverse order
+                limit (int, default=None): Maximum number of keys
+           Returns:
+                list: Sorted list of keys
+        """
+        if limit is not None:
+            limit = int(limit)
+
+            if limit <= 0:
+                return []
+
+        if reverse:
+            # OCI can only list forwards, so we have to list the whole
+            # range, but only need to hold the last 'limit' keys
+            from collections import deque as _deque
+            keys = _deque(maxlen=limit)
+
+            for name in _list_names(bucket, start=start_key, end=end_key):
+                keys.append(name)
+
+            keys = list(keys)
+            keys.reverse()
+            return keys
+
+        if limit is None or limit > 1000:
+            page_size = 1000
+        else:
+            page_size = limit
+
+        keys = []
+
+        for name in _list_names(bucket, start=start_key, end=end_key,
+                                page_size=page_size):
+            keys.append(name)
+
+            if limit is not None and len(keys) >= limit:
+                break
+
+        return keys
 
     @staticmethod
     def set_object(bucket, key, data):
@@ -679,6 +954,122 @@ class OCI_ObjectStore:
                                     bucket["bucket_name"],
                                     key, f)
 
+    @staticmethod
+    def set_object_stream(bucket, key, fileobj):
+        """Set the value of 'key' in 'bucket' to the binary data read
+           from the file-like object 'fileobj'. Large objects (or
+           streams of unknown size) are uploaded in parts, in parallel,
+           using the native multipart upload, so that the whole object
+           is never held in memory
+
+           Args:
+                bucket (dict): Bucket containing data
+                key (str): Key for data in bucket
+                fileobj (file): File-like object opened for binary reading
+
+           Returns:
+                None
+        """
+        from ._objstore import _get_stream_size
+
+        key = _clean_key(key)
+        size = _get_stream_size(fileobj)
+
+        if size is not None and size <= _multipart_threshold:
+            bucket["client"].put_object(bucket["namespace"],
+                                        bucket["bucket_name"],
+                                        key, fileobj, content_length=size)
+            return
+
+        try:
+            from oci.object_storage import UploadManager as _UploadManager
+        except:
+            raise ImportError(
+                "Cannot import OCI. Please install OCI, e.g. via "
+                "'pip install oci' so that you can connect to the "
+                "Oracle Cloud Infrastructure")
+
+        from ._parallel import get_max_object_store_workers \
+            as _get_max_object_store_workers
+
+        manager = _UploadManager(
+                    bucket["client"], allow_parallel_uploads=True,
+                    parallel_process_count=_get_max_object_store_workers())
+
+        manager.upload_stream(bucket["namespace"], bucket["bucket_name"],
+                              key, fileobj, part_size=_multipart_part_size)
+
+    @staticmethod
+    def set_object_if(bucket, key, data, if_match=None):
+        """Set the value of 'key' in 'bucket' to binary 'data', but
+           only if the etag of the existing object matches 'if_match'
+           (using 'if-match'), or, if 'if_match' is None, only if there
+           is no existing object (using 'if-none-match: *'). The
+           condition is checked atomically by the object store
+
+           Args:
+                bucket (dict): Bucket containing data
+                key (str): Key for data in bucket
+                data (bytes): Binary data to store in bucket
+                if_match (str, default=None): Etag of the existing object
+
+           Returns:
+                str: Etag of the new object
+
+           Raises:
+                ObjectStorePreconditionError: If the condition is not met
+        """
+        if data is None:
+            data = b'0'
+
+        f = _io.BytesIO(data)
+
+        key = _clean_key(key)
+
+        if if_match is None:
+            kwargs = {"if_none_match": "*"}
+        else:
+            kwargs = {"if_match": if_match}
+
+        try:
+            response = bucket["client"].put_object(bucket["namespace"],
+                                                   bucket["bucket_name"],
+                                                   key, f, **kwargs)
+        except Exception as e:
+            if _is_precondition_failure(e):
+                from Acquire.ObjectStore import ObjectStorePreconditionError
+                raise ObjectStorePreconditionError(
+                    "Cannot set the object at key '%s' as the "
+                    "precondition %s was not met" % (key, kwargs))
+            raise
+
+        return response.headers["etag"]
+
+    @staticmethod
+    def set_objects(bucket, objects):
+        """Set the binary data of many objects in 'bucket'. The objects
+           are written concurrently using a bounded pool of threads
+
+           Args:
+                bucket (dict): Bucket to hold data
+                objects (dict): Binary data indexed by key
+
+           Returns:
+                None
+
+           Raises:
+                ObjectStoreBatchError: If any of the objects could not
+                be written. This holds the per-key errors
+        """
+        from ._parallel import run_in_parallel as _run_in_parallel
+        from ._parallel import assert_no_errors as _assert_no_errors
+
+        (results, errors) = _run_in_parallel(
+            lambda key: OCI_ObjectStore.set_object(bucket, key, objects[key]),
+            objects.keys())
+
+        _assert_no_errors(results, errors, "set")
+
     @staticmethod
     def delete_all_objects(bucket, prefix=None):
         """Deletes all objects...
@@ -714,6 +1105,36 @@ class OCI_ObjectStore:
         except:
             pass
 
+    @staticmethod
+    def delete_object_if(bucket, key, if_match):
+        """Removes the object at 'key', but only if its etag matches
+           'if_match'
+
+           Args:
+                bucket (dict): Bucket containing data
+                key (str): Key for data
+                if_match (str): Etag of the object
+           Returns:
+                None
+
+           Raises:
+                ObjectStorePreconditionError: If the object has been
+                changed or removed
+        """
+        key = _clean_key(key)
+
+        try:
+            bucket["client"].delete_object(bucket["namespace"],
+                                           bucket["bucket_name"],
+                                           key, if_match=if_match)
+        except Exception as e:
+            if _is_precondition_failure(e):
+                from Acquire.ObjectStore import ObjectStorePreconditionError
+                raise ObjectStorePreconditionError(
+                    "Cannot delete the object at key '%s' as it has "
+                    "been changed or removed" % key)
+            raise
+
     @staticmethod
     def get_size_and_checksum(bucket, key):
         """Return the object size (in bytes) and MD5 checksum of the
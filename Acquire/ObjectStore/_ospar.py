@@ -1,11 +1,33 @@
 
 import datetime as _datetime
+import io as _io
 import json as _json
 import os as _os
+import shutil as _shutil
+import time as _time
 
 __all__ = ["OSPar", "BucketReader", "BucketWriter",
            "ObjectReader", "ObjectWriter"]
 
+# The size of the buffers in which objects are streamed via an OSPar
+_stream_chunk_size = 1024 * 1024
+
+# Remote objects are read using HTTP range requests of this many bytes,
+# with the ranges after the first being fetched concurrently
+_range_size = 8 * 1024 * 1024
+
+# Streamed writes to an OCI OSPar of more than this many bytes (or of
+# an unknown number of bytes) are uploaded in parts of this size
+# using a multipart upload
+_multipart_part_size = 16 * 1024 * 1024
+
+# The maximum number of times that a failed range or part is retried
+_max_retries = 3
+
+# The maximum number of object names requested in each page when
+# listing a bucket via an OSPar
+_list_page_size = 1000
+
 
 class OSPar:
     """This class holds the result of a pre-authenticated request
@@ -14,7 +36,8 @@ class OSPar:
        pre-authenticated URL to access either;
 
        (1) A individual object in an object store (read or write)
-       (2) An entire bucket in the object store (write only)
+       (2) An entire bucket in the object store (write, or read of
+           the objects in a directory)
        (3) A calculation to be performed on the compute service (start or stop)
 
        The OSPar is created encrypted, so can only be used by the
@@ -41,6 +64,8 @@ class OSPar:
             calculation
             driver_details (str, default=None): Contains extra details for
             OSPar creation
+            prefix (str, default=None): Directory to which read access
+            to a bucket is limited
 
     """
     def __init__(self, url=None, key=None,
@@ -48,7 +73,8 @@ class OSPar:
                  expires_datetime=None,
                  is_readable=False,
                  is_writeable=False,
-                 driver_details=None):
+                 driver_details=None,
+                 prefix=None):
         """Construct an OSPar result by passing in the URL at which the
            object can be accessed, the UTC datetime when this expires,
            whether this is readable or writeable, and
@@ -67,6 +93,9 @@ class OSPar:
            the OSPar, and supplies extra details that are used by the
            driver to create, register and manage OSPars... You should
            not do anything with driver_details yourself
+
+           Bucket OSPars that are readable must pass in the 'prefix'
+           (directory) to which read access to the bucket is limited
         """
         service_url = None
 
@@ -98,6 +127,7 @@ class OSPar:
 
         self._url = url
         self._key = key
+        self._prefix = prefix
         self._expires_datetime = expires_datetime
         self._service_url = service_url
 
@@ -325,6 +355,19 @@ class OSPar:
            """
         return self._key
 
+    def prefix(self):
+        """Return the prefix (directory) to which access to the bucket
+           is limited - this is None if the OSPar is for a single object
+           or grants access to the entire bucket
+
+           Returns:
+                str: Prefix to which access is limited
+        """
+        try:
+            return self._prefix
+        except:
+            return None
+
     def is_bucket(self):
         """Return whether or not this OSPar is for an entire bucket
 
@@ -479,6 +522,10 @@ class OSPar:
         data["url"] = _bytes_to_string(self._url)
         data["uid"] = self._uid
         data["key"] = self._key
+
+        if self.prefix() is not None:
+            data["prefix"] = self._prefix
+
         data["expires_datetime"] = _datetime_to_string(self._expires_datetime)
         data["is_readable"] = self._is_readable
         data["is_writeable"] = self._is_writeable
@@ -531,6 +578,9 @@ class OSPar:
         if par._key is not None:
             par._key = str(par._key)
 
+        if "prefix" in data:
+            par._prefix = str(data["prefix"])
+
         par._expires_datetime = _string_to_datetime(data["expires_datetime"])
         par._is_readable = data["is_readable"]
         par._is_writeable = data["is_writeable"]
@@ -575,78 +625,413 @@ def _read_local(url):
         return FILE.read()
 
 
-def _read_remote(url):
-    """Internal function used to read data from a remote URL
+def _stream_local(url):
+    """Internal generator used to stream data from the local testing
+       object store
 
        Args:
-            url (str): Remote URL from which to read data
+            url (str): URL from which to read data
        Returns:
-            str: HTTP request content
-
+            generator: Yields the data in buffers
     """
-    status_code = None
-    response = None
+    with open("%s._data" % _url_to_filepath(url), "rb") as FILE:
+        while True:
+            chunk = FILE.read(_stream_chunk_size)
+
+            if not chunk:
+                return
+
+            yield chunk
+
 
+def _get_remote(url, headers=None, stream=False):
+    """Internal function used to send a GET request to a remote URL
+
+       Args:
+            url (str): Remote URL from which to read data
+            headers (dict, default=None): Headers for the request
+            stream (bool, default=False): Whether or not to stream
+            the content of the response
+       Returns:
+            Response: The HTTP response
+    """
     try:
         from Acquire.Stubs import requests as _requests
-        response = _requests.get(url)
-        status_code = response.status_code
+        return _requests.get(url, headers=headers, stream=stream)
     except Exception as e:
         from Acquire.Client import PARReadError
         raise PARReadError(
             "Cannot read the remote OSPar URL '%s' because of a possible "
             "nework issue: %s" % (url, str(e)))
 
-    output = response.content
 
-    if status_code != 200:
-        from Acquire.Client import PARReadError
+def _get_total_size(content_range):
+    """Internal function that returns the total size of an object from
+       the 'Content-Range' header of a range response, e.g. 1234 from
+       'bytes 0-99/1234', or None if this is not known
+
+       Args:
+            content_range (str): Value of the Content-Range header
+       Returns:
+            int: Total size of the object
+    """
+    try:
+        return int(content_range.split("/")[-1].strip())
+    except Exception:
+        return None
+
+
+def _read_remote_range(url, start, end, etag=None):
+    """Internal function used to read the bytes from 'start' to 'end'
+       (inclusive) of the object at a remote URL. This is retried
+       (with backoff) up to _max_retries times if it fails. If 'etag'
+       is passed then the range is only read if the object still
+       has this ETag, and a PARReadError is raised (without retrying)
+       if the object has been changed
+
+       Args:
+            url (str): Remote URL from which to read data
+            start (int): Index of the first byte to read
+            end (int): Index of the last byte to read
+            etag (str, default=None): ETag the object must have
+       Returns:
+            bytes: The data in the range
+    """
+    from Acquire.Client import PARReadError
+
+    headers = {"Range": "bytes=%d-%d" % (start, end)}
+
+    if etag is not None:
+        headers["If-Match"] = etag
+
+    attempt = 0
+
+    while True:
+        try:
+            response = _get_remote(url, headers=headers)
+
+            if response.status_code == 412:
+                break
+
+            if response.status_code != 206:
+                raise PARReadError(
+                    "Failed to read bytes %d-%d from the OSPar URL. HTTP "
+                    "status code = %s" % (start, end, response.status_code))
+
+            data = response.content
+
+            if len(data) != end - start + 1:
+                raise PARReadError(
+                    "Failed to read bytes %d-%d from the OSPar URL. Only "
+                    "%d bytes were returned" % (start, end, len(data)))
+
+            return data
+        except PARReadError:
+            if attempt >= _max_retries:
+                raise
+
+        _time.sleep(0.1 * (2 ** attempt))
+        attempt += 1
+
+    raise PARReadError(
+        "Failed to read bytes %d-%d from the OSPar URL as the object was "
+        "changed while it was being read" % (start, end))
+
+
+def _stream_remote(url):
+    """Internal generator used to stream data from a remote URL. The
+       first _range_size bytes are read using a range request, which
+       also returns the size of the object. The remaining ranges are
+       then fetched concurrently, and are yielded in order. Each
+       range is retried if it fails, so a failure part way through
+       a large object does not mean that it must be read again. The
+       remaining ranges are only read if the object still has the
+       ETag of the first range, so a PARReadError is raised (rather
+       than returning a mix of two versions) if the object is changed
+       while it is being read
+
+       Args:
+            url (str): Remote URL from which to read data
+       Returns:
+            generator: Yields the data in buffers
+    """
+    from Acquire.Client import PARReadError
+
+    response = _get_remote(url, headers={"Range": "bytes=0-%d" %
+                                         (_range_size - 1)}, stream=True)
+    status_code = response.status_code
+
+    if status_code == 416:
+        # no range can be satisfied as the object is empty
+        response = _get_remote(url, stream=True)
+        status_code = response.status_code
+
+    if status_code not in [200, 206]:
         raise PARReadError(
             "Failed to read data from the OSPar URL. HTTP status code = %s, "
-            "returned output: %s" % (status_code, output))
+            "returned output: %s" % (status_code, response.content))
+
+    for chunk in response.iter_content(_stream_chunk_size):
+        yield chunk
+
+    if status_code == 200:
+        # the server returned the whole object
+        return
+
+    total = _get_total_size(response.headers.get("Content-Range"))
+
+    if total is None or total <= _range_size:
+        return
+
+    etag = response.headers.get("ETag")
 
-    return output
+    ranges = []
 
+    for start in range(_range_size, total, _range_size):
+        ranges.append((start, min(start + _range_size, total) - 1))
 
-def _list_local(url):
-    """Internal function to list all of the objects keys below 'url'
+    from ._parallel import iter_in_parallel as _iter_in_parallel
+
+    for data in _iter_in_parallel(
+            lambda r: _read_remote_range(url, r[0], r[1], etag), ranges):
+        yield data
+
+
+def _read_remote(url):
+    """Internal function used to read data from a remote URL
+
+       Args:
+            url (str): Remote URL from which to read data
+       Returns:
+            bytes: The data
+
+    """
+    return b"".join(_stream_remote(url))
+
+
+def _stream(url):
+    """Internal function that returns a generator that streams the
+       data at the passed local or remote URL
 
        Args:
             url (str): URL from which to read data
        Returns:
-            list: List of object keys
+            generator: Yields the data in buffers
+    """
+    if url.startswith("file://"):
+        return _stream_local(url)
+    else:
+        return _stream_remote(url)
+
+
+def _list_local(url, prefix=None):
+    """Internal function to list the keys of all of the objects in the
+       bucket at 'url' whose keys start with 'prefix'. Only the
+       directory containing the prefix is walked
+
+       Args:
+            url (str): URL of the bucket
+            prefix (str, default=None): Prefix of the keys to list
+       Returns:
+            list: Sorted list of object keys
     """
     local_dir = _url_to_filepath(url)
 
+    if prefix is not None and "/" in prefix:
+        root = _os.path.join(local_dir, prefix.rsplit("/", 1)[0])
+    else:
+        root = local_dir
+
     keys = []
 
-    for dirpath, _, filenames in _os.walk(local_dir):
-        local_path = dirpath[len(local_dir):]
-        has_local_path = (len(local_path) > 0)
+    for dirpath, _, filenames in _os.walk(root):
+        local_path = _os.path.relpath(dirpath, local_dir)
 
         for filename in filenames:
             if filename.endswith("._data"):
                 filename = filename[0:-6]
 
-                if has_local_path:
-                    keys.append("%s/%s" % (local_path, filename))
+                if local_path != ".":
+                    key = "%s/%s" % (local_path.replace(_os.sep, "/"),
+                                     filename)
                 else:
-                    keys.append(filename)
+                    key = filename
+
+                if prefix is None or key.startswith(prefix):
+                    keys.append(key)
+
+    keys.sort()
 
     return keys
 
 
-def _list_remote(url):
-    """Internal function to list all of the objects keys below 'url'
+def _add_query(url, params):
+    """Internal function that returns 'url' with the passed query
+       parameters (skipping any that are None) appended
+    """
+    from urllib.parse import urlencode as _urlencode
+
+    params = [(key, value) for (key, value) in params
+              if value is not None]
+
+    if len(params) == 0:
+        return url
+    elif "?" in url:
+        return "%s&%s" % (url, _urlencode(params))
+    else:
+        return "%s?%s" % (url, _urlencode(params))
+
 
-       Currently unimplemented
+def _list_remote_oci(url, prefix=None):
+    """Internal generator that lists the keys of the objects in the
+       bucket behind the OCI OSPar at 'url', one page at a time,
+       following 'nextStartWith' until the listing is complete
 
        Args:
-            url (str): URL from which to read data
+            url (str): URL of the bucket OSPar
+            prefix (str, default=None): Prefix of the keys to list
        Returns:
-            list: Empty list
+            generator: Yields the object keys
     """
-    return []
+    from Acquire.Client import PARReadError
+
+    start = None
+
+    while True:
+        response = _get_remote(_add_query(url, [("prefix", prefix),
+                                                ("start", start),
+                                                ("limit", _list_page_size),
+                                                ("fields", "name")]))
+
+        if response.status_code != 200:
+            raise PARReadError(
+                "Failed to list the objects in the OSPar bucket. HTTP "
+                "status code = %s, returned output: %s"
+                % (response.status_code, response.content))
+
+        try:
+            result = _json.loads(response.content)
+            names = [obj["name"] for obj in result.get("objects", [])]
+        except Exception as e:
+            raise PARReadError(
+                "Unable to interpret the listing of the objects in the "
+                "OSPar bucket: %s" % str(e))
+
+        for name in names:
+            yield name
+
+        start = result.get("nextStartWith", None)
+
+        if start is None or len(names) == 0:
+            return
+
+
+def _list_remote_xml(url, prefix=None):
+    """Internal generator that lists the keys of the objects in the
+       bucket behind the OSPar at 'url' using the XML (ListBucketResult)
+       API used by GCP. Signed URLs cannot carry extra query parameters,
+       so the prefix is matched here, and the listing stops once it has
+       passed the prefix. Further pages are requested using the 'marker'
+       parameter - if this is rejected then an error is raised rather
+       than returning an incomplete listing
+
+       Args:
+            url (str): URL of the bucket OSPar
+            prefix (str, default=None): Prefix of the keys to list
+       Returns:
+            generator: Yields the object keys
+    """
+    import xml.etree.ElementTree as _ElementTree
+    from Acquire.Client import PARReadError
+
+    marker = None
+
+    while True:
+        response = _get_remote(_add_query(url, [("marker", marker)]))
+
+        if response.status_code != 200:
+            if marker is None:
+                raise PARReadError(
+                    "Failed to list the objects in the OSPar bucket. HTTP "
+                    "status code = %s, returned output: %s"
+                    % (response.status_code, response.content))
+            else:
+                raise PARReadError(
+                    "Failed to list the objects in the OSPar bucket after "
+                    "'%s', as the OSPar cannot be used to page through the "
+                    "listing. HTTP status code = %s"
+                    % (marker, response.status_code))
+
+        try:
+            root = _ElementTree.fromstring(response.content)
+        except Exception as e:
+            raise PARReadError(
+                "Unable to interpret the listing of the objects in the "
+                "OSPar bucket: %s" % str(e))
+
+        is_truncated = False
+        next_marker = None
+        last_key = None
+
+        for element in root.iter():
+            # strip the namespace from the tag
+            tag = element.tag.split("}")[-1]
+
+            if tag == "Key":
+                last_key = element.text
+
+                if prefix is None or last_key.startswith(prefix):
+                    yield last_key
+                elif last_key > prefix:
+                    # keys are listed in order, so no more will match
+                    return
+            elif tag == "IsTruncated":
+                is_truncated = (element.text.strip().lower() == "true")
+            elif tag == "NextMarker":
+                next_marker = element.text
+
+        if not is_truncated:
+            return
+
+        marker = next_marker or last_key
+
+        if marker is None:
+            return
+
+
+def _list_remote(url, prefix=None):
+    """Internal function that returns a generator that lists the keys
+       of the objects in the bucket behind the remote OSPar at 'url'
+       whose keys start with 'prefix'. The objects are listed page
+       by page, so the whole listing is never held in memory
+
+       Args:
+            url (str): URL of the bucket OSPar
+            prefix (str, default=None): Prefix of the keys to list
+       Returns:
+            generator: Yields the object keys
+    """
+    if _is_oci_url(url):
+        return _list_remote_oci(url, prefix)
+    else:
+        return _list_remote_xml(url, prefix)
+
+
+def _list(url, prefix=None):
+    """Internal function that returns an iterator over the keys of the
+       objects in the bucket at the passed local or remote URL whose
+       keys start with 'prefix'
+
+       Args:
+            url (str): URL of the bucket
+            prefix (str, default=None): Prefix of the keys to list
+       Returns:
+            iterator: Iterates over the object keys
+    """
+    if url.startswith("file://"):
+        return iter(_list_local(url, prefix))
+    else:
+        return _list_remote(url, prefix)
 
 
 def _write_local(url, data):
@@ -658,63 +1043,233 @@ def _write_local(url, data):
        Returns:
             None
     """
+    _write_local_stream(url, _io.BytesIO(data))
+
+
+def _write_local_stream(url, fileobj):
+    """Internal function used to copy the data read from the file-like
+       object 'fileobj' to a local file, one buffer at a time
+
+       Args:
+            url (str): URL to write data to
+            fileobj (file): File-like object from which to read data
+       Returns:
+            None
+    """
     filename = "%s._data" % _url_to_filepath(url)
 
-    try:
-        with open(filename, 'wb') as FILE:
-            FILE.write(data)
-            FILE.flush()
-    except:
-        dir = "/".join(filename.split("/")[0:-1])
-        _os.makedirs(dir, exist_ok=True)
-        with open(filename, 'wb') as FILE:
-            FILE.write(data)
-            FILE.flush()
+    _os.makedirs(_os.path.dirname(filename), exist_ok=True)
 
+    with open(filename, 'wb') as FILE:
+        _shutil.copyfileobj(fileobj, FILE, _stream_chunk_size)
+        FILE.flush()
 
-def _write_remote(url, data):
-    """Internal function used to write data to the passed remote URL
+    # this has bypassed the testing object store, so make sure that
+    # it records the new generation of the object and rebuilds its
+    # indexes of the keys in its buckets
+    from ._testing_objstore import new_etag as _new_etag
+    from ._testing_objstore import clear_sorted_indexes \
+        as _clear_sorted_indexes
+    _new_etag(filename)
+    _clear_sorted_indexes()
+
+
+def _send_remote(method, url, data=None, headers=None):
+    """Internal function used to send a request to a remote URL,
+       e.g. to write data
 
        Args:
-            url (str): Remote URL to write data to
-            data (bytes): Data to write
+            method (str): HTTP method, e.g. "put"
+            url (str): Remote URL
+            data (bytes or file, default=None): Data to send
+            headers (dict, default=None): Headers for the request
        Returns:
-            None
+            Response: The HTTP response
     """
     try:
         from Acquire.Stubs import requests as _requests
-        response = _requests.put(url, data=data)
-        status_code = response.status_code
+        return getattr(_requests, method)(url, data=data, headers=headers)
     except Exception as e:
         from Acquire.Client import PARWriteError
         raise PARWriteError(
             "Cannot write data to the remote OSPar URL '%s' because of a "
             "possible nework issue: %s" % (url, str(e)))
 
-    if status_code != 200:
+
+def _write_remote(url, data):
+    """Internal function used to write data to the passed remote URL.
+       'data' can also be a file-like object, which is streamed
+
+       Args:
+            url (str): Remote URL to write data to
+            data (bytes or file): Data to write
+       Returns:
+            None
+    """
+    response = _send_remote("put", url, data=data)
+
+    if response.status_code != 200:
         from Acquire.Client import PARWriteError
         raise PARWriteError(
             "Cannot write data to the remote OSPar URL '%s' because of a "
             "possible nework issue: %s" % (url, str(response.content)))
 
 
-def _join_bucket_and_prefix(url, prefix):
-    """Join together the passed url and prefix, returning the
-       url directory and the remainig part which is the start
-       of the file name
+def _write_remote_part(upload_url, part, data):
+    """Internal function used to upload part number 'part' of a
+       multipart upload. This is retried (with backoff) up to
+       _max_retries times if it fails
+
+       Args:
+            upload_url (str): URL of the multipart upload
+            part (int): Number of the part (from 1)
+            data (bytes): Data of the part
+       Returns:
+            None
+    """
+    from Acquire.Client import PARWriteError
+
+    attempt = 0
+
+    while True:
+        try:
+            _write_remote("%s%d" % (upload_url, part), data)
+            return
+        except PARWriteError:
+            if attempt >= _max_retries:
+                raise
+
+        _time.sleep(0.1 * (2 ** attempt))
+        attempt += 1
+
+
+def _write_remote_multipart(url, fileobj):
+    """Internal function used to write the data read from 'fileobj'
+       to the passed OCI OSPar URL using a multipart upload. The data
+       is uploaded in parts of _multipart_part_size bytes, each of
+       which is retried if it fails, so that only the failed part
+       needs to be sent again. The upload is aborted if it fails
+
+       Args:
+            url (str): Remote URL to write data to
+            fileobj (file): File-like object from which to read data
+       Returns:
+            None
+    """
+    from Acquire.Client import PARWriteError
+    from urllib.parse import urljoin as _urljoin
+
+    response = _send_remote("put", url, headers={"opc-multipart": "true"})
+
+    try:
+        if response.status_code != 200:
+            raise ValueError("HTTP status code = %s" % response.status_code)
+
+        upload_url = _urljoin(url, response.json()["accessUri"])
+    except Exception as e:
+        raise PARWriteError(
+            "Cannot start a multipart upload to the remote OSPar URL "
+            "'%s': %s" % (url, str(e)))
+
+    try:
+        part = 0
+
+        while True:
+            data = fileobj.read(_multipart_part_size)
+
+            if part > 0 and not data:
+                break
+
+            part += 1
+            _write_remote_part(upload_url, part, data)
+
+            if not data:
+                break
+
+        response = _send_remote("post", upload_url)
+
+        if response.status_code != 200:
+            raise PARWriteError(
+                "Cannot commit the multipart upload to the remote OSPar "
+                "URL '%s': %s" % (url, str(response.content)))
+    except:
+        try:
+            _send_remote("delete", upload_url)
+        except Exception:
+            pass
+
+        raise
+
+
+def _is_oci_url(url):
+    """Internal function that returns whether or not 'url' is the URL
+       of an OCI OSPar, i.e. https://objectstorage.{region}.oraclecloud.com
+       (the driver of an OSPar is only known on the service)
+    """
+    from urllib.parse import urlparse as _urlparse
+    host = _urlparse(url).netloc
+    return host.startswith("objectstorage.") and \
+        host.endswith(".oraclecloud.com")
+
+
+def _write_stream(url, fileobj):
+    """Internal function used to stream the data read from 'fileobj'
+       to the passed local or remote URL. Large writes to OCI OSPars
+       use a resumable multipart upload, while everything else is
+       streamed in a single request
 
        Args:
-            url (str): URL to combine
-            prefix (str): Prefix to combine
+            url (str): URL to write data to
+            fileobj (file): File-like object from which to read data
        Returns:
-            str: URL and prefix processed concatenated
+            None
+    """
+    if url.startswith("file://"):
+        _write_local_stream(url, fileobj)
+        return
+
+    if _is_oci_url(url):
+        from ._objstore import _get_stream_size
+        size = _get_stream_size(fileobj)
+
+        if size is None or size > _multipart_part_size:
+            _write_remote_multipart(url, fileobj)
+            return
+
+    _write_remote(url, fileobj)
+
+
+def _to_directory(prefix):
+    """Internal function that returns 'prefix' as a directory, i.e.
+       without any leading "/" and ending with a single "/", so that
+       "listing" matches "listing/one" but not "listing2/four". This
+       returns None if the prefix is None or empty
     """
     if prefix is None:
-        return url
+        return None
+
+    prefix = prefix.strip("/")
+
+    if len(prefix) == 0:
+        return None
 
-    parts = prefix.split("/")
+    return "%s/" % prefix
 
-    return ("%s/%s" % (url, "/".join(parts[0:-2])), parts[-1])
+
+def _strip_prefix(key, prefix):
+    """Internal function that returns 'key' with 'prefix' (and any
+       following "/") removed
+    """
+    if prefix:
+        while prefix.startswith("/"):
+            prefix = prefix[1:]
+
+        key = key[len(prefix):]
+
+        while key.startswith("/"):
+            key = key[1:]
+
+    return key
 
 
 class BucketReader:
@@ -746,18 +1301,17 @@ class BucketReader:
         else:
             self._par = None
 
-    def get_object(self, key):
-        """Return the binary data contained in the key 'key' in the
-           passed bucket
+    def _get_url(self, key):
+        """Internal function that returns the URL of the object at
+           'key' in the bucket
 
            Args:
                 key (str): Key to access data in bucket
            Returns:
-                bytes: Data referred to by key
+                str: URL of the object
         """
-        if self._par is None:
-            from Acquire.Client import PARError
-            raise PARError("You cannot read data from an empty OSPar")
+        self._assert_can_read(prefix=key)
+        self._assert_can_read_objects()
 
         while key.startswith("/"):
             key = key[1:]
@@ -765,28 +1319,106 @@ class BucketReader:
         url = self._url
 
         if url.endswith("/"):
-            url = "%s%s" % (url, key)
+            return "%s%s" % (url, key)
         else:
-            url = "%s/%s" % (url, key)
+            return "%s/%s" % (url, key)
+
+    def _assert_can_read(self, prefix):
+        """Internal function that raises a PARError if this reader
+           cannot read the keys starting with 'prefix', i.e. the OSPar
+           is empty or the keys are outside the directory to which the
+           OSPar limits access
+
+           Args:
+                prefix (str): Prefix (or key) to be read
+           Returns:
+                None
+        """
+        from Acquire.Client import PARError
+
+        if self._par is None:
+            raise PARError("You cannot read data from an empty OSPar")
+
+        limit = self._par.prefix()
+
+        if limit is None:
+            return
+
+        if prefix is None or not prefix.lstrip("/").startswith(limit):
+            raise PARError(
+                "You cannot read '%s' as this OSPar only gives access to "
+                "the objects in '%s'" % (prefix, limit))
+
+    def _assert_can_read_objects(self):
+        """Internal function that raises a PARError if objects cannot
+           be read via this OSPar. Objects are read by appending the key
+           to the bucket URL, which only works for local and OCI bucket
+           OSPars (e.g. a GCP signed bucket URL can only list objects)
+        """
+        url = self._url
+
+        if not (url.startswith("file://") or _is_oci_url(url)):
+            from Acquire.Client import PARError
+            raise PARError(
+                "Objects cannot be read via this bucket OSPar as only OCI "
+                "bucket OSPars support reading objects by key. Create an "
+                "OSPar for each object to read instead")
+
+    def get_object(self, key):
+        """Return the binary data contained in the key 'key' in the
+           passed bucket
+
+           Args:
+                key (str): Key to access data in bucket
+           Returns:
+                bytes: Data referred to by key
+        """
+        url = self._get_url(key)
 
         if url.startswith("file://"):
             return _read_local(url)
         else:
             return _read_remote(url)
 
+    def get_object_stream(self, key):
+        """Return a generator that yields the binary data contained in
+           the key 'key' in the passed bucket as a series of buffers.
+           Large remote objects are read using concurrent range requests
+
+           Args:
+                key (str): Key to access data in bucket
+           Returns:
+                generator: Yields the data in buffers
+        """
+        return _stream(self._get_url(key))
+
+    def get_object_into(self, key, output):
+        """Stream the object contained in the key 'key' in the passed
+           bucket into 'output', which is either a bytearray (which is
+           written in place and then resized to fit) or a file-like
+           object opened for binary writing
+
+           Args:
+                key (str): Key to access data in bucket
+                output (bytearray or file): Where to write the data
+           Returns:
+                int: Number of bytes written
+        """
+        from ._objstore import _stream_into
+        return _stream_into(self.get_object_stream(key), output)
+
     def get_object_as_file(self, key, filename):
         """Get the object contained in the key 'key' in the passed 'bucket'
-           and writing this to the file called 'filename'
+           and writing this to the file called 'filename'. The object
+           is streamed to the file, so is never held in memory
 
            Args:
                 key (str): Key to access data in bucket
            Returns:
                 None
         """
-        objdata = self.get_object(key)
-
         with open(filename, "wb") as FILE:
-            FILE.write(objdata)
+            self.get_object_into(key, FILE)
 
     def get_string_object(self, key):
         """Return the string in 'bucket' associated with 'key'
@@ -813,46 +1445,89 @@ class BucketReader:
         data = self.get_string_object(key)
         return _json.loads(data)
 
+    def iter_object_names(self, prefix=None):
+        """Return an iterator over the full keys of all of the objects
+           in the bucket that are in the directory 'prefix' (a "/" is
+           added to the prefix if needed). This defaults to the directory
+           to which the OSPar limits access. Remote buckets are listed
+           page by page as the iterator is consumed
+
+           Args:
+                prefix (str, default=None): Directory of the keys to list
+           Returns:
+                iterator: Iterates over the object keys
+        """
+        prefix = _to_directory(prefix)
+
+        if prefix is None and self._par is not None:
+            prefix = self._par.prefix()
+
+        self._assert_can_read(prefix=prefix)
+
+        return _list(self._url, prefix)
+
     def get_all_object_names(self, prefix=None):
-        """Returns the names of all objects in the passed bucket"""
-        (url, part) = _join_bucket_and_prefix(self._url, prefix)
+        """Returns the names of all objects in the passed bucket that
+           are in the directory 'prefix'. The prefix is removed from the
+           returned names
 
-        if url.startswith("file://"):
-            objnames = _list_local(url)
-        else:
-            objnames = _list_remote(url)
+           Args:
+                prefix (str, default=None): Directory of the keys to list
+           Returns:
+                list: Names of the objects
+        """
+        return [_strip_prefix(key, _to_directory(prefix))
+                for key in self.iter_object_names(prefix)]
+
+    def iter_objects(self, prefix=None, max_workers=None):
+        """Return a generator that yields (name, data) for all of the
+           objects in the passed bucket that are in the directory
+           'prefix', in key order. The keys are streamed from the
+           listing and the objects are read concurrently (by up to
+           'max_workers' threads), so only a bounded number of keys and
+           objects are held in memory at once. This means that this can
+           be used to export a bucket that is too large to be read in
+           one go. A PARError is raised before anything is read if
+           objects cannot be read via this OSPar
 
-        # scan the object names returned and discard the ones that don't
-        # match the prefix
-        matches = []
+           Args:
+                prefix (str, default=None): Directory of the keys to read
+                max_workers (int, default=None): Maximum number of
+                objects read at the same time
+           Returns:
+                generator: Yields the name and data of each object
+        """
+        from ._parallel import iter_in_parallel as _iter_in_parallel
 
-        if len(part) > 0:
-            for objname in objnames:
-                if objname.startswith(part):
-                    objname = objname[len(part):]
+        keys = self.iter_object_names(prefix)
 
-                    while objname.startswith("/"):
-                        objname = objname[1:]
+        # check that the objects can be read before reading anything
+        self._assert_can_read_objects()
 
-                    matches.append(objname)
-        else:
-            matches = objnames
+        directory = _to_directory(prefix)
+
+        def _read(key):
+            return (_strip_prefix(key, directory), self.get_object(key))
 
-        return matches
+        return _iter_in_parallel(_read, keys, max_workers)
 
-    def get_all_objects(self, prefix=None):
-        """Return all of the objects in the passed bucket"""
-        names = self.get_all_object_names(prefix)
+    def get_all_objects(self, prefix=None, max_workers=None):
+        """Return all of the objects in the passed bucket that are in the
+           directory 'prefix', as a dictionary of data indexed by name
+           (with the prefix removed). The objects are read concurrently,
+           by up to 'max_workers' threads
 
+           Args:
+                prefix (str, default=None): Directory of the keys to read
+                max_workers (int, default=None): Maximum number of
+                objects read at the same time
+           Returns:
+                dict: Data of each object indexed by name
+        """
         objects = {}
 
-        if prefix:
-            for name in names:
-                objects[name] = self.get_object(
-                                    "%s/%s" % (prefix, name))
-        else:
-            for name in names:
-                objects[name] = self.get_object(name)
+        for (name, data) in self.iter_objects(prefix, max_workers):
+            objects[name] = data
 
         return objects
 
@@ -896,8 +1571,10 @@ class BucketWriter:
         else:
             self._par = None
 
-    def set_object(self, key, data):
-        """Set the value of 'key' in 'bucket' to binary 'data'"""
+    def _get_url(self, key):
+        """Internal function that returns the URL of the object at
+           'key' in the bucket
+        """
         if self._par is None:
             from Acquire.Client import PARError
             raise PARError("You cannot write data to an empty OSPar")
@@ -908,21 +1585,32 @@ class BucketWriter:
         url = self._url
 
         if url.endswith("/"):
-            url = "%s%s" % (url, key)
+            return "%s%s" % (url, key)
         else:
-            url = "%s/%s" % (url, key)
+            return "%s/%s" % (url, key)
+
+    def set_object(self, key, data):
+        """Set the value of 'key' in 'bucket' to binary 'data'"""
+        url = self._get_url(key)
 
         if url.startswith("file://"):
             return _write_local(url, data)
         else:
             return _write_remote(url, data)
 
+    def set_object_stream(self, key, fileobj):
+        """Set the value of 'key' in 'bucket' to the binary data read
+           from the file-like object 'fileobj', which is streamed
+           (using a resumable multipart upload for large objects
+           written via an OCI OSPar)"""
+        url = self._get_url(key)
+        _write_stream(url, fileobj)
+
     def set_object_from_file(self, key, filename):
         """Set the value of 'key' in 'bucket' to equal the contents
-           of the file located by 'filename'"""
+           of the file located by 'filename', which is streamed"""
         with open(filename, "rb") as FILE:
-            data = FILE.read()
-            self.set_object(key, data)
+            self.set_object_stream(key, FILE)
 
     def set_string_object(self, key, string_data):
         """Set the value of 'key' in 'bucket' to the string 'string_data'"""
@@ -969,13 +1657,30 @@ class ObjectReader:
         else:
             return _read_remote(url)
 
+    def get_object_stream(self):
+        """Return a generator that yields the binary data contained in
+           this object as a series of buffers. Large remote objects
+           are read using concurrent range requests"""
+        if self._par is None:
+            from Acquire.Client import PARError
+            raise PARError("You cannot read data from an empty OSPar")
+
+        return _stream(self._url)
+
+    def get_object_into(self, output):
+        """Stream the object contained in this OSPar into 'output', which
+           is either a bytearray (which is written in place and then
+           resized to fit) or a file-like object opened for binary
+           writing. This returns the number of bytes written"""
+        from ._objstore import _stream_into
+        return _stream_into(self.get_object_stream(), output)
+
     def get_object_as_file(self, filename):
         """Get the object contained in this OSPar and write this to
-           the file called 'filename'"""
-        objdata = self.get_object()
-
+           the file called 'filename'. The object is streamed to the
+           file, so is never held in memory"""
         with open(filename, "wb") as FILE:
-            FILE.write(objdata)
+            self.get_object_into(FILE)
 
     def get_string_object(self):
         """Return the object behind this OSPar as a string (raises exception
@@ -1037,12 +1742,23 @@ class ObjectWriter(ObjectReader):
         else:
             return _write_remote(url, data)
 
+    def set_object_stream(self, fileobj):
+        """Set the value of the object behind this OSPar to the binary
+           data read from the file-like object 'fileobj', which is
+           streamed (using a resumable multipart upload for large
+           objects written via an OCI OSPar)
+        """
+        if self._par is None:
+            from Acquire.Client import PARError
+            raise PARError("You cannot write data to an empty OSPar")
+
+        _write_stream(self._url, fileobj)
+
     def set_object_from_file(self, filename):
         """Set the value of the object behind this OSPar to equal the contents
-           of the file located by 'filename'"""
+           of the file located by 'filename', which is streamed"""
         with open(filename, "rb") as FILE:
-            data = FILE.read()
-            self.set_object(data)
+            self.set_object_stream(FILE)
 
     def set_string_object(self, string_data):
         """Set the value of the object behind this OSPar to the
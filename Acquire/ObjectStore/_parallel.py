@@ -0,0 +1,186 @@
+
+__all__ = ["get_max_object_store_workers",
+           "set_max_object_store_workers"]
+
+# The maximum number of threads that will be used to perform
+# concurrent object store operations. Calls to the object store
+# are dominated by network latency, so this can be much larger
+# than the number of cores
+_max_workers = 16
+
+
+def get_max_object_store_workers():
+    """Return the maximum number of threads that will be used
+       to perform concurrent object store operations
+
+       Returns:
+            int: Maximum number of worker threads
+    """
+    return _max_workers
+
+
+def set_max_object_store_workers(max_workers):
+    """Set the maximum number of threads that will be used
+       to perform concurrent object store operations. Set this
+       to 1 to disable concurrency
+
+       Args:
+            max_workers (int): Maximum number of worker threads
+       Returns:
+            None
+    """
+    global _max_workers
+
+    max_workers = int(max_workers)
+
+    if max_workers < 1:
+        raise ValueError("The number of workers must be at least 1: %s"
+                         % max_workers)
+
+    _max_workers = max_workers
+
+
+def run_in_parallel(function, items, max_workers=None):
+    """Internal function used by the object store backends to call
+       'function(item)' for every item in 'items' using a bounded
+       pool of threads. This returns a tuple of two dictionaries,
+       the first holds the results indexed by item, and the second
+       holds any exceptions raised, again indexed by item
+
+       Args:
+            function (function): Function to call for each item
+            items (list): Hashable items to pass to the function
+            max_workers (int, default=None): Maximum number of threads
+       Returns:
+            tuple (dict, dict): Results and errors indexed by item
+    """
+    if max_workers is None:
+        max_workers = _max_workers
+
+    items = list(items)
+
+    results = {}
+    errors = {}
+
+    max_workers = min(int(max_workers), len(items))
+
+    if max_workers <= 1:
+        # no need to pay for a thread pool
+        for item in items:
+            try:
+                results[item] = function(item)
+            except Exception as e:
+                errors[item] = e
+
+        return (results, errors)
+
+    from concurrent.futures import ThreadPoolExecutor as _ThreadPoolExecutor
+
+    with _ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {}
+
+        for item in items:
+            if item not in futures:
+                futures[item] = pool.submit(function, item)
+
+        for (item, future) in futures.items():
+            try:
+                results[item] = future.result()
+            except Exception as e:
+                errors[item] = e
+
+    return (results, errors)
+
+
+def iter_in_parallel(function, items, max_workers=None):
+    """Internal generator used by the object store backends to call
+       'function(item)' for every item in 'items' using a bounded pool
+       of threads, yielding the results in the same order as 'items'.
+       'items' can be any iterable (e.g. a paged listing), and is only
+       consumed as calls are submitted, so at most 'max_workers' items
+       and results are held in memory at any time. Any exception is
+       raised when its result would have been yielded
+
+       Args:
+            function (function): Function to call for each item
+            items (iterable): Items to pass to the function
+            max_workers (int, default=None): Maximum number of threads
+       Returns:
+            generator: Yields the result for each item in order
+    """
+    if max_workers is None:
+        max_workers = _max_workers
+
+    from itertools import islice as _islice
+
+    remaining = iter(items)
+    first = list(_islice(remaining, int(max_workers)))
+
+    max_workers = len(first)
+
+    if max_workers <= 1:
+        for item in first:
+            yield function(item)
+
+        for item in remaining:
+            yield function(item)
+
+        return
+
+    from collections import deque as _deque
+    from concurrent.futures import ThreadPoolExecutor as _ThreadPoolExecutor
+
+    pool = _ThreadPoolExecutor(max_workers=max_workers)
+    futures = _deque()
+
+    try:
+        for item in first:
+            futures.append(pool.submit(function, item))
+
+        first = None
+
+        while len(futures) > 0:
+            result = futures.popleft().result()
+
+            # keep the pool busy while the result is being used
+            for item in remaining:
+                futures.append(pool.submit(function, item))
+                break
+
+            yield result
+    finally:
+        for future in futures:
+            future.cancel()
+
+        pool.shutdown(wait=False)
+
+
+def assert_no_errors(results, errors, operation):
+    """Internal function used to raise an ObjectStoreBatchError if
+       any of the per-key operations in a batch failed
+
+       Args:
+            results (dict): Successful results indexed by key
+            errors (dict): Exceptions indexed by key
+            operation (str): Name of the operation (for the message)
+       Returns:
+            None
+    """
+    if len(errors) == 0:
+        return
+
+    from Acquire.ObjectStore import ObjectStoreBatchError
+
+    keys = list(errors.keys())
+    keys.sort()
+
+    if len(keys) > 5:
+        failed = "%s, ... (%d more)" % (", ".join(keys[0:5]),
+                                        len(keys) - 5)
+    else:
+        failed = ", ".join(keys)
+
+    raise ObjectStoreBatchError(
+        "Failed to %s %d of %d objects: %s" %
+        (operation, len(errors), len(errors) + len(results), failed),
+        results=results, errors=errors)
@@ -10,9 +10,376 @@ import uuid as _uuid
 
 _rlock = threading.RLock()
 
+# The size of the buffers in which objects are streamed
+_stream_chunk_size = 1024 * 1024
+
+# sorted lists of all keys in each bucket, together with the generation
+# of the bucket from which they were built. These are built on first use
+# and then kept up to date as objects are set and deleted, and are
+# rebuilt if the bucket is changed by another process
+_sorted_indexes = {}
+
+# The maximum number of names returned by each page of a listing. This
+# is unlimited by default, but can be set (e.g. to 1 using
+# ACQUIRE_TESTING_PAGE_LIMIT) to simulate the page limits of the cloud
+# backends, so that listings that are truncated are caught by the tests
+_page_limit = None
+
+if _os.getenv("ACQUIRE_TESTING_PAGE_LIMIT"):
+    _page_limit = int(_os.getenv("ACQUIRE_TESTING_PAGE_LIMIT"))
+
 __all__ = ["Testing_ObjectStore"]
 
 
+def _index_key(key):
+    """Internal function that normalises 'key' in the same way as the
+       filesystem, so that it matches the names returned by
+       get_all_object_names
+    """
+    key = _os.path.normpath(key)
+
+    while key.startswith("/"):
+        key = key[1:]
+
+    return key
+
+
+def _generation_filename(bucket):
+    """Internal function that returns the name of the file that holds
+       the generation of 'bucket'
+    """
+    return "%s._generation" % bucket
+
+
+def _read_generation(bucket):
+    """Internal function that returns the generation of 'bucket'. This
+       is incremented (by any process) every time that objects are
+       added to or removed from the bucket
+    """
+    try:
+        with open(_generation_filename(bucket), "r") as FILE:
+            return int(FILE.read())
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def _increment_generation(bucket):
+    """Internal function that increments the generation of 'bucket',
+       returning the generation before the increment. This must be
+       called holding the _BucketLock for 'bucket'
+    """
+    generation = _read_generation(bucket)
+
+    # write then rename, so that readers never see a partial file
+    filename = _generation_filename(bucket)
+    tmpname = "%s.%s._tmp" % (filename, _uuid.uuid4())
+
+    with open(tmpname, "w") as FILE:
+        FILE.write(str(generation + 1))
+
+    _os.replace(tmpname, filename)
+
+    return generation
+
+
+def _get_sorted_index(bucket):
+    """Internal function that returns the sorted list of all keys in
+       'bucket', building this from the filesystem if needed (including
+       if the bucket has been changed by another process). This must
+       be called while holding _rlock
+    """
+    generation = _read_generation(bucket)
+
+    try:
+        (index_generation, keys) = _sorted_indexes[bucket]
+
+        if index_generation == generation:
+            return keys
+    except KeyError:
+        pass
+
+    keys = _scan_object_names(bucket)
+    keys.sort()
+    _sorted_indexes[bucket] = (generation, keys)
+    return keys
+
+
+def _get_index_to_update(bucket):
+    """Internal function that increments the generation of 'bucket'
+       after one of its objects has been added or removed, returning
+       the sorted index that needs to be updated, or None if this
+       index has not been built. The index is dropped (to be rebuilt
+       when next needed) if another process has changed the bucket
+       since it was built. This must be called holding the
+       _BucketLock for 'bucket'
+    """
+    generation = _increment_generation(bucket)
+
+    try:
+        (index_generation, keys) = _sorted_indexes[bucket]
+    except KeyError:
+        return None
+
+    if index_generation != generation:
+        _sorted_indexes.pop(bucket, None)
+        return None
+
+    _sorted_indexes[bucket] = (generation + 1, keys)
+    return keys
+
+
+def _drop_index(bucket):
+    """Internal function that drops the sorted index of 'bucket' after
+       many of its objects have been removed, so that it is rebuilt
+       when next needed. This must be called holding the _BucketLock
+       for 'bucket'
+    """
+    _increment_generation(bucket)
+    _sorted_indexes.pop(bucket, None)
+
+
+def _add_to_index(bucket, key):
+    """Internal function to add 'key' to the sorted index of 'bucket'
+       (if this index has been built). Must be called holding the
+       _BucketLock for 'bucket'
+    """
+    import bisect as _bisect
+
+    keys = _get_index_to_update(bucket)
+
+    if keys is None:
+        return
+
+    key = _index_key(key)
+    i = _bisect.bisect_left(keys, key)
+
+    if i == len(keys) or keys[i] != key:
+        keys.insert(i, key)
+
+
+def _remove_from_index(bucket, key):
+    """Internal function to remove 'key' from the sorted index of
+       'bucket' (if this index has been built). Must be called
+       holding the _BucketLock for 'bucket'
+    """
+    import bisect as _bisect
+
+    keys = _get_index_to_update(bucket)
+
+    if keys is None:
+        return
+
+    key = _index_key(key)
+    i = _bisect.bisect_left(keys, key)
+
+    if i < len(keys) and keys[i] == key:
+        del keys[i]
+
+
+def clear_sorted_indexes():
+    """Clear the sorted key indexes of all buckets. This is needed if
+       objects are written to the testing buckets directly (e.g. via
+       a file:// OSPar) rather than via the Testing_ObjectStore
+    """
+    with _rlock:
+        _sorted_indexes.clear()
+
+
+def _scan_object_names(bucket):
+    """Internal function that returns the names of all objects in
+       'bucket' by scanning the filesystem
+    """
+    root_len = len(bucket) + 1
+
+    subdir_names = _glob.glob("%s/*" % bucket)
+
+    object_names = []
+
+    while True:
+        names = subdir_names
+        subdir_names = []
+
+        for name in names:
+            if name.endswith("._data"):
+                # remove the  ._data at the end
+                name = name[root_len:-6]
+                while name.endswith("/"):
+                    name = name[0:-1]
+
+                if len(name) > 0:
+                    object_names.append(name)
+            elif _os.path.isdir(name):
+                subdir_names += _glob.glob("%s/*" % name)
+
+        if len(subdir_names) == 0:
+            break
+
+    return object_names
+
+
+def _list_page(bucket, prefix=None, start=None, end=None, limit=1000):
+    """Internal function that mimics a single list request to a cloud
+       backend. This returns a tuple of the sorted names of up to
+       'limit' objects in 'bucket' (fewer if the page limit is lower)
+       that start with 'prefix' and are from 'start' (inclusive) to
+       'end' (exclusive), plus the name at which the next page
+       starts (None if this is the last page)
+    """
+    import bisect as _bisect
+
+    limit = int(limit)
+
+    if _page_limit is not None:
+        limit = min(limit, _page_limit)
+
+    if limit < 1:
+        raise ValueError("The page size must be at least 1")
+
+    with _rlock:
+        keys = _get_sorted_index(bucket)
+
+        i = 0
+
+        if prefix:
+            i = _bisect.bisect_left(keys, prefix)
+
+        if start is not None:
+            i = max(i, _bisect.bisect_left(keys, start))
+
+        names = []
+
+        for key in keys[i:i+limit+1]:
+            if end is not None and key >= end:
+                break
+            elif prefix and not key.startswith(prefix):
+                break
+
+            names.append(key)
+
+    if len(names) > limit:
+        return (names[0:limit], names[limit])
+    else:
+        return (names, None)
+
+
+def _list_names(bucket, prefix=None, start=None, end=None, page_size=1000):
+    """Internal generator that lists the names of objects in 'bucket'
+       (optionally with 'prefix') from 'start' (inclusive) to 'end'
+       (exclusive), fetching one page of 'page_size' names at a time
+       in the same way as the cloud backends
+    """
+    while True:
+        (names, start) = _list_page(bucket, prefix=prefix, start=start,
+                                    end=end, limit=page_size)
+
+        for name in names:
+            yield name
+
+        if start is None:
+            return
+
+
+def _get_etag(data):
+    """Internal function that returns the etag of an object that was
+       written before its generation was recorded (the MD5 checksum
+       of its data)
+    """
+    import hashlib as _hashlib
+
+    if data is None:
+        data = b""
+
+    return _hashlib.md5(data).hexdigest()
+
+
+def _etag_filename(filename):
+    """Internal function that returns the name of the file that holds
+       the etag of the object whose data is in 'filename'
+    """
+    return "%s._etag" % filename[0:-6]
+
+
+def new_etag(filename):
+    """Record a new generation for the object whose data is in
+       'filename', returning its etag. Like the cloud backends (OCI
+       etags and GCP generations), the etag changes on every write,
+       even if the data is the same, so a conditional write that
+       uses a stale etag always fails. This must be called after
+       every write, including writes that bypass the
+       Testing_ObjectStore (e.g. via a file:// OSPar)
+    """
+    etag = _uuid.uuid4().hex
+
+    with open(_etag_filename(filename), "w") as FILE:
+        FILE.write(etag)
+
+    return etag
+
+
+def _read_etag(filename):
+    """Internal function that returns the etag of the object whose
+       data is in 'filename', or None if there is no object
+    """
+    if not _os.path.exists(filename):
+        return None
+
+    try:
+        with open(_etag_filename(filename), "r") as FILE:
+            return FILE.read()
+    except FileNotFoundError:
+        pass
+
+    try:
+        with open(filename, "rb") as FILE:
+            return _get_etag(FILE.read())
+    except FileNotFoundError:
+        return None
+
+
+def _remove_etag(filename):
+    """Internal function that removes the etag of the object whose
+       data is in 'filename'
+    """
+    try:
+        _os.remove(_etag_filename(filename))
+    except FileNotFoundError:
+        pass
+
+
+class _BucketLock:
+    """Internal context manager that holds an exclusive lock on the
+       passed bucket, both for this process (via _rlock) and for all
+       other processes using the same bucket (via a lock file next to
+       the bucket). This is used to make the conditional operations
+       atomic, and to keep the generation of the bucket (and so the
+       sorted indexes of all processes) in step with every write
+    """
+    def __init__(self, bucket):
+        self._lockfile = "%s._lock" % bucket
+
+    def __enter__(self):
+        import fcntl as _fcntl
+        _rlock.acquire()
+
+        try:
+            self._file = open(self._lockfile, "a")
+            _fcntl.flock(self._file, _fcntl.LOCK_EX)
+        except:
+            _rlock.release()
+            raise
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        import fcntl as _fcntl
+
+        try:
+            _fcntl.flock(self._file, _fcntl.LOCK_UN)
+            self._file.close()
+        finally:
+            _rlock.release()
+
+
 def _get_driver_details_from_par(par):
     from Acquire.ObjectStore import datetime_to_string \
         as _datetime_to_string
@@ -118,11 +485,14 @@ class Testing_ObjectStore:
                     Testing_ObjectStore.get_bucket_name(bucket=bucket))
 
         # the bucket is empty - delete it
-        _os.rmdir(bucket)
+        with _BucketLock(bucket):
+            _os.rmdir(bucket)
+            _drop_index(bucket)
 
     @staticmethod
     def create_par(bucket, encrypt_key, key=None, readable=True,
-                   writeable=False, duration=3600, cleanup_function=None):
+                   writeable=False, duration=3600, cleanup_function=None,
+                   prefix=None):
         """Create a pre-authenticated request for the passed bucket and
            key (if key is None then the request is for the entire bucket).
            This will return a PAR object that will contain a URL that can
@@ -132,7 +502,8 @@ class Testing_ObjectStore:
            in 'duration' (by default this is one hour). Note that you must
            pass in a public key that will be used to encrypt this PAR. This is
            necessary as the PAR grants access to anyone who can decrypt
-           the URL
+           the URL. Like OCI, read access to a bucket must be limited
+           to the objects in 'prefix'
         """
         from Acquire.Crypto import PublicKey as _PublicKey
 
@@ -151,6 +522,16 @@ class Testing_ObjectStore:
         elif not _os.path.exists(bucket):
             from Acquire.Client import PARError
             raise PARError("The bucket '%s' does not exist!" % bucket)
+        elif readable and not prefix:
+            # mimic OCI - a readable bucket PAR must be limited to
+            # the objects in a prefix
+            from Acquire.Client import PARError
+            raise PARError(
+                "You cannot create a Bucket PAR that has read permissions "
+                "unless you limit it to the objects in a 'prefix'")
+
+        if not ((key is None) and readable):
+            prefix = None
 
         url = "file://%s" % bucket
 
@@ -165,14 +546,6 @@ class Testing_ObjectStore:
         expires_datetime = created_datetime + \
             _datetime.timedelta(seconds=duration)
 
-        # mimic limitations of OCI - cannot have a bucket PAR with
-        # read permissions!
-        if (key is None) and readable:
-            from Acquire.Client import PARError
-            raise PARError(
-                "You cannot create a Bucket PAR that has read permissions "
-                "due to a limitation in the underlying platform")
-
         from Acquire.ObjectStore import OSPar as _OSPar
         from Acquire.ObjectStore import OSParRegistry as _OSParRegistry
 
@@ -185,7 +558,7 @@ class Testing_ObjectStore:
         par = _OSPar(url=url, key=key, encrypt_key=encrypt_key,
                      expires_datetime=expires_datetime,
                      is_readable=readable, is_writeable=writeable,
-                     driver_details=driver_details)
+                     driver_details=driver_details, prefix=prefix)
 
         _OSParRegistry.register(par=par, url_checksum=url_checksum,
                                 details_function=_get_driver_details_from_par,
@@ -232,64 +605,198 @@ class Testing_ObjectStore:
                 from Acquire.ObjectStore import ObjectStoreError
                 raise ObjectStoreError("No object at key '%s'" % key)
 
+    @staticmethod
+    def get_object_stream(bucket, key):
+        """Iterate over the binary data contained in the key 'key' in
+           the passed bucket, yielding buffers of up to 1 MB
+        """
+        filepath = "%s/%s._data" % (bucket, key)
+
+        with _rlock:
+            try:
+                FILE = open(filepath, "rb")
+            except FileNotFoundError:
+                from Acquire.ObjectStore import ObjectStoreError
+                raise ObjectStoreError("No object at key '%s'" % key)
+
+        with FILE:
+            while True:
+                chunk = FILE.read(_stream_chunk_size)
+
+                if not chunk:
+                    return
+
+                yield chunk
+
+    @staticmethod
+    def get_object_with_etag(bucket, key):
+        """Return a tuple of the binary data contained in the key 'key'
+           in the passed bucket, plus the etag of this data (which
+           changes every time that the object is written)
+        """
+        with _rlock:
+            data = Testing_ObjectStore.get_object(bucket, key)
+            return (data, _read_etag("%s/%s._data" % (bucket, key)))
+
+    @staticmethod
+    def get_objects(bucket, keys):
+        """Return the binary data contained in each of the passed 'keys'
+           in the passed bucket, as a dictionary indexed by key. This
+           uses a thread pool to mimic the cloud backends, and raises
+           an ObjectStoreBatchError if any object cannot be read
+        """
+        from ._parallel import run_in_parallel as _run_in_parallel
+        from ._parallel import assert_no_errors as _assert_no_errors
+
+        (results, errors) = _run_in_parallel(
+            lambda key: Testing_ObjectStore.get_object(bucket, key), keys)
+
+        _assert_no_errors(results, errors, "get")
+
+        return results
+
     @staticmethod
     def take_object(bucket, key):
         """Take (delete) the object from the object store, returning
            the object
         """
-        with _rlock:
+        with _BucketLock(bucket):
             filepath = "%s/%s._data" % (bucket, key)
             if _os.path.exists(filepath):
                 data = open(filepath, "rb").read()
                 _os.remove(filepath)
+                _remove_etag(filepath)
+                _remove_from_index(bucket, key)
                 return data
             else:
                 from Acquire.ObjectStore import ObjectStoreError
                 raise ObjectStoreError("No object at key '%s'" % key)
 
     @staticmethod
-    def get_all_object_names(bucket, prefix=None, without_prefix=False):
-        """Returns the names of all objects in the passed bucket"""
+    def get_page_limit():
+        """Return the maximum number of names returned by each page
+           of a listing, or None if this is unlimited
+        """
+        return _page_limit
 
-        root = bucket
+    @staticmethod
+    def set_page_limit(limit=None):
+        """Set the maximum number of names returned by each page of a
+           listing, regardless of the requested page size. Setting this
+           to a small number (e.g. 1) simulates the page limits of the
+           cloud backends. Pass None to remove the limit
+        """
+        global _page_limit
 
-        if prefix is not None:
-            root = "%s/%s" % (bucket, prefix)
+        if limit is not None:
+            limit = int(limit)
+
+            if limit < 1:
+                raise ValueError("The page limit must be at least 1")
 
-        root_len = len(bucket) + 1
+        _page_limit = limit
+
+    @staticmethod
+    def get_all_object_names(bucket, prefix=None, without_prefix=False,
+                             page_size=1000):
+        """Returns the names of all objects in the passed bucket. These
+           are listed one page at a time, like the cloud backends
+        """
+        return list(Testing_ObjectStore.iter_object_names(
+                                    bucket, prefix=prefix,
+                                    page_size=page_size,
+                                    without_prefix=without_prefix))
+
+    @staticmethod
+    def count_objects(bucket, prefix=None, page_size=1000):
+        """Return the number of objects in the passed bucket (that
+           have the passed prefix)
+        """
+        count = 0
+
+        for _name in Testing_ObjectStore.iter_object_names(
+                                    bucket, prefix=prefix,
+                                    page_size=page_size):
+            count += 1
+
+        return count
+
+    @staticmethod
+    def iter_object_names(bucket, prefix=None, start_after=None,
+                          end_before=None, page_size=1000,
+                          without_prefix=False):
+        """Iterate over the names of all objects in the passed bucket,
+           in lexical order. This mimics the cloud backends by listing
+           the bucket one page of 'page_size' names at a time, with
+           each page starting at the marker returned by the last
+        """
+        if int(page_size) < 1:
+            raise ValueError("The page size must be at least 1")
+
+        if prefix is not None:
+            while prefix.startswith("/"):
+                prefix = prefix[1:]
 
-        if without_prefix:
+        if without_prefix and prefix is not None:
             prefix_len = len(prefix)
+        else:
+            prefix_len = 0
 
-        subdir_names = _glob.glob("%s*" % root)
+        for name in _list_names(bucket, prefix=prefix, start=start_after,
+                                end=end_before, page_size=page_size):
+            # 'start' is inclusive, but 'start_after' is not
+            if start_after is not None and name <= start_after:
+                continue
 
-        object_names = []
+            if without_prefix:
+                name = name[prefix_len:]
+                while name.startswith("/"):
+                    name = name[1:]
 
-        while True:
-            names = subdir_names
-            subdir_names = []
+                if len(name) == 0:
+                    continue
 
-            for name in names:
-                if name.endswith("._data"):
-                    # remove the  ._data at the end
-                    name = name[root_len:-6]
-                    while name.endswith("/"):
-                        name = name[0:-1]
+            yield name
 
-                    if without_prefix:
-                        name = name[prefix_len:]
-                        while name.startswith("/"):
-                            name = name[1:]
+    @staticmethod
+    def list_keys_between(bucket, start_key=None, end_key=None,
+                          reverse=False, limit=None):
+        """Return the sorted list of keys in the passed bucket that
+           are between 'start_key' (inclusive) and 'end_key'
+           (exclusive). This uses a sorted index of the keys in
+           the bucket, which mimics the range listing of the cloud
+           backends. If 'reverse' is True then the keys are returned
+           in reverse order. At most 'limit' keys are returned
+        """
+        import bisect as _bisect
 
-                    if len(name) > 0:
-                        object_names.append(name)
-                elif _os.path.isdir(name):
-                    subdir_names += _glob.glob("%s/*" % name)
+        with _rlock:
+            keys = _get_sorted_index(bucket)
 
-            if len(subdir_names) == 0:
-                break
+            if start_key is None:
+                i = 0
+            else:
+                i = _bisect.bisect_left(keys, start_key)
+
+            if end_key is None:
+                j = len(keys)
+            else:
+                j = _bisect.bisect_left(keys, end_key)
+
+            if limit is not None:
+                limit = max(int(limit), 0)
+
+                if reverse:
+                    i = max(i, j - limit)
+                else:
+                    j = min(j, i + limit)
+
+            keys = keys[i:j]
 
-        return object_names
+        if reverse:
+            keys.reverse()
+
+        return keys
 
     @staticmethod
     def set_object(bucket, key, data):
@@ -297,7 +804,7 @@ class Testing_ObjectStore:
 
         filename = "%s/%s._data" % (bucket, key)
 
-        with _rlock:
+        with _BucketLock(bucket):
             try:
                 with open(filename, 'wb') as FILE:
                     if data is not None:
@@ -311,21 +818,150 @@ class Testing_ObjectStore:
                         FILE.write(data)
                     FILE.flush()
 
+            new_etag(filename)
+            _add_to_index(bucket, key)
+
+    @staticmethod
+    def set_object_stream(bucket, key, fileobj):
+        """Set the value of 'key' in 'bucket' to the binary data read
+           from the file-like object 'fileobj'. The data is streamed to
+           a temporary file, which is then moved into place
+        """
+        filename = "%s/%s._data" % (bucket, key)
+        tmpname = "%s.%s._tmp" % (filename, _uuid.uuid4())
+
+        _os.makedirs(_os.path.dirname(filename), exist_ok=True)
+
+        try:
+            with open(tmpname, "wb") as FILE:
+                _shutil.copyfileobj(fileobj, FILE, _stream_chunk_size)
+
+            with _BucketLock(bucket):
+                _os.replace(tmpname, filename)
+                new_etag(filename)
+                _add_to_index(bucket, key)
+        finally:
+            try:
+                _os.remove(tmpname)
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def set_object_if(bucket, key, data, if_match=None):
+        """Set the value of 'key' in 'bucket' to binary 'data', but
+           only if the etag of the existing object matches 'if_match',
+           or, if 'if_match' is None, only if there is no existing
+           object. The data is written to a temporary file which is
+           then atomically linked (create) or renamed (replace) into
+           place while holding the bucket lock. This raises an
+           ObjectStorePreconditionError if the condition is not
+           met, and returns the etag of the new object
+        """
+        if data is None:
+            data = b""
+
+        filename = "%s/%s._data" % (bucket, key)
+        tmpname = "%s.%s._tmp" % (filename, _uuid.uuid4())
+
+        with _BucketLock(bucket):
+            _os.makedirs(_os.path.dirname(filename), exist_ok=True)
+
+            with open(tmpname, "wb") as FILE:
+                FILE.write(data)
+                FILE.flush()
+
+            try:
+                if if_match is None:
+                    try:
+                        _os.link(tmpname, filename)
+                    except FileExistsError:
+                        from Acquire.ObjectStore import \
+                            ObjectStorePreconditionError
+                        raise ObjectStorePreconditionError(
+                            "Cannot create the object at key '%s' as it "
+                            "already exists" % key)
+                else:
+                    if _read_etag(filename) != if_match:
+                        from Acquire.ObjectStore import \
+                            ObjectStorePreconditionError
+                        raise ObjectStorePreconditionError(
+                            "Cannot update the object at key '%s' as it "
+                            "has been changed or removed" % key)
+
+                    _os.replace(tmpname, filename)
+            finally:
+                try:
+                    _os.remove(tmpname)
+                except FileNotFoundError:
+                    pass
+
+            etag = new_etag(filename)
+            _add_to_index(bucket, key)
+
+        return etag
+
+    @staticmethod
+    def set_objects(bucket, objects):
+        """Set the binary data of many objects in 'bucket', where
+           'objects' is a dictionary of binary data indexed by key.
+           This raises an ObjectStoreBatchError if any object
+           cannot be written
+        """
+        from ._parallel import run_in_parallel as _run_in_parallel
+        from ._parallel import assert_no_errors as _assert_no_errors
+
+        (results, errors) = _run_in_parallel(
+            lambda key: Testing_ObjectStore.set_object(bucket, key,
+                                                       objects[key]),
+            objects.keys())
+
+        _assert_no_errors(results, errors, "set")
+
     @staticmethod
     def delete_all_objects(bucket, prefix=None):
         """Deletes all objects..."""
-        if prefix:
-            _shutil.rmtree("%s/%s" % (bucket, prefix), ignore_errors=True)
-        else:
-            _shutil.rmtree(bucket, ignore_errors=True)
+        with _BucketLock(bucket):
+            if prefix:
+                _shutil.rmtree("%s/%s" % (bucket, prefix), ignore_errors=True)
+            else:
+                _shutil.rmtree(bucket, ignore_errors=True)
+
+            _drop_index(bucket)
 
     @staticmethod
     def delete_object(bucket, key):
         """Removes the object at 'key'"""
-        try:
-            _os.remove("%s/%s._data" % (bucket, key))
-        except:
-            pass
+        with _BucketLock(bucket):
+            filename = "%s/%s._data" % (bucket, key)
+
+            try:
+                _os.remove(filename)
+            except:
+                pass
+
+            _remove_etag(filename)
+            _remove_from_index(bucket, key)
+
+    @staticmethod
+    def delete_object_if(bucket, key, if_match):
+        """Removes the object at 'key', but only if its etag matches
+           'if_match'. This raises an ObjectStorePreconditionError
+           if the object has been changed or removed
+        """
+        filename = "%s/%s._data" % (bucket, key)
+
+        with _BucketLock(bucket):
+            etag = _read_etag(filename)
+
+            if etag is None or etag != if_match:
+                from Acquire.ObjectStore import ObjectStorePreconditionError
+                raise ObjectStorePreconditionError(
+                    "Cannot delete the object at key '%s' as it "
+                    "has been changed or removed" % key)
+
+            _os.remove(filename)
+            _remove_etag(filename)
+            _remove_from_index(bucket, key)
 
     @staticmethod
     def get_size_and_checksum(bucket, key):
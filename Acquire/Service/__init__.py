@@ -6,12 +6,15 @@ the services used in the system. It is not likely to be user-facing
 """
 
 from ._function import *
+from ._http_pool import *
+from ._async import *
 from ._get_session_info import *
 from ._get_services import *
 from ._get_service_account_bucket import *
 from ._service_account import *
 from ._service import *
 from ._profile import *
+from ._tracing import *
 from ._errors import *
 from ._cache_management import *
 from ._trust_service import *
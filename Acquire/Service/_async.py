@@ -0,0 +1,101 @@
+
+__all__ = ["run_async", "call_function_async",
+           "get_max_async_workers", "set_max_async_workers"]
+
+# The maximum number of threads used to run blocking calls (e.g. calls
+# to services) for coroutines. These calls are dominated by network
+# latency, so this can be much larger than the number of cores
+_max_workers = 32
+
+_executor = None
+
+
+def get_max_async_workers():
+    """Return the maximum number of threads used to run blocking
+       calls for coroutines
+
+       Returns:
+            int: Maximum number of worker threads
+    """
+    return _max_workers
+
+
+def set_max_async_workers(max_workers):
+    """Set the maximum number of threads used to run blocking calls
+       for coroutines, i.e. the maximum number of calls that can be
+       in flight at the same time from an event loop
+
+       Args:
+            max_workers (int): Maximum number of worker threads
+       Returns:
+            None
+    """
+    global _max_workers, _executor
+
+    max_workers = int(max_workers)
+
+    if max_workers < 1:
+        raise ValueError("The number of workers must be at least 1: %s"
+                         % max_workers)
+
+    _max_workers = max_workers
+
+    if _executor is not None:
+        # calls that are already running are allowed to finish
+        _executor.shutdown(wait=False)
+        _executor = None
+
+
+def _get_executor():
+    """Internal function that returns the pool of threads used to
+       run blocking calls for coroutines
+    """
+    global _executor
+
+    if _executor is None:
+        from concurrent.futures import ThreadPoolExecutor \
+            as _ThreadPoolExecutor
+        _executor = _ThreadPoolExecutor(max_workers=_max_workers,
+                                        thread_name_prefix="acquire_async")
+
+    return _executor
+
+
+async def run_async(function, *args, **kwargs):
+    """Run 'function(*args, **kwargs)' in the pool of threads used for
+       blocking calls, returning its result (or raising its exception)
+       once it has completed. This lets many calls run concurrently
+       from a single event loop, e.g.
+
+        results = await asyncio.gather(
+                        run_async(drive.upload, "a.txt"),
+                        run_async(drive.upload, "b.txt"))
+    """
+    import asyncio as _asyncio
+    import functools as _functools
+
+    # get_event_loop returns the running loop when called from
+    # a coroutine (get_running_loop needs python 3.7)
+    loop = _asyncio.get_event_loop()
+
+    return await loop.run_in_executor(
+                    _get_executor(),
+                    _functools.partial(function, *args, **kwargs))
+
+
+async def call_function_async(service_url, function=None, args=None,
+                              args_key=None, response_key=None,
+                              public_cert=None, binary=False,
+                              timeout=None, idempotent=None):
+    """Awaitable version of call_function. This packs the arguments,
+       calls the service using the pooled, keep-alive sessions and
+       unpacks the response in exactly the same way as call_function,
+       but does so without blocking the event loop
+    """
+    from ._function import call_function as _call_function
+
+    return await run_async(_call_function, service_url=service_url,
+                           function=function, args=args, args_key=args_key,
+                           response_key=response_key,
+                           public_cert=public_cert, binary=binary,
+                           timeout=timeout, idempotent=idempotent)
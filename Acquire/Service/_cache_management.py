@@ -14,3 +14,11 @@ def clear_service_cache():
     clear_services_cache()
     clear_login_cache()
     clear_serviceinfo_cache()
+
+    from Acquire.ObjectStore import get_object_store_cache \
+        as _get_object_store_cache
+
+    objstore_cache = _get_object_store_cache()
+
+    if objstore_cache is not None:
+        objstore_cache.clear()
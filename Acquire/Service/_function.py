@@ -1,10 +1,126 @@
 
 import json as _json
+import struct as _struct
 from io import BytesIO as _BytesIO
 
 __all__ = ["call_function", "pack_arguments", "unpack_arguments",
            "create_return_value", "pack_return_value", "unpack_return_value",
-           "exception_to_safe_exception", "exception_to_string"]
+           "exception_to_safe_exception", "exception_to_string",
+           "is_binary_frame"]
+
+
+# Binary frames start with this magic, which can never be the start
+# of a JSON document. A frame is the magic, followed by the length of
+# the header (4-byte big-endian unsigned int), the JSON header, and then
+# the body. The header lists the sizes of the parts of the body, i.e.
+# the JSON payload followed by each of the raw byte strings that were
+# in the payload (or, for encrypted frames, the encrypted inner frame)
+_binary_magic = b"\x00AQB1"
+_binary_magic_str = _binary_magic.decode("utf-8")
+
+_header_size = _struct.Struct(">I")
+
+
+def _bytes_to_json(obj):
+    """Internal function used to JSON-encode the bytes within a
+       payload when sending JSON-framed data. These are sent as
+       base64-encoded strings
+    """
+    if isinstance(obj, bytes):
+        from Acquire.ObjectStore import bytes_to_string as _bytes_to_string
+        return _bytes_to_string(obj)
+
+    raise TypeError("Object of type %s is not JSON serializable" %
+                    obj.__class__.__name__)
+
+
+def is_binary_frame(data):
+    """Return whether or not 'data' has been packed using the
+       binary framing (rather than as JSON)
+    """
+    return isinstance(data, bytes) and data.startswith(_binary_magic)
+
+
+def _pack_frame(header, parts):
+    """Internal function that packs the passed header dictionary and
+       list of byte strings 'parts' into a single binary frame
+    """
+    header["sizes"] = [len(part) for part in parts]
+    header = _json.dumps(header).encode("utf-8")
+
+    return b"".join([_binary_magic, _header_size.pack(len(header)),
+                     header] + parts)
+
+
+def _unpack_frame(data):
+    """Internal function that unpacks the passed binary frame, returning
+       the header dictionary and the list of byte strings in the body
+    """
+    try:
+        start = len(_binary_magic)
+        end = start + _header_size.size
+        (header_size,) = _header_size.unpack(data[start:end])
+
+        start = end
+        end = start + header_size
+        header = _json.loads(data[start:end].decode("utf-8"))
+
+        parts = []
+        view = memoryview(data)
+
+        for size in header["sizes"]:
+            start = end
+            end = start + int(size)
+
+            if end > len(data):
+                raise ValueError("The frame is truncated")
+
+            parts.append(bytes(view[start:end]))
+    except Exception as e:
+        from Acquire.Service import UnpackingError
+        raise UnpackingError("Cannot unpack a binary frame: %s" % str(e))
+
+    return (header, parts)
+
+
+def _pack_binary_payload(result):
+    """Internal function that packs the 'payload' in the passed 'result'
+       dictionary into a binary frame. Any bytes in the payload are sent
+       raw after the JSON payload, rather than being base64-encoded
+    """
+    blobs = []
+
+    def _extract_bytes(obj):
+        if isinstance(obj, bytes):
+            blobs.append(obj)
+            return {"__bytes__": len(blobs) - 1}
+
+        raise TypeError("Object of type %s is not JSON serializable" %
+                        obj.__class__.__name__)
+
+    header = dict(result)
+    payload = _json.dumps(header.pop("payload"),
+                          default=_extract_bytes).encode("utf-8")
+
+    return _pack_frame(header, [payload] + blobs)
+
+
+def _unpack_binary_payload(header, parts):
+    """Internal function that reverses _pack_binary_payload, returning
+       the dictionary containing the payload
+    """
+    blobs = parts[1:]
+
+    def _restore_bytes(obj):
+        if len(obj) == 1 and "__bytes__" in obj:
+            return blobs[obj["__bytes__"]]
+        else:
+            return obj
+
+    header["payload"] = _json.loads(parts[0].decode("utf-8"),
+                                    object_hook=_restore_bytes)
+
+    return header
 
 
 def _get_signing_certificate(fingerprint=None, private_cert=None):
@@ -18,6 +134,34 @@ def _get_signing_certificate(fingerprint=None, private_cert=None):
     return _get_service_private_certificate(fingerprint=fingerprint)
 
 
+# Cache of the public keys sent by callers to encrypt responses,
+# indexed by their encoded bytes. Reusing the same PublicKey object
+# for a caller lets responses reuse its session key
+_response_keys = {}
+_max_cached_response_keys = 256
+
+
+def _get_response_key(key):
+    """Internal function used to return the PublicKey from the
+       passed base64-encoded bytes
+    """
+    try:
+        return _response_keys[key]
+    except KeyError:
+        pass
+
+    from Acquire.Crypto import PublicKey as _PublicKey
+    from Acquire.ObjectStore import string_to_bytes as _string_to_bytes
+    public_key = _PublicKey.read_bytes(_string_to_bytes(key))
+
+    if len(_response_keys) >= _max_cached_response_keys:
+        _response_keys.clear()
+
+    _response_keys[key] = public_key
+
+    return public_key
+
+
 def _get_key(key, fingerprint=None):
     """The user may pass the key in multiple ways. It could just be
        a key. Or it could be a function that gets the key on demand.
@@ -38,8 +182,7 @@ def _get_key(key, fingerprint=None):
             key = None
 
         if key is not None:
-            from Acquire.ObjectStore import string_to_bytes as _string_to_bytes
-            key = _PublicKey.read_bytes(_string_to_bytes(key))
+            key = _get_response_key(key)
     else:
         key = key(fingerprint=fingerprint)
 
@@ -94,20 +237,31 @@ def create_return_value(payload):
 
 def pack_return_value(function=None, payload=None, key=None,
                       response_key=None, public_cert=None,
-                      private_cert=None):
+                      private_cert=None, binary=False):
     """Pack the passed result into a json string, optionally
        encrypting the result with the passed key, and optionally
        supplying a public response key, with which the function
        being called should encrypt the response. If public_cert is
        provided then we will ask the service to sign their response.
        Note that you can only ask the service to sign their response
-       if you provide a 'reponse_key' for them to encrypt it with too
+       if you provide a 'reponse_key' for them to encrypt it with too.
+
+       If 'binary' is True then the result is packed into a binary
+       frame rather than a json string. This avoids base64-encoding
+       the (encrypted) data, and any bytes in the payload are sent
+       raw. The response to arguments that were packed into a binary
+       frame is also packed into a binary frame
     """
     try:
         sign_result = key["sign_with_service_key"]
     except:
         sign_result = False
 
+    try:
+        binary = binary or key["binary_framing"]
+    except:
+        pass
+
     key = _get_key(key)
     response_key = _get_key(response_key)
 
@@ -138,6 +292,13 @@ def pack_return_value(function=None, payload=None, key=None,
     result["synctime"] = now
     result["function"] = function
 
+    if binary:
+        # tell the service to reply using a binary frame
+        result["binary_framing"] = True
+        result = _pack_binary_payload(result)
+    else:
+        result = _json.dumps(result, default=_bytes_to_json).encode("utf-8")
+
     if key is None:
         if sign_result:
             from Acquire.Service import PackingError
@@ -147,7 +308,9 @@ def pack_return_value(function=None, payload=None, key=None,
     else:
         response = {}
 
-        result_data = key.encrypt(_json.dumps(result).encode("utf-8"))
+        # binary framing is only supported by code that can also
+        # decrypt messages encrypted using session keys
+        result_data = key.encrypt(result, use_session_key=binary)
 
         if sign_result:
             # sign using the signing certificate for this service
@@ -156,23 +319,27 @@ def pack_return_value(function=None, payload=None, key=None,
                             private_cert=private_cert).sign(result_data)
             response["signature"] = _bytes_to_string(signature)
 
-        response["data"] = _bytes_to_string(result_data)
         response["encrypted"] = True
         response["fingerprint"] = key.fingerprint()
         response["synctime"] = now
-        result = response
 
-    result = _json.dumps(result).encode("utf-8")
+        if binary:
+            result = _pack_frame(response, [result_data])
+        else:
+            response["data"] = _bytes_to_string(result_data)
+            result = _json.dumps(response).encode("utf-8")
 
     return result
 
 
 def pack_arguments(function=None, args=None, key=None,
-                   response_key=None, public_cert=None):
-    """Pack the passed arguments, optionally encrypted using the passed key"""
+                   response_key=None, public_cert=None, binary=False):
+    """Pack the passed arguments, optionally encrypted using the passed key.
+       The arguments are packed into a binary frame if 'binary' is True
+    """
     return pack_return_value(function=function, payload=args,
                              key=key, response_key=response_key,
-                             public_cert=public_cert)
+                             public_cert=public_cert, binary=binary)
 
 
 def exception_to_safe_exception(e):
@@ -216,7 +383,8 @@ def unpack_arguments(args, key=None, public_cert=None, is_return_value=False,
 
 
        Args:
-        args (str) : should be a JSON encoded UTF-8
+        args (str) : should be a JSON encoded UTF-8, or a binary
+                     frame (bytes)
     """
     if not (args and len(args) > 0):
         if is_return_value:
@@ -224,13 +392,26 @@ def unpack_arguments(args, key=None, public_cert=None, is_return_value=False,
         else:
             return (None, None, None)
 
-    # args should be a json-encoded utf-8 string
-    try:
-        data = _json.loads(args)
-    except Exception as e:
-        from Acquire.Service import UnpackingError
-        raise UnpackingError("Cannot decode json from '%s' : %s" %
-                             (data, str(e)))
+    if isinstance(args, str) and args.startswith(_binary_magic_str):
+        # decrypted binary frames that happen to be valid utf-8
+        # are returned by the keys as strings
+        args = args.encode("utf-8")
+
+    if is_binary_frame(args):
+        (data, parts) = _unpack_frame(args)
+
+        if data.get("encrypted", False):
+            data["data"] = parts[0]
+        else:
+            data = _unpack_binary_payload(data, parts)
+    else:
+        # args should be a json-encoded utf-8 string
+        try:
+            data = _json.loads(args)
+        except Exception as e:
+            from Acquire.Service import UnpackingError
+            raise UnpackingError("Cannot decode json from '%s' : %s" %
+                                 (args, str(e)))
 
     while not isinstance(data, dict):
         if not (data and len(data) > 0):
@@ -299,7 +480,10 @@ def unpack_arguments(args, key=None, public_cert=None, is_return_value=False,
                 (function, service))
 
     if is_encrypted:
-        encrypted_data = _string_to_bytes(data["data"])
+        encrypted_data = data["data"]
+
+        if not isinstance(encrypted_data, bytes):
+            encrypted_data = _string_to_bytes(encrypted_data)
 
         try:
             fingerprint = data["fingerprint"]
@@ -415,7 +599,8 @@ def exception_to_string(e):
 
 
 def call_function(service_url, function=None, args=None, args_key=None,
-                  response_key=None, public_cert=None):
+                  response_key=None, public_cert=None, binary=False,
+                  timeout=None, idempotent=None):
     """Call the remote function called 'function' at 'service_url' passing
        in named function arguments in 'kwargs'. If 'args_key' is supplied,
        then encrypt the arguments using 'args'. If 'response_key'
@@ -424,7 +609,15 @@ def call_function(service_url, function=None, args=None, args_key=None,
        decrypt it in the response. If 'public_cert' is supplied then
        we will ask the service to sign their response using their
        service signing certificate, and we will validate the
-       signature using 'public_cert'
+       signature using 'public_cert'. If 'binary' is True then
+       the arguments (and so the response) are sent as binary
+       frames. Only do this if the service supports binary framing.
+
+       Calls are made using a pooled, keep-alive session for each host.
+       The call times out after 'timeout' seconds (default 60). If
+       the call is 'idempotent' (by default, if the function only
+       reads data) then it is retried if it fails because of a
+       network or gateway error
     """
     if args is None:
         args = {}
@@ -454,15 +647,22 @@ def call_function(service_url, function=None, args=None, args_key=None,
         args_json = pack_arguments(function=function,
                                    args=args, key=args_key,
                                    response_key=response_key.public_key(),
-                                   public_cert=public_cert)
+                                   public_cert=public_cert,
+                                   binary=binary)
     else:
         args_json = pack_arguments(function=function,
-                                   args=args, key=args_key)
+                                   args=args, key=args_key,
+                                   binary=binary)
 
     response = None
     try:
-        from Acquire.Stubs import requests as _requests
-        response = _requests.post(service_url, data=args_json, timeout=60.0)
+        from ._http_pool import post as _post
+        from ._tracing import trace as _trace
+
+        with _trace("call_function/%s" % function, url=service_url) as span:
+            response = _post(service_url, data=args_json, function=function,
+                             timeout=timeout, idempotent=idempotent)
+            span.nbytes = len(args_json) + len(response.content)
     except Exception as e:
         from Acquire.Service import RemoteFunctionCallError
         raise RemoteFunctionCallError(
@@ -482,7 +682,9 @@ def call_function(service_url, function=None, args=None, args_key=None,
             (function, service_url,
              response.status_code, str(response.content)))
 
-    if response.encoding == "utf-8" or response.encoding is None:
+    if is_binary_frame(response.content):
+        result = response.content
+    elif response.encoding == "utf-8" or response.encoding is None:
         result = response.content.decode("utf-8")
     else:
         from Acquire.Service import RemoteFunctionCallError
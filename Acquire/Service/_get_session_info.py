@@ -1,5 +1,28 @@
 
-__all__ = ["get_session_info"]
+__all__ = ["get_session_info", "get_sessions_info"]
+
+
+def _process_session_info(response):
+    """Internal function that cleans up the session information
+       returned by the identity service
+    """
+    try:
+        del response["status"]
+    except:
+        pass
+
+    try:
+        del response["message"]
+    except:
+        pass
+
+    from Acquire.Crypto import PublicKey as _PublicKey
+
+    for key in response.keys():
+        if key in ["public_key", "public_certificate"]:
+            response[key] = _PublicKey.from_data(response[key])
+
+    return response
 
 
 def get_session_info(identity_url, session_uid,
@@ -23,20 +46,83 @@ def get_session_info(identity_url, session_uid,
 
     response = service.call_function(function="get_session_info", args=args)
 
-    try:
-        del response["status"]
-    except:
-        pass
+    return _process_session_info(response)
+
+
+def _get_sessions_info_one_by_one(identity_url, session_uids,
+                                  scope=None, permissions=None):
+    """Internal function that obtains the information about each of the
+       login sessions in 'session_uids' using one call per session. This
+       is used for identity services that do not support batches
+    """
+    sessions = {}
+    errors = {}
+
+    for session_uid in session_uids:
+        try:
+            sessions[session_uid] = get_session_info(
+                                        identity_url=identity_url,
+                                        session_uid=session_uid,
+                                        scope=scope,
+                                        permissions=permissions)
+        except Exception as e:
+            errors[session_uid] = str(e)
+
+    return (sessions, errors)
+
+
+def get_sessions_info(identity_url, session_uids,
+                      scope=None, permissions=None):
+    """Call the identity_url to obtain information about all of the
+       login sessions in 'session_uids' using a single call. Optionally
+       limit the scope and permissions for which these certs would
+       be valid. This returns a tuple of two dictionaries, the first
+       holds the information indexed by session UID, and the second
+       holds the error message for any session whose information
+       could not be obtained, again indexed by session UID
+    """
+    from Acquire.Service import get_trusted_service as _get_trusted_service
+
+    session_uids = list(set(str(uid) for uid in session_uids))
+
+    if len(session_uids) == 0:
+        return ({}, {})
+
+    service = _get_trusted_service(identity_url)
+
+    args = {"session_uids": session_uids}
+
+    if scope is not None:
+        args["scope"] = scope
+
+    if permissions is not None:
+        args["permissions"] = permissions
+
+    from Acquire.Service import RemoteFunctionCallError \
+        as _RemoteFunctionCallError
 
     try:
-        del response["message"]
-    except:
-        pass
+        response = service.call_function(function="get_session_info",
+                                         args=args)
+    except (PermissionError, _RemoteFunctionCallError):
+        # this is an older identity service that rejects the list of
+        # session UIDs as it expects a single 'session_uid'
+        response = {}
 
-    from Acquire.Crypto import PublicKey as _PublicKey
+    if "sessions" not in response:
+        # this is an older identity service that only returns information
+        # about a single session - fall back to one call per session
+        return _get_sessions_info_one_by_one(identity_url, session_uids,
+                                             scope, permissions)
 
-    for key in response.keys():
-        if key in ["public_key", "public_certificate"]:
-            response[key] = _PublicKey.from_data(response[key])
+    sessions = {}
 
-    return response
+    for (session_uid, info) in response["sessions"].items():
+        sessions[session_uid] = _process_session_info(info)
+
+    try:
+        errors = dict(response["errors"])
+    except:
+        errors = {}
+
+    return (sessions, errors)
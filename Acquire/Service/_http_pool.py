@@ -0,0 +1,294 @@
+
+import random as _random
+import threading as _threading
+import time as _time
+
+__all__ = ["get_http_pool_size", "set_http_pool_size",
+           "get_http_max_retries", "set_http_max_retries",
+           "get_http_statistics", "reset_http_statistics",
+           "close_http_sessions", "is_idempotent_function"]
+
+# The maximum number of connections kept alive to each host. Each
+# thread that is calling a host at the same time needs its own connection
+_pool_size = 16
+
+# The maximum number of times that a call to an idempotent function
+# is retried if it fails because of a network or gateway error
+_max_retries = 3
+
+# The default timeout (in seconds) of each call
+_default_timeout = 60.0
+
+# Functions that only read data, and so can safely be retried
+_idempotent_functions = set([None, "get_session_info",
+                             "admin/get_session_info", "get_service",
+                             "get_info", "get_account_uids", "list_files",
+                             "list_versions", "download_chunk"])
+
+# HTTP status codes for gateway errors, after which the call is retried
+_retry_status_codes = set([502, 503, 504])
+
+_lock = _threading.Lock()
+_sessions = {}
+_statistics = {}
+
+# the number of connections opened to each host before the
+# statistics were last reset
+_connection_offsets = {}
+
+
+def get_http_pool_size():
+    """Return the maximum number of connections kept alive to each host
+
+       Returns:
+            int: Maximum number of connections per host
+    """
+    return _pool_size
+
+
+def set_http_pool_size(pool_size):
+    """Set the maximum number of connections kept alive to each host.
+       This only affects hosts that have not yet been called, so
+       call close_http_sessions to apply this to all hosts
+
+       Args:
+            pool_size (int): Maximum number of connections per host
+       Returns:
+            None
+    """
+    global _pool_size
+
+    pool_size = int(pool_size)
+
+    if pool_size < 1:
+        raise ValueError("The pool size must be at least 1: %s" % pool_size)
+
+    _pool_size = pool_size
+
+
+def get_http_max_retries():
+    """Return the maximum number of times that a call to an idempotent
+       function is retried
+
+       Returns:
+            int: Maximum number of retries
+    """
+    return _max_retries
+
+
+def set_http_max_retries(max_retries):
+    """Set the maximum number of times that a call to an idempotent
+       function is retried if it fails because of a network or gateway
+       error. Set this to 0 to disable retries
+
+       Args:
+            max_retries (int): Maximum number of retries
+       Returns:
+            None
+    """
+    global _max_retries
+
+    max_retries = int(max_retries)
+
+    if max_retries < 0:
+        raise ValueError("The number of retries cannot be negative: %s"
+                         % max_retries)
+
+    _max_retries = max_retries
+
+
+def _get_host(url):
+    """Internal function that returns the scheme and host of 'url'"""
+    from urllib.parse import urlparse as _urlparse
+    p = _urlparse(url)
+    return "%s://%s" % (p.scheme, p.netloc)
+
+
+def _get_session(host):
+    """Internal function that returns the pooled session used to
+       call 'host', creating it if necessary
+    """
+    try:
+        return _sessions[host]
+    except KeyError:
+        pass
+
+    from Acquire.Stubs import requests as _requests
+
+    with _lock:
+        if host not in _sessions:
+            session = _requests.Session()
+            adapter = _requests.adapters.HTTPAdapter(
+                                            pool_connections=1,
+                                            pool_maxsize=_pool_size)
+            session.mount(host, adapter)
+            session.headers.update({"Connection": "keep-alive"})
+            _sessions[host] = session
+
+        return _sessions[host]
+
+
+def _get_statistics(host):
+    """Internal function that returns the statistics for 'host'.
+       This must be called while holding _lock
+    """
+    try:
+        return _statistics[host]
+    except KeyError:
+        stats = {"requests": 0, "retries": 0, "failures": 0}
+        _statistics[host] = stats
+        return stats
+
+
+def _count_connections(session):
+    """Internal function that returns the number of connections that
+       have been opened by 'session', or None if this is not known
+    """
+    try:
+        connections = 0
+
+        for adapter in session.adapters.values():
+            manager = adapter.poolmanager
+
+            for key in manager.pools.keys():
+                connections += manager.pools[key].num_connections
+
+        return connections
+    except Exception:
+        return None
+
+
+def is_idempotent_function(function):
+    """Return whether or not the function called 'function' only
+       reads data, and so can be safely retried
+    """
+    return function in _idempotent_functions
+
+
+def post(url, data, function=None, timeout=None, idempotent=None):
+    """Internal function used by call_function to post 'data' to 'url'
+       using the pooled, keep-alive session for its host. If the call
+       is 'idempotent' (by default, if 'function' only reads data)
+       then it is retried with exponential backoff if it fails because
+       of a network or gateway error. This returns the response, or
+       raises the exception from the last attempt
+    """
+    if timeout is None:
+        timeout = _default_timeout
+
+    if idempotent is None:
+        idempotent = is_idempotent_function(function)
+
+    if idempotent:
+        max_retries = _max_retries
+    else:
+        max_retries = 0
+
+    host = _get_host(url)
+    session = _get_session(host)
+
+    attempt = 0
+
+    while True:
+        with _lock:
+            stats = _get_statistics(host)
+            stats["requests"] += 1
+
+            if attempt > 0:
+                stats["retries"] += 1
+
+        try:
+            response = session.post(url, data=data, timeout=timeout)
+        except Exception:
+            if attempt >= max_retries:
+                with _lock:
+                    _get_statistics(host)["failures"] += 1
+
+                raise
+
+            response = None
+
+        if response is not None:
+            if response.status_code not in _retry_status_codes or \
+                    attempt >= max_retries:
+                return response
+
+        # jittered exponential backoff, starting from 100 ms
+        _time.sleep(_random.uniform(0.5, 1.0) * 0.1 * (2 ** attempt))
+        attempt += 1
+
+
+def get_http_statistics(host=None):
+    """Return the statistics of the calls made to each host, indexed by
+       host (scheme://hostname:port), or just the statistics for the
+       host of the URL 'host' if this is passed. The statistics are the
+       number of requests, the number of these that were retries, the
+       number of calls that failed, and the number of connections that
+       have been opened (if known). The number of requests that reused
+       a kept-alive connection is the number of requests minus
+       the number of connections
+
+       Args:
+            host (str, default=None): URL of the host
+       Returns:
+            dict: Statistics for each host (or for the passed host)
+    """
+    with _lock:
+        statistics = {}
+
+        for (h, stats) in _statistics.items():
+            stats = dict(stats)
+
+            try:
+                connections = _count_connections(_sessions[h])
+            except KeyError:
+                connections = None
+
+            if connections is not None:
+                connections -= _connection_offsets.get(h, 0)
+
+            stats["connections"] = connections
+
+            if connections is not None:
+                stats["reused"] = max(0, stats["requests"] -
+                                      stats["connections"])
+
+            statistics[h] = stats
+
+    if host is not None:
+        try:
+            return statistics[_get_host(host)]
+        except KeyError:
+            return {"requests": 0, "retries": 0, "failures": 0,
+                    "connections": None}
+
+    return statistics
+
+
+def reset_http_statistics():
+    """Reset the statistics of the calls made to all hosts"""
+    with _lock:
+        _statistics.clear()
+        _connection_offsets.clear()
+
+        for (host, session) in _sessions.items():
+            connections = _count_connections(session)
+
+            if connections is not None:
+                _connection_offsets[host] = connections
+
+
+def close_http_sessions():
+    """Close all of the pooled sessions, closing all kept-alive
+       connections. New sessions are created as needed
+    """
+    with _lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+        _connection_offsets.clear()
+
+    for session in sessions:
+        try:
+            session.close()
+        except Exception:
+            pass
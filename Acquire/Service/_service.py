@@ -293,6 +293,8 @@ class Service:
         service._service_user_uid = None
         service._service_user_secrets = None
 
+        service._binary_framing = True
+
         return service
 
     def create_stage2(self, service_uid, response):
@@ -396,6 +398,18 @@ class Service:
         else:
             return self._skeleton_key is not None
 
+    def supports_binary_framing(self):
+        """Return whether or not this service accepts function calls
+           whose arguments are packed into binary frames
+        """
+        if self.is_null():
+            return False
+        elif self.is_unlocked():
+            # this is the running service, which supports binary framing
+            return True
+        else:
+            return self._binary_framing
+
     def get_trusted_service(self, service_url=None, service_uid=None):
         """Return the trusted service info for the service with specified
            service_url or service_uid"""
@@ -421,6 +435,21 @@ class Service:
                                  session_uid=session_uid,
                                  scope=scope, permissions=permissions)
 
+    def get_sessions_info(self, session_uids,
+                          scope=None, permissions=None):
+        """Return information about all of the passed sessions using a
+           single call, optionally limited to the provided scope and
+           permissions. This returns the information and any errors,
+           both indexed by session UID
+        """
+        if self.is_null():
+            return ({}, {})
+
+        from Acquire.Service import get_sessions_info as _get_sessions_info
+        return _get_sessions_info(identity_url=self.canonical_url(),
+                                  session_uids=session_uids,
+                                  scope=scope, permissions=permissions)
+
     def assert_unlocked(self):
         """Assert that this service object is unlocked"""
         if self.is_locked():
@@ -824,14 +853,16 @@ class Service:
         else:
             return self._lastcert
 
-    def call_function(self, function, args=None):
+    def call_function(self, function, args=None, timeout=None,
+                      idempotent=None):
         """Call the function 'func' on this service, optionally passing
            in the arguments 'args'. This is a simple wrapper around
            Acquire.Service.call_function which automatically
            gets the correct URL, encrypts the arguments using the
            service's public key, and supplies a key to encrypt
            the response (and automatically then decrypts the
-           response)
+           response). The 'timeout' and 'idempotent' arguments
+           are passed to Acquire.Service.call_function
         """
         if self.is_null():
             from Acquire.Service import RemoteFunctionCallError
@@ -853,7 +884,9 @@ class Service:
                                   args=args,
                                   args_key=self.public_key(),
                                   public_cert=self.public_certificate(),
-                                  response_key=_get_private_key("function"))
+                                  response_key=_get_private_key("function"),
+                                  binary=self.supports_binary_framing(),
+                                  timeout=timeout, idempotent=idempotent)
 
         except ServiceAccountMissingKeyError:
             # the service's keys have changed and we can no longer
@@ -873,7 +906,19 @@ class Service:
                               args=args,
                               args_key=self.public_key(),
                               public_cert=self.public_certificate(),
-                              response_key=_get_private_key("function"))
+                              response_key=_get_private_key("function"),
+                              binary=self.supports_binary_framing(),
+                              timeout=timeout, idempotent=idempotent)
+
+    async def call_function_async(self, function, args=None, timeout=None,
+                                  idempotent=None):
+        """Awaitable version of call_function, which lets many functions
+           be called concurrently from a single event loop
+        """
+        from ._async import run_async as _run_async
+        return await _run_async(self.call_function, function=function,
+                                args=args, timeout=timeout,
+                                idempotent=idempotent)
 
     def sign(self, message):
         """Sign the specified message"""
@@ -1256,6 +1301,8 @@ class Service:
         data["service_user_name"] = self._service_user_name
         data["service_user_uid"] = self._service_user_uid
 
+        data["binary_framing"] = self.supports_binary_framing()
+
         from Acquire.ObjectStore import bytes_to_string as _bytes_to_string
 
         if (self.is_unlocked()) and (password is not None):
@@ -1371,6 +1418,12 @@ class Service:
         service._service_user_uid = data["service_user_uid"]
         service._service_user_name = data["service_user_name"]
 
+        try:
+            service._binary_framing = bool(data["binary_framing"])
+        except:
+            # this service was created before binary framing was supported
+            service._binary_framing = False
+
         try:
             service._public_skeleton_key = _PublicKey.from_data(
                                             data["public_skeleton_key"])
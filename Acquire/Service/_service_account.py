@@ -1,6 +1,8 @@
 
 import os as _os
 import json as _json
+import threading as _threading
+import time as _time
 
 from cachetools import cached as _cached
 from cachetools import LRUCache as _LRUCache
@@ -13,6 +15,11 @@ _cache_adminusers = _LRUCache(maxsize=5)
 _cache_serviceuser = _LRUCache(maxsize=5)
 _cache_service_account_uid = _LRUCache(maxsize=5)
 
+# The unlocked service objects are cached by get_this_service, and are
+# checked against the stored service data after this many seconds
+_cache_service_info_lock = _threading.Lock()
+_service_revalidate_time = 60
+
 
 __all__ = ["push_is_running_service", "pop_is_running_service",
            "is_running_service", "assert_running_service",
@@ -74,7 +81,10 @@ def clear_serviceinfo_cache():
        and admin user objects
     """
     _cache_adminusers.clear()
-    _cache_service_info.clear()
+
+    with _cache_service_info_lock:
+        _cache_service_info.clear()
+
     _cache_serviceinfo_data.clear()
     _cache_serviceuser.clear()
     _cache_service_account_uid.clear()
@@ -423,15 +433,12 @@ def _refresh_this_service_keys_and_certs(service_info, service_password):
     return service_data
 
 
-@_cached(_cache_service_info)
-def get_this_service(need_private_access=False):
-    """Return the service info object for this service. If private
-       access is needed then this will decrypt and access the private
-       keys and signing certificates, which is slow if you just need
-       the public certificates.
+def _load_this_service(need_private_access):
+    """Internal function that loads the service info object for this
+       service from the stored data, refreshing the keys if needed.
+       This returns the service object together with the data from
+       which it was loaded
     """
-    assert_running_service()
-
     from Acquire.Service import MissingServiceAccountError
 
     try:
@@ -468,11 +475,63 @@ def get_this_service(need_private_access=False):
                                                             service_password)
 
         if need_private_access:
-            return _Service.from_data(service_info, service_password)
+            service = _Service.from_data(service_info, service_password)
         else:
-            return _Service.from_data(service_info)
-    else:
-        return service
+            service = _Service.from_data(service_info)
+
+    return (service, service_info)
+
+
+def get_this_service(need_private_access=False):
+    """Return the service info object for this service. If private
+       access is needed then this will decrypt and access the private
+       keys and signing certificates, which is slow if you just need
+       the public certificates.
+
+       The (public or unlocked) service object is cached for the life
+       of the process. Every _service_revalidate_time seconds the
+       cached object is checked against the 'last_key_update' of the
+       stored service data, and is only reloaded (and decrypted) if
+       the keys have been refreshed, e.g. by another instance
+    """
+    assert_running_service()
+
+    now = _time.monotonic()
+
+    with _cache_service_info_lock:
+        cached = _cache_service_info.get(need_private_access, None)
+
+    if cached is not None:
+        (service, last_key_update, validated) = cached
+
+        if not service.should_refresh_keys():
+            if now - validated < _service_revalidate_time:
+                return service
+
+            # re-read the stored data to see if the keys have changed
+            _cache_serviceinfo_data.clear()
+
+            try:
+                stored_update = _get_this_service_data().get(
+                                                        "last_key_update")
+            except Exception:
+                stored_update = None
+
+            if stored_update is not None and \
+                    stored_update == last_key_update:
+                with _cache_service_info_lock:
+                    _cache_service_info[need_private_access] = \
+                        (service, last_key_update, now)
+
+                return service
+
+    (service, service_info) = _load_this_service(need_private_access)
+
+    with _cache_service_info_lock:
+        _cache_service_info[need_private_access] = \
+            (service, service_info.get("last_key_update"), now)
+
+    return service
 
 
 @_cached(_cache_service_account_uid)
@@ -0,0 +1,285 @@
+
+import bisect as _bisect
+import json as _json
+import os as _os
+import threading as _threading
+import time as _time
+
+__all__ = ["trace", "start_trace_request", "end_trace_request",
+           "set_trace_request_function",
+           "get_trace_statistics", "reset_trace_statistics",
+           "set_tracing_enabled", "is_tracing_enabled",
+           "set_trace_output"]
+
+# Tracing is always on (its overhead is a couple of microseconds per
+# span) unless it is disabled using ACQUIRE_TRACING=0
+_enabled = _os.getenv("ACQUIRE_TRACING", "1") != "0"
+
+# The upper bounds (in milliseconds) of the buckets of the latency
+# histograms. The last bucket holds everything slower than this
+_histogram_bounds = [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100,
+                     250, 500, 1000, 2500, 5000, 10000]
+
+_lock = _threading.Lock()
+_statistics = {}
+
+# The file to which every span is written as a line of json, if set
+_output = None
+_output_is_owned = False
+
+# The request being handled by each thread
+_local = _threading.local()
+
+
+def is_tracing_enabled():
+    """Return whether or not tracing is enabled
+
+       Returns:
+            bool: Whether or not tracing is enabled
+    """
+    return _enabled
+
+
+def set_tracing_enabled(enabled):
+    """Enable or disable tracing
+
+       Args:
+            enabled (bool): Whether or not to enable tracing
+       Returns:
+            None
+    """
+    global _enabled
+    _enabled = bool(enabled)
+
+
+def set_trace_output(output=None):
+    """Write every span as a line of json to 'output', which is either
+       the name of a file (which is appended to) or a file-like object.
+       Pass None to stop writing spans. This can also be set using
+       the ACQUIRE_TRACE_FILE environment variable
+
+       Args:
+            output (str or file, default=None): Where to write spans
+       Returns:
+            None
+    """
+    global _output, _output_is_owned
+
+    with _lock:
+        if _output is not None and _output_is_owned:
+            try:
+                _output.close()
+            except Exception:
+                pass
+
+        if output is None:
+            _output = None
+            _output_is_owned = False
+        elif isinstance(output, str):
+            _output = open(output, "a")
+            _output_is_owned = True
+        else:
+            _output = output
+            _output_is_owned = False
+
+
+def start_trace_request(function=None):
+    """Record that this thread has started handling a request to call
+       'function'. All spans recorded by this thread until
+       end_trace_request is called are tagged with this request.
+       The function can be set later (e.g. once the request has
+       been unpacked) using set_trace_request_function
+    """
+    _local.request = (_os.urandom(6).hex(), function)
+
+
+def set_trace_request_function(function):
+    """Set the function called by the request that this thread is
+       handling, keeping the same request tag
+    """
+    request = getattr(_local, "request", None)
+
+    if request is not None:
+        _local.request = (request[0], function)
+
+
+def end_trace_request():
+    """Record that this thread has finished handling the request"""
+    _local.request = None
+
+
+def _get_stats(name):
+    """Internal function that returns the statistics for the span
+       called 'name'. This must be called while holding _lock
+    """
+    try:
+        return _statistics[name]
+    except KeyError:
+        stats = {"count": 0, "errors": 0, "total_ms": 0.0,
+                 "min_ms": None, "max_ms": 0.0, "bytes": 0,
+                 "histogram": [0] * (len(_histogram_bounds) + 1)}
+        _statistics[name] = stats
+        return stats
+
+
+class _Span:
+    """Internal class used to time a span of work, which is recorded
+       into the histogram for its name when it ends
+    """
+    __slots__ = ["_name", "_attributes", "_start", "nbytes"]
+
+    def __init__(self, name, attributes):
+        self._name = name
+        self._attributes = attributes
+        self.nbytes = 0
+
+    def __enter__(self):
+        self._start = _time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        duration = 1000.0 * (_time.perf_counter() - self._start)
+        _record(self._name, self._attributes, duration,
+                self.nbytes or 0, exc_type)
+        return False
+
+
+class _NullSpan:
+    """Internal class used in place of a span when tracing is disabled"""
+    __slots__ = ["nbytes"]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        return False
+
+
+def _record(name, attributes, duration, nbytes=0, exc_type=None):
+    """Internal function that records a span called 'name' that took
+       'duration' milliseconds and processed 'nbytes' bytes into
+       the histogram for 'name', and writes it to the trace output
+    """
+    with _lock:
+        stats = _get_stats(name)
+        stats["count"] += 1
+        stats["total_ms"] += duration
+        stats["bytes"] += nbytes
+
+        if exc_type is not None:
+            stats["errors"] += 1
+
+        if stats["min_ms"] is None or duration < stats["min_ms"]:
+            stats["min_ms"] = duration
+
+        if duration > stats["max_ms"]:
+            stats["max_ms"] = duration
+
+        stats["histogram"][_bisect.bisect_left(_histogram_bounds,
+                                               duration)] += 1
+
+    if _output is not None:
+        _write_span(name, attributes, duration, nbytes, exc_type)
+
+
+def _write_span(name, attributes, duration, nbytes, exc_type):
+    """Internal function that writes the span called 'name' as a line
+       of json to the trace output
+    """
+    record = {"name": name,
+              "time": _time.time(),
+              "duration_ms": round(duration, 3)}
+
+    request = getattr(_local, "request", None)
+
+    if request is not None:
+        record["request"] = request[0]
+        record["function"] = request[1]
+
+    if nbytes:
+        record["bytes"] = nbytes
+
+    if exc_type is not None:
+        record["error"] = exc_type.__name__
+
+    if attributes:
+        for (key, value) in attributes.items():
+            if value is not None:
+                record[key] = str(value)
+
+    line = _json.dumps(record)
+
+    with _lock:
+        if _output is not None:
+            try:
+                _output.write(line + "\n")
+                _output.flush()
+            except Exception:
+                pass
+
+
+def trace(name, **attributes):
+    """Return a context manager that times the work in its block as a
+       span called 'name', recording the latency (and the number of
+       bytes, which can be set using 'span.nbytes') into the histogram
+       for 'name'. Any 'attributes' are only written to the json lines
+       output, e.g.
+
+        with trace("objstore.get_object", bucket=bucket) as span:
+            data = get_object(bucket, key)
+            span.nbytes = len(data)
+    """
+    if not _enabled:
+        return _NullSpan()
+
+    return _Span(name, attributes)
+
+
+def get_trace_statistics(name=None):
+    """Return the statistics of all of the spans that have been traced,
+       indexed by span name (or just the statistics for the span called
+       'name' if this is passed). The statistics are the number of spans,
+       the number that raised errors, the total, mean, minimum and
+       maximum latency in milliseconds, the total number of bytes and
+       the latency histogram, which is a list of the upper bound of
+       each bucket in milliseconds (None for the last bucket) and
+       the number of spans in that bucket
+
+       Args:
+            name (str, default=None): Name of the span
+       Returns:
+            dict: Statistics for each span (or for the passed span)
+    """
+    bounds = _histogram_bounds + [None]
+
+    with _lock:
+        statistics = {}
+
+        for (key, stats) in _statistics.items():
+            stats = dict(stats)
+
+            if stats["count"] > 0:
+                stats["mean_ms"] = stats["total_ms"] / stats["count"]
+            else:
+                stats["mean_ms"] = 0.0
+
+            stats["histogram"] = [[bound, count] for (bound, count)
+                                  in zip(bounds, stats["histogram"])
+                                  if count > 0]
+
+            statistics[key] = stats
+
+    if name is not None:
+        return statistics.get(name, None)
+
+    return statistics
+
+
+def reset_trace_statistics():
+    """Reset the statistics of all traced spans"""
+    with _lock:
+        _statistics.clear()
+
+
+if _os.getenv("ACQUIRE_TRACE_FILE"):
+    set_trace_output(_os.getenv("ACQUIRE_TRACE_FILE"))
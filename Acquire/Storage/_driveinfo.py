@@ -250,9 +250,11 @@ class DriveInfo:
 
         return (filemeta, uploader)
 
-    def close_uploader(self, file_uid, secret):
+    def close_uploader(self, file_uid, secret, num_chunks=None):
         """Close the uploader associated with the passed file_uid,
-           authenticated using the passed secret
+           authenticated using the passed secret. If 'num_chunks' is
+           passed then this verifies that this many chunks have been
+           uploaded. The uploader is left open if any chunks are missing
         """
         from Acquire.ObjectStore import ObjectStore as _ObjectStore
         from Acquire.Service import get_service_account_bucket \
@@ -277,16 +279,6 @@ class DriveInfo:
                 "Invalid request - you do not have permission to "
                 "close this uploader")
 
-        try:
-            data2 = _ObjectStore.take_object_from_json(bucket, key)
-        except:
-            data2 = None
-
-        if data2 is None:
-            # someone else is already in the process of closing
-            # this uploader - let them do it!
-            return
-
         filename = data["filename"]
         version = data["version"]
 
@@ -296,9 +288,24 @@ class DriveInfo:
                                   filename=filename,
                                   version=version)
 
+        # this verifies that all of the chunks have arrived (they can
+        # arrive in any order), and raises if any are missing, in which
+        # case the uploader stays open so they can be re-sent
         file_key = data["filekey"]
         file_bucket = self._get_file_bucket(file_key)
-        fileinfo.close_uploader(file_bucket=file_bucket)
+        fileinfo.close_uploader(file_bucket=file_bucket,
+                                num_chunks=num_chunks)
+
+        try:
+            data2 = _ObjectStore.take_object_from_json(bucket, key)
+        except:
+            data2 = None
+
+        if data2 is None:
+            # someone else is already in the process of closing
+            # this uploader - let them do it!
+            return
+
         fileinfo.save()
 
     def close_downloader(self, downloader_uid, file_uid, secret):
@@ -383,9 +390,12 @@ class DriveInfo:
         data_key = "%s/data/%d" % (file_key, chunk_index)
         meta_key = "%s/meta/%d" % (file_key, chunk_index)
 
+        # write the data before the metadata, as the uploader is closed
+        # by counting the metadata. Chunks may be uploaded concurrently,
+        # so may arrive in any order
         from Acquire.ObjectStore import ObjectStore as _ObjectStore
-        _ObjectStore.set_object_from_json(file_bucket, meta_key, meta)
         _ObjectStore.set_object(file_bucket, data_key, chunk)
+        _ObjectStore.set_object_from_json(file_bucket, meta_key, meta)
 
     def download_chunk(self, file_uid, downloader_uid, chunk_index, secret):
         """Download a chunk of the file with UID 'file_uid' at chunk
@@ -802,11 +812,23 @@ class DriveInfo:
             # we need to load all of the metadata info for this file to
             # return to the user
             from Acquire.Storage import FileInfo as _FileInfo
+            from Acquire.ObjectStore import ObjectStoreBatchError \
+                as _ObjectStoreBatchError
+
+            # fetch all of the metadata in one concurrent batch, skipping
+            # any files whose metadata could not be read
+            try:
+                datas = _ObjectStore.get_objects_from_json(metadata_bucket,
+                                                           names)
+            except _ObjectStoreBatchError as e:
+                datas = e.results()
 
             for name in names:
+                if name not in datas:
+                    continue
+
                 try:
-                    data = _ObjectStore.get_object_from_json(metadata_bucket,
-                                                             name)
+                    data = datas[name]
                     fileinfo = _FileInfo.from_data(data,
                                                    identifiers=identifiers,
                                                    upstream=drive_acl)
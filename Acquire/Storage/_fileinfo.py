@@ -127,10 +127,13 @@ class VersionInfo:
         else:
             return False
 
-    def close_uploader(self, file_bucket):
+    def close_uploader(self, file_bucket, num_chunks=None):
         """Close the uploader. This will count the number of chunks,
            and will also create a checksum of all of the chunk's
-           checksums
+           checksums. Chunks may have been uploaded in any order, so
+           this verifies that every chunk from 0 up to the last chunk
+           (or up to 'num_chunks', if this is passed by the uploader)
+           has been received, raising a FileValidationError if not
         """
         if not self.is_uploading():
             return
@@ -144,19 +147,35 @@ class VersionInfo:
         meta_keys = {}
         for key in keys:
             idx = int(key.split("/")[-1])
-            meta_keys[idx] = key
+            meta_keys[idx] = "%s/%d" % (meta_root, idx)
+
+        if num_chunks is None:
+            nchunks = len(meta_keys)
+        else:
+            nchunks = int(num_chunks)
+
+        missing = []
+        for i in range(0, nchunks):
+            if i not in meta_keys:
+                missing.append(i)
+
+        if len(missing) > 0 or len(meta_keys) != nchunks:
+            from Acquire.Storage import FileValidationError
+            raise FileValidationError(
+                "Cannot close the uploader as the chunks have not all "
+                "been uploaded. Expected %d chunks, received %d. "
+                "Missing chunks: %s" % (nchunks, len(meta_keys), missing))
+
+        metas = _ObjectStore.get_objects_from_json(
+                        bucket=file_bucket,
+                        keys=[meta_keys[i] for i in range(0, nchunks)])
 
-        nchunks = len(keys)
         size = 0
-        from Acquire.Crypto import Hash as _Hash
         from hashlib import md5 as _md5
         md5 = _md5()
 
         for i in range(0, nchunks):
-            key = meta_keys[i]
-            meta = _ObjectStore.get_object_from_json(
-                            bucket=file_bucket, key="%s/%d" % (meta_root, i))
-
+            meta = metas[meta_keys[i]]
             size += meta["filesize"]
             md5.update(meta["checksum"].encode("utf-8"))
 
@@ -542,14 +561,17 @@ class FileInfo:
         else:
             return {self._latest_version.datetime(), self._latest_version}
 
-    def close_uploader(self, file_bucket):
-        """Close the uploader"""
+    def close_uploader(self, file_bucket, num_chunks=None):
+        """Close the uploader, verifying that all 'num_chunks' chunks
+           have been uploaded
+        """
         if self.is_null():
             return
         elif not self._latest_version.is_uploading():
             return
 
-        self._latest_version.close_uploader(file_bucket)
+        self._latest_version.close_uploader(file_bucket,
+                                            num_chunks=num_chunks)
 
     def is_uploading(self):
         """Return whether this version is still in the process of
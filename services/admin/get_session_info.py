@@ -4,15 +4,65 @@ from Acquire.Identity import LoginSession
 from Acquire.ObjectStore import datetime_to_string
 
 
+def _get_session_info(session_uid, scope=None, permissions=None):
+    """Internal function that returns the public information about
+       the login session with UID 'session_uid'
+    """
+    login_session = LoginSession.load(uid=session_uid, scope=scope,
+                                      permissions=permissions)
+
+    return _get_login_session_info(login_session)
+
+
+def _get_login_session_info(login_session):
+    """Internal function that returns the public information
+       about the passed login session
+    """
+    return_value = {}
+
+    # only send information if the user had logged in!
+    should_return_data = False
+
+    if login_session.is_approved():
+        should_return_data = True
+        return_value["public_key"] = login_session.public_key().to_data()
+
+    elif login_session.is_logged_out():
+        should_return_data = True
+        return_value["logout_datetime"] = \
+            datetime_to_string(login_session.logout_time())
+
+    if should_return_data:
+        return_value["public_cert"] = \
+            login_session.public_certificate().to_data()
+        return_value["scope"] = login_session.scope()
+        return_value["permissions"] = login_session.permissions()
+        return_value["user_uid"] = login_session.user_uid()
+
+    return_value["session_status"] = login_session.status()
+    return_value["login_message"] = login_session.login_message()
+
+    return return_value
+
+
 def run(args):
     """This function will allow anyone to obtain the public
-       keys for the passed login session
+       keys for the passed login session. If a list of 'session_uids'
+       is passed then this returns the information for all of these
+       sessions (indexed by session UID, in 'sessions'). The
+       information for any session that could not be loaded is
+       replaced by the error message, in 'errors'
     """
     try:
         session_uid = args["session_uid"]
     except:
         session_uid = None
 
+    try:
+        session_uids = args["session_uids"]
+    except:
+        session_uids = None
+
     try:
         short_uid = args["short_uid"]
     except:
@@ -28,6 +78,23 @@ def run(args):
     except:
         permissions = None
 
+    if session_uids is not None:
+        sessions = {}
+        errors = {}
+
+        for session_uid in session_uids:
+            session_uid = str(session_uid)
+
+            try:
+                sessions[session_uid] = _get_session_info(
+                                            session_uid=session_uid,
+                                            scope=scope,
+                                            permissions=permissions)
+            except Exception as e:
+                errors[session_uid] = str(e)
+
+        return {"sessions": sessions, "errors": errors}
+
     if session_uid:
         login_session = LoginSession.load(uid=session_uid, scope=scope,
                                           permissions=permissions)
@@ -48,28 +115,4 @@ def run(args):
                                           scope=scope,
                                           permissions=permissions)
 
-    return_value = {}
-
-    # only send information if the user had logged in!
-    should_return_data = False
-
-    if login_session.is_approved():
-        should_return_data = True
-        return_value["public_key"] = login_session.public_key().to_data()
-
-    elif login_session.is_logged_out():
-        should_return_data = True
-        return_value["logout_datetime"] = \
-            datetime_to_string(login_session.logout_time())
-
-    if should_return_data:
-        return_value["public_cert"] = \
-            login_session.public_certificate().to_data()
-        return_value["scope"] = login_session.scope()
-        return_value["permissions"] = login_session.permissions()
-        return_value["user_uid"] = login_session.user_uid()
-
-    return_value["session_status"] = login_session.status()
-    return_value["login_message"] = login_session.login_message()
-
-    return return_value
+    return _get_login_session_info(login_session)
@@ -0,0 +1,40 @@
+
+from Acquire.Service import get_this_service, get_trace_statistics, \
+    reset_trace_statistics
+from Acquire.Identity import Authorisation
+
+
+def run(args):
+    """Call this function to return the latency histograms and byte
+       counts of all of the spans (function calls, object store
+       operations, crypto operations, calls to other services etc.)
+       that have been traced by this instance of the service. The
+       statistics are reset afterwards if 'reset' is True
+
+       Args:
+            args (dict): contains authorisation details and the
+                         optional 'reset' flag
+       Returns:
+            dict: contains the statistics indexed by span name
+    """
+    try:
+        authorisation = Authorisation.from_data(args["authorisation"])
+    except:
+        raise PermissionError(
+            "Only an authorised admin can get the trace statistics")
+
+    service = get_this_service(need_private_access=True)
+    service.assert_admin_authorised(
+            authorisation, "get_trace_statistics %s" % service.uid())
+
+    statistics = get_trace_statistics()
+
+    try:
+        reset = bool(args["reset"])
+    except:
+        reset = False
+
+    if reset:
+        reset_trace_statistics()
+
+    return {"statistics": statistics}
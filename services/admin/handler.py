@@ -62,12 +62,21 @@ def _route_function(function, args, additional_functions=None):
     elif function == "admin/get_session_info":
         from admin.get_session_info import run as _get_session_info
         return _get_session_info(args)
+    elif function == "admin/get_trace_statistics":
+        from admin.get_trace_statistics import run as _get_trace_statistics
+        return _get_trace_statistics(args)
     elif function == "admin/login":
         from admin.login import run as _login
         return _login(args)
     elif function == "admin/logout":
         from admin.logout import run as _logout
         return _logout(args)
+    elif function == "admin/notify_logout":
+        from admin.notify_logout import run as _notify_logout
+        return _notify_logout(args)
+    elif function == "admin/purge_auth_once":
+        from admin.purge_auth_once import run as _purge_auth_once
+        return _purge_auth_once(args)
     elif function == "admin/recover_otp":
         from admin.recover_otp import run as _recover_otp
         return _recover_otp(args)
@@ -124,14 +133,15 @@ def _handle(function=None, additional_functions=None, args={}):
             function: the routed function
        """
 
-    from Acquire.Service import start_profile, end_profile
+    from Acquire.Service import start_profile, end_profile, trace
 
     pr = start_profile()
 
     # if function != "warm":
     #     one_hot_spare()
 
-    result = _route_function(function, args, additional_functions)
+    with trace("function/%s" % function):
+        result = _route_function(function, args, additional_functions)
 
     end_profile(pr, result)
 
@@ -163,35 +173,51 @@ def _base_handler(additional_functions=None, ctx=None, data=None, loop=None):
     from Acquire.Service import push_is_running_service, \
         pop_is_running_service, unpack_arguments, \
         get_service_private_key, pack_return_value, \
-        create_return_value
+        create_return_value, trace, start_trace_request, \
+        set_trace_request_function, end_trace_request
 
     push_is_running_service()
 
+    # the request is started before unpacking, so that all of the spans
+    # are tagged with it, and the function is added once it is known
+    start_trace_request()
+
     result = None
 
     try:
-        (function, args, keys) = unpack_arguments(data,
-                                                  get_service_private_key)
-    except Exception as e:
-        function = None
-        args = None
-        result = e
-        keys = None
-
-    if result is None:
         try:
-            result = _handle(function=function,
-                             additional_functions=additional_functions,
-                             args=args)
+            with trace("unpack_arguments") as span:
+                if data is not None:
+                    span.nbytes = len(data)
+                (function, args, keys) = unpack_arguments(
+                                                data, get_service_private_key)
         except Exception as e:
+            function = None
+            args = None
             result = e
+            keys = None
 
-    result = create_return_value(payload=result)
+        set_trace_request_function(function)
 
-    try:
-        result = pack_return_value(payload=result, key=keys)
-    except Exception as e:
-        result = pack_return_value(payload=create_return_value(e))
+        if result is None:
+            try:
+                result = _handle(function=function,
+                                 additional_functions=additional_functions,
+                                 args=args)
+            except Exception as e:
+                result = e
+
+        result = create_return_value(payload=result)
+
+        with trace("pack_return_value") as span:
+            try:
+                result = pack_return_value(payload=result, key=keys)
+            except Exception as e:
+                result = pack_return_value(payload=create_return_value(e))
+
+            span.nbytes = len(result)
+    finally:
+        end_trace_request()
 
     pop_is_running_service()
     return result
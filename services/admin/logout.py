@@ -1,5 +1,38 @@
 
-from Acquire.Identity import LoginSession, Authorisation
+from Acquire.Identity import LoginSession, Authorisation, \
+    invalidate_session_certificate
+from Acquire.ObjectStore import ObjectStore, string_to_bytes
+from Acquire.Service import Service, get_this_service, \
+    get_service_account_bucket
+
+
+def _notify_logout(session_uid):
+    """Tell all of the services trusted by this identity service that
+       the user has logged out of the session with UID 'session_uid',
+       so that they no longer use their cached copy of the session's
+       certificate. This is best-effort - services that cannot be
+       notified will see the logout once their cached copy expires
+    """
+    identity_uid = get_this_service().uid()
+
+    invalidate_session_certificate(identity_uid=identity_uid,
+                                   session_uid=session_uid)
+
+    args = {"identity_uid": identity_uid, "session_uid": session_uid}
+
+    bucket = get_service_account_bucket()
+
+    try:
+        datas = ObjectStore.get_all_objects_from_json(bucket, "_trusted/uid/")
+    except:
+        datas = {}
+
+    for data in datas.values():
+        try:
+            service = Service.from_data(data)
+            service.call_function(function="notify_logout", args=args)
+        except:
+            pass
 
 
 def run(args):
@@ -31,3 +64,5 @@ def run(args):
 
     login_session.set_logged_out(authorisation=authorisation,
                                  signature=signature)
+
+    _notify_logout(session_uid)
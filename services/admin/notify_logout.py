@@ -0,0 +1,26 @@
+
+from Acquire.Identity import invalidate_session_certificate
+
+
+def run(args):
+    """This function is called by an identity service to notify this
+       service that a user has logged out of a login session, so that
+       any cached information about that session is discarded. This
+       does not need to be authorised, as it only removes information
+       from the cache (which will be re-fetched from the identity
+       service when it is next needed)
+
+       Args:
+        args (dict): contains the UIDs of the identity service
+                     and the login session
+
+        Returns:
+            dict: empty dictionary
+    """
+    identity_uid = str(args["identity_uid"])
+    session_uid = str(args["session_uid"])
+
+    invalidate_session_certificate(identity_uid=identity_uid,
+                                   session_uid=session_uid)
+
+    return {}
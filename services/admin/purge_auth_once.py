@@ -0,0 +1,35 @@
+
+from Acquire.Service import get_this_service
+from Acquire.Identity import Authorisation
+
+
+def run(args):
+    """Call this function to remove the records of authorisations that
+       have been used on this service (which are used to prevent replay
+       attacks) that are older than 'stale_time' seconds. This is
+       authorised by a service admin
+
+       Args:
+            args (dict): contains authorisation details and the
+                         optional stale_time
+       Returns:
+            dict: contains the number of partitions that were removed
+    """
+    try:
+        authorisation = Authorisation.from_data(args["authorisation"])
+    except:
+        raise PermissionError(
+            "Only an authorised admin can purge the authorisation records")
+
+    service = get_this_service(need_private_access=True)
+    service.assert_admin_authorised(
+            authorisation, "purge_auth_once %s" % service.uid())
+
+    try:
+        stale_time = int(args["stale_time"])
+    except:
+        stale_time = 7200
+
+    npurged = Authorisation.purge_assert_once_records(stale_time=stale_time)
+
+    return {"num_purged": npurged}
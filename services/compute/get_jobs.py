@@ -0,0 +1,29 @@
+
+from Acquire.Compute import Cluster
+
+
+def run(args):
+    """This function gets the jobs with the specified UIDs in the
+       specified state, optionally changing them to a new state. This
+       returns the jobs that were fetched, plus the errors for the
+       jobs that could not be fetched, both indexed by UID
+    """
+
+    uids = [str(uid) for uid in args["uids"]]
+    passphrase = str(args["passphrase"])
+    start_state = str(args["start_state"])
+
+    try:
+        end_state = str(args["end_state"])
+    except:
+        end_state = None
+
+    cluster = Cluster.get_cluster()
+
+    (jobs, errors) = cluster.get_jobs(uids=uids, passphrase=passphrase,
+                                      start_state=start_state,
+                                      end_state=end_state)
+
+    jobs = {uid: job.to_data() for (uid, job) in jobs.items()}
+
+    return {"jobs": cluster.encrypt_data(jobs), "errors": errors}
@@ -8,9 +8,15 @@ def compute_functions(function, args):
     elif function == "get_job":
         from compute.get_job import run as _get_job
         return _get_job(args)
+    elif function == "get_jobs":
+        from compute.get_jobs import run as _get_jobs
+        return _get_jobs(args)
     elif function == "get_pending_job_uids":
         from compute.get_pending_job_uids import run as _get_job_uids
         return _get_job_uids(args)
+    elif function == "wait_for_jobs":
+        from compute.wait_for_jobs import run as _wait_for_jobs
+        return _wait_for_jobs(args)
     elif function == "set_cluster":
         from compute.set_cluster import run as _set_cluster
         return _set_cluster(args)
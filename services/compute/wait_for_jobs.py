@@ -0,0 +1,32 @@
+
+from Acquire.Compute import Cluster
+
+
+def run(args):
+    """This function waits for pending jobs, returning the UIDs of
+       the oldest pending jobs, which are leased to the caller
+    """
+    passphrase = str(args["passphrase"])
+
+    try:
+        max_jobs = int(args["max_jobs"])
+    except:
+        max_jobs = 1
+
+    try:
+        lease_time = int(args["lease_time"])
+    except:
+        lease_time = 300
+
+    try:
+        timeout = float(args["timeout"])
+    except:
+        timeout = 20
+
+    cluster = Cluster.get_cluster()
+
+    job_uids = cluster.wait_for_jobs(max_jobs=max_jobs,
+                                     lease_time=lease_time,
+                                     timeout=timeout, passphrase=passphrase)
+
+    return {"job_uids": cluster.encrypt_data(job_uids)}
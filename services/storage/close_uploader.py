@@ -9,8 +9,14 @@ def run(args):
     file_uid = str(args["file_uid"])
     secret = str(args["secret"])
 
+    try:
+        num_chunks = int(args["num_chunks"])
+    except:
+        num_chunks = None
+
     drive = DriveInfo(drive_uid=drive_uid)
 
-    drive.close_uploader(file_uid=file_uid, secret=secret)
+    drive.close_uploader(file_uid=file_uid, secret=secret,
+                         num_chunks=num_chunks)
 
     return True
@@ -1,6 +1,5 @@
 
 from Acquire.Storage import DriveInfo
-from Acquire.ObjectStore import bytes_to_string
 
 import json
 
@@ -29,7 +28,9 @@ def run(args):
     response = {}
 
     if data is not None:
-        response["chunk"] = bytes_to_string(data)
+        # the chunk is sent raw if the response is a binary frame,
+        # else it is sent as a base64-encoded string
+        response["chunk"] = data
         data = None
 
     if meta is not None:
@@ -10,7 +10,11 @@ def run(args):
     file_uid = str(args["file_uid"])
     chunk_idx = int(args["chunk_index"])
     secret = str(args["secret"])
-    data = string_to_bytes(args["data"])
+    data = args["data"]
+
+    if not isinstance(data, bytes):
+        # the data was sent as a base64-encoded string
+        data = string_to_bytes(data)
     checksum = str(args["checksum"])
 
     drive = DriveInfo(drive_uid=drive_uid)
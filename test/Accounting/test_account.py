@@ -5,7 +5,8 @@ import datetime
 
 from Acquire.Accounting import Account, Transaction, TransactionRecord, \
                                Accounts, Ledger, Receipt, Refund, \
-                               create_decimal, Balance
+                               create_decimal, Balance, \
+                               InsufficientFundsError
 
 from Acquire.Identity import Authorisation, ACLRule
 
@@ -232,6 +233,80 @@ def test_transactions(random_transaction, bucket):
     assert(starting_balance1.receivable() == ending_balance1.receivable())
 
 
+def test_batch_transactions(account1, account2, bucket, monkeypatch):
+    transactions = [Transaction(create_decimal(random.random()),
+                                "batch transaction %d" % i)
+                    for i in range(0, 20)]
+
+    total = create_decimal(0)
+    for transaction in transactions:
+        total += transaction.value()
+
+    starting_balance1 = account1.balance()
+    starting_balance2 = account2.balance()
+
+    resource = " ".join([t.fingerprint() for t in transactions])
+    authorisation = Authorisation(resource=resource,
+                                  testing_key=testing_key,
+                                  testing_user_guid=account1.group_name())
+
+    # the whole batch should be checked against one balance read, plus
+    # one re-check after the line items have been written
+    nbalances = {"count": 0}
+    balance = Account.balance
+
+    def counted_balance(self, *args, **kwargs):
+        nbalances["count"] += 1
+        return balance(self, *args, **kwargs)
+
+    monkeypatch.setattr(Account, "balance", counted_balance)
+
+    records = Ledger.perform(transactions=transactions,
+                             debit_account=account1,
+                             credit_account=account2,
+                             authorisation=authorisation,
+                             is_provisional=False,
+                             bucket=bucket)
+
+    monkeypatch.undo()
+
+    assert(nbalances["count"] == 2)
+    assert(len(records) == len(transactions))
+
+    for (record, transaction) in zip(records, transactions):
+        assert(record.transaction() == transaction)
+        assert(record.debit_account_uid() == account1.uid())
+        assert(record.credit_account_uid() == account2.uid())
+        assert(Ledger.load_transaction(record.uid(), bucket) == record)
+
+    assert(account1.balance().balance() ==
+           starting_balance1.balance() - total)
+    assert(account2.balance().balance() ==
+           starting_balance2.balance() + total)
+
+    # a batch that cannot be afforded must not debit anything
+    transactions = [transactions[0]] + \
+        [Transaction(create_decimal(999999), "large transaction %d" % i)
+         for i in range(0, 3)]
+    resource = " ".join([t.fingerprint() for t in transactions])
+    authorisation = Authorisation(resource=resource,
+                                  testing_key=testing_key,
+                                  testing_user_guid=account1.group_name())
+
+    starting_balance1 = account1.balance()
+    starting_balance2 = account2.balance()
+
+    with pytest.raises(InsufficientFundsError):
+        Ledger.perform(transactions=transactions,
+                       debit_account=account1,
+                       credit_account=account2,
+                       authorisation=authorisation,
+                       bucket=bucket)
+
+    assert(account1.balance() == starting_balance1)
+    assert(account2.balance() == starting_balance2)
+
+
 def test_pending_transactions(random_transaction):
     (transaction, account1, account2) = random_transaction
 
@@ -66,3 +66,80 @@ def test_authorisation(bucket):
         raise
 
     pop_is_running_service()
+
+
+def test_assert_once_purge(bucket):
+    from Acquire.ObjectStore import ObjectStore, get_datetime_now
+    from Acquire.Identity._authorisation import _get_auth_once_partition
+
+    push_is_running_service()
+
+    try:
+        key = get_private_key("testing")
+        auth = Authorisation(resource="purge", testing_key=key)
+        auth.assert_once()
+
+        # add records in an old partition and in the unpartitioned layout
+        partition = _get_auth_once_partition(get_datetime_now())
+        old_key = "auth_once/%d/old" % (partition - 10)
+        legacy_key = "auth_once/2000-01-01T00:00:00/legacy"
+        legacy_micro_key = "auth_once/2000-01-01T00:00:00.123456/legacy"
+        unknown_key = "auth_once/unknown/legacy"
+        ObjectStore.set_string_object(bucket, old_key, "old")
+        ObjectStore.set_string_object(bucket, legacy_key, "legacy")
+        ObjectStore.set_string_object(bucket, legacy_micro_key, "legacy")
+        ObjectStore.set_string_object(bucket, unknown_key, "legacy")
+
+        assert(Authorisation.purge_assert_once_records(bucket=bucket) == 3)
+
+        names = ObjectStore.get_all_object_names(bucket, "auth_once/")
+        assert(len(names) > 0)
+        assert(old_key not in names and legacy_key not in names)
+        assert(legacy_micro_key not in names)
+
+        # records whose time cannot be read are kept
+        assert(unknown_key in names)
+
+        # the current records are kept, so replays are still rejected
+        with pytest.raises(PermissionError):
+            auth.assert_once()
+    finally:
+        pop_is_running_service()
+
+
+def test_assert_once_legacy(bucket):
+    import datetime
+    from Acquire.ObjectStore import ObjectStore
+    import Acquire.Identity._authorisation as _authorisation
+
+    push_is_running_service()
+
+    try:
+        key = get_private_key("testing")
+
+        # an authorisation recorded before the records were partitioned
+        # cannot be replayed
+        auth = Authorisation(resource="legacy", testing_key=key)
+        ObjectStore.set_string_object(bucket, "auth_once/%s" % auth._uid,
+                                      "used")
+
+        with pytest.raises(PermissionError):
+            auth.assert_once()
+
+        # the old records are not checked once they would all be stale
+        name = ObjectStore.get_bucket_name(bucket)
+        partitioned = _authorisation._get_auth_once_partitioned(bucket)
+
+        try:
+            _authorisation._auth_once_partitioned[name] = \
+                partitioned - datetime.timedelta(seconds=7201)
+
+            auth = Authorisation(resource="legacy", testing_key=key)
+            auth.assert_once()
+
+            names = ObjectStore.get_all_object_names(bucket, "auth_once/")
+            assert("auth_once/%s" % auth._uid not in names)
+        finally:
+            _authorisation._auth_once_partitioned[name] = partitioned
+    finally:
+        pop_is_running_service()
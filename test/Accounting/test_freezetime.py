@@ -350,3 +350,85 @@ def test_parallel_transaction(account1, account2, bucket):
 
     assert(account1.balance() == start1 + total1)
     assert(account2.balance() == start2 + total2)
+
+
+def test_balance_snapshots(bucket):
+    if not have_freezetime:
+        return
+
+    from Acquire.ObjectStore import ObjectStore
+
+    with freeze_time(start_time) as _frozen_datetime:
+        push_is_running_service()
+        accounts = Accounts(user_guid=account1_user)
+        debit_account = Account(name="Snapshot Debit Account",
+                                description="Snapshot testing account",
+                                group_name=accounts.name())
+        debit_account.set_overdraft_limit(account1_overdraft_limit)
+        credit_account = Account(name="Snapshot Credit Account",
+                                 description="Snapshot testing account",
+                                 group_name=accounts.name())
+        pop_is_running_service()
+
+    now = get_datetime_now()
+    random_dates = []
+
+    for i in range(0, 20):
+        r = start_time + random.random() * (now - start_time)
+
+        while (r.minute == 59 and r.second >= 58) or \
+              (r.minute == 0 and r.second == 0 and r.microsecond < 10):
+            r = r + datetime.timedelta(seconds=1)
+
+        random_dates.append(r)
+
+    random_dates.sort()
+
+    total = create_decimal(0)
+    expected = []
+
+    for (i, transaction_time) in enumerate(random_dates):
+        with freeze_time(transaction_time) as _frozen_datetime:
+            transaction = Transaction(25*random.random(),
+                                      "snapshot transaction %d" % i)
+
+            auth = Authorisation(
+                        resource=transaction.fingerprint(),
+                        testing_key=testing_key,
+                        testing_user_guid=debit_account.group_name())
+
+            Ledger.perform(transaction=transaction,
+                           debit_account=debit_account,
+                           credit_account=credit_account,
+                           authorisation=auth, bucket=bucket)
+
+            total += transaction.value()
+            expected.append((transaction_time, total))
+
+    def check_balances(account):
+        for (transaction_time, value) in expected:
+            later = transaction_time + datetime.timedelta(seconds=1)
+            assert(account.balance(now=later) == Balance(balance=value))
+
+        assert(account.balance() == Balance(balance=total))
+
+    # the balance is calculated via the hourly, daily and monthly snapshots
+    credit_account = Account(uid=credit_account.uid())
+    check_balances(credit_account)
+
+    monthly_keys = ObjectStore.get_all_object_names(
+                        bucket, credit_account._monthly_balance_key())
+    assert(len(monthly_keys) > 0)
+
+    # remove all of the snapshots and then backfill the monthly snapshots
+    for key in [credit_account._balance_key(),
+                credit_account._daily_balance_key(),
+                credit_account._monthly_balance_key()]:
+        for name in ObjectStore.get_all_object_names(bucket, key):
+            ObjectStore.delete_object(bucket, "%s/%s" % (key, name))
+
+    credit_account = Account(uid=credit_account.uid())
+    nsnapshots = credit_account.backfill_balance_snapshots(bucket=bucket)
+    assert(nsnapshots >= len(monthly_keys))
+
+    check_balances(credit_account)
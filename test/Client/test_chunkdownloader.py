@@ -0,0 +1,81 @@
+import io
+import threading
+import time
+
+import pytest
+
+from Acquire.Client import ChunkDownloader
+
+
+class _FakeDownloader(ChunkDownloader):
+    """ChunkDownloader that downloads 'num_chunks' chunks from
+       memory, recording which chunks were requested
+    """
+    def __init__(self, num_chunks, fail_index=None, missing_index=None):
+        super().__init__(drive_uid="drive", file_uid="file",
+                         max_in_flight=4)
+        self._num_chunks = num_chunks
+        self._fail_index = fail_index
+        self._missing_index = missing_index
+        self._lock = threading.Lock()
+        self.requested = []
+        self.closed = False
+
+        self._next_index = 0
+        self._FILE = io.BytesIO()
+
+    def _download_chunk(self, chunk_index):
+        with self._lock:
+            self.requested.append(chunk_index)
+
+        if chunk_index == self._fail_index:
+            raise ConnectionError("Chunk %d failed" % chunk_index)
+        elif chunk_index == self._missing_index:
+            # this chunk has not been uploaded yet
+            return (None, None)
+        elif chunk_index >= self._num_chunks:
+            raise IndexError("There is no chunk %d" % chunk_index)
+
+        return (b"%d," % chunk_index, self._num_chunks)
+
+    def _write_chunk(self, chunk, num_chunks):
+        # a slow disk gives the prefetches time to start
+        time.sleep(0.01)
+        return super()._write_chunk(chunk, num_chunks)
+
+    def close(self):
+        self.closed = True
+        self._next_index = None
+
+
+def test_download_prefetched():
+    downloader = _FakeDownloader(num_chunks=6)
+    downloader._download_prefetched()
+
+    assert(downloader.closed)
+    assert(downloader._FILE.getvalue() == b"0,1,2,3,4,5,")
+
+    # nothing is requested past the end of the file once the
+    # number of chunks is known
+    assert(sorted(downloader.requested) == [0, 1, 2, 3, 4, 5])
+
+
+def test_download_prefetched_errors():
+    # errors in prefetched chunks are raised, not swallowed
+    downloader = _FakeDownloader(num_chunks=6, fail_index=2)
+
+    with pytest.raises(ConnectionError):
+        downloader._download_prefetched()
+
+    assert(not downloader.closed)
+    assert(downloader._FILE.getvalue() == b"0,1,")
+
+    # this includes chunks prefetched after a chunk that is not
+    # yet available
+    downloader = _FakeDownloader(num_chunks=6, missing_index=2,
+                                 fail_index=3)
+
+    with pytest.raises(ConnectionError):
+        downloader._download_prefetched()
+
+    assert(downloader._FILE.getvalue() == b"0,1,")
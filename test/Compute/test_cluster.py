@@ -0,0 +1,84 @@
+import pytest
+
+from Acquire.Compute import Cluster
+from Acquire.ObjectStore import ObjectStore, create_uuid, list_to_string
+from Acquire.Service import get_service_account_bucket, \
+    push_is_running_service, pop_is_running_service
+
+
+@pytest.fixture
+def bucket(tmpdir_factory):
+    d = tmpdir_factory.mktemp("objstore")
+    push_is_running_service()
+    bucket = get_service_account_bucket(str(d))
+    pop_is_running_service()
+    return bucket
+
+
+def _submit_job(cluster, uid):
+    """Save a (minimal) ComputeJob with UID 'uid' and submit it
+       to the pending pool of 'cluster'
+    """
+    job = {"uid": uid, "credit_notes": list_to_string([]), "par": {},
+           "secret": "secret", "request": {}}
+    ObjectStore.set_object_from_json(get_service_account_bucket(),
+                                     "compute/job/%s" % uid, job)
+    cluster.submit_job(uid)
+
+
+def test_get_jobs(bucket):
+    push_is_running_service()
+
+    try:
+        cluster = Cluster()
+        cluster._uid = create_uuid()
+        cluster._secret = "secret"
+
+        uids = [create_uuid() for _ in range(3)]
+
+        for uid in uids:
+            _submit_job(cluster, uid)
+
+        assert(sorted(cluster.get_pending_job_uids(
+            passphrase=cluster.passphrase("get_pending_job_uids"))) ==
+            sorted(uids))
+
+        def _get_jobs(uids, start_state, end_state=None):
+            if end_state is None:
+                resource = "get_jobs %s %s" % (",".join(uids), start_state)
+            else:
+                resource = "get_jobs %s %s->%s" % (",".join(uids),
+                                                   start_state, end_state)
+
+            return cluster.get_jobs(uids, start_state=start_state,
+                                    end_state=end_state,
+                                    passphrase=cluster.passphrase(resource))
+
+        # the passphrase must match the requested jobs
+        with pytest.raises(PermissionError):
+            cluster.get_jobs(uids, passphrase="wrong")
+
+        # move all of the jobs in one call, reporting failure for
+        # the job that doesn't exist
+        (jobs, errors) = _get_jobs(uids + ["missing"], "pending",
+                                   "submitting")
+
+        assert(sorted(jobs.keys()) == sorted(uids))
+        assert(list(errors.keys()) == ["missing"])
+
+        for (uid, job) in jobs.items():
+            assert(job.uid() == uid)
+
+        # the jobs have moved, so cannot be moved again
+        (jobs, errors) = _get_jobs(uids, "pending", "submitting")
+        assert(len(jobs) == 0)
+        assert(sorted(errors.keys()) == sorted(uids))
+
+        (jobs, errors) = _get_jobs(uids, "submitting")
+        assert(sorted(jobs.keys()) == sorted(uids))
+        assert(len(errors) == 0)
+
+        assert(cluster.get_pending_job_uids(
+            passphrase=cluster.passphrase("get_pending_job_uids")) == [])
+    finally:
+        pop_is_running_service()
@@ -0,0 +1,112 @@
+
+import datetime
+import pytest
+import threading
+import time
+
+from Acquire.Compute._jobqueue import JobQueue
+from Acquire.ObjectStore import ObjectStore, get_datetime_now, \
+    create_uuid
+from Acquire.Service import get_service_account_bucket, \
+    push_is_running_service, pop_is_running_service
+
+
+@pytest.fixture
+def bucket(tmpdir_factory):
+    d = tmpdir_factory.mktemp("objstore")
+    push_is_running_service()
+    bucket = get_service_account_bucket(str(d))
+    pop_is_running_service()
+    return bucket
+
+
+def test_jobqueue(bucket):
+    now = get_datetime_now()
+
+    # push the jobs out of order - they are claimed oldest first
+    uids = [create_uuid(include_date=now) for _ in range(5)]
+
+    for i in [3, 0, 4, 1, 2]:
+        JobQueue.push(bucket, uids[i],
+                      now + datetime.timedelta(seconds=i))
+
+    claimed = JobQueue.claim(bucket, max_jobs=2)
+    assert(claimed == uids[0:2])
+
+    # claimed jobs are moved out of the queue into leases
+    names = ObjectStore.get_all_object_names(bucket, "compute/queue/")
+    assert(len(names) == 3)
+    leases = ObjectStore.get_all_object_names(bucket, "compute/leases/")
+    assert(len(leases) == 2)
+
+    # leased jobs cannot be claimed again until the lease expires
+    claimed = JobQueue.claim(bucket, max_jobs=10, lease_time=0)
+    assert(claimed == uids[2:5])
+    assert(ObjectStore.get_all_object_names(bucket, "compute/queue/") == [])
+
+    # expired leases are claimed again (in the order that they expired),
+    # while live leases are skipped without being read
+    claimed = JobQueue.claim(bucket, max_jobs=10, lease_time=0)
+    assert(sorted(claimed) == sorted(uids[2:5]))
+
+    # jobs that are no longer pending have their leases removed
+    claimed = JobQueue.claim(bucket, max_jobs=10, lease_time=0,
+                             is_pending=lambda uid: uid == uids[4])
+    assert(claimed == uids[4:5])
+
+    leases = ObjectStore.get_all_object_names(bucket, "compute/leases/",
+                                              without_prefix=True)
+    assert(len(leases) == 3)
+    assert(sorted(lease.split("/", 1)[1] for lease in leases) ==
+           sorted(uids[0:2] + uids[4:5]))
+
+    # removing a job removes it from the queue
+    uid = create_uuid()
+    key = JobQueue.push(bucket, uid)
+    JobQueue.remove(bucket, uid, key)
+    assert(ObjectStore.get_all_object_names(bucket, "compute/queue/") == [])
+    assert(JobQueue.claim(bucket, max_jobs=10, lease_time=0) == uids[4:5])
+
+    # a job is only claimed by one of many concurrent pollers
+    pushed = [create_uuid() for _ in range(10)]
+
+    for uid in pushed:
+        JobQueue.push(bucket, uid)
+
+    results = []
+
+    def _claim():
+        results.append(JobQueue.claim(bucket, max_jobs=10))
+
+    threads = [threading.Thread(target=_claim) for _ in range(4)]
+
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    claimed = [uid for result in results for uid in result]
+    assert(sorted(claimed) == sorted(pushed + uids[4:5]))
+
+
+def test_wait_for_jobs(bucket):
+    start = time.monotonic()
+    assert(JobQueue.wait(bucket, timeout=0.5, poll_interval=0.1) == [])
+    assert(time.monotonic() - start >= 0.5)
+
+    uid = create_uuid()
+
+    def _push():
+        time.sleep(0.3)
+        JobQueue.push(bucket, uid)
+
+    thread = threading.Thread(target=_push)
+    thread.start()
+
+    start = time.monotonic()
+    claimed = JobQueue.wait(bucket, timeout=10, poll_interval=0.1)
+    thread.join()
+
+    assert(claimed == [uid])
+    assert(time.monotonic() - start < 5)
@@ -94,3 +94,47 @@ def test_keys():
     assert(symkey == symkey2)
 
     assert(long_message == symkey2.decrypt(c))
+
+
+def test_session_keys():
+    import Acquire.Crypto._keys as _keys
+    from Acquire.Crypto import DecryptionError
+
+    privkey = PrivateKey()
+    pubkey = privkey.public_key()
+
+    messages = ["Hello World", b"\x00\x01\xff", os.urandom(100000)]
+
+    header_size = len(_keys._session_magic) + privkey.key_size_in_bytes()
+    headers = set()
+
+    for message in messages:
+        c = pubkey.encrypt(message, use_session_key=True)
+        headers.add(c[0:header_size])
+        assert(privkey.decrypt(c) == message)
+
+        # messages encrypted without a session key can still be decrypted
+        c = pubkey.encrypt(message)
+        assert(privkey.decrypt(c) == message)
+
+    # all messages share the same session key
+    assert(len(headers) == 1)
+
+    # the session key is regenerated after the maximum number of messages
+    for _ in range(_keys._max_session_messages):
+        c = pubkey.encrypt("Hello World", use_session_key=True)
+        headers.add(c[0:header_size])
+
+    assert(len(headers) == 2)
+    assert(privkey.decrypt(c) == "Hello World")
+
+    # the ciphertext is authenticated
+    c = bytearray(c)
+    c[-1] ^= 1
+
+    with pytest.raises(DecryptionError):
+        privkey.decrypt(bytes(c))
+
+    # only the matching private key can decrypt the message
+    with pytest.raises(DecryptionError):
+        PrivateKey().decrypt(pubkey.encrypt("Hello", use_session_key=True))
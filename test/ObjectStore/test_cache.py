@@ -0,0 +1,160 @@
+import time
+import pytest
+
+from Acquire.ObjectStore import ObjectStore, ObjectStoreCache, \
+    ObjectStoreError, enable_object_store_cache, \
+    disable_object_store_cache, get_object_store_cache
+from Acquire.Service import get_service_account_bucket, \
+    push_is_running_service, pop_is_running_service
+
+
+@pytest.fixture(scope="module")
+def bucket(tmpdir_factory):
+    d = tmpdir_factory.mktemp("objstore_cache")
+    push_is_running_service()
+    bucket = get_service_account_bucket(str(d))
+    pop_is_running_service()
+    return bucket
+
+
+def test_cache_eviction():
+    cache = ObjectStoreCache(max_size=100, max_object_size=50,
+                             ttl=60, prefix_ttls={"short/": 0.1,
+                                                  "never/": 0})
+
+    cache.set("bucket", "a", b"x" * 40)
+    cache.set("bucket", "b", b"x" * 40)
+
+    assert(cache.get("bucket", "a") == b"x" * 40)
+
+    # this should evict 'b', as 'a' was used more recently
+    cache.set("bucket", "c", b"x" * 40)
+
+    assert(cache.get("bucket", "b") is None)
+    assert(cache.get("bucket", "a") is not None)
+    assert(cache.get("bucket", "c") is not None)
+
+    # objects that are too large are never cached
+    cache.set("bucket", "d", b"x" * 60)
+    assert(cache.get("bucket", "d") is None)
+
+    cache.set("bucket", "never/a", b"x")
+    assert(cache.get("bucket", "never/a") is None)
+
+    cache.set("bucket", "short//a", b"x")
+    assert(cache.get("bucket", "short/a") == b"x")
+    time.sleep(0.15)
+    assert(cache.get("bucket", "short/a") is None)
+
+    stats = cache.statistics()
+    assert(stats["evictions"] == 1)
+    assert(stats["expirations"] == 1)
+    assert(stats["size"] <= 100)
+    assert(stats["hits"] == 4)
+
+
+def test_cache_generation(monkeypatch):
+    import Acquire.ObjectStore._cache as _cache
+
+    cache = ObjectStoreCache()
+
+    # data read before a key was invalidated is not cached
+    generation = cache.generation()
+    cache.invalidate("bucket", key="a")
+    cache.set("bucket", "a", b"old", generation=generation)
+    assert(cache.get("bucket", "a") is None)
+
+    cache.set("bucket", "b", b"b", generation=generation)
+    assert(cache.get("bucket", "b") == b"b")
+
+    generation = cache.generation()
+    cache.set("bucket", "a", b"new", generation=generation)
+    assert(cache.get("bucket", "a") == b"new")
+
+    # invalidating a prefix stops all reads in progress being cached
+    cache.invalidate("bucket", prefix="x/")
+    cache.set("bucket", "c", b"c", generation=generation)
+    assert(cache.get("bucket", "c") is None)
+
+    # as does recording too many invalidated keys
+    monkeypatch.setattr(_cache, "_max_invalidated", 2)
+    generation = cache.generation()
+
+    for key in ["d", "e", "f"]:
+        cache.invalidate("bucket", key=key)
+
+    cache.set("bucket", "g", b"g", generation=generation)
+    assert(cache.get("bucket", "g") is None)
+
+
+def test_cache_concurrent_write(bucket, monkeypatch):
+    import Acquire.ObjectStore._objstore as _objstore
+
+    backend = _objstore._objstore_backend
+    get_object = backend.get_object
+
+    def _get_then_set(bucket, key):
+        # the object is set after it has been read, but before the
+        # read has been cached
+        data = get_object(bucket, key)
+        monkeypatch.setattr(backend, "get_object", get_object)
+        ObjectStore.set_object(bucket, key, b"new")
+        return data
+
+    enable_object_store_cache()
+
+    try:
+        ObjectStore.set_object(bucket, "cached/race", b"old")
+        monkeypatch.setattr(backend, "get_object", _get_then_set)
+
+        assert(ObjectStore.get_object(bucket, "cached/race") == b"old")
+        assert(ObjectStore.get_object(bucket, "cached/race") == b"new")
+    finally:
+        disable_object_store_cache()
+
+
+def test_read_through_cache(bucket):
+    assert(get_object_store_cache() is None)
+
+    cache = enable_object_store_cache()
+
+    try:
+        ObjectStore.set_object_from_json(bucket, "cached/a", {"a": 1})
+
+        assert(ObjectStore.get_object_from_json(bucket, "cached/a") ==
+               {"a": 1})
+        assert(ObjectStore.get_object_from_json(bucket, "cached/a") ==
+               {"a": 1})
+
+        stats = cache.statistics()
+        assert(stats["misses"] == 1)
+        assert(stats["hits"] == 1)
+
+        # writing through the ObjectStore invalidates the cached copy
+        ObjectStore.set_object_from_json(bucket, "cached/a", {"a": 2})
+        assert(ObjectStore.get_object_from_json(bucket, "cached/a") ==
+               {"a": 2})
+
+        assert(ObjectStore.take_object_from_json(bucket, "cached/a") ==
+               {"a": 2})
+
+        with pytest.raises(ObjectStoreError):
+            ObjectStore.get_object(bucket, "cached/a")
+
+        ObjectStore.set_objects(bucket, {"cached/b": b"b", "cached/c": b"c"})
+        assert(ObjectStore.get_object(bucket, "cached/b") == b"b")
+
+        results = ObjectStore.get_objects(bucket, ["cached/b", "cached/c"])
+        assert(results == {"cached/b": b"b", "cached/c": b"c"})
+
+        ObjectStore.delete_object(bucket, "cached/b")
+
+        with pytest.raises(ObjectStoreError):
+            ObjectStore.get_object(bucket, "cached/b")
+
+        ObjectStore.delete_all_objects(bucket, "cached")
+        assert(cache.statistics()["count"] == 0)
+    finally:
+        disable_object_store_cache()
+
+    assert(get_object_store_cache() is None)
@@ -0,0 +1,172 @@
+
+import io
+
+import pytest
+
+from Acquire.ObjectStore import ObjectStoreError
+from Acquire.ObjectStore._oci_objstore import OCI_ObjectStore
+from Acquire.ObjectStore._gcp_objstore import GCP_ObjectStore
+
+_names = ["drive/%03d" % i for i in range(0, 23)] + ["other/1"]
+
+# an object stored in segments
+_segments = {"big/1": b"a" * 1000, "big/2": b"b" * 10, "big/3": b"c",
+             "big/5": b"not contiguous", "big/x": b"not a segment"}
+
+
+class _Result:
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class _OCIClient:
+    """Fake OCI client that returns at most 10 names per request,
+       whatever limit is requested
+    """
+    def __init__(self):
+        self.requests = 0
+
+    def list_objects(self, namespace, bucket_name, prefix=None, start=None,
+                     end=None, limit=1000, fields=None):
+        self.requests += 1
+        assert(fields == "name")
+
+        names = [n for n in sorted(_names + list(_segments.keys()))
+                 if (prefix is None or n.startswith(prefix))
+                 and (start is None or n >= start)
+                 and (end is None or n < end)]
+
+        limit = min(limit, 10)
+        page = [_Result(name=n) for n in names[0:limit]]
+
+        if len(names) > limit:
+            next_start_with = names[limit]
+        else:
+            next_start_with = None
+
+        return _Result(data=_Result(objects=page,
+                                    next_start_with=next_start_with))
+
+    def get_object(self, namespace, bucket_name, key):
+        data = _segments[key]
+
+        def stream(chunk_size, decode_content=False):
+            for i in range(0, len(data), chunk_size):
+                yield data[i:i+chunk_size]
+
+        return _Result(data=_Result(raw=_Result(stream=stream)),
+                       headers={"etag": "1"})
+
+    def put_object(self, namespace, bucket_name, key, fileobj,
+                   content_length=None):
+        _segments[key] = fileobj.read()
+        assert(len(_segments[key]) == content_length)
+
+
+class _GCPBucket:
+    """Fake GCP bucket that returns the listing in pages"""
+    def __init__(self):
+        self.page_sizes = []
+
+    def list_blobs(self, prefix=None, start_offset=None, end_offset=None,
+                   page_size=None, fields=None):
+        self.page_sizes.append(page_size)
+        assert("nextPageToken" in fields)
+
+        names = [_Result(name=n) for n in _names
+                 if prefix is None or n.startswith(prefix)]
+
+        pages = [names[i:i+page_size] for i in
+                 range(0, len(names), page_size)]
+
+        return _Result(pages=pages)
+
+
+class _Blob:
+    def __init__(self, key, chunk_size=None):
+        self.key = key
+        self.chunk_size = chunk_size
+
+    def download_as_string(self):
+        return _segments[self.key]
+
+    def open(self, mode, chunk_size=None):
+        return io.BytesIO(_segments[self.key])
+
+    def upload_from_file(self, fileobj, size=None):
+        _segments[self.key] = fileobj.read()
+
+
+_GCPBucket.blob = lambda self, key, chunk_size=None: _Blob(key, chunk_size)
+
+
+def test_oci_paged_listing():
+    client = _OCIClient()
+    bucket = {"client": client, "namespace": "ns", "bucket_name": "test"}
+
+    names = OCI_ObjectStore.get_all_object_names(bucket, "drive")
+    assert(names == _names[0:23])
+    assert(client.requests == 3)
+
+    names = OCI_ObjectStore.get_all_object_names(bucket, "drive/",
+                                                 without_prefix=True,
+                                                 page_size=5)
+    assert(names == ["%03d" % i for i in range(0, 23)])
+
+    assert(OCI_ObjectStore.count_objects(bucket, "drive") == 23)
+
+
+def test_oci_streaming():
+    bucket = {"client": _OCIClient(), "namespace": "ns",
+              "bucket_name": "test"}
+
+    # the segments are fetched concurrently, but yielded in order
+    chunks = list(OCI_ObjectStore.get_object_stream(bucket, "big"))
+    assert(chunks == [_segments["big/1"], _segments["big/2"], b"c"])
+    assert(OCI_ObjectStore.get_object(bucket, "big") == b"".join(chunks))
+
+    with pytest.raises(ObjectStoreError):
+        OCI_ObjectStore.get_object(bucket, "missing")
+
+    OCI_ObjectStore.set_object_stream(bucket, "small",
+                                      io.BytesIO(b"x" * 5000))
+
+    try:
+        chunks = list(OCI_ObjectStore.get_object_stream(bucket, "small"))
+        assert(b"".join(chunks) == b"x" * 5000)
+    finally:
+        del _segments["small"]
+
+
+def test_gcp_paged_listing():
+    gcp_bucket = _GCPBucket()
+    bucket = {"bucket": gcp_bucket}
+
+    names = GCP_ObjectStore.get_all_object_names(bucket, "drive",
+                                                 page_size=7)
+    assert(names == _names[0:23])
+    assert(gcp_bucket.page_sizes == [7])
+
+    assert(GCP_ObjectStore.count_objects(bucket, "drive/") == 23)
+
+
+def test_gcp_streaming():
+    bucket = {"bucket": _GCPBucket()}
+    bucket["bucket"].list_blobs = lambda **kwargs: _Result(pages=[
+        [_Result(name=n) for n in sorted(_segments.keys())
+         if n.startswith(kwargs["prefix"])]])
+
+    chunks = list(GCP_ObjectStore.get_object_stream(bucket, "big"))
+    assert(chunks == [_segments["big/1"], _segments["big/2"], b"c"])
+    assert(GCP_ObjectStore.get_object(bucket, "big") == b"".join(chunks))
+
+    with pytest.raises(ObjectStoreError):
+        GCP_ObjectStore.get_object(bucket, "missing")
+
+    GCP_ObjectStore.set_object_stream(bucket, "small", io.BytesIO(b"y" * 10))
+
+    try:
+        assert(list(GCP_ObjectStore.get_object_stream(bucket, "small")) ==
+               [b"y" * 10])
+    finally:
+        del _segments["small"]
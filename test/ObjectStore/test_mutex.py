@@ -1,5 +1,6 @@
 
-from Acquire.ObjectStore import Mutex, MutexTimeoutError
+from Acquire.ObjectStore import Mutex, MutexTimeoutError, \
+    get_mutex_statistics, reset_mutex_statistics
 from Acquire.Service import get_service_account_bucket, \
     push_is_running_service, pop_is_running_service
 
@@ -86,4 +87,64 @@ def test_mutex(bucket):
         pop_is_running_service()
         raise
 
-    pop_is_running_service()
\ No newline at end of file
+    pop_is_running_service()
+
+
+def test_mutex_renew_and_statistics(bucket):
+    reset_mutex_statistics()
+
+    m = Mutex("ObjectStore.test_mutex_renew", bucket=bucket,
+              lease_time=0.5, auto_renew=True)
+
+    # the lease is renewed in the background, so is still held
+    time.sleep(1.2)
+    assert(m.is_locked())
+    assert(not m.expired())
+
+    with pytest.raises(MutexTimeoutError):
+        Mutex("ObjectStore.test_mutex_renew", bucket=bucket, timeout=0.2)
+
+    m.unlock()
+    assert(not m.is_locked())
+
+    m2 = Mutex("ObjectStore.test_mutex_renew", bucket=bucket, timeout=0.2)
+    assert(m2.is_locked())
+    m2.renew_lease(lease_time=5)
+    assert(m2.seconds_remaining_on_lease() >= 4)
+    m2.unlock()
+
+    stats = get_mutex_statistics("ObjectStore.test_mutex_renew")
+    assert(stats["acquisitions"] == 2)
+    assert(stats["timeouts"] == 1)
+    assert(stats["attempts"] > 3)
+
+
+def test_fair_mutex(bucket):
+    from threading import Thread
+
+    m = Mutex("ObjectStore.test_fair_mutex", bucket=bucket, fair=True)
+
+    order = []
+
+    def wait_for_mutex(i):
+        mutex = Mutex("ObjectStore.test_fair_mutex", bucket=bucket,
+                      fair=True, timeout=20)
+        order.append(i)
+        mutex.unlock()
+
+    threads = []
+
+    for i in range(0, 4):
+        thread = Thread(target=wait_for_mutex, args=[i])
+        thread.start()
+        threads.append(thread)
+        # make sure that each waiter has taken its ticket
+        time.sleep(0.1)
+
+    m.unlock()
+
+    for thread in threads:
+        thread.join()
+
+    # the waiters were served in the order that they started waiting
+    assert(order == [0, 1, 2, 3])
@@ -1,7 +1,8 @@
 
 import pytest
 
-from Acquire.ObjectStore import ObjectStore, ObjectStoreError
+from Acquire.ObjectStore import ObjectStore, ObjectStoreError, \
+    ObjectStorePreconditionError
 from Acquire.Service import get_service_account_bucket, \
     push_is_running_service, pop_is_running_service, \
     is_running_service
@@ -95,3 +96,303 @@ def test_objstore(bucket):
     test_value2 = ObjectStore.get_string_object(new_bucket2, test_key)
 
     assert(test_value == test_value2)
+
+
+def test_get_set_objects(bucket):
+    from Acquire.ObjectStore import ObjectStoreBatchError
+
+    batch_bucket = ObjectStore.get_bucket(bucket, "batch_bucket",
+                                          create_if_needed=True)
+
+    objects = {}
+
+    for i in range(0, 50):
+        objects["batch/%03d" % i] = ("Object %d ∂∂∂" % i).encode("utf-8")
+
+    ObjectStore.set_objects(batch_bucket, objects)
+
+    results = ObjectStore.get_objects(batch_bucket, objects.keys())
+
+    assert(results == objects)
+    assert(ObjectStore.get_all_objects(batch_bucket, "batch/") == objects)
+
+    data = {"a": {"cat": "mieow"}, "b": {"dog": "woof"}}
+
+    ObjectStore.set_objects_from_json(batch_bucket, data)
+
+    assert(ObjectStore.get_objects_from_json(batch_bucket,
+                                             ["a", "b"]) == data)
+
+    keys = ["batch/000", "missing/1", "batch/001", "missing/2"]
+
+    with pytest.raises(ObjectStoreBatchError) as e:
+        ObjectStore.get_objects(batch_bucket, keys)
+
+    assert(sorted(e.value.errors().keys()) == ["missing/1", "missing/2"])
+    assert(sorted(e.value.results().keys()) == ["batch/000", "batch/001"])
+
+    for error in e.value.errors().values():
+        assert(isinstance(error, ObjectStoreError))
+
+
+def test_iter_object_names(bucket):
+    iter_bucket = ObjectStore.get_bucket(bucket, "iter_bucket",
+                                         create_if_needed=True)
+
+    keys = []
+
+    for i in range(0, 25):
+        key = "iter/%02d" % i
+        ObjectStore.set_string_object(iter_bucket, key, "value %d" % i)
+        keys.append(key)
+
+    ObjectStore.set_string_object(iter_bucket, "other", "other")
+
+    names = list(ObjectStore.iter_object_names(iter_bucket, "iter",
+                                               page_size=7))
+    assert(names == keys)
+
+    names = list(ObjectStore.iter_object_names(iter_bucket, "iter",
+                                               start_after="iter/09",
+                                               end_before="iter/15",
+                                               page_size=2))
+    assert(names == keys[10:15])
+
+    names = list(ObjectStore.iter_object_names(iter_bucket, "iter/",
+                                               page_size=10,
+                                               without_prefix=True))
+    assert(names == ["%02d" % i for i in range(0, 25)])
+
+    # the iterator can be stopped early
+    it = ObjectStore.iter_object_names(iter_bucket, page_size=3)
+    assert(next(it) == "iter/00")
+    assert(next(it) == "iter/01")
+
+    names = list(ObjectStore.iter_object_names(iter_bucket))
+    assert(names == keys + ["other"])
+
+
+def test_paged_listing(bucket):
+    from Acquire.ObjectStore._testing_objstore import Testing_ObjectStore
+
+    page_bucket = ObjectStore.get_bucket(bucket, "page_bucket",
+                                         create_if_needed=True)
+
+    keys = ["page/%02d" % i for i in range(0, 12)]
+    ObjectStore.set_objects(page_bucket, {key: b"x" for key in keys})
+    ObjectStore.set_string_object(page_bucket, "zzz", "other")
+
+    page_limit = Testing_ObjectStore.get_page_limit()
+
+    # simulate a backend that returns at most 5 names per request
+    Testing_ObjectStore.set_page_limit(5)
+
+    try:
+        assert(ObjectStore.get_all_object_names(page_bucket, "page") == keys)
+        assert(ObjectStore.get_all_object_names(page_bucket, "page",
+                                                page_size=2) == keys)
+        assert(ObjectStore.count_objects(page_bucket, "page") == 12)
+        assert(ObjectStore.count_objects(page_bucket) == 13)
+
+        names = list(ObjectStore.iter_object_names(page_bucket, "page/",
+                                                   start_after="page/03",
+                                                   without_prefix=True))
+        assert(names == ["%02d" % i for i in range(4, 12)])
+
+        with pytest.raises(ValueError):
+            Testing_ObjectStore.set_page_limit(0)
+    finally:
+        Testing_ObjectStore.set_page_limit(page_limit)
+
+
+def test_object_streams(bucket, tmpdir):
+    import io
+    import os
+    from Acquire.ObjectStore._parallel import iter_in_parallel
+
+    data = os.urandom(2 * 1024 * 1024 + 17)
+
+    ObjectStore.set_object_stream(bucket, "stream/data", io.BytesIO(data))
+    assert(ObjectStore.get_object(bucket, "stream/data") == data)
+
+    chunks = list(ObjectStore.get_object_stream(bucket, "stream/data"))
+    assert(len(chunks) == 3)
+    assert(b"".join(chunks) == data)
+
+    # the object can be read into a preallocated buffer...
+    buffer = bytearray(len(data))
+    assert(ObjectStore.get_object_into(bucket, "stream/data",
+                                       buffer) == len(data))
+    assert(buffer == data)
+
+    # ...which is resized to fit
+    for size in [0, 100, len(data) + 100]:
+        buffer = bytearray(size)
+        ObjectStore.get_object_into(bucket, "stream/data", buffer)
+        assert(buffer == data)
+
+    filename = str(tmpdir.join("stream.data"))
+    ObjectStore.get_object_as_file(bucket, "stream/data", filename)
+    assert(open(filename, "rb").read() == data)
+
+    ObjectStore.set_object_from_file(bucket, "stream/copy", filename)
+    assert(ObjectStore.get_object(bucket, "stream/copy") == data)
+
+    with pytest.raises(ObjectStoreError):
+        list(ObjectStore.get_object_stream(bucket, "stream/missing"))
+
+    # results are yielded in order, whatever order they complete in
+    import time
+    results = iter_in_parallel(lambda i: time.sleep(0.01 * (5 - i)) or i,
+                               range(0, 6), max_workers=3)
+    assert(list(results) == list(range(0, 6)))
+
+    with pytest.raises(ValueError):
+        list(iter_in_parallel(lambda i: int(i), ["1", "x", "3"]))
+
+
+def test_list_keys_between(bucket):
+    range_bucket = ObjectStore.get_bucket(bucket, "range_bucket",
+                                          create_if_needed=True)
+
+    keys = []
+
+    for day in range(1, 21):
+        key = "txns/2019-01-%02dT12:00:00/uid" % day
+        ObjectStore.set_string_object(range_bucket, key, "%d" % day)
+        keys.append(key)
+
+    assert(ObjectStore.list_keys_between(range_bucket) == keys)
+
+    result = ObjectStore.list_keys_between(range_bucket,
+                                           start_key="txns/2019-01-05",
+                                           end_key="txns/2019-01-10")
+    assert(result == keys[4:9])
+
+    result = ObjectStore.list_keys_between(range_bucket,
+                                           start_key="txns/",
+                                           end_key="txns/2019-01-10",
+                                           reverse=True, limit=2)
+    assert(result == [keys[8], keys[7]])
+
+    # reverse listings must be bounded
+    with pytest.raises(ValueError):
+        ObjectStore.list_keys_between(range_bucket, end_key="txns/2019-01-10",
+                                      reverse=True, limit=1)
+
+    result = ObjectStore.list_keys_between(range_bucket,
+                                           start_key="txns/2019-01-15",
+                                           limit=3)
+    assert(result == keys[14:17])
+
+    # the index must be kept up to date as keys are added and removed
+    ObjectStore.delete_object(range_bucket, keys[0])
+    ObjectStore.take_object(range_bucket, keys[1])
+    ObjectStore.set_string_object(range_bucket, "txns/2019-01-01", "new")
+
+    result = ObjectStore.list_keys_between(range_bucket,
+                                           start_key="txns/",
+                                           end_key="txns/2019-01-04")
+    assert(result == ["txns/2019-01-01", keys[2]])
+
+    # and also as keys are added and removed by other processes
+    import os
+    import subprocess
+    import sys
+
+    subprocess.run([sys.executable, "-c",
+                    "from Acquire.ObjectStore._testing_objstore import "
+                    "Testing_ObjectStore as store; "
+                    "store.delete_object(%r, %r); "
+                    "store.set_object(%r, 'txns/2019-01-02', b'new')"
+                    % (range_bucket, keys[2], range_bucket)],
+                   env=dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path)),
+                   check=True)
+
+    result = ObjectStore.list_keys_between(range_bucket,
+                                           start_key="txns/",
+                                           end_key="txns/2019-01-04")
+    assert(result == ["txns/2019-01-01", "txns/2019-01-02"])
+
+    ObjectStore.delete_all_objects(range_bucket, "txns")
+
+    assert(ObjectStore.list_keys_between(range_bucket) == [])
+
+
+def test_set_object_if(bucket):
+    from threading import Thread
+
+    key = "test_set_object_if/counter"
+
+    # only succeeds if the object does not yet exist
+    etag = ObjectStore.set_object_if(bucket, key, b"0")
+
+    with pytest.raises(ObjectStorePreconditionError):
+        ObjectStore.set_object_if(bucket, key, b"1")
+
+    (data, etag2) = ObjectStore.get_object_with_etag(bucket, key)
+    assert(data == b"0")
+    assert(etag2 == etag)
+
+    # only succeeds if the object has not changed since it was read
+    etag3 = ObjectStore.set_object_if(bucket, key, b"1", if_match=etag)
+    assert(etag3 != etag)
+    assert(ObjectStore.get_object(bucket, key) == b"1")
+
+    with pytest.raises(ObjectStorePreconditionError):
+        ObjectStore.set_object_if(bucket, key, b"2", if_match=etag)
+
+    with pytest.raises(ObjectStorePreconditionError):
+        ObjectStore.delete_object_if(bucket, key, etag)
+
+    ObjectStore.delete_object_if(bucket, key, etag3)
+
+    with pytest.raises(ObjectStoreError):
+        ObjectStore.get_object_with_etag(bucket, key)
+
+    with pytest.raises(ObjectStorePreconditionError):
+        ObjectStore.set_object_if(bucket, key, b"2", if_match=etag3)
+
+    # the etag changes on every write, so writing A, then B, then A
+    # again does not make a stale etag valid again
+    etag = ObjectStore.set_object_if(bucket, key, b"A")
+    ObjectStore.set_object(bucket, key, b"B")
+    ObjectStore.set_object(bucket, key, b"A")
+
+    (data, etag2) = ObjectStore.get_object_with_etag(bucket, key)
+    assert(data == b"A")
+    assert(etag2 != etag)
+
+    with pytest.raises(ObjectStorePreconditionError):
+        ObjectStore.set_object_if(bucket, key, b"C", if_match=etag)
+
+    with pytest.raises(ObjectStorePreconditionError):
+        ObjectStore.delete_object_if(bucket, key, etag)
+
+    ObjectStore.delete_object_if(bucket, key, etag2)
+
+    # concurrent increments using compare-and-swap must not lose updates
+    ObjectStore.set_object_from_json(bucket, key, 0)
+
+    def increment():
+        for i in range(0, 10):
+            while True:
+                (value, etag) = ObjectStore.get_object_from_json_with_etag(
+                                                                bucket, key)
+                try:
+                    ObjectStore.set_object_from_json_if(bucket, key,
+                                                        value + 1,
+                                                        if_match=etag)
+                    break
+                except ObjectStorePreconditionError:
+                    pass
+
+    threads = [Thread(target=increment) for i in range(0, 5)]
+
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    assert(ObjectStore.get_object_from_json(bucket, key) == 50)
@@ -3,7 +3,8 @@ import pytest
 import datetime
 import uuid
 
-from Acquire.ObjectStore import ObjectStore, ObjectStoreError, OSPar
+from Acquire.ObjectStore import ObjectStore, ObjectStoreError, OSPar, \
+    get_datetime_now
 from Acquire.Client import PARError, PARPermissionsError
 
 from Acquire.Service import get_service_account_bucket, \
@@ -110,3 +111,341 @@ def test_par(bucket):
         value = par.read(privkey).get_string_object()
 
         assert(keyvals[key] == value)
+
+
+def test_par_streaming(bucket, tmpdir):
+    import io
+    import os
+
+    privkey = get_private_key()
+    pubkey = privkey.public_key()
+
+    data = os.urandom(3 * 1024 * 1024 + 5)
+
+    ObjectStore.set_object(bucket, "stream", b"")
+
+    par = ObjectStore.create_par(bucket, key="stream", readable=True,
+                                 writeable=True, encrypt_key=pubkey)
+
+    writer = par.write(privkey)
+    writer.set_object_stream(io.BytesIO(data))
+    assert(ObjectStore.get_object(bucket, "stream") == data)
+
+    reader = par.read(privkey)
+    chunks = list(reader.get_object_stream())
+    assert(len(chunks) == 4)
+    assert(b"".join(chunks) == data)
+
+    buffer = bytearray(len(data))
+    assert(reader.get_object_into(buffer) == len(data))
+    assert(buffer == data)
+
+    filename = str(tmpdir.join("par_stream.data"))
+    reader.get_object_as_file(filename)
+    assert(open(filename, "rb").read() == data)
+
+    writer.set_object_from_file(filename)
+    assert(ObjectStore.get_object(bucket, "stream") == data)
+
+
+class _Response:
+    def __init__(self, status_code, content=b"", headers=None, json=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+        self._json = json
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i:i+chunk_size]
+
+    def json(self):
+        return self._json
+
+
+class _RangeServer:
+    """Fake HTTP server for an OCI OSPar, supporting range reads
+       and multipart uploads, which fails the first read of
+       each range and the first upload of each part. Range reads
+       honour If-Match with an ETag that changes with the data
+    """
+    def __init__(self, data):
+        self.data = data
+        self.ranges = []
+        self.parts = {}
+        self.failed = set()
+        self.committed = False
+
+    def get(self, url, headers=None, stream=False):
+        if headers is None or "Range" not in headers:
+            return _Response(200, self.data)
+
+        if len(self.data) == 0:
+            return _Response(416)
+
+        (start, end) = headers["Range"][6:].split("-")
+        (start, end) = (int(start), min(int(end), len(self.data) - 1))
+        self.ranges.append(start)
+
+        if start > 0 and start not in self.failed:
+            self.failed.add(start)
+            raise ConnectionError("Connection reset")
+
+        import hashlib
+        etag = '"%s"' % hashlib.md5(self.data).hexdigest()
+
+        if headers.get("If-Match", etag) != etag:
+            return _Response(412)
+
+        content_range = "bytes %d-%d/%d" % (start, end, len(self.data))
+        return _Response(206, self.data[start:end+1],
+                         headers={"Content-Range": content_range,
+                                  "ETag": etag})
+
+    def put(self, url, data=None, headers=None):
+        if headers is not None and headers.get("opc-multipart") == "true":
+            return _Response(200, json={"accessUri": "/p/token/u/id/"})
+
+        part = int(url.split("/")[-1])
+
+        if part not in self.failed:
+            self.failed.add(part)
+            return _Response(503)
+
+        self.parts[part] = data
+        return _Response(200)
+
+    def post(self, url, data=None, headers=None):
+        self.data = b"".join(self.parts[i] for i in sorted(self.parts))
+        self.committed = True
+        return _Response(200)
+
+    def delete(self, url, data=None, headers=None):
+        return _Response(200)
+
+
+def test_par_range_reads(monkeypatch):
+    import io
+    import os
+    import Acquire.Stubs
+    import Acquire.ObjectStore._ospar as _ospar
+
+    monkeypatch.setattr(_ospar, "_range_size", 1000)
+    monkeypatch.setattr(_ospar, "_multipart_part_size", 1500)
+    monkeypatch.setattr(_ospar._time, "sleep", lambda seconds: None)
+
+    data = os.urandom(4500)
+    server = _RangeServer(data)
+    monkeypatch.setattr(Acquire.Stubs, "requests", server)
+
+    url = "https://objectstorage.region.oraclecloud.com/p/token/o/key"
+
+    # the object is read in ranges, which are retried if they fail
+    assert(_ospar._read_remote(url) == data)
+    assert(sorted(set(server.ranges)) == [0, 1000, 2000, 3000, 4000])
+
+    # changing the object while it is read is an error, not a mix
+    # of the old and new data
+    from Acquire.Client import PARReadError
+    stream = _ospar._stream_remote(url)
+    assert(next(stream) == data[0:1000])
+
+    server.data = os.urandom(4500)
+    server.ranges = []
+
+    with pytest.raises(PARReadError):
+        list(stream)
+
+    # the ranges were not retried once the ETag no longer matched
+    assert(len(server.ranges) == len(set(server.ranges)))
+    server.data = data
+
+    # objects larger than a part are uploaded in parts
+    new_data = os.urandom(4000)
+    _ospar._write_stream(url, io.BytesIO(new_data))
+
+    assert(server.committed)
+    assert(sorted(server.parts.keys()) == [1, 2, 3])
+    assert(server.data == new_data)
+
+    server.data = b""
+    assert(_ospar._read_remote(url) == b"")
+
+
+def test_par_bucket_listing(bucket):
+    privkey = get_private_key()
+    pubkey = privkey.public_key()
+
+    keyvals = {"listing/one": b"1", "listing/two": b"22",
+               "listing/sub/three": b"333", "listing2/four": b"4444"}
+
+    for (key, value) in keyvals.items():
+        ObjectStore.set_object(bucket, key, value)
+
+    # read access to a bucket must be limited to a directory
+    with pytest.raises(PARError):
+        ObjectStore.create_par(bucket, readable=True, writeable=False,
+                               encrypt_key=pubkey)
+
+    par = ObjectStore.create_par(bucket, readable=True, writeable=False,
+                                 encrypt_key=pubkey, prefix="listing")
+
+    assert(par.prefix() == "listing/")
+    assert(OSPar.from_data(par.to_data()).prefix() == "listing/")
+
+    reader = par.read(privkey)
+
+    assert(list(reader.iter_object_names("listing/")) ==
+           ["listing/one", "listing/sub/three", "listing/two"])
+
+    assert(reader.get_all_object_names("listing/") ==
+           ["one", "sub/three", "two"])
+
+    assert(reader.get_all_object_names() ==
+           ["listing/one", "listing/sub/three", "listing/two"])
+
+    # the prefix is a directory, so "listing2/" is not included
+    objects = reader.get_all_objects("listing", max_workers=2)
+    assert(objects == {"one": b"1", "two": b"22", "sub/three": b"333"})
+
+    assert(list(reader.iter_objects("listing/sub/")) == [("three", b"333")])
+
+    # objects outside the directory cannot be listed or read
+    with pytest.raises(PARError):
+        reader.get_all_strings("listing2/")
+
+    with pytest.raises(PARError):
+        reader.get_object("listing2/four")
+
+    par = ObjectStore.create_par(bucket, readable=True, writeable=False,
+                                 encrypt_key=pubkey, prefix="/listing2/")
+
+    reader = par.read(privkey)
+
+    assert(reader.get_all_strings("listing2") == {"four": "4444"})
+
+
+class _ListingServer:
+    """Fake HTTP server for bucket OSPars that returns the sorted
+       'names' a page at a time, as OCI JSON or GCP XML listings
+    """
+    def __init__(self, names, page_size=2, allow_marker=True):
+        from urllib.parse import urlparse, parse_qs
+        self._urlparse = urlparse
+        self._parse_qs = parse_qs
+        self.names = sorted(names)
+        self.page_size = page_size
+        self.allow_marker = allow_marker
+        self.requests = 0
+
+    def get(self, url, headers=None, stream=False):
+        self.requests += 1
+
+        p = self._urlparse(url)
+        query = self._parse_qs(p.query)
+
+        if p.netloc.endswith(".oraclecloud.com"):
+            return self._get_oci(query)
+        else:
+            return self._get_xml(query)
+
+    def _get_oci(self, query):
+        import json
+
+        prefix = query.get("prefix", [""])[0]
+        start = query.get("start", [""])[0]
+        limit = int(query["limit"][0])
+        assert(query["fields"] == ["name"])
+
+        names = [name for name in self.names
+                 if name.startswith(prefix) and name >= start]
+
+        result = {"objects": [{"name": name} for name in names[0:limit]]}
+
+        if len(names) > limit:
+            result["nextStartWith"] = names[limit]
+
+        return _Response(200, json.dumps(result).encode("utf-8"))
+
+    def _get_xml(self, query):
+        if "marker" in query and not self.allow_marker:
+            return _Response(403, b"SignatureDoesNotMatch")
+
+        marker = query.get("marker", [""])[0]
+        names = [name for name in self.names if name > marker]
+        page = names[0:self.page_size]
+
+        xml = ['<?xml version="1.0" encoding="UTF-8"?>',
+               '<ListBucketResult xmlns="http://doc.s3.amazonaws.com/'
+               '2006-03-01"><Name>bucket</Name>']
+
+        if len(names) > self.page_size:
+            xml.append("<IsTruncated>true</IsTruncated>")
+            xml.append("<NextMarker>%s</NextMarker>" % page[-1])
+        else:
+            xml.append("<IsTruncated>false</IsTruncated>")
+
+        for name in page:
+            xml.append("<Contents><Key>%s</Key><Size>1</Size></Contents>"
+                       % name)
+
+        xml.append("</ListBucketResult>")
+
+        return _Response(200, "".join(xml).encode("utf-8"))
+
+
+def test_par_remote_listing(monkeypatch):
+    import Acquire.Stubs
+    import Acquire.ObjectStore._ospar as _ospar
+    from Acquire.Client import PARReadError
+
+    monkeypatch.setattr(_ospar, "_list_page_size", 2)
+
+    names = ["a/1", "a/2", "a/3", "b/1", "b/2", "c"]
+    server = _ListingServer(names)
+    monkeypatch.setattr(Acquire.Stubs, "requests", server)
+
+    # OCI bucket OSPars are listed using nextStartWith
+    url = "https://objectstorage.region.oraclecloud.com/p/token/n/ns/b/b/o/"
+
+    assert(list(_ospar._list_remote(url)) == names)
+    assert(server.requests == 3)
+
+    assert(list(_ospar._list_remote(url, "a/")) == ["a/1", "a/2", "a/3"])
+
+    # GCP bucket OSPars are listed using the XML API
+    url = "https://storage.googleapis.com/bucket?X-Goog-Signature=abc"
+
+    assert(list(_ospar._list_remote(url)) == names)
+
+    # the listing stops once it has passed the prefix
+    server.requests = 0
+    assert(list(_ospar._list_remote(url, "a/")) == ["a/1", "a/2", "a/3"])
+    assert(server.requests == 2)
+
+    # an incomplete listing is an error
+    server.allow_marker = False
+    assert(list(_ospar._list_remote(url, "a/1")) == ["a/1"])
+
+    with pytest.raises(PARReadError):
+        list(_ospar._list_remote(url))
+
+    # objects can be listed, but not read, via a GCP bucket OSPar
+    server.allow_marker = True
+    privkey = get_private_key()
+    expires = get_datetime_now() + datetime.timedelta(hours=1)
+    par = OSPar(url=url, encrypt_key=privkey.public_key(),
+                expires_datetime=expires, is_readable=True, prefix="a/")
+    reader = _ospar.BucketReader(par, privkey)
+
+    assert(reader.get_all_object_names("a") == ["1", "2", "3"])
+
+    server.requests = 0
+
+    with pytest.raises(PARError):
+        reader.iter_objects()
+
+    with pytest.raises(PARError):
+        reader.get_object("a/1")
+
+    assert(server.requests == 0)
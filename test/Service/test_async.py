@@ -0,0 +1,47 @@
+
+import asyncio
+import threading
+import time
+
+from Acquire.Service import run_async, get_max_async_workers
+
+
+def _slow_double(x, delay=0.2):
+    time.sleep(delay)
+    return (2 * x, threading.current_thread().name)
+
+
+def test_run_async():
+    assert(get_max_async_workers() >= 10)
+
+    async def _run():
+        return await asyncio.gather(*[run_async(_slow_double, i, delay=0.2)
+                                      for i in range(10)])
+
+    loop = asyncio.new_event_loop()
+
+    try:
+        start = time.monotonic()
+        results = loop.run_until_complete(_run())
+        elapsed = time.monotonic() - start
+    finally:
+        loop.close()
+
+    assert([r[0] for r in results] == [2 * i for i in range(10)])
+
+    # the calls were run concurrently, in the worker threads
+    assert(elapsed < 1.0)
+    assert(all(r[1].startswith("acquire_async") for r in results))
+
+    async def _fail():
+        await run_async(_slow_double, None, delay=0.0)
+
+    loop = asyncio.new_event_loop()
+
+    try:
+        loop.run_until_complete(_fail())
+        assert(False)
+    except TypeError:
+        pass
+    finally:
+        loop.close()
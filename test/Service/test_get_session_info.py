@@ -0,0 +1,55 @@
+
+import pytest
+
+import Acquire.Service
+
+from Acquire.Service import get_sessions_info
+
+
+class _OldIdentityService:
+    """Fake identity service whose get_session_info handler does not
+       support batches, so rejects a list of session UIDs in the same
+       way as an identity service that has not been upgraded
+    """
+    def __init__(self):
+        self.calls = []
+
+    def call_function(self, function, args):
+        self.calls.append(dict(args))
+
+        if "session_uid" not in args:
+            raise PermissionError(
+                "Error calling 'get_session_info': You must specify either "
+                "the session_uid or the short_uid of the login session")
+
+        if args["session_uid"] == "missing":
+            raise KeyError("No session with UID 'missing'")
+
+        return {"status": 0, "session_status": "approved",
+                "user_uid": "user-%s" % args["session_uid"]}
+
+
+@pytest.fixture
+def old_identity_service(monkeypatch):
+    service = _OldIdentityService()
+    monkeypatch.setattr(Acquire.Service, "get_trusted_service",
+                        lambda url: service)
+    return service
+
+
+def test_get_sessions_info_fallback(old_identity_service):
+    (sessions, errors) = get_sessions_info(
+                            identity_url="https://example.com/t/identity",
+                            session_uids=["a", "b", "missing"])
+
+    assert(sorted(sessions.keys()) == ["a", "b"])
+    assert(sessions["a"]["user_uid"] == "user-a")
+    assert("status" not in sessions["a"])
+    assert(list(errors.keys()) == ["missing"])
+
+    # one batch call that was rejected, then one call per session
+    calls = old_identity_service.calls
+    assert(len(calls) == 4)
+    assert("session_uids" in calls[0])
+    assert(sorted(call["session_uid"] for call in calls[1:]) ==
+           ["a", "b", "missing"])
@@ -0,0 +1,141 @@
+
+import pytest
+
+import Acquire.Stubs
+import Acquire.Service._http_pool as _http_pool
+
+from Acquire.Service import get_http_statistics, reset_http_statistics, \
+    close_http_sessions, set_http_max_retries, get_http_max_retries
+
+
+class _Response:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+class _Adapters:
+    class HTTPAdapter:
+        def __init__(self, pool_connections=10, pool_maxsize=10):
+            self.pool_maxsize = pool_maxsize
+
+
+class _FlakyRequests:
+    """Fake requests module whose sessions fail the first
+       'failures' posts, alternately raising and returning 503
+    """
+    adapters = _Adapters
+    failures = 0
+    sessions = []
+
+    class Session:
+        def __init__(self):
+            self.headers = {}
+            self.posts = 0
+            _FlakyRequests.sessions.append(self)
+
+        def mount(self, prefix, adapter):
+            self.adapter = adapter
+
+        def post(self, url, data, timeout=None):
+            self.posts += 1
+
+            if self.posts <= _FlakyRequests.failures:
+                if self.posts % 2 == 1:
+                    raise ConnectionError("Connection reset")
+                else:
+                    return _Response(503)
+
+            return _Response(200)
+
+
+@pytest.fixture
+def flaky_requests(monkeypatch):
+    monkeypatch.setattr(Acquire.Stubs, "requests", _FlakyRequests)
+    monkeypatch.setattr(_http_pool, "_time", _NoSleep)
+    _FlakyRequests.sessions = []
+    close_http_sessions()
+    reset_http_statistics()
+    yield _FlakyRequests
+    close_http_sessions()
+    reset_http_statistics()
+
+
+class _NoSleep:
+    @staticmethod
+    def sleep(seconds):
+        pass
+
+
+def test_http_pool(flaky_requests):
+    url = "https://example.com/t/identity"
+
+    # one pooled session is used for all calls to the same host
+    for _ in range(5):
+        response = _http_pool.post(url, b"data", function="get_service")
+        assert(response.status_code == 200)
+
+    _http_pool.post("https://example.com/t/storage", b"data")
+
+    assert(len(flaky_requests.sessions) == 1)
+    session = flaky_requests.sessions[0]
+    assert(session.headers["Connection"] == "keep-alive")
+    assert(session.adapter.pool_maxsize == _http_pool.get_http_pool_size())
+
+    stats = get_http_statistics(url)
+    assert(stats["requests"] == 6)
+    assert(stats["retries"] == 0)
+
+    # idempotent functions are retried
+    close_http_sessions()
+    reset_http_statistics()
+    flaky_requests.failures = 2
+
+    response = _http_pool.post(url, b"data", function="get_session_info")
+    assert(response.status_code == 200)
+
+    stats = get_http_statistics(url)
+    assert(stats["requests"] == 3)
+    assert(stats["retries"] == 2)
+    assert(stats["failures"] == 0)
+
+    # but other functions are not, including those that may move
+    # data, such as get_job
+    for function in ["perform", "get_job"]:
+        close_http_sessions()
+        reset_http_statistics()
+
+        with pytest.raises(ConnectionError):
+            _http_pool.post(url, b"data", function=function)
+
+        assert(get_http_statistics(url)["failures"] == 1)
+
+    # unless they are explicitly marked as idempotent
+    close_http_sessions()
+
+    response = _http_pool.post(url, b"data", function="perform",
+                               idempotent=True)
+    assert(response.status_code == 200)
+
+    # the call fails once all retries are exhausted
+    close_http_sessions()
+    reset_http_statistics()
+    flaky_requests.failures = 100
+
+    max_retries = get_http_max_retries()
+    set_http_max_retries(0)
+
+    try:
+        with pytest.raises(ConnectionError):
+            _http_pool.post(url, b"data", function="get_service")
+
+        # gateway errors are returned once all retries are exhausted
+        response = _http_pool.post(url, b"data", function="get_service")
+        assert(response.status_code == 503)
+    finally:
+        set_http_max_retries(max_retries)
+        flaky_requests.failures = 0
+
+    stats = get_http_statistics(url)
+    assert(stats["requests"] == 2)
+    assert(stats["retries"] == 0)
+    assert(stats["failures"] == 1)
@@ -4,7 +4,7 @@ import pytest
 from Acquire.Crypto import PrivateKey, get_private_key
 from Acquire.Service import pack_arguments, unpack_arguments
 from Acquire.Service import pack_return_value, unpack_return_value
-from Acquire.Service import create_return_value
+from Acquire.Service import create_return_value, is_binary_frame
 from Acquire.ObjectStore import string_to_bytes, bytes_to_string
 
 import random
@@ -99,3 +99,63 @@ def test_pack_unpack_args_returnvals():
     with pytest.raises(PermissionError):
         result = unpack_return_value(function=func, return_value=packed_result,
                                      key=privkey, public_cert=pubkey)
+
+
+def test_pack_unpack_binary_frames():
+    privkey = get_private_key("testing")
+    pubkey = privkey.public_key()
+
+    chunk = bytes(random.getrandbits(8) for _ in range(4096))
+
+    args = {"message": "Hello, this is a message",
+            "data": chunk,
+            "nested": {"data": [b"", b"\x00\xff"]}}
+
+    func = "test_function"
+
+    packed = pack_arguments(function=func, args=args, binary=True)
+
+    assert(is_binary_frame(packed))
+
+    # bytes are sent raw, not base64-encoded
+    assert(len(packed) < len(chunk) + 1024)
+
+    (f, unpacked, keys) = unpack_arguments(args=packed)
+
+    assert(args == unpacked)
+    assert(f == func)
+    assert(keys["binary_framing"])
+
+    packed = pack_arguments(function=func, args=args,
+                            key=pubkey, response_key=pubkey,
+                            public_cert=pubkey, binary=True)
+
+    assert(is_binary_frame(packed))
+
+    (f, unpacked, keys) = unpack_arguments(function=func, args=packed,
+                                           key=privkey)
+
+    assert(args == unpacked)
+
+    # the response is packed in the same way as the arguments
+    return_value = create_return_value({"chunk": chunk})
+
+    packed_result = pack_return_value(function=func,
+                                      payload=return_value, key=keys,
+                                      private_cert=privkey)
+
+    assert(is_binary_frame(packed_result))
+
+    result = unpack_return_value(return_value=packed_result,
+                                 key=privkey, public_cert=pubkey)
+
+    assert(result == {"chunk": chunk})
+
+    # bytes are sent as base64-encoded strings in json frames
+    packed = pack_arguments(function=func, args=args)
+
+    assert(not is_binary_frame(packed))
+
+    (f, unpacked, keys) = unpack_arguments(args=packed)
+
+    assert(string_to_bytes(unpacked["data"]) == chunk)
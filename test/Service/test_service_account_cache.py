@@ -0,0 +1,67 @@
+
+from Acquire.Service import Service, push_is_running_service, \
+    pop_is_running_service, push_testing_objstore, pop_testing_objstore, \
+    get_this_service, get_service_account_bucket, clear_serviceinfo_cache
+from Acquire.ObjectStore import ObjectStore
+
+import Acquire.Service._service_account as _service_account
+
+
+def test_service_account_cache(tmpdir_factory, monkeypatch):
+    bucket = tmpdir_factory.mktemp("test_service_cache")
+    push_testing_objstore(bucket)
+    push_is_running_service()
+
+    password = "Service_pa33word"
+    monkeypatch.setenv("SERVICE_PASSWORD", password)
+
+    loads = []
+    from_data = Service.from_data
+
+    def _counting_from_data(data, password=None):
+        loads.append(password is not None)
+        return from_data(data, password)
+
+    try:
+        service = Service.create(service_type="identity",
+                                 service_url="identity")
+        service.create_stage2(service_uid="Z9-Z8", response=service.uid())
+
+        bucket = get_service_account_bucket()
+        ObjectStore.set_object_from_json(bucket, "_service_key",
+                                         service.to_data(password))
+        clear_serviceinfo_cache()
+
+        monkeypatch.setattr(Service, "from_data",
+                            staticmethod(_counting_from_data))
+
+        # the unlocked service is only decrypted once
+        s1 = get_this_service(need_private_access=True)
+        s2 = get_this_service(need_private_access=True)
+        assert(s1 is s2)
+        assert(s1.is_unlocked())
+        assert(loads == [True])
+
+        p1 = get_this_service(need_private_access=False)
+        assert(get_this_service(need_private_access=False) is p1)
+        assert(loads == [True, False])
+
+        # revalidating against unchanged stored data keeps the object
+        monkeypatch.setattr(_service_account, "_service_revalidate_time", 0)
+        assert(get_this_service(need_private_access=True) is s1)
+        assert(loads == [True, False])
+
+        # refreshing the stored keys (e.g. from another instance)
+        # means that the service is reloaded
+        service.refresh_keys()
+        ObjectStore.set_object_from_json(bucket, "_service_key",
+                                         service.to_data(password))
+
+        s3 = get_this_service(need_private_access=True)
+        assert(s3 is not s1)
+        assert(s3.last_key_update() == service.last_key_update())
+        assert(s3.private_key() == service.private_key())
+        assert(loads == [True, False, True])
+    finally:
+        pop_is_running_service()
+        pop_testing_objstore()
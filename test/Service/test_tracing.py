@@ -0,0 +1,91 @@
+
+import io
+import json
+import pytest
+
+from Acquire.Service import trace, get_trace_statistics, \
+    reset_trace_statistics, set_trace_output, set_tracing_enabled, \
+    start_trace_request, end_trace_request, set_trace_request_function
+
+
+def test_tracing():
+    reset_trace_statistics()
+    output = io.StringIO()
+    set_trace_output(output)
+
+    try:
+        start_trace_request("test_function")
+
+        for i in range(5):
+            with trace("test.span", key="value") as span:
+                span.nbytes = 10
+
+        with pytest.raises(KeyError):
+            with trace("test.span"):
+                raise KeyError("error")
+
+        end_trace_request()
+
+        set_tracing_enabled(False)
+
+        with trace("test.span") as span:
+            span.nbytes = 10
+
+        set_tracing_enabled(True)
+    finally:
+        set_trace_output(None)
+
+    stats = get_trace_statistics("test.span")
+
+    assert(stats["count"] == 6)
+    assert(stats["errors"] == 1)
+    assert(stats["bytes"] == 50)
+    assert(stats["min_ms"] <= stats["mean_ms"] <= stats["max_ms"])
+    assert(sum(count for (_, count) in stats["histogram"]) == 6)
+
+    lines = [json.loads(line) for line in output.getvalue().splitlines()]
+
+    assert(len(lines) == 6)
+    assert(lines[0]["name"] == "test.span")
+    assert(lines[0]["function"] == "test_function")
+    assert(lines[0]["key"] == "value")
+    assert(lines[0]["bytes"] == 10)
+    assert(lines[-1]["error"] == "KeyError")
+    assert(len(set(line["request"] for line in lines)) == 1)
+
+    reset_trace_statistics()
+    assert(get_trace_statistics("test.span") is None)
+
+
+def test_trace_request_function():
+    output = io.StringIO()
+    set_trace_output(output)
+
+    try:
+        # the function can be set after the request has started, e.g.
+        # once the arguments of the request have been unpacked
+        start_trace_request()
+
+        with trace("test.unpack"):
+            pass
+
+        set_trace_request_function("test_function")
+
+        with trace("test.handle"):
+            pass
+
+        end_trace_request()
+
+        with trace("test.after"):
+            pass
+    finally:
+        set_trace_output(None)
+        reset_trace_statistics()
+
+    lines = [json.loads(line) for line in output.getvalue().splitlines()]
+
+    assert(len(lines) == 3)
+    assert(lines[0]["function"] is None)
+    assert(lines[1]["function"] == "test_function")
+    assert(lines[0]["request"] == lines[1]["request"])
+    assert("request" not in lines[2])
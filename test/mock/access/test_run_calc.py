@@ -81,6 +81,11 @@ def test_run_calc(aaai_services, authenticated_user):
 
     print(pending_uids)
 
+    # the pending jobs are claimed from the queue
+    claimed_uids = cluster.claim_jobs(max_jobs=10)
+    assert(sorted(claimed_uids) == sorted(pending_uids))
+    assert(cluster.claim_jobs(max_jobs=10) == [])
+
     for uid in pending_uids:
         job = cluster.submit_job(uid)
         print(job)
@@ -89,4 +94,7 @@ def test_run_calc(aaai_services, authenticated_user):
 
     print(pending_uids)
 
+    assert(len(pending_uids) == 0)
+    assert(cluster.wait_for_jobs(max_jobs=10, timeout=0.1) == [])
+
     #assert(False)
@@ -7,6 +7,7 @@
 import pytest
 import os
 import sys
+import threading
 import uuid
 
 import Acquire
@@ -51,6 +52,12 @@ Acquire.Client._wallet._get_wallet_dir = _get_wallet_dir
 Acquire.Client._wallet._get_wallet_password = _get_wallet_password
 
 
+# The stack of testing object stores is global, so calls from different
+# threads (e.g. concurrent uploads) must be performed one at a time.
+# This is re-entrant as services call other services
+_perform_lock = threading.RLock()
+
+
 class MockedRequests:
     """Mocked requests object. This provides a requests interface which calls
        the 'handler' functions of the services directly, rather
@@ -74,6 +81,11 @@ class MockedRequests:
 
     @staticmethod
     def _perform(url, data, is_post=False):
+        with _perform_lock:
+            return MockedRequests._perform_locked(url, data, is_post=is_post)
+
+    @staticmethod
+    def _perform_locked(url, data, is_post=False):
         _services = _get_services()
 
         if "identity" not in _services:
@@ -118,6 +130,43 @@ class MockedRequests:
         return MockedRequests(status_code=200, content=result)
 
 
+class MockedAdapter:
+    """Mocked requests.adapters.HTTPAdapter"""
+    def __init__(self, pool_connections=10, pool_maxsize=10,
+                 max_retries=0, pool_block=False):
+        pass
+
+
+class MockedAdapters:
+    """Mocked requests.adapters module"""
+    HTTPAdapter = MockedAdapter
+
+
+class MockedSession:
+    """Mocked requests.Session object, which performs requests using
+       MockedRequests
+    """
+    def __init__(self):
+        self.headers = {}
+        self.adapters = {}
+
+    def mount(self, prefix, adapter):
+        self.adapters[prefix] = adapter
+
+    def get(self, url, data, timeout=None):
+        return MockedRequests.get(url, data, timeout=timeout)
+
+    def post(self, url, data, timeout=None):
+        return MockedRequests.post(url, data, timeout=timeout)
+
+    def close(self):
+        pass
+
+
+MockedRequests.Session = MockedSession
+MockedRequests.adapters = MockedAdapters
+
+
 def mocked_input(s):
     return "y"
 
@@ -92,3 +92,129 @@ def test_login(username, password, aaai_services, tmpdir):
     auth.verify("test")
 
     user.logout()
+
+
+def _register_and_login(username, password):
+    """Register a new user and return the user, logged in"""
+    result = User.register(username=username, password=password,
+                           identity_url="identity")
+
+    otp = OTP(result["otpsecret"])
+
+    user = User(username=username, identity_url="identity",
+                auto_logout=False)
+
+    result = user.request_login()
+
+    Wallet().send_password(url=result["login_url"], username=username,
+                           password=password, otpcode=otp.generate())
+
+    user.wait_for_login()
+    assert(user.is_logged_in())
+
+    return user
+
+
+def test_session_certificate_cache(aaai_services, monkeypatch):
+    import Acquire.Service
+    import Acquire.Identity._authorisation as _authorisation
+    from Acquire.Identity import clear_session_certificate_cache
+
+    user = _register_and_login("cacheuser", "ABCdef12345")
+
+    identity_service = user.identity_service()
+    calls = []
+
+    class _CountingService:
+        def get_session_info(self, **kwargs):
+            calls.append(kwargs)
+            return identity_service.get_session_info(**kwargs)
+
+        def __getattr__(self, name):
+            return getattr(identity_service, name)
+
+    # pretend that the authorisations are verified on a service
+    monkeypatch.setattr(Acquire.Service, "is_running_service",
+                        lambda: True)
+    monkeypatch.setattr(Acquire.Service, "get_trusted_service",
+                        lambda url: _CountingService())
+
+    clear_session_certificate_cache()
+
+    try:
+        for _ in range(3):
+            auth = Authorisation(user=user, resource="test")
+            # the service receives the authorisation as data
+            auth = Authorisation.from_data(auth.to_data())
+            auth.verify("test")
+
+        # the session certificate is only fetched once
+        assert(len(calls) == 1)
+        assert(len(_authorisation._cache_session_certs) == 1)
+
+        monkeypatch.undo()
+
+        # logging out invalidates the cached certificate
+        user.logout()
+
+        assert(len(_authorisation._cache_session_certs) == 0)
+    finally:
+        clear_session_certificate_cache()
+
+
+def test_verify_many(aaai_services, monkeypatch):
+    import Acquire.Service
+
+    users = [_register_and_login("manyuser%d" % i, "ABCdef12345")
+             for i in range(2)]
+
+    identity_service = users[0].identity_service()
+    calls = []
+
+    class _CountingService:
+        def get_session_info(self, **kwargs):
+            calls.append(("get_session_info", kwargs))
+            return identity_service.get_session_info(**kwargs)
+
+        def get_sessions_info(self, **kwargs):
+            calls.append(("get_sessions_info", kwargs))
+            return identity_service.get_sessions_info(**kwargs)
+
+        def __getattr__(self, name):
+            return getattr(identity_service, name)
+
+    monkeypatch.setattr(Acquire.Service, "get_trusted_service",
+                        lambda url: _CountingService())
+
+    resources = ["resource %d" % i for i in range(6)]
+
+    def _auths():
+        # the authorisations are received as data
+        auths = []
+        for (i, resource) in enumerate(resources):
+            auth = Authorisation(user=users[i % 2], resource=resource)
+            auths.append(Authorisation.from_data(auth.to_data()))
+        return auths
+
+    identifiers = Authorisation.verify_many(_auths(), resources)
+
+    assert(len(identifiers) == len(resources))
+    for (i, ident) in enumerate(identifiers):
+        assert(ident["user_guid"] == users[i % 2].guid())
+
+    # both sessions were fetched in a single call
+    assert(len(calls) == 1)
+    assert(calls[0][0] == "get_sessions_info")
+    assert(len(calls[0][1]["session_uids"]) == 2)
+
+    # an authorisation for the wrong resource is rejected
+    wrong = list(resources)
+    wrong[3] = "wrong resource"
+
+    with pytest.raises(PermissionError):
+        Authorisation.verify_many(_auths(), wrong)
+
+    monkeypatch.undo()
+
+    for user in users:
+        user.logout()
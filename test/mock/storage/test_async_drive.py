@@ -0,0 +1,57 @@
+
+import pytest
+import asyncio
+import os
+
+from Acquire.Client import Drive, StorageCreds
+
+
+@pytest.fixture(scope="session")
+def tempdir(tmpdir_factory):
+    d = tmpdir_factory.mktemp("")
+    return str(d)
+
+
+def _same_file(file1, file2):
+    lines1 = open(file1, "r").readlines()
+    lines2 = open(file2, "r").readlines()
+
+    return lines1 == lines2
+
+
+def test_async_drive(authenticated_user, tempdir):
+    creds = StorageCreds(user=authenticated_user, service_url="storage")
+
+    drive = Drive(name="test_async_drive", creds=creds, autocreate=True)
+
+    names = ["async_%d.py" % i for i in range(5)]
+
+    loop = asyncio.new_event_loop()
+
+    async def _upload():
+        return await asyncio.gather(
+                    *[drive.upload_async(__file__, uploaded_name=name)
+                      for name in names])
+
+    filemetas = loop.run_until_complete(_upload())
+
+    assert(sorted(f.name() for f in filemetas) == names)
+
+    files = loop.run_until_complete(drive.list_files_async())
+
+    assert(sorted(f.filename() for f in files) == names)
+
+    async def _download():
+        return await asyncio.gather(
+                    *[drive.download_async(name, dir=tempdir)
+                      for name in names])
+
+    filenames = loop.run_until_complete(_download())
+
+    loop.close()
+
+    assert(len(filenames) == len(names))
+
+    for (name, filename) in zip(names, filenames):
+        assert(os.path.basename(filename) == name)
+        assert(_same_file(__file__, filename))
@@ -54,3 +54,32 @@ def test_chunking(authenticated_user, tempdir):
 
     assert(lines[0] == "This is some text\n")
     assert(lines[1] == "Here is some more!\n")
+
+
+def test_pipelined_chunking(authenticated_user, tempdir):
+    drive_name = "test_pipelined_chunking"
+    creds = StorageCreds(user=authenticated_user, service_url="storage")
+
+    drive = Drive(name=drive_name, creds=creds)
+
+    uploader = drive.chunk_upload("test_pipelined_chunking.py")
+    uploader.set_max_in_flight(8)
+    assert(uploader.max_in_flight() == 8)
+
+    # upload this file in lots of small chunks, which will be in
+    # flight at the same time, so may arrive in any order
+    uploader.upload_file(__file__, chunk_size=128)
+    uploader.close()
+
+    filename = drive.download("test_pipelined_chunking.py", dir=tempdir)
+
+    assert(_same_file(__file__, filename))
+
+    downloader = drive.chunk_download("test_pipelined_chunking.py",
+                                      dir=tempdir, max_in_flight=8)
+    assert(downloader.max_in_flight() == 8)
+
+    filename = downloader.download()
+
+    assert(not downloader.is_open())
+    assert(_same_file(__file__, filename))
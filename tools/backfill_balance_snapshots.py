@@ -0,0 +1,48 @@
+# Backfill the monthly balance snapshots of all of the accounts in
+# the accounting service. This must be run from within the environment
+# of the accounting service (so that it can load the service bucket),
+# and only needs to be run once for accounts created before balance
+# snapshots were introduced
+from Acquire.Accounting import Account
+from Acquire.ObjectStore import ObjectStore
+from Acquire.Service import get_service_account_bucket, \
+    push_is_running_service, pop_is_running_service
+
+push_is_running_service()
+
+try:
+    bucket = get_service_account_bucket()
+
+    nsnapshots = 0
+    naccounts = 0
+    failed = []
+
+    # every account is indexed by name in its account group, and the
+    # index holds only one key per account (unlike the account
+    # directories, which also hold every transaction)
+    for key in ObjectStore.iter_object_names(
+            bucket=bucket, prefix="accounting/account_groups/"):
+        # a broken account must not stop the backfill of the rest,
+        # and the backfill can safely be re-run for the accounts that fail
+        uid = key
+
+        try:
+            uid = ObjectStore.get_string_object(bucket, key)
+            account = Account(uid=uid, bucket=bucket)
+            n = account.backfill_balance_snapshots(bucket=bucket)
+        except Exception as e:
+            print("%s: FAILED: %s" % (uid, e))
+            failed.append(uid)
+            continue
+
+        print("%s: wrote %d snapshots" % (uid, n))
+        nsnapshots += n
+        naccounts += 1
+
+    print("Wrote %d snapshots for %d accounts" % (nsnapshots, naccounts))
+
+    if len(failed) > 0:
+        print("Failed to backfill %d accounts: %s" %
+              (len(failed), ", ".join(failed)))
+finally:
+    pop_is_running_service()
@@ -0,0 +1,80 @@
+# Benchmark the size and CPU cost of packing and unpacking the arguments
+# and response of the 'upload_chunk' and 'download_chunk' functions,
+# comparing the json framing with the binary framing. This packs and
+# unpacks exactly what call_function and the service handler would, but
+# without any network transfer
+import os
+import sys
+import time
+
+from Acquire.Crypto import PrivateKey
+from Acquire.ObjectStore import bytes_to_string
+from Acquire.Service import pack_arguments, unpack_arguments, \
+    pack_return_value, unpack_return_value, create_return_value
+
+try:
+    chunk_size = int(sys.argv[1])
+except:
+    chunk_size = 8 * 1024 * 1024
+
+try:
+    repeats = int(sys.argv[2])
+except:
+    repeats = 5
+
+service_key = PrivateKey()
+service_cert = PrivateKey()
+response_key = PrivateKey()
+
+# compressed chunks are effectively random bytes
+chunk = os.urandom(chunk_size)
+
+
+def _round_trip(binary):
+    """Pack and unpack the upload_chunk arguments and the download_chunk
+       response, returning the number of bytes sent for each
+    """
+    if binary:
+        data = chunk
+    else:
+        # the json framing needs the chunk to be a string
+        data = bytes_to_string(chunk)
+
+    args = {"drive_uid": "drive", "file_uid": "file", "chunk_index": 0,
+            "secret": "secret", "checksum": "checksum", "data": data}
+
+    packed_args = pack_arguments(function="upload_chunk", args=args,
+                                 key=service_key.public_key(),
+                                 response_key=response_key.public_key(),
+                                 public_cert=service_cert.public_key(),
+                                 binary=binary)
+
+    (function, args, keys) = unpack_arguments(packed_args, key=service_key)
+
+    result = create_return_value({"chunk": data})
+    packed_result = pack_return_value(function=function, payload=result,
+                                      key=keys, private_cert=service_cert)
+
+    unpack_return_value(packed_result, key=response_key,
+                        public_cert=service_cert.public_key())
+
+    return (len(packed_args), len(packed_result))
+
+
+print("Chunk size: %d bytes, %d repeats" % (chunk_size, repeats))
+
+for binary in [False, True]:
+    _round_trip(binary)
+
+    start = time.perf_counter()
+
+    for _ in range(repeats):
+        (args_size, result_size) = _round_trip(binary)
+
+    elapsed = (time.perf_counter() - start) / repeats
+
+    print("%6s framing: upload %d bytes (%.2fx), download %d bytes (%.2fx), "
+          "%.1f ms per round trip" %
+          ("binary" if binary else "json",
+           args_size, args_size / chunk_size,
+           result_size, result_size / chunk_size, 1000.0 * elapsed))
@@ -0,0 +1,49 @@
+# Benchmark the throughput of PublicKey.encrypt and PrivateKey.decrypt
+# by message size, comparing encryption using a new random symmetric
+# key for each message with encryption using a reused session key
+import os
+import time
+
+from Acquire.Crypto import PrivateKey
+
+privkey = PrivateKey()
+pubkey = privkey.public_key()
+
+sizes = [100, 1024, 16 * 1024, 256 * 1024, 1024 * 1024, 8 * 1024 * 1024]
+
+
+def _time(function, min_time=0.5):
+    """Return the average time taken to call 'function'"""
+    function()
+
+    n = 0
+    start = time.perf_counter()
+
+    while True:
+        function()
+        n += 1
+        elapsed = time.perf_counter() - start
+
+        if elapsed > min_time:
+            return elapsed / n
+
+
+print("%10s  %7s  %12s  %12s  %10s" % ("size", "session", "encrypt MB/s",
+                                       "decrypt MB/s", "overhead"))
+
+for size in sizes:
+    message = os.urandom(size)
+
+    for use_session_key in [False, True]:
+        encrypted = pubkey.encrypt(message, use_session_key=use_session_key)
+        assert(privkey.decrypt(encrypted) == message)
+
+        t_encrypt = _time(lambda: pubkey.encrypt(
+                                    message, use_session_key=use_session_key))
+        t_decrypt = _time(lambda: privkey.decrypt(encrypted))
+
+        print("%10d  %7s  %12.1f  %12.1f  %9.2fx" %
+              (size, use_session_key,
+               size / t_encrypt / (1024 * 1024),
+               size / t_decrypt / (1024 * 1024),
+               len(encrypted) / size))
@@ -0,0 +1,74 @@
+# Benchmark the cost of get_this_service, which is called (sometimes
+# several times) by almost every service function. This compares a
+# cold call, which loads the service data and decrypts the skeleton
+# key and private keys, with a call in a warm process that uses the
+# cached service object, and with a call that revalidates the cached
+# object against the stored 'last_key_update'
+import os
+import sys
+import tempfile
+import time
+
+from Acquire.ObjectStore import ObjectStore
+from Acquire.Service import Service, push_is_running_service, \
+    push_testing_objstore, get_service_account_bucket, \
+    get_this_service, clear_serviceinfo_cache
+
+import Acquire.Service._service_account as _service_account
+
+try:
+    repeats = int(sys.argv[1])
+except:
+    repeats = 20
+
+password = "Service_pa33word"
+os.environ["SERVICE_PASSWORD"] = password
+
+push_testing_objstore(tempfile.mkdtemp())
+push_is_running_service()
+
+service = Service.create(service_type="identity", service_url="identity")
+service.create_stage2(service_uid="Z9-Z8", response=service.uid())
+
+ObjectStore.set_object_from_json(get_service_account_bucket(),
+                                 "_service_key", service.to_data(password))
+
+
+def _cold(need_private_access):
+    clear_serviceinfo_cache()
+    get_this_service(need_private_access=need_private_access)
+
+
+def _warm(need_private_access):
+    get_this_service(need_private_access=need_private_access)
+
+
+def _revalidate(need_private_access):
+    _service_account._service_revalidate_time = 0
+    get_this_service(need_private_access=need_private_access)
+    _service_account._service_revalidate_time = 60
+
+
+def _time(function, need_private_access, n):
+    """Return the average time taken to call 'function'"""
+    function(need_private_access)
+
+    start = time.perf_counter()
+
+    for _ in range(0, n):
+        function(need_private_access)
+
+    return (time.perf_counter() - start) / n
+
+
+print("%8s  %12s  %12s  %15s" % ("private", "cold (ms)", "warm (ms)",
+                                  "revalidate (ms)"))
+
+for need_private_access in [False, True]:
+    t_cold = _time(_cold, need_private_access, repeats)
+    t_warm = _time(_warm, need_private_access, 100 * repeats)
+    t_revalidate = _time(_revalidate, need_private_access, repeats)
+
+    print("%8s  %12.3f  %12.4f  %15.3f" %
+          (need_private_access, 1000 * t_cold, 1000 * t_warm,
+           1000 * t_revalidate))
@@ -0,0 +1,90 @@
+# Benchmark the throughput of Ledger.perform on the local testing object
+# store, comparing performing each transaction with its own call (so
+# each is checked against its own balance read and written separately)
+# with performing all of the transactions as one batch (one balance
+# check, with the line items written together)
+import random
+import sys
+import tempfile
+import time
+
+from Acquire.Accounting import Account, Accounts, Ledger, Transaction, \
+    create_decimal
+from Acquire.Crypto import get_private_key
+from Acquire.Identity import Authorisation
+from Acquire.Service import push_is_running_service, push_testing_objstore, \
+    get_service_account_bucket
+
+try:
+    ntransactions = int(sys.argv[1])
+except:
+    ntransactions = 200
+
+testing_key = get_private_key("testing")
+
+push_testing_objstore(tempfile.mkdtemp())
+push_is_running_service()
+
+bucket = get_service_account_bucket()
+
+
+def _create_account(user_guid, name):
+    """Create an account called 'name' owned by 'user_guid' that
+       can afford all of the transactions
+    """
+    accounts = Accounts(user_guid=user_guid)
+    account = Account(name=name, description="Benchmark account",
+                      group_name=accounts.name(), bucket=bucket)
+    account.set_overdraft_limit(1000000 * ntransactions)
+    return account
+
+
+debit_account = _create_account("debit@local", "debit")
+credit_account = _create_account("credit@local", "credit")
+
+
+def _transactions():
+    """Return 'ntransactions' new random transactions"""
+    return [Transaction(create_decimal(random.random()),
+                        "benchmark transaction %d" % i)
+            for i in range(0, ntransactions)]
+
+
+def _perform(transactions):
+    """Perform the passed transactions as a single batch"""
+    resource = " ".join([t.fingerprint() for t in transactions])
+    authorisation = Authorisation(
+                        resource=resource, testing_key=testing_key,
+                        testing_user_guid=debit_account.group_name())
+
+    return Ledger.perform(transactions=transactions,
+                          debit_account=debit_account,
+                          credit_account=credit_account,
+                          authorisation=authorisation,
+                          bucket=bucket)
+
+
+def _time_one_by_one():
+    transactions = _transactions()
+    start = time.perf_counter()
+
+    for transaction in transactions:
+        _perform([transaction])
+
+    return time.perf_counter() - start
+
+
+def _time_batch():
+    transactions = _transactions()
+    start = time.perf_counter()
+    _perform(transactions)
+    return time.perf_counter() - start
+
+
+t_one = _time_one_by_one()
+t_batch = _time_batch()
+
+print("%14s  %10s  %14s" % ("mode", "time (s)", "transactions/s"))
+
+for (mode, t) in [("one by one", t_one), ("batch", t_batch)]:
+    print("%14s  %10.3f  %14.1f" % (mode, t, ntransactions / t))